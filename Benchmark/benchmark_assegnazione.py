@@ -0,0 +1,107 @@
+"""Benchmark della risoluzione dei match multipli (ex step A-D delle funzioni di record linkage).
+   Confronta gli step A-D originali (drop_duplicates + groupby.apply sul massimo + concat) con
+   assegna_uno_a_uno (Funzioni/assegnazione.py) in modalità 'greedy' e 'ottimo' su:
+      - le coppie sopra soglia dei dati di Roma e Terni ('Data Product'), a diverse soglie;
+      - coppie sintetiche (100k di default) con score casuali sopra soglia.
+   Per ogni metodo riporta tempo, numero di match e numero di location con più di un match (violazioni dell'1:1).
+   Uso:
+      python "Benchmark/benchmark_assegnazione.py" [--coppie-sintetiche 100000]
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from confronto import jarowinkler_vettoriale
+from assegnazione import assegna_uno_a_uno
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def step_a_d(scores_df: pd.DataFrame, score: str) -> pd.DataFrame:
+   """Gli step A-D originali di record_linkage_title, per confronto."""
+   match = scores_df.drop_duplicates(subset="index_booking", keep=False)
+   match = match.drop_duplicates(subset="index_agoda", keep=False)
+
+   dups = scores_df[scores_df.duplicated(subset="index_booking", keep=False)]
+   booking_best_match = dups.groupby("index_booking", group_keys=False).apply(
+      lambda row: row[row[score] == row[score].max()]
+   )
+   dups = scores_df[scores_df.duplicated(subset="index_agoda", keep=False)]
+   agoda_best_match = dups.groupby("index_agoda", group_keys=False).apply(
+      lambda row: row[row[score] == row[score].max()]
+   )
+
+   agoda_best_match["pair"] = agoda_best_match["index_booking"].astype(str) + "#" + agoda_best_match["index_agoda"].astype(str)
+   booking_best_match["pair"] = booking_best_match["index_booking"].astype(str) + "#" + booking_best_match["index_agoda"].astype(str)
+   match = pd.concat([match, booking_best_match])
+   match = pd.concat([match, agoda_best_match])
+   match = match.drop_duplicates(subset=["index_booking", "index_agoda"])
+   return match
+
+
+def misura(nome: str, scores_df: pd.DataFrame) -> list:
+   righe = []
+   metodi = {
+      "step A-D": lambda df: step_a_d(df, "score"),
+      "greedy": lambda df: assegna_uno_a_uno(df, "score", "greedy"),
+      "ottimo": lambda df: assegna_uno_a_uno(df, "score", "ottimo"),
+   }
+   for metodo, funzione in metodi.items():
+      inizio = time.perf_counter()
+      match = funzione(scores_df)
+      tempo = time.perf_counter() - inizio
+      violazioni = match["index_booking"].duplicated().sum() + match["index_agoda"].duplicated().sum()
+      righe.append({"input": nome, "coppie": len(scores_df), "metodo": metodo, "tempo [s]": round(tempo, 4),
+                    "match": len(match), "somma score": round(match["score"].sum(), 2),
+                    "violazioni 1:1": int(violazioni)})
+   return righe
+
+
+def coppie_sintetiche(n: int, seed: int = 0) -> pd.DataFrame:
+   """n coppie casuali tra n/2 location booking e n/2 location agoda, score arrotondato a 2 decimali (molti pareggi)."""
+   rng = np.random.default_rng(seed)
+   scores_df = pd.DataFrame({"index_booking": rng.integers(0, n // 2, n),
+                             "index_agoda": rng.integers(0, n // 2, n),
+                             "score": np.round(rng.uniform(0.95, 1.0, n), 2)})
+   scores_df = scores_df.drop_duplicates(subset=["index_booking", "index_agoda"]).reset_index(drop=True)
+   scores_df["pair"] = scores_df["index_booking"].astype(str) + "#" + scores_df["index_agoda"].astype(str)
+   return scores_df
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--coppie-sintetiche", type=int, default=100000)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   booking["first_letter"] = booking["titolo_processed"].str[0]
+   agoda["first_letter"] = agoda["titolo_processed"].str[0]
+   indexer = recordlinkage.Index()
+   indexer.block("first_letter")
+   candidate_links = indexer.index(booking, agoda)
+   similarita = jarowinkler_vettoriale(candidate_links, booking["titolo_processed"], agoda["titolo_processed"])
+
+   righe = []
+   for soglia in (0.95, 0.9, 0.8):
+      scores_df = similarita[similarita > soglia].rename("score").reset_index()
+      scores_df.columns = ["index_booking", "index_agoda", "score"]
+      scores_df["pair"] = scores_df["index_booking"].astype(str) + "#" + scores_df["index_agoda"].astype(str)
+      righe.extend(misura(f"Roma+Terni soglia {soglia}", scores_df))
+   righe.extend(misura("sintetico", coppie_sintetiche(args.coppie_sintetiche)))
+
+   with pd.option_context("display.width", 200):
+      print(pd.DataFrame(righe).to_string(index=False))
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,61 @@
+"""Benchmark delle strategie di blocking (STEP 1-2 delle funzioni di record linkage).
+   Per ogni strategia misura tempo, numero di coppie candidate, pair reduction ratio e pair completeness
+   rispetto ai match salvati in 'Results' (matches_titolo_095.csv e matches_titolo_095_città_08.csv).
+   Uso:
+      python "Benchmark/benchmark_blocking.py"
+"""
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from blocking import IndiceInvertito, TopKTfidf, valuta_blocking
+
+
+def main():
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0).rename(columns={"titolo_processed": "titolo_agoda"})
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0).rename(columns={"titolo_processed": "titolo_booking"})
+   booking["first_letter"] = booking["titolo_booking"].str[0]
+   agoda["first_letter"] = agoda["titolo_agoda"].str[0]
+
+   risultati = {}
+   for file in ("matches_titolo_095.csv", "matches_titolo_095_città_08.csv"):
+      match = pd.read_csv(paths["path_results"] / file)
+      risultati[file] = pd.MultiIndex.from_arrays([match["index_booking"], match["index_agoda"]])
+
+   strategie = {"first_letter": None}
+   for max_blocco in (1000, 100, 50):
+      strategie[f"token max_blocco={max_blocco}"] = IndiceInvertito(modalita="token", max_blocco=max_blocco)
+   strategie["token 2 token comuni"] = IndiceInvertito(modalita="token", min_token_comuni=2)
+   for q, comuni in ((3, 1), (3, 2), (4, 2)):
+      strategie[f"qgram q={q}, {comuni} comuni"] = IndiceInvertito(modalita="qgram", q=q, min_token_comuni=comuni, max_blocco=300)
+   for k in (1, 3, 5, 10):
+      strategie[f"tfidf top-{k}"] = TopKTfidf(k=k)
+
+   righe = []
+   for nome, algoritmo in strategie.items():
+      indexer = recordlinkage.Index()
+      if algoritmo is None:
+         indexer.block("first_letter")
+      else:
+         indexer.add(algoritmo)
+      inizio = time.perf_counter()
+      candidate_links = indexer.index(booking, agoda)
+      tempo = time.perf_counter() - inizio
+
+      for file, match_veri in risultati.items():
+         valutazione = valuta_blocking(candidate_links, match_veri, len(booking), len(agoda))
+         righe.append({"strategia": nome, "tempo [s]": round(tempo, 3), "risultati": file, **valutazione})
+
+   tabella = pd.DataFrame(righe)
+   with pd.option_context("display.width", 200, "display.max_columns", None):
+      print(tabella.to_string(index=False))
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,56 @@
+"""Benchmark della cache delle similarità (Funzioni/cache.py) su una serie di soglie, come nel notebook RecordLinkage.ipynb.
+   record_linkage_title è eseguita per ogni soglia senza cache e con una cache nuova (cartella temporanea):
+   con la cache solo la prima esecuzione calcola le similarità, le altre le leggono dal disco.
+   Il dataframe booking può essere replicato (--repliche) per avere più coppie.
+   Uso:
+      python "Benchmark/benchmark_cache.py" [--soglie 0.9 0.95 0.955] [--repliche 10] [--blocking first_letter]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import record_linkage_title
+from cache import CacheSimilarita
+from benchmark_streaming import replica
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--soglie", type=float, nargs="+", default=[0.9, 0.925, 0.95, 0.955, 0.97])
+   parser.add_argument("--repliche", type=int, default=10)
+   parser.add_argument("--blocking", default="first_letter")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = replica(pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0), args.repliche)
+
+   with tempfile.TemporaryDirectory() as cartella:
+      cache = CacheSimilarita(Path(cartella) / "cache_similarita")
+      print(f"{'soglia':>7} {'senza cache [s]':>16} {'con cache [s]':>14} {'hit':>9} {'miss':>9} {'match':>6}")
+      for soglia in args.soglie:
+         inizio = time.perf_counter()
+         senza_cache = record_linkage_title(agoda.copy(), booking.copy(), soglia, blocking=args.blocking)
+         tempo_senza = time.perf_counter() - inizio
+
+         cache.azzera_statistiche()
+         inizio = time.perf_counter()
+         con_cache = record_linkage_title(agoda.copy(), booking.copy(), soglia, blocking=args.blocking, cache=cache)
+         tempo_con = time.perf_counter() - inizio
+
+         assert len(senza_cache) == len(con_cache)
+         statistiche = cache.statistiche()
+         print(f"{soglia:>7} {tempo_senza:>16.2f} {tempo_con:>14.2f} {statistiche['hit']:>9} {statistiche['miss']:>9} {len(con_cache):>6}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,74 @@
+"""Benchmark del calcolo della similarità Jaro-Winkler sui titoli (STEP 3-4 di record_linkage_title).
+   Confronta recordlinkage.Compare().string(method='jarowinkler') con jarowinkler_vettoriale (Funzioni/confronto.py)
+   sui dati di 'Data Product', con il dataframe booking replicato 10 e 100 volte (le coppie candidate crescono in proporzione).
+   Le repliche sono di due tipi:
+      - 'copie', titoli identici all'originale (caso di scraping ripetuti);
+      - 'varianti', ad ogni titolo replicato è aggiunto il numero della replica, così tutte le coppie sono diverse.
+   Uso:
+      python "Benchmark/benchmark_confronto.py" [--repliche 1 10 100]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from confronto import jarowinkler_vettoriale
+
+
+def replica(booking: pd.DataFrame, volte: int, varianti: bool) -> pd.DataFrame:
+   """Replica il dataframe booking 'volte' volte con un nuovo index univoco."""
+   copie = []
+   for k in range(volte):
+      copia = booking.copy()
+      if varianti and k:
+         copia["titolo_processed"] = copia["titolo_processed"] + f" {k}"
+      copie.append(copia)
+   replicato = pd.concat(copie, ignore_index=True)
+   replicato["first_letter"] = replicato["titolo_processed"].str[0]
+   return replicato
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, nargs="+", default=[1, 10, 100])
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda["first_letter"] = agoda["titolo_processed"].str[0]
+
+   indexer = recordlinkage.Index()
+   indexer.block("first_letter")
+
+   print(f"{'repliche':>8} {'tipo':>9} {'coppie':>10} {'recordlinkage [s]':>18} {'vettoriale [s]':>15} {'speedup':>8} {'max |diff|':>11}")
+   for volte in args.repliche:
+      for varianti in (False, True):
+         if volte == 1 and varianti:
+            continue
+         booking_replicato = replica(booking, volte, varianti)
+         candidate_links = indexer.index(booking_replicato, agoda)
+
+         compare = recordlinkage.Compare()
+         compare.string("titolo_processed", "titolo_processed", method="jarowinkler", label="name_similarity")
+         inizio = time.perf_counter()
+         atteso = compare.compute(candidate_links, booking_replicato, agoda)["name_similarity"]
+         tempo_recordlinkage = time.perf_counter() - inizio
+
+         inizio = time.perf_counter()
+         ottenuto = jarowinkler_vettoriale(candidate_links, booking_replicato["titolo_processed"], agoda["titolo_processed"])
+         tempo_vettoriale = time.perf_counter() - inizio
+
+         differenza = np.abs(atteso.to_numpy() - ottenuto.to_numpy()).max()
+         print(f"{volte:>8} {'varianti' if varianti else 'copie':>9} {len(candidate_links):>10} "
+               f"{tempo_recordlinkage:>18.3f} {tempo_vettoriale:>15.3f} {tempo_recordlinkage / tempo_vettoriale:>8.1f} {differenza:>11.2e}")
+
+
+if __name__ == "__main__":
+   main()
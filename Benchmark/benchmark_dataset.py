@@ -0,0 +1,107 @@
+"""Benchmark del salvataggio in Parquet (Funzioni/dataset.py) rispetto ai csv usati oggi tra un passaggio e l'altro.
+   Il dataframe booking di 'Data Product' è replicato fino a circa --righe righe, con date del soggiorno diverse
+   per ogni replica (così ci sono più partizioni città x date). Per ogni modalità di lettura si misurano
+   il tempo, il picco di memoria (RSS, in un processo nuovo per ogni lettura, perché pyarrow non usa l'allocatore
+   di python e tracemalloc non lo vede) e la memoria del dataframe letto; le letture csv includono la conversione
+   ai tipi del Parquet (tipizza), che oggi ogni notebook rifà a modo suo.
+   Si verifica che i dati letti dal Parquet siano uguali a quelli del csv.
+   Uso:
+      python "Benchmark/benchmark_dataset.py" [--righe 1000000]
+"""
+import argparse
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from dataset import leggi_dataset, scrivi_dataset, tipizza
+
+COLONNE_LINKAGE = ["titolo_processed", "città"]
+
+
+def leggi(modalita: str, path_csv: Path, path_parquet: Path):
+   if modalita == "csv":
+      return tipizza(pd.read_csv(path_csv, index_col=0))
+   if modalita == "csv, colonne linkage":
+      # La prima colonna (senza nome) è l'indice
+      return pd.read_csv(path_csv, index_col=0, usecols=lambda c: c in COLONNE_LINKAGE or c in ("", "Unnamed: 0"))
+   if modalita == "parquet":
+      return leggi_dataset(path_parquet)
+   if modalita == "parquet, colonne linkage":
+      return leggi_dataset(path_parquet, COLONNE_LINKAGE)
+   if modalita == "parquet, linkage, str arrow":
+      return leggi_dataset(path_parquet, COLONNE_LINKAGE, stringhe_arrow=True)
+   if modalita == "parquet, linkage solo roma":
+      return leggi_dataset(path_parquet, COLONNE_LINKAGE, filtri=[("città", "==", "roma")])
+   raise ValueError(modalita)
+
+
+def _picco_rss() -> float:
+   """Picco di memoria residente del processo in MB (VmHWM di Linux; ru_maxrss invece sopravvive all'exec
+      e nel processo nuovo varrebbe quanto il processo padre)."""
+   with open("/proc/self/status") as f:
+      return next(int(riga.split()[1]) for riga in f if riga.startswith("VmHWM")) / 1024
+
+
+def _misura(modalita, path_csv, path_parquet):
+   """Eseguita in un processo nuovo: tempo, picco di RSS oltre a quello dopo gli import, memoria del dataframe."""
+   # pyarrow carica i moduli per i dataset alla prima lettura: vanno importati prima di misurare
+   import pyarrow.dataset  # noqa: F401
+   base = _picco_rss()
+   inizio = time.perf_counter()
+   dataframe = leggi(modalita, path_csv, path_parquet)
+   tempo = time.perf_counter() - inizio
+   picco = _picco_rss() - base
+   return tempo, picco, dataframe.memory_usage(deep=True).sum() / 2**20, len(dataframe)
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, default=1_000_000)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   copie = []
+   for k in range(-(-args.righe // len(booking))):
+      copia = booking.copy()
+      for colonna in ("inizio_permanenza_datetime", "fine_permanenza_datetime"):
+         copia[colonna] = (pd.to_datetime(copia[colonna]) + pd.Timedelta(days=k % 30)).dt.strftime("%Y-%m-%d")
+      if k:
+         copia["titolo_processed"] = copia["titolo_processed"] + f" {k}"
+      copie.append(copia)
+   dataframe = pd.concat(copie, ignore_index=True).iloc[:args.righe]
+
+   with tempfile.TemporaryDirectory() as cartella:
+      path_csv, path_parquet = Path(cartella) / "booking.csv", Path(cartella) / "booking.parquet"
+      inizio = time.perf_counter()
+      dataframe.to_csv(path_csv)
+      tempo_csv = time.perf_counter() - inizio
+      inizio = time.perf_counter()
+      scrivi_dataset(dataframe, path_parquet)
+      tempo_parquet = time.perf_counter() - inizio
+      dimensione = sum(f.stat().st_size for f in path_parquet.rglob("*.parquet"))
+      print(f"Righe: {len(dataframe)}, partizioni: {len(list(path_parquet.rglob('*.parquet')))}")
+      print(f"Scrittura: csv {tempo_csv:.2f} s ({path_csv.stat().st_size / 2**20:.1f} MB), "
+            f"parquet {tempo_parquet:.2f} s ({dimensione / 2**20:.1f} MB)")
+
+      uguali = leggi_dataset(path_parquet).equals(tipizza(pd.read_csv(path_csv, index_col=0)))
+      print(f"Parquet uguale al csv tipizzato: {uguali}")
+
+      contesto = multiprocessing.get_context("spawn")
+      print(f"{'lettura':>27} {'tempo [s]':>10} {'picco RSS [MB]':>15} {'dataframe [MB]':>15} {'righe':>8}")
+      for modalita in ("csv", "parquet", "csv, colonne linkage", "parquet, colonne linkage",
+                      "parquet, linkage, str arrow", "parquet, linkage solo roma"):
+         with ProcessPoolExecutor(max_workers=1, mp_context=contesto) as executor:
+            tempo, picco, memoria, righe = executor.submit(_misura, modalita, path_csv, path_parquet).result()
+         print(f"{modalita:>27} {tempo:>10.2f} {picco:>15.1f} {memoria:>15.1f} {righe:>8}")
+
+
+if __name__ == "__main__":
+   main()
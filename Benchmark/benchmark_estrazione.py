@@ -0,0 +1,164 @@
+"""Benchmark dell'estrazione delle informazioni dagli html salvati (Funzioni/estrazione.py) rispetto al ciclo
+   dei notebook 02)_Get_Info (BeautifulSoup con 'html.parser', una riga alla volta con df.loc[len(df)]).
+   Sono usati gli html presenti nelle cartelle 'html' degli scraper; con --repliche ogni pagina è elaborata più volte,
+   come se fossero state salvate più pagine. Si verifica che i csv scritti dalle due versioni siano identici.
+   Uso:
+      python "Benchmark/benchmark_estrazione.py" [--repliche 4] [--n-jobs 1 -1]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from estrazione import COLONNE_AGODA, COLONNE_BOOKING, estrai_html, ordina_pagine
+
+
+#%%% Cicli dei notebook (copiati da 02)_Get_Info.ipynb, senza tqdm)
+
+def notebook_booking(paths: list) -> pd.DataFrame:
+   booking_dataframe = pd.DataFrame(columns=COLONNE_BOOKING)
+   for path in paths:
+      with open(path, "r") as f:
+         html = f.read()
+      html_bs4 = BeautifulSoup(html, 'html.parser')
+      proprietà = html_bs4.find_all("div", {"data-testid": "property-card"})
+
+      for post in proprietà:
+         titolo = post.find("div", {"data-testid": "title"}).text
+         review = post.find("div", {"data-testid": "review-score"})
+         if review != None:
+            recensione_voto_numerico = review.find("div", {"aria-hidden": "true"}).text
+            info_recensioni = review.find("div", {"aria-hidden": "false"})
+            for div in info_recensioni:
+               if ("recensioni" in div.text.lower()) or ("recensione" in div.text.lower()):
+                  numero_recensioni = div.text
+               else:
+                  recensione_voto_parola = div.text
+         else:
+            recensione_voto_numerico = "Novità su booking"
+            numero_recensioni = "Novità su booking"
+            recensione_voto_parola = "Novità su booking"
+
+         info_costi = post.find("div", {"data-testid": "availability-rate-wrapper"})
+         permanenza = info_costi.find("div", {"data-testid": "price-for-x-nights"}).text
+         prezzo = info_costi.find("span", {"data-testid": "price-and-discounted-price"}).text
+         distanza_centro = post.find("span", {"data-testid": "distance"}).text
+         indirizzo = post.find("span", {"data-testid": "address"}).text
+
+         rating_stars = post.find("div", {"data-testid": "rating-stars"})
+         if rating_stars != None:
+            stelle = len(rating_stars.find_all("div"))
+         else:
+            stelle = np.nan
+         rating_booking = post.find("div", {"data-testid": "rating-squares"})
+         if rating_booking != None:
+            valutazione_booking = len(rating_booking.find_all("div"))
+         else:
+            valutazione_booking = np.nan
+
+         descrizione_unprocessed = post.find("div", {"data-testid": "recommended-units"}).text
+         descrizione = post.find("div", {"data-testid": "recommended-units"})
+         descrizione_camera = descrizione.find("h4").text
+         configurazione_camera = descrizione.find("div", {"data-testid": "property-card-unit-configuration"})
+         if configurazione_camera != None:
+            configurazione_camera = configurazione_camera.text
+         else:
+            configurazione_camera = "Configurazione camera non disponibile"
+
+         booking_dataframe.loc[len(booking_dataframe)] = {
+            "titolo": titolo, "recensione_voto_numerico": recensione_voto_numerico,
+            "recensione_voto_parola": recensione_voto_parola, "numero_recensioni": numero_recensioni,
+            "date": "1 agosto - 2 agosto", "permanenza": permanenza, "prezzo": prezzo,
+            "distanza_centro": distanza_centro, "indirizzo": indirizzo, "stelle": stelle,
+            "valutazione_booking": valutazione_booking, "descrizione_camera": descrizione_camera,
+            "configurazione_camera": configurazione_camera, "descrizione_unprocessed": descrizione_unprocessed}
+   return booking_dataframe
+
+
+def notebook_agoda(paths: list) -> pd.DataFrame:
+   booking_dataframe = pd.DataFrame(columns=COLONNE_AGODA)
+   for path in paths:
+      with open(path, "r") as f:
+         html = f.read()
+      html_bs4 = BeautifulSoup(html, 'html.parser')
+      proprietà = html_bs4.find_all("div", {"data-element-name": "PropertyCardBaseJacket"})
+
+      for post in proprietà:
+         header = post.find("header", {"data-element-name": "property-info-header"})
+         try:
+            titolo = header.find("h3", {"data-selenium": "hotel-name"}).text
+         except:
+            continue
+
+         rating = header.find("div", {"data-testid": "rating-container"})
+         if rating != None:
+            rating = rating.find_all("svg", {"opacity": "1"})
+            stelle = len(rating)
+         else:
+            stelle = np.nan
+
+         indirizzo = header.find("div", {"data-selenium": "area-city"}).text
+         indirizzo = indirizzo.replace("- Guarda sulla mappa", "")
+
+         informazioni = post.find("div", {"data-element-name": "property-card-pricing-info"})
+         informazioni_recensioni = informazioni.find("div", {"class": "Box-sc-kv6pi1-0 hRUYUu PropertyCard__PricingHeadliner"})
+         for p in informazioni_recensioni.find_all("p"):
+            spans = p.find_all("span")
+            if len(spans) > 0:
+               for span in spans:
+                  if "," in span.text:
+                     recensione_voto_numerico = span.text
+                  else:
+                     recensione_voto_parola = span.text
+            else:
+               numero_recensioni = p.text
+
+         prezzo = informazioni.find("div", {"data-element-name": "property-card-price"})
+         prezzo = prezzo.find("div", {"data-element-name": "final-price"}).text
+
+         booking_dataframe.loc[len(booking_dataframe)] = {
+            "titolo": titolo, "recensione_voto_numerico": recensione_voto_numerico,
+            "recensione_voto_parola": recensione_voto_parola, "numero_recensioni": numero_recensioni,
+            "date": "1 agosto - 2 agosto", "permanenza": "1 notte, 2 adulti", "prezzo": prezzo,
+            "indirizzo": indirizzo, "valutazione": stelle}
+   return booking_dataframe
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, default=4)
+   parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, -1])
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   notebook = {"booking": notebook_booking, "agoda": notebook_agoda}
+   print(f"Core disponibili: {os.cpu_count()}")
+   print(f"{'piattaforma':>11} {'pagine':>6} {'righe':>6} {'versione':>16} {'tempo [s]':>10} {'speedup':>8} {'csv uguali':>11}")
+   for piattaforma in ("booking", "agoda"):
+      pagine = ordina_pagine((paths[f"path_scraper_{piattaforma}"] / "html").glob("html_final*.txt")) * args.repliche
+
+      inizio = time.perf_counter()
+      riferimento = notebook[piattaforma](pagine)
+      tempo_base = time.perf_counter() - inizio
+      csv_riferimento = riferimento.to_csv()
+      print(f"{piattaforma:>11} {len(pagine):>6} {len(riferimento):>6} {'notebook (bs4)':>16} {tempo_base:>10.2f} {1:>8.2f} {'':>11}")
+
+      for n_jobs in args.n_jobs:
+         inizio = time.perf_counter()
+         estratto = estrai_html(piattaforma, pagine, n_jobs=n_jobs)
+         tempo = time.perf_counter() - inizio
+         print(f"{piattaforma:>11} {len(pagine):>6} {len(estratto):>6} {f'lxml n_jobs={n_jobs}':>16} {tempo:>10.2f} "
+               f"{tempo_base / tempo:>8.2f} {str(estratto.to_csv() == csv_riferimento):>11}")
+
+
+if __name__ == "__main__":
+   main()
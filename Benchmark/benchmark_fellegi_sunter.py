@@ -0,0 +1,81 @@
+"""Benchmark del modello di Fellegi-Sunter sulla tabella dei pattern di accordo (Funzioni/fellegi_sunter.py).
+   Il dataframe booking di 'Data Product' è replicato (vedi benchmark_streaming.replica) e le coppie candidate sono
+   generate con il blocking sulla prima lettera, così le coppie sono molte. Per ogni numero di repliche:
+      - binario: recordlinkage.ECMClassifier (fit + predict su tutte le coppie) contro em_livelli sull'istogramma
+        delle coppie, con la verifica che le coppie classificate match siano le stesse;
+      - più livelli: em_livelli con i livelli di LIVELLI_FELLEGI_SUNTER e lookup dei pesi sulle coppie (pesi_coppie).
+   I tempi del modello non comprendono il calcolo delle similarità.
+   Uso:
+      python "Benchmark/benchmark_fellegi_sunter.py" [--repliche 1 5 20] [--soglia-titolo 0.95] [--soglia-citta 0.8]
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+from funzioni import LIVELLI_FELLEGI_SUNTER, calcola_features, crea_indexer, proiezione_linkage
+from fellegi_sunter import em_livelli, istogramma_soglie, livelli_accordo, pesi_coppie
+from benchmark_streaming import replica
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, nargs="+", default=[1, 5, 20])
+   parser.add_argument("--soglia-titolo", type=float, default=0.95)
+   parser.add_argument("--soglia-citta", type=float, default=0.8)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda = proiezione_linkage(pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0), "agoda")
+   confronti = {"name_similarity": ("titolo_booking", "titolo_agoda"), "città_similarity": ("città", "città")}
+   soglie = [np.array([args.soglia_titolo]), np.array([args.soglia_citta])]
+   livelli = [np.unique(np.append(s, LIVELLI_FELLEGI_SUNTER.get(nome, ()))) for nome, s in zip(confronti, soglie)]
+
+   print(f"{'repliche':>8} {'coppie':>9} {'modello':>22} {'pattern':>7} {'iterazioni':>10} {'tempo [s]':>10} "
+         f"{'match':>7} {'uguali':>7}")
+   for repliche in args.repliche:
+      features = calcola_features(proiezione_linkage(replica(booking, repliche), "booking"), agoda,
+                                  crea_indexer("first_letter"), confronti)
+
+      # ECMClassifier su tutte le coppie binarizzate
+      inizio = time.perf_counter()
+      binarie = (features > [args.soglia_titolo, args.soglia_citta]).astype(int)
+      classificatore = recordlinkage.ECMClassifier()
+      classificatore.fit(binarie)
+      match_ecm = binarie.index.isin(classificatore.predict(binarie))
+      tempo_ecm = time.perf_counter() - inizio
+      print(f"{repliche:>8} {len(features):>9} {'ECMClassifier':>22} {'':>7} {'':>10} {tempo_ecm:>10.2f} "
+            f"{int(match_ecm.sum()):>7} {'':>7}")
+
+      # Stesso modello sulla tabella dei pattern, binaria e a più livelli
+      for nome, tagli in (("em_livelli binario", soglie), ("em_livelli più livelli", livelli)):
+         inizio = time.perf_counter()
+         istogramma = istogramma_soglie(features, tagli)
+         modello = em_livelli(istogramma)
+         probabilita = pesi_coppie(livelli_accordo(features, tagli), modello)["probabilita_match"].to_numpy()
+         match = probabilita > 0.5
+         tempo = time.perf_counter() - inizio
+         uguali = str(bool(np.array_equal(match, match_ecm))) if len(tagli[0]) == 1 else ""
+         print(f"{repliche:>8} {len(features):>9} {nome:>22} {np.count_nonzero(istogramma):>7} "
+               f"{modello['iterazioni']:>10} {tempo:>10.2f} {int(match.sum()):>7} {uguali:>7}")
+
+   print("Probabilità di match per livello del titolo (righe) e della città (colonne), più livelli:")
+   print(pd.DataFrame(modello["probabilita_match"],
+                      index=[f"titolo > {s}" if i else f"titolo <= {livelli[0][0]}" for i, s in enumerate([None, *livelli[0]])],
+                      columns=[f"città > {s}" if i else f"città <= {livelli[1][0]}" for i, s in enumerate([None, *livelli[1]])]
+                      ).round(3).to_string())
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,86 @@
+"""Benchmark del record linkage incrementale (ArchivioLinkage di Funzioni/incrementale.py).
+   I dataframe di 'Data Product' sono replicati (vedi benchmark_streaming.replica) e si simulano più scraping successivi:
+   ad ogni "giorno" una quota delle location di booking e agoda è rimossa, una quota ha il titolo processato modificato
+   e si aggiungono nuove location (location dell'altra piattaforma con il titolo cambiato).
+   Per ogni giorno si misura il tempo di record_linkage_title da zero e quello dell'aggiornamento dell'archivio,
+   e si verifica che i match siano gli stessi; con l'assegnazione 'ottimo', se ci sono più soluzioni ottime,
+   le due esecuzioni possono sceglierne due diverse: si verifica allora che la somma degli score sia la stessa.
+   Uso:
+      python "Benchmark/benchmark_incrementale.py" [--repliche 20] [--giorni 3] [--quota 0.02] [--assegnazione greedy]
+"""
+import argparse
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import record_linkage_title
+from incrementale import ArchivioLinkage
+from coppie import chiavi_coppie
+from benchmark_streaming import replica
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def nuovo_giorno(df: pd.DataFrame, altra: pd.DataFrame, quota: float, giorno: int, rng) -> pd.DataFrame:
+   """Simula lo scraping successivo: rimuove, modifica e aggiunge ciascuna una quota 'quota' delle location."""
+   n = int(len(df) * quota)
+   df = df.drop(rng.choice(df.index, n, replace=False))
+   modificate = rng.choice(df.index, n, replace=False)
+   df.loc[modificate, "titolo_processed"] = df.loc[modificate, "titolo_processed"] + " Rome"
+   nuove = altra.sample(n, random_state=giorno)[df.columns.intersection(altra.columns)].copy()
+   nuove["titolo"] = nuove["titolo"] + f" {giorno}"
+   return pd.concat([df, nuove], ignore_index=True)
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, default=20)
+   parser.add_argument("--giorni", type=int, default=3)
+   parser.add_argument("--quota", type=float, default=0.02)
+   parser.add_argument("--soglia", type=float, default=0.95)
+   parser.add_argument("--assegnazione", default="greedy")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = replica(pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0), args.repliche)
+   booking = replica(pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0), args.repliche)
+   # Le repliche di una location devono avere chiavi diverse (vedi chiavi_record): anche il titolo riceve il numero della replica
+   for df in (agoda, booking):
+      df["titolo"] = df["titolo"] + " " + (df.index // (len(df) // args.repliche)).astype(str)
+   rng = np.random.default_rng(0)
+
+   print(f"{'giorno':>6} {'booking':>8} {'agoda':>7} {'da zero [s]':>12} {'incrementale [s]':>17} "
+         f"{'confrontate':>12} {'match':>6} {'uguali':>7} {'stessa somma':>13}")
+   with tempfile.TemporaryDirectory() as cartella:
+      archivio = ArchivioLinkage(cartella, args.soglia, assegnazione=args.assegnazione)
+      for giorno in range(args.giorni + 1):
+         if giorno:
+            booking_nuovo = nuovo_giorno(booking, agoda, args.quota, giorno, rng)
+            agoda = nuovo_giorno(agoda, booking, args.quota, giorno, rng)
+            booking = booking_nuovo
+
+         inizio = time.perf_counter()
+         completo = record_linkage_title(agoda.copy(), booking.copy(), args.soglia, blocking="token",
+                                        assegnazione=args.assegnazione)
+         tempo_completo = time.perf_counter() - inizio
+
+         inizio = time.perf_counter()
+         incrementale = archivio.aggiorna(booking, agoda)
+         tempo_incrementale = time.perf_counter() - inizio
+
+         uguali = np.array_equal(np.sort(chiavi_coppie(completo)), np.sort(chiavi_coppie(incrementale)))
+         stessa_somma = np.isclose(completo["name_similarity"].sum(), incrementale["name_similarity"].sum())
+         print(f"{giorno:>6} {len(booking):>8} {len(agoda):>7} {tempo_completo:>12.2f} {tempo_incrementale:>17.2f} "
+               f"{archivio.ultimo_aggiornamento['coppie_confrontate']:>12} {len(incrementale):>6} {str(uguali):>7} "
+               f"{str(stessa_somma):>13}")
+
+
+if __name__ == "__main__":
+   main()
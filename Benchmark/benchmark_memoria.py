@@ -0,0 +1,126 @@
+"""Benchmark della memoria del record linkage con la proiezione compatta dei dataframe (funzioni.proiezione_linkage)
+   rispetto alla versione precedente, che copiava booking e agoda con tutte le colonne (prepara_dataframe)
+   e univa i match ai dataframe interi con due merge.
+   I dataframe di 'Data Product' sono replicati fino a --righe righe ciascuno. In ogni replica le lettere e le cifre
+   di 'titolo_processed' sono permutate (la stessa permutazione per booking e agoda): le similarità tra i record
+   della stessa replica sono quelle dei dati veri, mentre le parole delle diverse repliche sono diverse
+   e il blocking sui token rari genera un numero di coppie candidate proporzionale alle righe.
+   La versione precedente è il file Funzioni/funzioni.py del commit --riferimento, con i moduli di Funzioni/ dello stesso commit (letti con git).
+   Ogni esecuzione avviene in un processo nuovo; si misurano tempo e picco di memoria residente (RSS) oltre
+   a quella dei dati in input, e si verifica che le coppie dei match delle due versioni siano le stesse.
+   Uso:
+      python "Benchmark/benchmark_memoria.py" [--righe 100000 1000000] [--funzioni title city_title] [--chunk-size 100000]
+"""
+import argparse
+import importlib.util
+import io
+import multiprocessing
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PATH_PROGETTO = Path(__file__).resolve().parent.parent
+sys.path.append(str(PATH_PROGETTO / "Funzioni"))
+from percorsi import carica_percorsi
+from coppie import chiavi_coppie
+from profilazione import azzera_picco_memoria, picco_memoria_residente
+
+# Commit con la versione di funzioni.py precedente alla proiezione compatta
+RIFERIMENTO = "39ce55f"
+
+CARATTERI = "abcdefghijklmnopqrstuvwxyz0123456789"
+
+
+def genera(dataframe: pd.DataFrame, righe: int, seme: int = 0) -> pd.DataFrame:
+   """Replica il dataframe fino a 'righe' righe con index univoco, permutando i caratteri del titolo in ogni replica
+      (con lo stesso seme booking e agoda hanno le stesse permutazioni). Le altre colonne sono quelle originali."""
+   generatore = np.random.default_rng(seme)
+   copie = []
+   for k in range(-(-righe // len(dataframe))):
+      copia = dataframe.copy()
+      if k:
+         permutazione = "".join(generatore.permutation(list(CARATTERI)))
+         copia["titolo_processed"] = copia["titolo_processed"].str.translate(str.maketrans(CARATTERI, permutazione))
+      copie.append(copia)
+   return pd.concat(copie, ignore_index=True).iloc[:righe]
+
+
+def _carica_funzioni(versione: str, riferimento: str):
+   """Modulo funzioni: quello attuale ('dopo') o quello del commit di riferimento ('prima')."""
+   if versione == "dopo":
+      import funzioni
+      return funzioni
+   archivio = subprocess.run(["git", "archive", riferimento, "Funzioni"], cwd=PATH_PROGETTO,
+                             capture_output=True, check=True).stdout
+   cartella = Path(tempfile.mkdtemp())
+   with tarfile.open(fileobj=io.BytesIO(archivio)) as tar:
+      tar.extractall(cartella)
+   # Anche i moduli importati da funzioni.py (blocking, confronto, fellegi_sunter, ...) sono quelli del commit di riferimento
+   moduli = cartella / "Funzioni"
+   sys.path.insert(0, str(moduli))
+   for path in moduli.glob("*.py"):
+      sys.modules.pop(path.stem, None)
+   specifica = importlib.util.spec_from_file_location("funzioni_prima", moduli / "funzioni.py")
+   modulo = importlib.util.module_from_spec(specifica)
+   specifica.loader.exec_module(modulo)
+   return modulo
+
+
+def _esegui(versione, riferimento, funzione, righe, chunk_size, blocking):
+   """Eseguita in un processo nuovo: genera i dati, poi misura tempo e picco di RSS del record linkage."""
+   warnings.simplefilter(action="ignore", category=FutureWarning)
+   funzioni = _carica_funzioni(versione, riferimento)
+   paths = carica_percorsi()
+   booking = genera(pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0), righe)
+   agoda = genera(pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0), righe)
+   dati = (booking.memory_usage(deep=True).sum() + agoda.memory_usage(deep=True).sum()) / 2**20
+
+   # Il picco è azzerato dopo la generazione dei dati: resta solo quello del record linkage (su Linux, vedi azzera_picco_memoria)
+   azzera_picco_memoria()
+   base = picco_memoria_residente()
+   inizio = time.perf_counter()
+   if funzione == "title":
+      match = funzioni.record_linkage_title(agoda, booking, 0.9, blocking=blocking, chunk_size=chunk_size)
+   else:
+      match = funzioni.record_linkage_city_title(booking, agoda, 0.95, 0.8, blocking=blocking, chunk_size=chunk_size)
+   tempo = time.perf_counter() - inizio
+   picco = picco_memoria_residente()
+   return tempo, picco - base, dati, match
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, nargs="+", default=[100_000, 1_000_000], help="righe di booking e di agoda")
+   parser.add_argument("--funzioni", nargs="+", choices=["title", "city_title"], default=["title", "city_title"])
+   parser.add_argument("--chunk-size", type=int, default=None)
+   parser.add_argument("--blocking", default="token")
+   parser.add_argument("--riferimento", default=RIFERIMENTO, help="commit con la versione precedente di funzioni.py")
+   args = parser.parse_args()
+
+   contesto = multiprocessing.get_context("spawn")
+   print(f"{'funzione':>10} {'righe':>9} {'dati [MB]':>10} {'versione':>8} {'tempo [s]':>10} "
+         f"{'picco RSS [MB]':>15} {'match':>7} {'uguali':>7}")
+   for righe in args.righe:
+      for funzione in args.funzioni:
+         risultati = {}
+         for versione in ("prima", "dopo"):
+            with ProcessPoolExecutor(max_workers=1, mp_context=contesto) as executor:
+               tempo, picco, dati, match = executor.submit(_esegui, versione, args.riferimento, funzione, righe,
+                                                           args.chunk_size, args.blocking).result()
+            risultati[versione] = match
+            uguali = np.array_equal(np.sort(chiavi_coppie(match)), np.sort(chiavi_coppie(risultati["prima"]))) \
+               if versione == "dopo" else ""
+            print(f"{funzione:>10} {righe:>9} {dati:>10.1f} {versione:>8} {tempo:>10.2f} {picco:>15.1f} "
+                  f"{len(match):>7} {str(uguali):>7}", flush=True)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,107 @@
+"""Benchmark del confronto su più campi (confronto.confronta_campi) rispetto a recordlinkage.Compare(),
+   che esegue una chiamata per campo (string, exact, numeric) indicizzando ogni volta i dataframe con il MultiIndex.
+   Il dataframe booking di 'Data Product' è replicato (vedi benchmark_streaming.replica) e le coppie candidate sono
+   generate con il blocking sulla prima lettera. Per ogni numero di repliche:
+      - tempo di recordlinkage.Compare() e di confronta_campi con i campi di CONFRONTI_MULTICAMPO aggiunti uno alla volta
+        (costo di ogni campo in più), con la verifica che le similarità siano le stesse;
+   infine i match di record_linkage_city_title con CONFRONTI_MULTICAMPO sono confrontati con quelli su titolo e città.
+   Uso:
+      python "Benchmark/benchmark_multicampo.py" [--repliche 1 5 20]
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+from funzioni import CONFRONTI_MULTICAMPO, colonne_confronti, crea_indexer, proiezione_linkage, record_linkage_city_title
+from confronto import confronta_campi, leggi_confronto, valori_numerici
+from coppie import chiavi_coppie
+from benchmark_streaming import replica
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def per_recordlinkage(proiezione: pd.DataFrame) -> pd.DataFrame:
+   """Proiezione con le colonne nei tipi di un dataframe letto da csv (stringhe e numeri, non categorie),
+      con i voti '8,1' già convertiti in numeri (recordlinkage non li converte)."""
+   return pd.DataFrame({colonna: valori_numerici(proiezione[colonna]) if colonna == "recensione_voto_numerico"
+                        else proiezione[colonna].astype(object) if isinstance(proiezione[colonna].dtype, pd.CategoricalDtype)
+                        else proiezione[colonna] for colonna in proiezione.columns}, index=proiezione.index)
+
+
+def compare_recordlinkage(confronti: dict) -> recordlinkage.Compare:
+   """Lo stesso confronto con recordlinkage: una chiamata per campo, valori mancanti NaN come in confronta_campi.
+      Le colonne di booking hanno il suffisso '_b' (le due tabelle hanno colonne con lo stesso nome)."""
+   compare = recordlinkage.Compare()
+   for nome, confronto in confronti.items():
+      colonna_booking, colonna_agoda, metodo, opzioni = leggi_confronto(confronto)
+      if metodo == "jarowinkler":
+         compare.string(colonna_booking + "_b", colonna_agoda, method="jarowinkler", missing_value=np.nan, label=nome)
+      elif metodo == "esatto":
+         compare.exact(colonna_booking + "_b", colonna_agoda, missing_value=np.nan, label=nome)
+      elif not opzioni.get("relativa"):
+         compare.numeric(colonna_booking + "_b", colonna_agoda, method=metodo.replace("lineare", "linear"),
+                         scale=opzioni["scala"], offset=opzioni.get("offset", 0.0), missing_value=np.nan, label=nome)
+   return compare
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, nargs="+", default=[1, 5, 20])
+   parser.add_argument("--soglia-titolo", type=float, default=0.95)
+   parser.add_argument("--soglia-citta", type=float, default=0.8)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   colonne_booking, colonne_agoda = colonne_confronti(CONFRONTI_MULTICAMPO)
+   proiezione_agoda = proiezione_linkage(agoda, "agoda", colonne_agoda)
+   agoda_rl = per_recordlinkage(proiezione_agoda)
+   # La differenza relativa dei prezzi non esiste in recordlinkage: il confronto del prezzo è escluso dalla verifica
+   confrontabili = [nome for nome, c in CONFRONTI_MULTICAMPO.items() if not leggi_confronto(c)[3].get("relativa")]
+
+   print(f"{'repliche':>8} {'coppie':>9} {'campi':>5} {'recordlinkage [s]':>17} {'confronta_campi [s]':>19} "
+         f"{'speed-up':>8} {'uguali':>7}")
+   for repliche in args.repliche:
+      booking_replicato = replica(booking, repliche)
+      proiezione_booking = proiezione_linkage(booking_replicato, "booking", colonne_booking)
+      candidate_links = crea_indexer("first_letter").index(proiezione_booking, proiezione_agoda)
+      booking_rl = per_recordlinkage(proiezione_booking).add_suffix("_b")
+
+      for n_campi in range(1, len(CONFRONTI_MULTICAMPO) + 1):
+         confronti = dict(list(CONFRONTI_MULTICAMPO.items())[:n_campi])
+         inizio = time.perf_counter()
+         riferimento = compare_recordlinkage(confronti).compute(candidate_links, booking_rl, agoda_rl)
+         tempo_rl = time.perf_counter() - inizio
+         inizio = time.perf_counter()
+         vettore = confronta_campi(candidate_links, proiezione_booking, proiezione_agoda, confronti)
+         tempo = time.perf_counter() - inizio
+         colonne = [nome for nome in confronti if nome in confrontabili]
+         uguali = np.allclose(vettore[colonne].to_numpy(), riferimento[colonne].to_numpy(), equal_nan=True)
+         print(f"{repliche:>8} {len(candidate_links):>9} {n_campi:>5} {tempo_rl:>17.2f} {tempo:>19.2f} "
+               f"{tempo_rl / tempo:>8.1f} {str(uguali):>7}", flush=True)
+
+   base = record_linkage_city_title(booking, agoda, args.soglia_titolo, args.soglia_citta)
+   multi = record_linkage_city_title(booking, agoda, args.soglia_titolo, args.soglia_citta, confronti=CONFRONTI_MULTICAMPO)
+   chiavi_base, chiavi_multi = set(chiavi_coppie(base)), set(chiavi_coppie(multi))
+   print(f"Match titolo e città: {len(base)}, con CONFRONTI_MULTICAMPO: {len(multi)}, "
+         f"in comune: {len(chiavi_base & chiavi_multi)}")
+   print("Match solo con CONFRONTI_MULTICAMPO:")
+   print(multi[[k in chiavi_multi - chiavi_base for k in chiavi_coppie(multi)]]
+         [["titolo_booking", "titolo_agoda", "score", "name_similarity", "zona_similarity", "prezzo_similarity"]].to_string())
+   print("Match solo su titolo e città:")
+   print(base[[k in chiavi_base - chiavi_multi for k in chiavi_coppie(base)]]
+         [["titolo_booking", "titolo_agoda", "score", "name_similarity"]].to_string())
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,59 @@
+"""Benchmark di scalabilità del calcolo delle similarità in parallelo (parametro n_jobs di jarowinkler_vettoriale).
+   Il dataframe booking di 'Data Product' è replicato (ad ogni replica è aggiunto il numero della replica al titolo,
+   così tutte le coppie sono diverse) e le coppie candidate sono generate con il blocking sulla prima lettera.
+   Per ogni numero di processi si misura il tempo, lo speedup e l'efficienza rispetto a un solo processo,
+   e si verifica che le similarità siano identiche.
+   Uso:
+      python "Benchmark/benchmark_parallelo.py" [--repliche 20] [--n-jobs 1 2 4 8] [--chunk-size 20000]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import recordlinkage
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from confronto import jarowinkler_vettoriale
+from benchmark_confronto import replica
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, default=20)
+   parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+   parser.add_argument("--chunk-size", type=int, default=20000)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda["first_letter"] = agoda["titolo_processed"].str[0]
+   booking_replicato = replica(booking, args.repliche, varianti=True)
+
+   indexer = recordlinkage.Index()
+   indexer.block("first_letter")
+   candidate_links = indexer.index(booking_replicato, agoda)
+   print(f"Coppie candidate: {len(candidate_links)}, core disponibili: {os.cpu_count()}")
+
+   print(f"{'n_jobs':>6} {'tempo [s]':>10} {'speedup':>8} {'efficienza':>11} {'uguali':>7}")
+   # Speedup ed efficienza rispetto al primo valore di --n-jobs (di default 1)
+   riferimento = tempo_base = jobs_base = None
+   for n_jobs in args.n_jobs:
+      inizio = time.perf_counter()
+      similarita = jarowinkler_vettoriale(candidate_links, booking_replicato["titolo_processed"], agoda["titolo_processed"],
+                                          chunk_size=args.chunk_size, n_jobs=n_jobs).to_numpy()
+      tempo = time.perf_counter() - inizio
+      if riferimento is None:
+         riferimento, tempo_base, jobs_base = similarita, tempo, n_jobs
+      speedup = tempo_base / tempo
+      print(f"{n_jobs:>6} {tempo:>10.2f} {speedup:>8.2f} {speedup * jobs_base / n_jobs:>11.2f} "
+            f"{str(np.array_equal(similarita, riferimento, equal_nan=True)):>7}")
+
+
+if __name__ == "__main__":
+   main()
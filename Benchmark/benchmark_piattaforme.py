@@ -0,0 +1,115 @@
+"""Benchmark del record linkage tra più piattaforme (multipiattaforma.record_linkage_piattaforme) rispetto a un
+   record_linkage_title per ogni coppia di piattaforme.
+   I dati sono generati con sintetico.genera_piattaforme(): --righe entità (record di booking replicati), ognuna presente
+   in una parte delle piattaforme con titoli e prezzi perturbati, così le entità vere sono note.
+   Per ogni numero di piattaforme:
+      - tempo, coppie candidate e coppie collegate di un solo passaggio su tutte le piattaforme e di tutte le coppie di
+        piattaforme (N * (N - 1) / 2 esecuzioni di record_linkage_title);
+      - precision e recall delle coppie di record nella stessa entità rispetto alle coppie vere (stessa entità generata);
+      - per le coppie di piattaforme, componenti connesse dei match con due record della stessa piattaforma
+        (match da riconciliare a mano; le entità di record_linkage_piattaforme non ne hanno per costruzione).
+   Con due piattaforme si verifica anche che le entità siano i match di record_linkage_title.
+   Uso:
+      python "Benchmark/benchmark_piattaforme.py" [--righe 20000] [--piattaforme 2 3 4 6] [--soglia 0.9]
+"""
+import argparse
+import itertools
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import record_linkage_title
+from multipiattaforma import record_linkage_piattaforme
+from sintetico import genera_piattaforme
+from profilazione import Profilo
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def coppie_entita(tabella: pd.DataFrame, nomi: list, veri: dict) -> pd.DataFrame:
+   """Coppie di record (piattaforma, record) nella stessa entità, con l'entità vera dei due record."""
+   coppie = []
+   for p, q in itertools.combinations(nomi, 2):
+      presenti = tabella[tabella[f"index_{p}"].notna() & tabella[f"index_{q}"].notna()]
+      coppie.append(pd.DataFrame({"piattaforme": f"{p}-{q}",
+                                  "vero_a": veri[p].loc[presenti[f"index_{p}"].astype(np.int64)].to_numpy(),
+                                  "vero_b": veri[q].loc[presenti[f"index_{q}"].astype(np.int64)].to_numpy()}))
+   return pd.concat(coppie, ignore_index=True)
+
+
+def coppie_vere(veri: dict) -> int:
+   """Numero di coppie di record di piattaforme diverse con la stessa entità vera."""
+   presenze = pd.concat(veri.values()).value_counts()
+   return int((presenze * (presenze - 1) // 2).sum())
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, default=20000, help="numero di entità")
+   parser.add_argument("--piattaforme", type=int, nargs="+", default=[2, 3, 4, 6])
+   parser.add_argument("--soglia", type=float, default=0.9)
+   parser.add_argument("--frazione", type=float, default=0.8, help="frazione delle entità in ogni piattaforma")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+
+   print(f"{'piattaforme':>11} {'record':>7} {'metodo':>8} {'tempo [s]':>9} {'coppie':>9} {'collegate':>9} "
+         f"{'precision':>9} {'recall':>7} {'in conflitto':>12}")
+   for n in args.piattaforme:
+      nomi = [f"piattaforma_{k}" for k in range(n)]
+      dati, veri = genera_piattaforme(booking, args.righe, nomi, frazione=args.frazione)
+      totale_veri = coppie_vere(veri)
+
+      # Un solo passaggio su tutte le piattaforme
+      profilo = Profilo()
+      inizio = time.perf_counter()
+      tabella = record_linkage_piattaforme(dati, args.soglia, profilo=profilo)
+      tempo = time.perf_counter() - inizio
+      report = profilo.report().set_index("fase")
+      coppie = coppie_entita(tabella, nomi, veri)
+      corrette = int((coppie["vero_a"] == coppie["vero_b"]).sum())
+      print(f"{n:>11} {sum(len(df) for df in dati.values()):>7} {'N-vie':>8} {tempo:>9.2f} "
+            f"{report.loc['STEP 1-2 coppie candidate', 'coppie']:>9} {len(coppie):>9} {corrette / len(coppie):>9.4f} "
+            f"{corrette / totale_veri:>7.4f} {'':>12}", flush=True)
+
+      # Un record_linkage_title per coppia di piattaforme
+      inizio = time.perf_counter()
+      collegamenti, candidate = [], 0
+      for p, q in itertools.combinations(nomi, 2):
+         profilo = Profilo()
+         match = record_linkage_title(dati[q], dati[p], args.soglia, blocking="token", profilo=profilo)
+         candidate += int(profilo.report().set_index("fase").loc["STEP 2 coppie candidate", "coppie"])
+         collegamenti.append(pd.DataFrame({"a": p + "#" + match["index_booking"].astype(str),
+                                           "b": q + "#" + match["index_agoda"].astype(str),
+                                           "vero_a": veri[p].loc[match["index_booking"]].to_numpy(),
+                                           "vero_b": veri[q].loc[match["index_agoda"]].to_numpy()}))
+      tempo = time.perf_counter() - inizio
+      collegamenti = pd.concat(collegamenti, ignore_index=True)
+      corrette = int((collegamenti["vero_a"] == collegamenti["vero_b"]).sum())
+      # Componenti connesse dei match di tutte le coppie di piattaforme con due record della stessa piattaforma
+      codici, nodi = pd.factorize(pd.concat([collegamenti["a"], collegamenti["b"]], ignore_index=True))
+      grafo = coo_matrix((np.ones(len(collegamenti)), (codici[:len(collegamenti)], codici[len(collegamenti):])),
+                         shape=(len(nodi), len(nodi)))
+      _, componente = connected_components(grafo, directed=False)
+      doppi = pd.DataFrame({"componente": componente, "piattaforma": nodi.str.split("#").str[0]}).duplicated()
+      print(f"{n:>11} {sum(len(df) for df in dati.values()):>7} {'coppie':>8} {tempo:>9.2f} {candidate:>9} "
+            f"{len(collegamenti):>9} {corrette / len(collegamenti):>9.4f} {corrette / totale_veri:>7.4f} "
+            f"{len(np.unique(componente[doppi.to_numpy()])):>12}", flush=True)
+
+      if n == 2:
+         chiavi = set(zip(tabella[f"index_{nomi[0]}"].astype(np.int64), tabella[f"index_{nomi[1]}"].astype(np.int64)))
+         print(f"   due piattaforme, stesse coppie di record_linkage_title: "
+               f"{chiavi == set(zip(match['index_booking'], match['index_agoda']))}")
+
+
+if __name__ == "__main__":
+   main()
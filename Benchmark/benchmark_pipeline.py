@@ -0,0 +1,103 @@
+"""Benchmark della pipeline (Funzioni/pipeline.py) su una copia del progetto in una cartella temporanea
+   (config.json, Funzioni, Web Scraping, Data Lake, Data Product, Results), così i file del repository non sono modificati.
+   La pipeline è eseguita in un altro processo, come da riga di comando, dagli html degli scraper (--html-città) fino ai
+   due record linkage (lo stadio analisi richiede nbclient):
+      - --help e --mostra (solo libreria standard, nessuno stadio eseguito);
+      - prima esecuzione con 1 e con --n-jobs thread (estrazione e pulizia di agoda e booking in parallelo);
+      - esecuzione senza stadi da aggiornare, anche dopo aver aggiornato la data di modifica dei file (stesso contenuto);
+      - dopo una modifica al codice della pulizia: la pulizia è eseguita, i record linkage sono saltati perché
+        'Data Product' non cambia.
+   Per ogni caso: tempo (mediana di --ripetizioni esecuzioni per i casi veloci), stadi eseguiti e saltati,
+   e se pandas è stato importato. Si verifica anche che i file del Data Lake di Terni e di 'Data Product' scritti
+   dalla pipeline siano identici a quelli del repository (Cleaning_pipeline.ipynb e 02)_Get_Info).
+   Uso:
+      python "Benchmark/benchmark_pipeline.py" [--città-html Terni] [--n-jobs 2] [--ripetizioni 5]
+"""
+import argparse
+import filecmp
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+
+# Stampa se pandas è stato importato dopo l'esecuzione della pipeline
+ESEGUI = ("import sys, runpy; sys.argv = ['pipeline.py'] + sys.argv[1:]\n"
+          "try:\n   runpy.run_path('Funzioni/pipeline.py', run_name='__main__')\n"
+          "finally:\n   print('pandas importato:', 'pandas' in sys.modules)")
+
+
+def esegui(cartella: Path, argomenti: list) -> tuple:
+   """Esegue la pipeline nella copia del progetto. Output: secondi, righe stampate."""
+   inizio = time.perf_counter()
+   risultato = subprocess.run([sys.executable, "-W", "ignore", "-c", ESEGUI] + argomenti, cwd=cartella,
+                              capture_output=True, text=True)
+   tempo = time.perf_counter() - inizio
+   if risultato.returncode not in (0, 1):
+      raise RuntimeError(risultato.stderr)
+   return tempo, risultato.stdout.splitlines()
+
+
+def riassunto(righe: list) -> str:
+   esiti = [riga.split()[0] for riga in righe if riga.strip().startswith(("eseguito", "saltato", "fallito"))]
+   pandas = righe[-1].endswith("True") if righe else False
+   return f"{esiti.count('eseguito'):>8} {esiti.count('saltato'):>7} {'sì' if pandas else 'no':>6}"
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--città-html", default="Terni", help="città degli html salvati nelle cartelle degli scraper")
+   parser.add_argument("--n-jobs", type=int, default=2)
+   parser.add_argument("--ripetizioni", type=int, default=5)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   radice = paths["path_progetto"]
+   with tempfile.TemporaryDirectory() as temporanea:
+      cartella = Path(temporanea)
+      shutil.copy(radice / "config.json", cartella)
+      for nome in ("Funzioni", "Web Scraping", "Data Lake", "Data Product", "Results"):
+         shutil.copytree(radice / nome, cartella / nome, ignore=shutil.ignore_patterns("__pycache__", ".pipeline"))
+
+      base = ["--html-città", args.città_html, "--stadi", "linkage"]
+      print(f"{'caso':<48} {'tempo [s]':>9} {'eseguiti':>8} {'saltati':>7} {'pandas':>6}")
+
+      def riga(caso, argomenti, ripetizioni=1):
+         tempi, righe = [], []
+         for _ in range(ripetizioni):
+            tempo, righe = esegui(cartella, argomenti)
+            tempi.append(tempo)
+         print(f"{caso:<48} {statistics.median(tempi):>9.3f} {riassunto(righe)}", flush=True)
+
+      inizio = time.perf_counter()
+      for _ in range(args.ripetizioni):
+         subprocess.run([sys.executable, "-c", "pass"])
+      caso = "avvio dell'interprete (python -c pass)"
+      print(f"{caso:<48} {(time.perf_counter() - inizio) / args.ripetizioni:>9.3f}")
+      riga("--help", ["--help"], args.ripetizioni)
+      riga("--mostra", base + ["--mostra"], args.ripetizioni)
+      riga("prima esecuzione, --n-jobs 1", base + ["--n-jobs", "1"])
+      riga(f"tutti gli stadi di nuovo, --n-jobs {args.n_jobs}", base + ["--forza", "--n-jobs", str(args.n_jobs)])
+      riga("nessuno stadio da aggiornare", base, args.ripetizioni)
+      for file in (cartella / "Data Lake").glob("*.csv"):
+         file.touch()
+      riga("data di modifica del Data Lake aggiornata", base)
+      riga("nessuno stadio da aggiornare (hash in memoria)", base, args.ripetizioni)
+      with open(cartella / "Funzioni" / "pulizia.py", "a") as f:
+         f.write("\n# modifica\n")
+      riga("codice della pulizia modificato", base)
+
+      confronti = [f"Data Lake/{p}_{args.città_html}.csv" for p in ("agoda", "booking")] + \
+                  [f"Data Product/{p}.csv" for p in ("agoda", "booking")]
+      print()
+      for file in confronti:
+         print(f"{file} uguale a quello del repository: {filecmp.cmp(cartella / file, radice / file, shallow=False)}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,96 @@
+"""Benchmark della potatura delle coppie sotto soglia nel calcolo di Jaro-Winkler (parametro soglia di jarowinkler_vettoriale).
+   Con la soglia, un limite superiore della similarità (lunghezze, caratteri in comune, prefisso) è calcolato per tutte
+   le coppie candidate e solo quelle con il limite sopra soglia sono confrontate carattere per carattere.
+   Sui dati di Roma ('Data Product'), con booking replicato (vedi benchmark_streaming.replica):
+      - per ogni blocking e soglia, tempo del calcolo dei titoli senza e con potatura, quota delle coppie potate
+        e verifica che le coppie sopra soglia e le loro similarità siano le stesse;
+      - record_linkage_title e record_linkage_city_title con potatura=False e potatura=True: tempo, quota potata
+        (conteggio 'coppie_potate' del Profilo) e verifica che i match siano gli stessi.
+   Uso:
+      python "Benchmark/benchmark_potatura.py" [--repliche 1 20] [--blocking token first_letter] [--soglie 0.8 0.9 0.95]
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+from funzioni import crea_indexer, proiezione_linkage, record_linkage_city_title, record_linkage_title
+from confronto import jarowinkler_vettoriale
+from profilazione import Profilo
+from benchmark_streaming import replica
+
+# Anche l'avviso di Fellegi-Sunter sulle coppie sotto soglia, uguale con e senza potatura
+warnings.simplefilter(action="ignore")
+
+
+def quota_potata(profilo: Profilo) -> float:
+   """Quota delle coppie candidate potate, dai conteggi della fase 'STEP 3-4 similarità'."""
+   report = profilo.report().set_index("fase")
+   return report.loc["STEP 3-4 similarità", "coppie_potate"] / report.loc["STEP 3-4 similarità", "coppie"]
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, nargs="+", default=[1, 20])
+   parser.add_argument("--blocking", nargs="+", default=["token", "first_letter"])
+   parser.add_argument("--soglie", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+   parser.add_argument("--soglia-titolo", type=float, default=0.95)
+   parser.add_argument("--soglia-citta", type=float, default=0.8)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   proiezione_agoda = proiezione_linkage(agoda, "agoda")
+
+   print(f"{'repliche':>8} {'blocking':>12} {'coppie':>9} {'soglia':>6} {'esatto [s]':>10} {'potatura [s]':>12} "
+         f"{'speed-up':>8} {'potate':>7} {'uguali':>7}")
+   for repliche in args.repliche:
+      proiezione_booking = proiezione_linkage(replica(booking, repliche), "booking")
+      for blocking in args.blocking:
+         candidate_links = crea_indexer(blocking).index(proiezione_booking, proiezione_agoda)
+         titoli = (candidate_links, proiezione_booking["titolo_booking"], proiezione_agoda["titolo_agoda"])
+         inizio = time.perf_counter()
+         esatte = jarowinkler_vettoriale(*titoli)
+         tempo_esatto = time.perf_counter() - inizio
+         for soglia in args.soglie:
+            statistiche = {}
+            inizio = time.perf_counter()
+            potate = jarowinkler_vettoriale(*titoli, soglia=soglia, statistiche=statistiche)
+            tempo = time.perf_counter() - inizio
+            uguali = esatte[esatte > soglia].equals(potate[potate > soglia])
+            print(f"{repliche:>8} {blocking:>12} {len(candidate_links):>9} {soglia:>6} {tempo_esatto:>10.2f} {tempo:>12.2f} "
+                  f"{tempo_esatto / tempo:>8.1f} {statistiche['coppie_potate'] / len(candidate_links):>7.1%} "
+                  f"{str(uguali):>7}", flush=True)
+
+   print(f"\n{'funzione':>10} {'repliche':>8} {'blocking':>12} {'senza [s]':>9} {'con [s]':>7} {'potate':>7} "
+         f"{'match':>6} {'uguali':>7}")
+   for repliche in args.repliche:
+      booking_replicato = replica(booking, repliche)
+      for blocking in args.blocking:
+         for funzione in ("title", "city_title"):
+            risultati, tempi = {}, {}
+            for potatura in (False, True):
+               profilo = Profilo()
+               inizio = time.perf_counter()
+               if funzione == "title":
+                  risultati[potatura] = record_linkage_title(agoda, booking_replicato, args.soglia_titolo, blocking=blocking,
+                                                             potatura=potatura, profilo=profilo)
+               else:
+                  risultati[potatura] = record_linkage_city_title(booking_replicato, agoda, args.soglia_titolo,
+                                                                  args.soglia_citta, blocking=blocking,
+                                                                  potatura=potatura, profilo=profilo)
+               tempi[potatura] = time.perf_counter() - inizio
+            uguali = risultati[False].equals(risultati[True])
+            print(f"{funzione:>10} {repliche:>8} {blocking:>12} {tempi[False]:>9.2f} {tempi[True]:>7.2f} "
+                  f"{quota_potata(profilo):>7.1%} {len(risultati[True]):>6} {str(uguali):>7}", flush=True)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,162 @@
+"""Benchmark dell'analisi dei prezzi (Funzioni/prezzi.py) su uno storico di scraping.
+   - Verifica: su 'Results/matches_titolo_095.csv' (più alcune righe con prezzo mancante e prezzo di agoda 0)
+     analizza_prezzi dà le stesse differenze e etichette di AnalisiRisultati.ipynb (df.apply(confronta_prezzi, axis=1));
+     tempo di np.select contro df.apply su uno snapshot.
+   - Storico: --snapshot file dei match in una cartella temporanea, ognuno con --righe righe (match replicati con prezzi
+     perturbati e date di permanenza spostate di un giorno per snapshot, vedi storico()).
+     Per ogni riepilogo (per città, per data, per città e stelle, per snapshot):
+        - rilettura di tutti i csv con analizza_prezzi e groupby (come rifare l'analisi ad ogni richiesta);
+        - riepilogo dall'archivio (ArchivioPrezzi), aperto da disco;
+     e si verifica che i due riepiloghi siano uguali. Sono misurati anche la costruzione dell'archivio (un file alla volta),
+     l'aggiunta di un nuovo snapshot, un aggiornamento con i file invariati e la dimensione dell'archivio rispetto ai csv.
+   Uso:
+      python "Benchmark/benchmark_prezzi.py" [--snapshot 100] [--righe 10000]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from prezzi import ArchivioPrezzi, analizza_prezzi
+
+
+def confronta_prezzi(row):
+   """Etichetta di AnalisiRisultati.ipynb, una riga alla volta."""
+   if pd.isna(row['prezzo_booking']) or pd.isna(row['prezzo_agoda']):
+      return 'missing price'
+   elif row['prezzo_booking'] < row['prezzo_agoda']:
+      return 'more convenient on booking'
+   elif row['prezzo_booking'] > row['prezzo_agoda']:
+      return 'more convenient on agoda'
+   else:
+      return 'same price'
+
+
+def come_notebook(df: pd.DataFrame) -> pd.DataFrame:
+   df = df.copy()
+   df['differenza_assoluta'] = df['prezzo_booking'] - df['prezzo_agoda']
+   df['differenza_percentuale'] = (df['differenza_assoluta'] / df['prezzo_agoda'].replace(0, pd.NA)) * 100
+   df['convenienza'] = df.apply(confronta_prezzi, axis=1)
+   return df
+
+
+def storico(match: pd.DataFrame, booking: pd.DataFrame, cartella: Path, snapshot: int, righe: int,
+            generatore: np.random.Generator) -> list:
+   """Scrive 'snapshot' file dei match: i match replicati fino a 'righe' righe, prezzi moltiplicati per un fattore
+      casuale (0.8-1.2, arrotondati all'euro, l'1% mancanti) e inizio permanenza spostato di k giorni nello snapshot k."""
+   replicati = match.iloc[np.arange(righe) % len(match)].reset_index(drop=True)
+   inizio = pd.to_datetime(replicati["inizio_permanenza"], format="%d-%m-%y")
+   replicati["stelle"] = booking["stelle"].reindex(replicati["index_booking"]).to_numpy()
+   file = []
+   for k in range(snapshot):
+      df = replicati.copy()
+      for colonna in ("prezzo_booking", "prezzo_agoda"):
+         prezzo = np.round(df[colonna].to_numpy() * generatore.uniform(0.8, 1.2, righe))
+         df[colonna] = np.where(generatore.random(righe) < 0.01, np.nan, prezzo)
+      df["inizio_permanenza"] = (inizio + pd.Timedelta(days=k)).dt.strftime("%d-%m-%y")
+      path = cartella / f"matches_scraping_{k:04d}.csv"
+      df.to_csv(path, index=False)
+      file.append(path)
+   return file
+
+
+def riepilogo_da_csv(file: list, per: list) -> pd.DataFrame:
+   """Riepilogo rileggendo tutti i file dei match (stesse colonne di ArchivioPrezzi.riepilogo)."""
+   parti = []
+   for path in file:
+      df = analizza_prezzi(pd.read_csv(path))
+      df["snapshot"] = path.stem
+      df["città"] = df["città_booking"]
+      df["data"] = pd.to_datetime(df["inizio_permanenza"], format="%d-%m-%y")
+      parti.append(df)
+   df = pd.concat(parti, ignore_index=True)
+   gruppi = df.groupby(per, dropna=False, sort=True)
+   return pd.DataFrame({"coppie": gruppi.size(),
+                        "quota_agoda": gruppi["convenienza"].agg(lambda c: (c == "more convenient on agoda").mean()),
+                        "differenza_media": gruppi["differenza_assoluta"].mean(),
+                        "deviazione_standard": gruppi["differenza_assoluta"].std(),
+                        "differenza_percentuale_media": gruppi["differenza_percentuale"].mean()}).reset_index()
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--snapshot", type=int, default=100)
+   parser.add_argument("--righe", type=int, default=10000, help="righe per snapshot")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   match = pd.read_csv(paths["path_results"] / "matches_titolo_095.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+
+   # Verifica, con righe con prezzo mancante e prezzo di agoda 0
+   prova = pd.concat([match, match.head(3).assign(prezzo_booking=[np.nan, 50, 0], prezzo_agoda=[100, np.nan, 0])],
+                     ignore_index=True)
+   attesi, vettoriale = come_notebook(prova), analizza_prezzi(prova)
+   uguali = (attesi["convenienza"].equals(vettoriale["convenienza"])
+             and np.allclose(attesi["differenza_assoluta"].astype(float), vettoriale["differenza_assoluta"], equal_nan=True)
+             and np.allclose(pd.to_numeric(attesi["differenza_percentuale"]), vettoriale["differenza_percentuale"], equal_nan=True))
+   print(f"analizza_prezzi uguale a AnalisiRisultati.ipynb ({len(prova)} match): {uguali}")
+
+   generatore = np.random.default_rng(0)
+   grande = match.iloc[np.arange(args.righe) % len(match)].reset_index(drop=True)
+   inizio = time.perf_counter()
+   grande.apply(confronta_prezzi, axis=1)
+   tempo_apply = time.perf_counter() - inizio
+   inizio = time.perf_counter()
+   analizza_prezzi(grande)
+   tempo_select = time.perf_counter() - inizio
+   print(f"etichette di {args.righe} match: df.apply {tempo_apply:.3f} s, np.select {tempo_select:.4f} s "
+         f"({tempo_apply / tempo_select:.0f}x)\n")
+
+   with tempfile.TemporaryDirectory() as temporanea:
+      cartella = Path(temporanea)
+      inizio = time.perf_counter()
+      file = storico(match, booking, cartella, args.snapshot, args.righe, generatore)
+      dimensione_csv = sum(f.stat().st_size for f in file)
+      print(f"storico: {args.snapshot} snapshot x {args.righe} righe, {dimensione_csv / 2 ** 20:.1f} MB di csv "
+            f"(scritti in {time.perf_counter() - inizio:.1f} s)")
+
+      # Archivio: un file alla volta, poi un nuovo snapshot e un aggiornamento senza file modificati
+      archivio = ArchivioPrezzi(cartella / "archivio")
+      inizio = time.perf_counter()
+      for path in file[:-1]:
+         archivio.aggiorna_file(path)
+      tempo_costruzione = time.perf_counter() - inizio
+      inizio = time.perf_counter()
+      archivio.aggiorna_file(file[-1])
+      tempo_nuovo = time.perf_counter() - inizio
+      inizio = time.perf_counter()
+      esiti = [archivio.aggiorna_file(path)["esito"] for path in file]
+      tempo_invariati = time.perf_counter() - inizio
+      dimensione_archivio = (cartella / "archivio" / "archivio.npz").stat().st_size
+      print(f"archivio: costruzione {tempo_costruzione:.2f} s ({tempo_costruzione / (len(file) - 1) * 1000:.1f} ms per snapshot), "
+            f"nuovo snapshot {tempo_nuovo * 1000:.1f} ms, {len(file)} file invariati {tempo_invariati * 1000:.1f} ms "
+            f"({esiti.count('invariato')} invariati)")
+      print(f"archivio: {len(archivio.aggregati)} righe di aggregati, {dimensione_archivio / 2 ** 10:.0f} KB "
+            f"({dimensione_csv / dimensione_archivio:.0f}x meno dei csv)\n")
+
+      print(f"{'riepilogo':<18} {'gruppi':>7} {'csv [s]':>8} {'archivio [ms]':>13} {'uguali':>6}")
+      for per in (["città"], ["data"], ["città", "stelle"], ["snapshot"]):
+         inizio = time.perf_counter()
+         da_csv = riepilogo_da_csv(file, per)
+         tempo_csv = time.perf_counter() - inizio
+
+         inizio = time.perf_counter()
+         da_archivio = ArchivioPrezzi(cartella / "archivio").riepilogo(per)
+         tempo_archivio = time.perf_counter() - inizio
+
+         colonne = ["coppie", "quota_agoda", "differenza_media", "deviazione_standard", "differenza_percentuale_media"]
+         uguali = len(da_csv) == len(da_archivio) and all(
+            np.allclose(da_csv[c].to_numpy(dtype=float), da_archivio[c].to_numpy(dtype=float), equal_nan=True) for c in colonne)
+         print(f"{' e '.join(per):<18} {len(da_archivio):>7} {tempo_csv:>8.2f} {tempo_archivio * 1000:>13.1f} {str(uguali):>6}",
+               flush=True)
+
+
+if __name__ == "__main__":
+   main()
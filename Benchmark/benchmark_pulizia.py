@@ -0,0 +1,105 @@
+"""Verifica e benchmark delle funzioni di pulizia per colonna di 'Data Product/funzioni.py'
+   (alfabeto_colonna, pulisci_recensione_colonna, pulisci_distanza_centro_colonna, trasforma_in_data_colonna) contro
+   le funzioni per riga applicate con .apply(lambda row: ...), come in Cleaning_pipeline.ipynb.
+   - Verifica: le colonne grezze di tutti i file 'Data Lake/*.csv' (estratte come nel notebook) sono pulite con le due versioni
+     e i risultati devono essere identici (valori e tipo);
+   - Benchmark: le colonne sono replicate fino a --righe righe, una volta così come sono (uno scraping ripete gli stessi valori
+     per ogni data) e una volta rendendo ogni valore distinto (caso peggiore per le versioni per colonna).
+     trasforma_in_data (dateparser) richiede alcuni millisecondi per riga: il suo .apply è misurato sulle prime
+     --righe-date righe e riportato a tutte le righe (tempo segnato con *).
+   Le date sono confrontate come stringhe '%d-%m-%y' (l'output di trasforma_in_data).
+   Uso:
+      python "Benchmark/benchmark_pulizia.py" [--righe 1000000] [--righe-date 5000]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+
+paths = carica_percorsi()
+sys.path.insert(0, str(paths["path_data_product"]))
+from funzioni import (alfabeto, pulisci_recensione, pulisci_distanza_centro, trasforma_in_data,
+                      alfabeto_colonna, pulisci_recensione_colonna, pulisci_distanza_centro_colonna, trasforma_in_data_colonna)
+
+
+def come_trasforma_in_data(date: pd.Series) -> pd.Series:
+   """Output di trasforma_in_data_colonna nel formato di trasforma_in_data (stringhe '%d-%m-%y', None se non è una data)."""
+   return date.dt.strftime('%d-%m-%y').astype(object).where(date.notna(), None)
+
+
+def colonne_grezze() -> dict:
+   """Colonne da pulire di tutti i file del Data Lake, estratte come in Cleaning_pipeline.ipynb."""
+   colonne = {"titolo": [], "numero_recensioni": [], "distanza_centro": [], "date": []}
+   for file in sorted(paths["path_data_lake"].glob("*.csv")):
+      df = pd.read_csv(file, index_col=0)
+      colonne["titolo"].append(df["titolo"])
+      colonne["numero_recensioni"].append(df["numero_recensioni"])
+      if "distanza_centro" in df.columns: # booking
+         colonne["distanza_centro"].append(df["distanza_centro"])
+      else: # agoda, la distanza è nell'indirizzo ('Zona, Città - A x km dal centro'), assente per Terni
+         colonne["distanza_centro"].append(df["indirizzo"].str.split("-").str[1])
+      colonne["date"].extend([df["date"].str.split("-").str[0], df["date"].str.split("-").str[1]]) # Inizio e fine permanenza
+   return {nome: pd.concat(valori, ignore_index=True) for nome, valori in colonne.items()}
+
+
+def distinti(colonna: pd.Series, nome: str) -> pd.Series:
+   """Rende distinti i valori della colonna mantenendo il formato atteso dalla funzione di pulizia."""
+   numero = pd.Series(np.arange(len(colonna)), index=colonna.index).astype(str)
+   if nome == "titolo":
+      return colonna + " " + numero
+   if nome == "numero_recensioni":
+      return numero + " recensioni"
+   if nome == "date": # Le date distinte di un anno sono poche: tutte le combinazioni giorno-mese
+      mesi = np.array(["gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio", "agosto",
+                       "settembre", "ottobre", "novembre", "dicembre"], dtype=object)
+      indici = np.arange(len(colonna))
+      return pd.Series((indici % 28 + 1).astype(str).astype(object) + " " + mesi[indici // 28 % 12], index=colonna.index)
+   return "A " + (numero.astype(int) % 100000).astype(str) + " m dal centro"
+
+
+def uguali(a: pd.Series, b: pd.Series) -> bool:
+   return a.dtype == b.dtype and a.index.equals(b.index) and bool(((a == b) | (a.isna() & b.isna())).all())
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, default=1_000_000)
+   parser.add_argument("--righe-date", type=int, default=5000)
+   args = parser.parse_args()
+
+   funzioni = {
+      "titolo": (alfabeto, alfabeto_colonna),
+      "numero_recensioni": (pulisci_recensione, pulisci_recensione_colonna),
+      "distanza_centro": (pulisci_distanza_centro, pulisci_distanza_centro_colonna),
+      "date": (trasforma_in_data, trasforma_in_data_colonna),
+   }
+
+   print(f"{'colonna':>17} {'valori':>9} {'righe':>8} {'distinti':>8} {'apply [s]':>10} {'colonna [s]':>12} {'speedup':>8} {'uguali':>7}")
+   for nome, colonna in colonne_grezze().items():
+      per_riga, per_colonna = funzioni[nome]
+      replicata = pd.Series(np.resize(colonna.to_numpy(), args.righe), name=nome)
+      for valori, dati in (("data lake", colonna), ("replicati", replicata), ("distinti", distinti(replicata, nome))):
+         campione = dati if nome != "date" else dati.iloc[:args.righe_date]
+         inizio = time.perf_counter()
+         atteso = campione.apply(lambda row: per_riga(row))
+         tempo_apply = (time.perf_counter() - inizio) * len(dati) / len(campione)
+
+         inizio = time.perf_counter()
+         risultato = per_colonna(dati)
+         tempo_colonna = time.perf_counter() - inizio
+         if nome == "date":
+            risultato = come_trasforma_in_data(risultato)
+
+         stima = "*" if len(campione) < len(dati) else " "
+         print(f"{nome:>17} {valori:>9} {len(dati):>8} {dati.nunique(dropna=False):>8} {tempo_apply:>9.2f}{stima} {tempo_colonna:>12.2f} "
+               f"{tempo_apply / tempo_colonna:>8.1f} {str(uguali(atteso, risultato.iloc[:len(campione)])):>7}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,163 @@
+"""Prova offline dello scheduler dello scraping (Funzioni/scraping.py).
+   Un server HTTP locale risponde ai link di ricerca con gli html salvati dagli scraper (html_final.txt per booking,
+   html_final_pagina{i}.txt per agoda, con il pulsante 'pagina successiva' collegato alla pagina seguente),
+   aspettando --latenza secondi per richiesta come un sito reale. Al posto del browser c'è una sessione HTTP
+   che legge la pagina con lxml e segue i link dei pulsanti (senza javascript).
+   Per ogni numero di sessioni si misurano durata, pagine al secondo e latenza per pagina e si verifica
+   che gli html salvati siano quelli serviti; infine si controlla la ripresa dopo un'interruzione.
+   Uso:
+      python "Benchmark/benchmark_scraping.py" [--città 4] [--latenza 0.3] [--n-sessioni 1 2 4]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urljoin, urlparse
+from urllib.request import urlopen
+
+from lxml import html as lxml_html
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from estrazione import ordina_pagine
+from scraping import SchedulerScraping, nome_lavoro
+
+
+#%%% Sito locale
+
+def crea_server(pagine: dict, latenza: float) -> ThreadingHTTPServer:
+   """Server HTTP su una porta libera: /booking?... restituisce l'html di booking, /agoda?...&pagina=i la pagina i di agoda."""
+
+   class Gestore(BaseHTTPRequestHandler):
+      def do_GET(self):
+         richiesta = urlparse(self.path)
+         sito = richiesta.path.strip("/")
+         numero = int(parse_qs(richiesta.query).get("pagina", ["1"])[0])
+         time.sleep(latenza)
+         if sito not in pagine or numero > len(pagine[sito]):
+            self.send_error(404)
+            return
+         html = pagine[sito][numero - 1]
+         if numero < len(pagine[sito]):
+            html = html.replace('id="paginationNext"', f'id="paginationNext" href="{self.path}&pagina={numero + 1}"', 1)
+         corpo = html.encode("utf-8")
+         self.send_response(200)
+         self.send_header("Content-Type", "text/html; charset=utf-8")
+         self.send_header("Content-Length", str(len(corpo)))
+         self.end_headers()
+         self.wfile.write(corpo)
+
+      def log_message(self, *args):
+         pass
+
+   server = ThreadingHTTPServer(("127.0.0.1", 0), Gestore)
+   threading.Thread(target=server.serve_forever, daemon=True).start()
+   return server
+
+
+class SessioneLocale:
+   """Sessione senza browser con gli stessi metodi di SessioneSelenium: la pagina è statica,
+      quindi le attese terminano subito (la condizione è già vera o non lo diventerà)."""
+
+   def apri(self, url: str) -> None:
+      self.url = url
+      with urlopen(url) as risposta:
+         self._html = risposta.read().decode("utf-8")
+      self._radice = lxml_html.fromstring(self._html)
+
+   def html(self) -> str:
+      return self._html
+
+   def conta(self, xpath: str) -> int:
+      return len(self._radice.xpath(xpath))
+
+   def attendi(self, xpath: str, timeout: float, minimo: int = 1) -> bool:
+      return self.conta(xpath) >= minimo
+
+   def clicca(self, xpath: str, timeout: float) -> bool:
+      elementi = [e for e in self._radice.xpath(xpath) if e.get("href")]
+      if not elementi:
+         return False
+      self.apri(urljoin(self.url, elementi[0].get("href")))
+      return True
+
+   def scorri_in_fondo(self) -> None:
+      pass
+
+   def chiudi(self) -> None:
+      pass
+
+#%%%
+
+
+def verifica(cartella: Path, lavori: list, pagine: dict) -> bool:
+   """True se per ogni lavoro sono stati salvati tutti gli html serviti (senza il link aggiunto dal server)."""
+   for lavoro in lavori:
+      sito = lavoro[0]
+      for numero, atteso in enumerate(pagine[sito], start=1):
+         nome = "html_final.txt" if sito == "booking" else f"html_final_pagina{numero}.txt"
+         path = cartella / nome_lavoro(lavoro) / nome
+         if not path.exists():
+            return False
+         salvato = path.read_text()
+         inizio = salvato.find(' href="', salvato.find('id="paginationNext"')) if 'id="paginationNext" href' in salvato else -1
+         if inizio >= 0:
+            salvato = salvato[:inizio] + salvato[salvato.index('"', inizio + 7) + 1:]
+         if salvato != atteso:
+            return False
+   return True
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--città", type=int, default=4, help="numero di città (lavori per sito)")
+   parser.add_argument("--latenza", type=float, default=0.3)
+   parser.add_argument("--n-sessioni", type=int, nargs="+", default=[1, 2, 4])
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   pagine = {}
+   for sito, modello in (("booking", "html_final.txt"), ("agoda", "html_final_pagina*.txt")):
+      pagine[sito] = [Path(p).read_text() for p in ordina_pagine((paths[f"path_scraper_{sito}"] / "html").glob(modello))]
+
+   server = crea_server(pagine, args.latenza)
+   base = f"http://127.0.0.1:{server.server_address[1]}"
+   url = {"booking": base + "/booking?ss={città}&checkin={checkin}&checkout={checkout}",
+          "agoda": base + "/agoda?textToSearch={città}&checkIn={checkin}&checkOut={checkout}&los={notti}"}
+   lavori = [(sito, f"Città {i}", "2025-08-01", "2025-08-02") for i in range(args.città) for sito in ("booking", "agoda")]
+   print(f"Lavori: {len(lavori)}, pagine per lavoro: booking {len(pagine['booking'])}, agoda {len(pagine['agoda'])}, "
+         f"latenza del server: {args.latenza} s")
+
+   cartella = Path(tempfile.mkdtemp())
+   try:
+      print(f"{'sessioni':>8} {'durata [s]':>10} {'pagine':>6} {'pagine/s':>8} {'p50 [s]':>8} {'p95 [s]':>8} {'uguali':>7}")
+      for n_sessioni in args.n_sessioni:
+         shutil.rmtree(cartella)
+         scheduler = SchedulerScraping(cartella, crea_sessione=SessioneLocale, n_sessioni=n_sessioni, url=url)
+         risultati = scheduler.esegui(lavori)
+         m = scheduler.metriche()
+         uguali = bool(risultati["completato"].all()) and verifica(cartella, lavori, pagine)
+         print(f"{n_sessioni:>8} {m['durata']:>10.2f} {m['pagine']:>6} {m['pagine_al_secondo']:>8.2f} "
+               f"{m['latenza_p50']:>8.2f} {m['latenza_p95']:>8.2f} {str(uguali):>7}")
+
+      # Ripresa: si cancella l'ultima pagina di un lavoro agoda come se lo scraping si fosse interrotto
+      interrotto = cartella / nome_lavoro(lavori[1])
+      (interrotto / f"html_final_pagina{len(pagine['agoda'])}.txt").unlink()
+      stato = (interrotto / "stato.json").read_text()
+      (interrotto / "stato.json").write_text(stato.replace('"completato": true', '"completato": false')
+                                             .replace(f", {len(pagine['agoda'])}]", "]"))
+      scheduler = SchedulerScraping(cartella, crea_sessione=SessioneLocale, n_sessioni=args.n_sessioni[-1], url=url)
+      risultati = scheduler.esegui(lavori)
+      print(f"Ripresa: pagine scaricate di nuovo {scheduler.metriche()['pagine']} (attesa 1), "
+            f"html uguali {bool(risultati['completato'].all()) and verifica(cartella, lavori, pagine)}")
+   finally:
+      server.shutdown()
+      shutil.rmtree(cartella, ignore_errors=True)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,157 @@
+"""Prova di carico del servizio dei match (Funzioni/servizio.py) su un'istanza locale.
+   L'indice è costruito sui dati di Roma ('Data Product') in una cartella temporanea, con i match di record_linkage_title
+   (o quelli del file --match), e il server è avviato in un altro processo ('servizio.py avvia' su una porta libera).
+   Client asyncio con --connessioni connessioni keep-alive in parallelo inviano --richieste richieste per ogni tipo di ricerca:
+      - booking, GET /match?booking=<index> (match precalcolato);
+      - titolo noto, GET /match?titolo=<titolo di booking> (pulizia e hash del titolo, match precalcolato);
+      - titolo nuovo, GET /match?titolo=<titolo perturbato> (pulizia, blocking e confronto, vedi sintetico.perturba_titoli);
+      - gruppo, POST /match con --gruppo index di booking per richiesta.
+   Per ogni tipo e numero di connessioni: richieste al secondo e latenze p50/p99 misurate dal client;
+   alla fine le latenze misurate dal server (/metriche). Si verifica anche che:
+      - le risposte per index di booking siano i match dell'indice;
+      - con al_volo il titolo di ogni location di booking abbia come similarità il massimo di Jaro-Winkler sopra soglia
+        delle sue coppie candidate di IndiceInvertito (il percorso del record linkage, senza l'assegnazione 1:1).
+   Uso:
+      python "Benchmark/benchmark_servizio.py" [--connessioni 1 8 32] [--richieste 2000] [--gruppo 100]
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import crea_indexer, proiezione_linkage
+from confronto import jarowinkler_vettoriale
+from servizio import costruisci_indice
+from sintetico import perturba_titoli
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+#%%% Client HTTP
+
+async def richiesta(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, metodo: str, percorso: str,
+                    corpo: dict = None) -> tuple:
+   """Invia una richiesta su una connessione keep-alive. Output: codice di stato e risposta JSON."""
+   dati = json.dumps(corpo).encode("utf-8") if corpo is not None else b""
+   writer.write(f"{metodo} {percorso} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(dati)}\r\n\r\n".encode("latin-1") + dati)
+   await writer.drain()
+   stato = int((await reader.readline()).split()[1])
+   lunghezza = 0
+   while (riga := await reader.readline()) not in (b"\r\n", b""):
+      nome, _, valore = riga.decode("latin-1").partition(":")
+      if nome.strip().lower() == "content-length":
+         lunghezza = int(valore)
+   return stato, json.loads(await reader.readexactly(lunghezza))
+
+
+async def carico(porta: int, richieste: list, connessioni: int) -> tuple:
+   """Invia le richieste (metodo, percorso, corpo) da 'connessioni' client in parallelo.
+      Output: latenze in secondi, durata totale, risposte nell'ordine delle richieste."""
+   latenze = np.empty(len(richieste))
+   risposte = [None] * len(richieste)
+   prossima = iter(range(len(richieste)))
+
+   async def client():
+      reader, writer = await asyncio.open_connection("127.0.0.1", porta)
+      for i in prossima:
+         inizio = time.perf_counter()
+         risposte[i] = await richiesta(reader, writer, *richieste[i])
+         latenze[i] = time.perf_counter() - inizio
+      writer.close()
+
+   inizio = time.perf_counter()
+   await asyncio.gather(*(client() for _ in range(connessioni)))
+   return latenze, time.perf_counter() - inizio, risposte
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--connessioni", type=int, nargs="+", default=[1, 8, 32])
+   parser.add_argument("--richieste", type=int, default=2000, help="richieste per tipo di ricerca e numero di connessioni")
+   parser.add_argument("--gruppo", type=int, default=100, help="index di booking per richiesta POST")
+   parser.add_argument("--soglia", type=float, default=0.95)
+   parser.add_argument("--match", type=Path, default=None, help="file dei match (es. Results/matches_titolo_095.csv)")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   titoli = booking["titolo"].fillna(booking["titolo_processed"]).to_numpy(dtype=object)
+   generatore = np.random.default_rng(0)
+
+   with tempfile.TemporaryDirectory() as cartella:
+      inizio = time.perf_counter()
+      parametri = costruisci_indice(booking, agoda, cartella, args.soglia,
+                                    match=pd.read_csv(args.match) if args.match else None)
+      print(f"indice: {parametri['booking']} location di booking, {parametri['agoda']} di agoda, {parametri['match']} match, "
+            f"costruito in {time.perf_counter() - inizio:.2f} s")
+      match = np.load(Path(cartella) / "match_agoda.npy")
+      index_agoda = np.load(Path(cartella) / "agoda_index.npy")
+      attesi = {int(b): (int(index_agoda[a]) if a >= 0 else None) for b, a in zip(booking.sort_index().index, match)}
+
+      inizio = time.perf_counter()
+      server = subprocess.Popen([sys.executable, "-W", "ignore", str(Path(__file__).resolve().parent.parent / "Funzioni" / "servizio.py"),
+                                 "avvia", "--cartella", cartella, "--porta", "0"], stdout=subprocess.PIPE, text=True)
+      try:
+         porta = int(server.stdout.readline().strip().rsplit(":", 1)[1])
+         print(f"server avviato in {time.perf_counter() - inizio:.2f} s sulla porta {porta}\n")
+
+         # Verifiche
+         n = len(booking)
+         _, _, risposte = asyncio.run(carico(porta, [("GET", f"/match?booking={b}", None) for b in booking.index], 8))
+         uguali = all(stato == 200 and r["agoda"] == attesi[r["booking"]] for stato, r in risposte)
+         print(f"match per index di booking uguali a quelli dell'indice: {uguali}")
+
+         gruppi = [("POST", "/match", {"titoli": list(titoli[i:i + args.gruppo]), "al_volo": True})
+                   for i in range(0, n, args.gruppo)]
+         _, _, risposte = asyncio.run(carico(porta, gruppi, 1))
+         al_volo = np.array([np.nan if r["similarita"] is None else r["similarita"]
+                             for _, corpo in risposte for r in corpo["risultati"]])
+         candidate_links = crea_indexer("token").index(proiezione_linkage(booking, "booking"), proiezione_linkage(agoda, "agoda"))
+         similarita = jarowinkler_vettoriale(candidate_links, booking["titolo_processed"], agoda["titolo_processed"])
+         massimi = similarita[similarita > args.soglia].groupby(level=0).max().reindex(booking.index).to_numpy()
+         print(f"titoli confrontati al volo con il massimo delle coppie candidate: "
+               f"{np.array_equal(al_volo, massimi, equal_nan=True)} ({int(np.isfinite(massimi).sum())} titoli con un match)\n")
+
+         # Prova di carico
+         scelte = generatore.integers(0, n, args.richieste)
+         perturbati = perturba_titoli(titoli[scelte], generatore)
+         tipi = {
+            "booking": [("GET", f"/match?booking={booking.index[i]}", None) for i in scelte],
+            "titolo noto": [("GET", f"/match?titolo={quote(titoli[i])}", None) for i in scelte],
+            "titolo nuovo": [("GET", f"/match?titolo={quote(t)}&al_volo=1", None) for t in perturbati],
+            "gruppo": [("POST", "/match", {"booking": booking.index[generatore.integers(0, n, args.gruppo)].tolist()})
+                       for _ in range(args.richieste // args.gruppo)],
+         }
+         print(f"{'tipo':>12} {'connessioni':>11} {'richieste':>9} {'rich./s':>8} {'p50 [ms]':>8} {'p99 [ms]':>8} {'errori':>6}")
+         for tipo, richieste in tipi.items():
+            for connessioni in args.connessioni:
+               latenze, durata, risposte = asyncio.run(carico(porta, richieste, connessioni))
+               p50, p99 = np.percentile(latenze * 1000, [50, 99])
+               errori = sum(stato != 200 for stato, _ in risposte)
+               print(f"{tipo:>12} {connessioni:>11} {len(richieste):>9} {len(richieste) / durata:>8.0f} {p50:>8.2f} {p99:>8.2f} "
+                     f"{errori:>6}", flush=True)
+
+         _, metriche = asyncio.run(carico(porta, [("GET", "/metriche", None)], 1))[2][0]
+         print(f"\nlatenze misurate dal server (ricerche: {metriche['ricerche']})")
+         print(pd.DataFrame(metriche["latenze"]).T.astype({"richieste": int}).to_string())
+      finally:
+         server.terminate()
+         server.wait()
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,98 @@
+"""Benchmark della modalità streaming (parametro chunk_size) di record_linkage_title e record_linkage_city_title.
+   Il dataframe booking di 'Data Product' è replicato più volte (ad ogni replica è aggiunto il numero della replica al titolo),
+   poi le due funzioni sono eseguite con tutto booking in un solo blocco e a blocchi di chunk_size righe.
+   Per ogni esecuzione si misurano tempo, picco di memoria allocata (tracemalloc) e si verifica che i match siano gli stessi.
+   Con blocking 'first_letter' (il default del benchmark) le coppie candidate crescono con il quadrato dei blocchi,
+   quindi la differenza di memoria è ben visibile.
+   Con --sintetico al posto delle repliche sono usati booking e agoda sintetici (Funzioni/sintetico.py) di --sintetico righe.
+   Con 'token', 'qgram' e 'tfidf' frequenze e idf del blocking devono essere quelli di booking intero per ogni chunk_size
+   (funzioni.adatta_indexer): se i match di un chunk_size sono diversi da quelli senza blocchi il programma termina
+   con codice di uscita 1, così si può usare come test, es. con tutti i blocking a blocchi di 5000 e 500 righe:
+      python "Benchmark/benchmark_streaming.py" --sintetico 20000 --chunk-size 5000 500 --blocking token qgram tfidf first_letter
+   Uso:
+      python "Benchmark/benchmark_streaming.py" [--repliche 10 20] [--sintetico 20000] [--chunk-size 1000] [--blocking first_letter]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import record_linkage_title, record_linkage_city_title
+from coppie import chiavi_coppie
+from sintetico import genera_dataset
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def replica(df: pd.DataFrame, volte: int) -> pd.DataFrame:
+   """Replica il dataframe 'volte' volte con un nuovo index univoco, aggiungendo il numero della replica al titolo."""
+   copie = []
+   for k in range(volte):
+      copia = df.copy()
+      if k:
+         copia["titolo_processed"] = copia["titolo_processed"] + f" {k}"
+      copie.append(copia)
+   return pd.concat(copie, ignore_index=True)
+
+
+def misura(funzione, *args, **kwargs) -> tuple:
+   """Esegue la funzione e restituisce risultato, tempo in secondi e picco di memoria allocata in MB."""
+   tracemalloc.start()
+   inizio = time.perf_counter()
+   risultato = funzione(*args, **kwargs)
+   tempo = time.perf_counter() - inizio
+   _, picco = tracemalloc.get_traced_memory()
+   tracemalloc.stop()
+   return risultato, tempo, picco / 2**20
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--repliche", type=int, nargs="+", default=[10, 20])
+   parser.add_argument("--sintetico", type=int, default=None, help="righe di booking e agoda sintetici, al posto delle repliche")
+   parser.add_argument("--chunk-size", type=int, nargs="+", default=[1000])
+   parser.add_argument("--blocking", nargs="+", default=["first_letter"])
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+
+   if args.sintetico:
+      booking_sintetico, agoda_sintetico, _ = genera_dataset(booking, agoda, args.sintetico, seme=0)
+      dati = {f"{args.sintetico} sintetiche": (booking_sintetico, agoda_sintetico)}
+   else:
+      dati = {f"{volte} repliche": (replica(booking, volte), replica(agoda, volte)) for volte in args.repliche}
+
+   funzioni = {
+      "title": lambda b, a, **kw: record_linkage_title(a, b, 0.95, **kw),
+      "city_title": lambda b, a, **kw: record_linkage_city_title(b, a, 0.95, 0.9, **kw),
+   }
+
+   diversi = 0
+   print(f"{'dati':>18} {'blocking':>12} {'funzione':>10} {'chunk_size':>10} {'tempo [s]':>10} {'picco [MB]':>11} {'match':>7} {'uguali':>7}")
+   for nome_dati, (booking_test, agoda_test) in dati.items():
+      for blocking in args.blocking:
+         for nome, funzione in funzioni.items():
+            riferimento = None
+            for chunk_size in (None, *args.chunk_size):
+               match, tempo, picco = misura(funzione, booking_test, agoda_test, blocking=blocking, chunk_size=chunk_size)
+               if riferimento is None:
+                  riferimento = np.sort(chiavi_coppie(match))
+               uguali = np.array_equal(np.sort(chiavi_coppie(match)), riferimento)
+               diversi += not uguali
+               print(f"{nome_dati:>18} {blocking:>12} {nome:>10} {str(chunk_size):>10} {tempo:>10.2f} {picco:>11.1f} "
+                     f"{len(match):>7} {str(uguali):>7}", flush=True)
+   if diversi:
+      sys.exit(f"{diversi} esecuzioni a blocchi con match diversi da quelle senza blocchi")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,146 @@
+"""Suite di benchmark del record linkage su dataset sintetici etichettati (Funzioni/sintetico.py) di più dimensioni.
+   Per ogni dimensione e funzione (record_linkage_title, record_linkage_city_title), in un processo nuovo:
+      - genera booking e agoda con --righe righe ciascuno e le coppie vere (stesso seme, stessi dati in ogni versione);
+      - esegue il record linkage misurando il tempo di ogni fase, il numero di coppie candidate e il picco di memoria
+        residente (RSS) oltre a quella dei dati generati;
+      - confronta i match con le coppie vere (precision, recall, f1).
+   Le fasi sono gli STEP delle funzioni di record linkage, registrati con un Profilo (Funzioni/profilazione.py):
+   per ogni fase tempo, CPU, variazione di RSS e conteggi; 'altro' è il tempo fuori dalle fasi (es. lettura dei blocchi).
+   I risultati sono salvati in JSON (con il commit e le versioni delle librerie) per confrontare versioni diverse:
+   con --confronta si stampano le differenze rispetto a un file salvato in precedenza.
+   Uso:
+      python "Benchmark/benchmark_suite.py" [--righe 10000 100000 1000000] [--output risultati.json] [--confronta vecchio.json]
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PATH_PROGETTO = Path(__file__).resolve().parent.parent
+sys.path.append(str(PATH_PROGETTO / "Funzioni"))
+from percorsi import carica_percorsi
+from profilazione import MISURA_MEMORIA
+
+
+def _esegui(funzione: str, righe: int, args: dict) -> dict:
+   """Eseguita in un processo nuovo: genera i dati, esegue il record linkage e restituisce le misure."""
+   warnings.simplefilter(action="ignore")
+   import funzioni
+   from sintetico import genera_dataset
+   from coppie import valuta_match
+   from profilazione import Profilo, azzera_picco_memoria, picco_memoria_residente
+
+   paths = carica_percorsi()
+   inizio = time.perf_counter()
+   booking, agoda, veri = genera_dataset(pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0),
+                                         pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0),
+                                         righe, frazione_match=args["frazione_match"], seme=args["seme"])
+   generazione = time.perf_counter() - inizio
+
+   profilo = Profilo()
+   # Il picco è azzerato dopo la generazione dei dati: resta solo quello del record linkage (su Linux, vedi azzera_picco_memoria)
+   azzera_picco_memoria()
+   base = picco_memoria_residente()
+   inizio_cpu, inizio = time.process_time(), time.perf_counter()
+   if funzione == "title":
+      match = funzioni.record_linkage_title(agoda, booking, args["soglia"], blocking=args["blocking"],
+                                            chunk_size=args["chunk_size"], profilo=profilo)
+   else:
+      match = funzioni.record_linkage_city_title(booking, agoda, args["soglia_titolo"], args["soglia_citta"],
+                                                 blocking=args["blocking"], chunk_size=args["chunk_size"], profilo=profilo)
+   totale, cpu = time.perf_counter() - inizio, time.process_time() - inizio_cpu
+   picco = picco_memoria_residente()
+
+   report = profilo.report()
+   step = report[report["livello"] == 1]
+   fasi = dict(zip(step["fase"], step["tempo_s"]))
+   fasi["altro"] = totale - step["tempo_s"].sum()
+   coppie = report.loc[report["fase"] == "STEP 2 coppie candidate", "coppie"]
+   return {"funzione": funzione, "righe": righe, "generazione_s": generazione,
+           "tempo_s": totale, "cpu_s": cpu, "fasi_s": fasi,
+           "coppie_candidate": int(coppie.iloc[0]) if len(coppie) else 0, "picco_rss_mb": picco - base,
+           **valuta_match(match, veri),
+           "profilo": json.loads(report.to_json(orient="records"))}
+
+
+def versione() -> dict:
+   """Commit del repository (con '-modificato' se ci sono modifiche non salvate) e versioni di python e delle librerie."""
+   def git(*comando):
+      return subprocess.run(["git", *comando], cwd=PATH_PROGETTO, capture_output=True, text=True).stdout.strip()
+   import recordlinkage
+   commit = git("rev-parse", "--short", "HEAD") or "sconosciuto"
+   if git("status", "--porcelain", "--untracked-files=no"):
+      commit += "-modificato"
+   return {"commit": commit, "data": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+           "numpy": np.__version__, "pandas": pd.__version__, "recordlinkage": recordlinkage.__version__,
+           "cpu": multiprocessing.cpu_count(), "misura_memoria": MISURA_MEMORIA}
+
+
+def confronta(risultati: list, path_vecchio: Path) -> None:
+   """Stampa le variazioni di tempo, memoria, precision e recall rispetto a un file di risultati precedente."""
+   vecchio = json.loads(Path(path_vecchio).read_text())
+   precedenti = {(r["funzione"], r["righe"]): r for r in vecchio["risultati"]}
+   print(f"Confronto con {path_vecchio} (commit {vecchio['versione']['commit']}):")
+   print(f"{'funzione':>10} {'righe':>9} {'tempo':>16} {'picco RSS [MB]':>18} {'precision':>15} {'recall':>15}")
+   for r in risultati:
+      p = precedenti.get((r["funzione"], r["righe"]))
+      if p is None:
+         continue
+      print(f"{r['funzione']:>10} {r['righe']:>9} {p['tempo_s']:>7.2f} -> {r['tempo_s']:<6.2f} "
+            f"{p['picco_rss_mb']:>8.0f} -> {r['picco_rss_mb']:<6.0f} {p['precision']:>6.4f} -> {r['precision']:<6.4f} "
+            f"{p['recall']:>6.4f} -> {r['recall']:<6.4f}")
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="righe di booking e di agoda")
+   parser.add_argument("--funzioni", nargs="+", choices=["title", "city_title"], default=["title", "city_title"])
+   parser.add_argument("--soglia", type=float, default=0.9, help="soglia di record_linkage_title")
+   parser.add_argument("--soglia-titolo", type=float, default=0.95)
+   parser.add_argument("--soglia-citta", type=float, default=0.8)
+   parser.add_argument("--blocking", default="token",
+                       help="'token' perché con 'first_letter' le coppie candidate crescono col quadrato delle righe")
+   parser.add_argument("--chunk-size", type=int, default=None)
+   parser.add_argument("--frazione-match", type=float, default=0.5)
+   parser.add_argument("--seme", type=int, default=0)
+   parser.add_argument("--output", type=Path, default=None,
+                       help="file JSON dei risultati, di default Benchmark/risultati/suite_<commit>.json")
+   parser.add_argument("--confronta", type=Path, default=None, help="file JSON di una esecuzione precedente")
+   args = parser.parse_args()
+   parametri = {k: v for k, v in vars(args).items() if k not in ("output", "confronta", "righe", "funzioni")}
+
+   info = versione()
+   output = args.output or PATH_PROGETTO / "Benchmark" / "risultati" / f"suite_{info['commit']}.json"
+   contesto = multiprocessing.get_context("spawn")
+   risultati = []
+   print(f"{'funzione':>10} {'righe':>9} {'coppie':>10} {'tempo [s]':>9} {'picco RSS [MB]':>14} {'precision':>9} "
+         f"{'recall':>7}  fasi [s]")
+   for righe in args.righe:
+      for funzione in args.funzioni:
+         with ProcessPoolExecutor(max_workers=1, mp_context=contesto) as executor:
+            r = executor.submit(_esegui, funzione, righe, parametri).result()
+         risultati.append(r)
+         fasi = ", ".join(f"{fase.split(' ', 2)[1]} {tempo:.2f}" if fase.startswith("STEP") else f"{fase} {tempo:.2f}"
+                          for fase, tempo in r["fasi_s"].items())
+         print(f"{funzione:>10} {righe:>9} {r['coppie_candidate']:>10} {r['tempo_s']:>9.2f} {r['picco_rss_mb']:>14.1f} "
+               f"{r['precision']:>9.4f} {r['recall']:>7.4f}  {fasi}", flush=True)
+
+   output.parent.mkdir(parents=True, exist_ok=True)
+   output.write_text(json.dumps({"versione": info, "parametri": parametri, "risultati": risultati}, indent=2))
+   print(f"Risultati salvati in {output}")
+   if args.confronta:
+      confronta(risultati, args.confronta)
+
+
+if __name__ == "__main__":
+   main()
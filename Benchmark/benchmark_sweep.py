@@ -0,0 +1,63 @@
+"""Benchmark di sweep (Funzioni/funzioni.py): una griglia di soglie calcolata in una sola esecuzione
+   contro una chiamata di record_linkage_title / record_linkage_city_title per ogni soglia (come in RecordLinkage.ipynb).
+   Per ogni soglia si verifica che i match di sweep siano uguali a quelli della chiamata singola.
+   Uso:
+      python "Benchmark/benchmark_sweep.py" [--soglie-titolo 0.8 0.85 0.9 0.95] [--soglie-citta 0.8 0.9] [--blocking token]
+"""
+import argparse
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Funzioni"))
+from percorsi import carica_percorsi
+from funzioni import record_linkage_title, record_linkage_city_title, sweep
+from coppie import chiavi_coppie
+
+warnings.simplefilter(action="ignore", category=FutureWarning)
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--soglie-titolo", type=float, nargs="+", default=list(np.round(np.arange(0.80, 1.0, 0.01), 2)))
+   parser.add_argument("--soglie-citta", type=float, nargs="+", default=[0.8, 0.9])
+   parser.add_argument("--blocking", default="first_letter")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+
+   griglie = {
+      "title": (lambda: sweep(booking, agoda, args.soglie_titolo, blocking=args.blocking),
+                [(s,) for s in args.soglie_titolo],
+                lambda s: record_linkage_title(agoda.copy(), booking.copy(), s, blocking=args.blocking)),
+      "city_title": (lambda: sweep(booking, agoda, args.soglie_titolo, args.soglie_citta, blocking=args.blocking),
+                     [(s, c) for s in args.soglie_titolo for c in args.soglie_citta],
+                     lambda s, c: record_linkage_city_title(booking.copy(), agoda.copy(), s, c, blocking=args.blocking)),
+   }
+
+   print(f"{'funzione':>10} {'soglie':>7} {'chiamate [s]':>13} {'sweep [s]':>10} {'speedup':>8} {'uguali':>7}")
+   for nome, (esegui_sweep, combinazioni, chiamata) in griglie.items():
+      inizio = time.perf_counter()
+      singole = {combinazione: chiamata(*combinazione) for combinazione in combinazioni}
+      tempo_chiamate = time.perf_counter() - inizio
+
+      inizio = time.perf_counter()
+      risultato = esegui_sweep()
+      tempo_sweep = time.perf_counter() - inizio
+
+      uguali = all(np.array_equal(np.sort(chiavi_coppie(singole[c])),
+                                  np.sort(chiavi_coppie(risultato["match"][c if len(c) > 1 else c[0]])))
+                   for c in combinazioni)
+      print(f"{nome:>10} {len(combinazioni):>7} {tempo_chiamate:>13.2f} {tempo_sweep:>10.2f} "
+            f"{tempo_chiamate / tempo_sweep:>8.1f} {str(uguali):>7}")
+   print(risultato["riepilogo"].to_string(index=False))
+
+
+if __name__ == "__main__":
+   main()
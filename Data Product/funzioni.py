@@ -1,10 +1,28 @@
+import datetime
 import re
 import string
+from functools import lru_cache
 import numpy as np
+import pandas as pd
 import dateparser
 
 #%%% Funzioni data product 
 
+# Tabelle ed espressioni regolari create una sola volta (e non ad ogni chiamata delle funzioni di pulizia)
+PUNTEGGIATURA = str.maketrans(string.punctuation, ' ' * len(string.punctuation)) # Caratteri speciali e punteggiatura -> spazio
+CARATTERI_KM = re.compile('[a km dal centro]') # Caratteri da rimuovere da 'A x km dal centro'
+CARATTERI_M = re.compile('[a m dal centro]')   # Caratteri da rimuovere da 'A x m dal centro'
+
+# Mesi in italiano, nome completo e abbreviato -> numero del mese (percorso veloce di trasforma_in_data_colonna)
+MESI = {nome: numero for numero, nomi in enumerate([("gennaio", "gen"), ("febbraio", "feb"), ("marzo", "mar"), ("aprile", "apr"),
+                                                    ("maggio", "mag"), ("giugno", "giu"), ("luglio", "lug"), ("agosto", "ago"),
+                                                    ("settembre", "set"), ("ottobre", "ott"), ("novembre", "nov"), ("dicembre", "dic")],
+                                                   start=1) for nome in nomi}
+# '<giorno> <mese> [anno]', eventualmente preceduta dal giorno della settimana (es. 'ven 1 ago', '1 agosto 2025')
+GIORNO_MESE = re.compile(r'^(?:(?:lun|mar|mer|gio|ven|sab|dom)[a-zì]*\.?,?\s+)?(\d{1,2})\s+(' + '|'.join(MESI) + r')\.?(?:\s+(\d{4}))?$')
+# Giorno e mese in qualsiasi punto della stringa (date che dateparser legge meglio con l'anno, vedi _data_singola)
+CONTIENE_GIORNO_MESE = re.compile(r'\b\d{1,2}°?\s+(?:' + '|'.join(MESI) + r')\b')
+
 def alfabeto(x: str) -> str:
    """ Funzione che presa una stringa in input:
       - Ordina le parole all'interno di essa;
@@ -19,10 +37,10 @@ def alfabeto(x: str) -> str:
    # Tutto minuscolo subito
    x = x.title()
 
-   # Rimuovere caratteri speciali, punteggiatura & ecc...,
+   # Rimuovere caratteri speciali, punteggiatura & ecc..., (sostituiti da spazi con la tabella PUNTEGGIATURA,
+   # stesso risultato di re.sub(f'[{re.escape(string.punctuation)}]', ' ', x) senza creare ogni volta l'espressione regolare)
    # https://stackoverflow.com/questions/23996118/replace-special-characters-in-a-string-in-python
-   chars = re.escape(string.punctuation)
-   x = re.sub(f'[{chars}]', ' ', x)
+   x = x.translate(PUNTEGGIATURA)
 
    # Suddividere in parole
    parole = x.split()
@@ -112,14 +130,14 @@ def pulisci_distanza_centro(riga : str) -> float:
       return 0
 
    elif "km" in riga: # Pulire i km
-      riga =  re.sub(f'[a km dal centro]', '', riga)
+      riga = CARATTERI_KM.sub('', riga)
       riga = riga.replace(",",".") # Se c'è la virgola come separatore dei decimali convertirla in punto perchè è il formato che python accetta
       # Conversione in float
       distanza = float(riga)     
       return distanza
 
    else: # Pulire i metri
-      riga =  re.sub(f'[a m dal centro]', '', riga)
+      riga = CARATTERI_M.sub('', riga)
       riga = riga.replace(",",".") # Se c'è la virgola come separatore dei decimali convertirla in punto perchè è il formato che python accetta
       
       # Conversione in float
@@ -130,6 +148,68 @@ def pulisci_distanza_centro(riga : str) -> float:
 
       return distanza
 
+def valori_unici(colonna : pd.Series) -> tuple:
+   """Funzione che restituisce i valori distinti di una colonna (valori mancanti compresi) e, per ogni riga,
+      la posizione del suo valore tra i distinti: le funzioni di pulizia lavorano sui soli valori distinti
+      (uno scraping ripete gli stessi titoli, recensioni e distanze per ogni data e città) e il risultato
+      è riportato su tutte le righe con risultato[codici].
+      Output:
+         - codici, array con la posizione del valore di ogni riga;
+         - uniche, Series con i valori distinti.
+   """
+   codici, uniche = pd.factorize(colonna, use_na_sentinel=False)
+   return codici, pd.Series(uniche, dtype=object)
+
+def alfabeto_colonna(colonna : pd.Series) -> pd.Series:
+   """Versione di alfabeto() da applicare direttamente ad una colonna, stesso risultato di colonna.apply(alfabeto).
+      Ogni titolo distinto è pulito una sola volta (vedi valori_unici).
+   """
+   codici, uniche = valori_unici(colonna)
+   if not all(isinstance(x, str) for x in uniche):
+      raise TypeError("'colonna' deve contenere solo stringhe.")
+
+   pulite = np.array([alfabeto(x) for x in uniche], dtype=object)
+   return pd.Series(pulite[codici], index=colonna.index, name=colonna.name)
+
+def pulisci_recensione_colonna(colonna : pd.Series) -> pd.Series:
+   """Versione di pulisci_recensione() da applicare direttamente ad una colonna, stesso risultato di colonna.apply(pulisci_recensione).
+      Le stesse operazioni con i metodi .str di pandas, sui soli valori distinti (vedi valori_unici).
+   """
+   codici, uniche = valori_unici(colonna)
+   if not all(isinstance(x, str) for x in uniche):
+      raise TypeError("'colonna' deve contenere solo stringhe.")
+
+   testo = uniche.str.strip().str.lower() # Rendere la stringa compatibile con i confronti
+   novita = testo.isin(['novità su agoda', 'novità su booking']) # Nessuna recensione: 0
+
+   numero = pd.Series(0, index=uniche.index, dtype=np.int64)
+   numero[~novita] = (testo[~novita]
+                      .str.replace('recensioni', '', regex=False) # Sostituire la parola 'recensioni'
+                      .str.replace('recensione', '', regex=False) # Sostituire la parola 'recensione'
+                      .str.replace('.', '', regex=False)          # Rimuovere separatore migliaia
+                      .str.strip()
+                      .astype(np.int64))
+   return pd.Series(numero.to_numpy()[codici], index=colonna.index, name=colonna.name)
+
+def pulisci_distanza_centro_colonna(colonna : pd.Series) -> pd.Series:
+   """Versione di pulisci_distanza_centro() da applicare direttamente ad una colonna,
+      stesso risultato di colonna.apply(pulisci_distanza_centro).
+      Le stesse operazioni con i metodi .str di pandas e le espressioni regolari compilate, sui soli valori distinti (vedi valori_unici).
+   """
+   codici, uniche = valori_unici(colonna)
+   stringhe = uniche.map(lambda x: isinstance(x, str)).to_numpy(dtype=bool) # Se non è una stringa la distanza non è specificata
+
+   testo = uniche[stringhe].str.strip().str.lower()
+   centro = testo == 'in pieno centro'
+   km = ~centro & testo.str.contains('km', regex=False)
+   metri = ~centro & ~km
+
+   distanza = pd.Series(np.nan, index=uniche.index)
+   distanza[centro.index[centro]] = 0
+   distanza[km.index[km]] = testo[km].str.replace(CARATTERI_KM, '', regex=True).str.replace(',', '.', regex=False).astype(float)
+   distanza[metri.index[metri]] = testo[metri].str.replace(CARATTERI_M, '', regex=True).str.replace(',', '.', regex=False).astype(float) / 1000
+   return pd.Series(distanza.to_numpy()[codici], index=colonna.index, name=colonna.name)
+
 def trasforma_in_data(data_str : str,
                       anno : int = None,
                       format : str  = '%d-%m-%y'):
@@ -156,6 +236,45 @@ def trasforma_in_data(data_str : str,
         return data.strftime(format)
     else:
         return None
+
+@lru_cache(maxsize=4096)
+def _data_singola(data_str : str, anno : int = None):
+   """Data (datetime.date) di una stringa in italiano, None se non è una data. Il risultato di ogni (stringa, anno)
+      è memorizzato (al massimo 4096 stringhe, le meno usate di recente sono dimenticate) e riusato nelle chiamate successive.
+      - Percorso veloce: '<giorno> <mese> [anno]' con la tabella MESI, senza anno quello di 'anno' o quello corrente;
+      - Altrimenti dateparser, come trasforma_in_data(). L'anno è aggiunto alla stringa solo se specificato e se la stringa
+        ha giorno e mese ma non l'anno: le date in altre forme (es. 'ieri', '3 giorni fa') sono lette da dateparser così come sono.
+   """
+   trovata = GIORNO_MESE.match(data_str.lower())
+   if trovata:
+      giorno, mese, anno_stringa = trovata.groups()
+      try:
+         return datetime.date(int(anno_stringa or anno or datetime.date.today().year), MESI[mese], int(giorno))
+      except ValueError: # Giorno inesistente (es. 31 febbraio), lo decide dateparser
+         pass
+
+   if anno and CONTIENE_GIORNO_MESE.search(data_str.lower()) and not re.search(r'\d{4}', data_str):
+      data_str = f"{data_str} {anno}"
+   data = dateparser.parse(data_str, languages=['it'])
+   return data.date() if data else None
+
+def trasforma_in_data_colonna(colonna : pd.Series,
+                              anno : int = None) -> pd.Series:
+   """Versione di trasforma_in_data() da applicare direttamente ad una colonna di date in italiano (es. '1 agosto').
+      A differenza di trasforma_in_data restituisce una colonna datetime64 e non stringhe '%d-%m-%y':
+      pd.to_datetime su quelle stringhe legge prima il mese (01-08-25 -> 8 gennaio 2025), scambiando giorno e mese.
+      Ogni stringa distinta è convertita una sola volta (vedi valori_unici e _data_singola), dateparser
+      è usato solo per le stringhe che non sono nella forma '<giorno> <mese> [anno]'.
+      Input:
+       - colonna, Series di stringhe;
+       - anno (opzionale), anno delle date senza anno, se non specificato quello corrente.
+      Output:
+       - Series datetime64, NaT per i valori mancanti e le stringhe che non sono date.
+   """
+   codici, uniche = valori_unici(colonna)
+   date = [_data_singola(" ".join(x.split()), anno) if isinstance(x, str) else None for x in uniche]
+   date = pd.to_datetime(pd.Series(date, dtype=object)).to_numpy(dtype="datetime64[ns]")
+   return pd.Series(date[codici], index=colonna.index, name=colonna.name)
 #%%%
 
 
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components, min_weight_full_bipartite_matching
+
+
+#%%% Assegnazione 1:1 dei match
+
+# Peso dello spareggio nei costi del matching ottimo: cambia la soluzione solo tra assegnazioni con somma degli score
+# (quasi) uguale, entro 1e-6 per coppia
+PESO_SPAREGGIO = 1e-6
+
+
+def _ordina_per_score(booking: np.ndarray, agoda: np.ndarray, score: np.ndarray, spareggio: np.ndarray = None) -> np.ndarray:
+   """Ordine delle coppie per score decrescente; a parità di score per spareggio decrescente (se c'è)
+      e poi per index booking e index agoda (ordine deterministico)."""
+   if spareggio is None:
+      return np.lexsort((agoda, booking, -score))
+   return np.lexsort((agoda, booking, -spareggio, -score))
+
+
+def assegnazione_greedy(booking: np.ndarray, agoda: np.ndarray, score: np.ndarray, spareggio: np.ndarray = None) -> np.ndarray:
+   """Assegnazione greedy 1:1: si accetta la coppia con score più alto, si scartano le altre coppie delle due location, e così via.
+      Invece di scorrere le coppie una alla volta si lavora a "giri" vettoriali: ordinate le coppie per score,
+      le coppie che sono la prima della loro location booking e anche della loro location agoda (maschere di duplicated)
+      sono sicuramente scelte dal greedy; si accettano tutte insieme, si eliminano le coppie in conflitto e si ripete.
+      Input:
+         - booking, agoda, array con gli index delle due location di ogni coppia;
+         - score, array con lo score di ogni coppia;
+         - spareggio (opzionale), array usato per ordinare le coppie a parità di score.
+      Output:
+         - array booleano, True per le coppie accettate.
+   """
+   accettate = np.zeros(len(score), dtype=bool)
+   rimaste = _ordina_per_score(booking, agoda, score, spareggio)
+
+   while len(rimaste):
+      prima_booking = ~pd.Series(booking[rimaste]).duplicated().to_numpy()
+      prima_agoda = ~pd.Series(agoda[rimaste]).duplicated().to_numpy()
+      scelte = rimaste[prima_booking & prima_agoda]
+      accettate[scelte] = True
+
+      # Eliminare le coppie che usano una location appena assegnata (l'ordine per score resta invariato)
+      in_conflitto = np.isin(booking[rimaste], booking[scelte]) | np.isin(agoda[rimaste], agoda[scelte])
+      rimaste = rimaste[~in_conflitto]
+
+   return accettate
+
+
+def assegnazione_ottima(booking: np.ndarray, agoda: np.ndarray, score: np.ndarray, spareggio: np.ndarray = None) -> np.ndarray:
+   """Assegnazione ottima 1:1: matching bipartito di peso massimo (somma degli score) risolto per componente connessa.
+      - Le componenti con una sola location su uno dei due lati (una sola coppia, o una stella) si risolvono prendendo la coppia migliore;
+      - Le altre componenti con scipy.sparse.csgraph.min_weight_full_bipartite_matching su un grafo sparso.
+      Input:
+         - booking, agoda, array con gli index delle due location di ogni coppia;
+         - score, array con lo score di ogni coppia (positivo);
+         - spareggio (opzionale), array in [0, 1]: tra le assegnazioni con la stessa somma degli score
+           si sceglie quella con la somma dello spareggio più alta (vedi PESO_SPAREGGIO).
+      Output:
+         - array booleano, True per le coppie accettate.
+   """
+   accettate = np.zeros(len(score), dtype=bool)
+   if len(score) == 0:
+      return accettate
+
+   codici_b, uniche_b = pd.factorize(booking)
+   codici_a, uniche_a = pd.factorize(agoda)
+   n_b = len(uniche_b)
+
+   # Grafo bipartito: nodi 0..n_b-1 booking, n_b.. agoda
+   grafo = coo_matrix((np.ones(len(score)), (codici_b, codici_a + n_b)), shape=(n_b + len(uniche_a),) * 2)
+   _, componente_nodo = connected_components(grafo, directed=False)
+   componente = componente_nodo[codici_b]
+
+   nodi_b = pd.Series(codici_b).groupby(componente).nunique()
+   nodi_a = pd.Series(codici_a).groupby(componente).nunique()
+   stella = ((nodi_b == 1) | (nodi_a == 1)).reindex(np.arange(componente.max() + 1), fill_value=False).to_numpy()
+
+   # Stelle: la coppia migliore della componente
+   ordine = _ordina_per_score(booking, agoda, score, spareggio)
+   ordine = ordine[stella[componente[ordine]]]
+   accettate[ordine[~pd.Series(componente[ordine]).duplicated().to_numpy()]] = True
+
+   # Componenti generiche: matching di peso massimo come matching completo di costo minimo su un grafo sparso "aumentato".
+   # Ogni location ha un nodo fittizio (location non assegnata) e per ogni coppia reale (b, a) c'è l'arco fittizio (a', b'),
+   # così un matching completo esiste sempre. Tutti i costi sono spostati di una costante (ogni matching completo ha lo stesso
+   # numero di archi): costo 2 - score per le coppie reali, 2 per gli archi fittizi.
+   # Le componenti sono indipendenti, quindi risolverle in un'unica matrice sparsa equivale a risolverle una per una.
+   generiche = np.flatnonzero(~stella[componente])
+   if len(generiche):
+      righe, righe_uniche = pd.factorize(codici_b[generiche])
+      colonne, colonne_uniche = pd.factorize(codici_a[generiche])
+      n_r, n_c = len(righe_uniche), len(colonne_uniche)
+      costo_reale = 2.0 - score[generiche]
+      if spareggio is not None:
+         costo_reale = costo_reale - PESO_SPAREGGIO * spareggio[generiche]
+      righe_aumentate = np.concatenate([righe, n_r + colonne, np.arange(n_r), n_r + np.arange(n_c)])
+      colonne_aumentate = np.concatenate([colonne, n_c + righe, n_c + np.arange(n_r), np.arange(n_c)])
+      costi = np.concatenate([costo_reale, np.full(len(generiche) + n_r + n_c, 2.0)])
+      grafo_aumentato = csr_matrix((costi, (righe_aumentate, colonne_aumentate)), shape=(n_r + n_c, n_c + n_r))
+      _, colonna_scelta = min_weight_full_bipartite_matching(grafo_aumentato)
+
+      # Coppie reali scelte: riga r (booking) abbinata a una colonna c < n_c (agoda)
+      indice_coppia = pd.Series(generiche, index=righe.astype(np.int64) * n_c + colonne)
+      scelte = np.flatnonzero(colonna_scelta[:n_r] < n_c)
+      accettate[indice_coppia.loc[scelte.astype(np.int64) * n_c + colonna_scelta[scelte]].to_numpy()] = True
+
+   return accettate
+
+
+def assegna_uno_a_uno(scores_df: pd.DataFrame,
+                      score : str,
+                      metodo : str = "greedy",
+                      colonna_booking : str = "index_booking",
+                      colonna_agoda : str = "index_agoda",
+                      spareggio : str = None) -> pd.DataFrame:
+   """Funzione che risolve i match multipli: ogni location di booking e di agoda compare al massimo in un match.
+      Sostituisce gli step A-D delle funzioni di record linkage (drop_duplicates + groupby.apply sul massimo),
+      che a parità di score potevano restituire match molti a molti.
+      Input:
+         - scores_df, dataframe con una riga per coppia sopra soglia;
+         - score, nome della colonna con lo score della coppia;
+         - metodo (opzionale), 'greedy' (coppie con score più alto per prime) oppure 'ottimo' (somma degli score massima);
+         - colonna_booking, colonna_agoda (opzionali), colonne con gli index delle location;
+         - spareggio (opzionale), colonna in [0, 1] che decide a parità di score, es. la similarità media delle coppie
+           quando lo score è la probabilità di match del pattern di accordo (uguale per tutte le coppie dello stesso pattern).
+      Output:
+         - le righe di scores_df accettate, match strettamente 1:1.
+   """
+   booking = scores_df[colonna_booking].to_numpy()
+   agoda = scores_df[colonna_agoda].to_numpy()
+   valori = scores_df[score].to_numpy(dtype=np.float64)
+   secondari = None if spareggio is None else scores_df[spareggio].to_numpy(dtype=np.float64)
+
+   if metodo == "greedy":
+      accettate = assegnazione_greedy(booking, agoda, valori, secondari)
+   elif metodo == "ottimo":
+      accettate = assegnazione_ottima(booking, agoda, valori, secondari)
+   else:
+      raise ValueError("'metodo' deve essere 'greedy' oppure 'ottimo'.")
+
+   return scores_df[accettate].copy()
+
+#%%%
@@ -0,0 +1,349 @@
+import copy
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from recordlinkage.base import BaseIndexAlgorithm
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+#%%% Tokenizzazione
+
+def rimuovi_accenti(x: str) -> str:
+   """Funzione che rimuove gli accenti da una stringa, es. 'Agorà' -> 'Agora'."""
+   return "".join(c for c in unicodedata.normalize("NFKD", x) if not unicodedata.combining(c))
+
+
+def tokenizza(colonna: pd.Series, modalita: str = "token", q: int = 3) -> pd.Series:
+   """Funzione che divide ogni stringa di una colonna in token (minuscoli e senza accenti).
+      Input:
+         - colonna, Series di stringhe (es. 'titolo_processed', output di alfabeto()) o di categorie;
+         - modalita (opzionale), 'token' per le parole, 'qgram' per i q-grammi di caratteri;
+         - q (opzionale), lunghezza dei q-grammi.
+      Output:
+         - Series "esplosa": una riga per ogni (record, token distinto), l'index è quello della colonna.
+   """
+   if isinstance(colonna.dtype, pd.CategoricalDtype):
+      # Titoli interni (vedi funzioni.proiezione_linkage): ogni stringa distinta è divisa in token una sola volta
+      # e i suoi token sono ripetuti per i record che la contengono, nello stesso ordine della versione per stringhe
+      token_categorie = tokenizza(pd.Series(colonna.cat.categories), modalita, q)
+      categoria = token_categorie.index.to_numpy()
+      inizi = np.searchsorted(categoria, np.arange(len(colonna.cat.categories)))
+      quanti = np.bincount(categoria, minlength=len(colonna.cat.categories))
+      codici = colonna.cat.codes.to_numpy()
+      ripetizioni = np.where(codici >= 0, quanti[codici], 0)
+      righe = np.repeat(np.arange(len(colonna)), ripetizioni)
+      scarti = np.arange(len(righe)) - np.repeat(np.cumsum(ripetizioni) - ripetizioni, ripetizioni)
+      prese = np.repeat(inizi[np.maximum(codici, 0)], ripetizioni) + scarti
+      return pd.Series(token_categorie.to_numpy()[prese], index=colonna.index[righe])
+
+   testo = colonna.fillna("").str.lower().map(rimuovi_accenti)
+   if modalita == "token":
+      token = testo.str.split()
+   elif modalita == "qgram":
+      # Spazi come separatori di parola: '_' all'inizio e alla fine così anche le parole corte producono q-grammi
+      testo = "_" + testo.str.replace(" ", "_", regex=False) + "_"
+      token = testo.map(lambda x: [x[i:i + q] for i in range(max(len(x) - q + 1, 1))])
+   else:
+      raise ValueError("'modalita' deve essere 'token' oppure 'qgram'.")
+
+   token = token.explode().dropna()
+   token = token[token != ""]
+   # Un token ripetuto nello stesso record conta una sola volta
+   return token[~pd.MultiIndex.from_arrays([token.index, token.to_numpy()]).duplicated()]
+
+#%%%
+
+
+#%%% Indice invertito
+
+class IndiceInvertito(BaseIndexAlgorithm):
+   """Blocking tramite indice invertito sui token (o q-grammi) dei titoli.
+      Al posto del blocking sulla prima lettera: due record sono una coppia candidata se condividono almeno
+      'min_token_comuni' token rari. Un token è raro se:
+         - il suo blocco (record booking con il token x record agoda con il token) non supera 'max_blocco' coppie;
+         - il suo idf, log(numero record / numero record con il token), è almeno 'min_idf'.
+      Token generici come 'hotel', 'apartment', 'b' creano blocchi enormi e vengono quindi ignorati;
+      un record senza token rari (es. 'Palace') tiene comunque il suo token con idf più alto.
+      Si usa come gli altri algoritmi di recordlinkage:
+         indexer = recordlinkage.Index()
+         indexer.add(IndiceInvertito('titolo_booking', 'titolo_agoda'))
+         candidate_links = indexer.index(copia_booking, copia_agoda)
+      Frequenze e idf sono quelle dei due dataframe passati a index(): confrontando booking a blocchi, un blocco alla volta,
+      la rarità cambierebbe con il blocco. adatta() restituisce una copia con le frequenze calcolate una volta sola
+      sui dataframe interi, così le coppie di ogni blocco sono quelle dell'indice sui dataframe interi.
+   """
+
+   def __init__(self, left_on: str = "titolo_booking", right_on: str = "titolo_agoda",
+                modalita: str = "token", q: int = 3,
+                min_token_comuni: int = 1, max_blocco: int = 100, min_idf: float = 0.0,
+                **kwargs):
+      super().__init__(**kwargs)
+      self.left_on = left_on
+      self.right_on = right_on
+      self.modalita = modalita
+      self.q = q
+      self.min_token_comuni = min_token_comuni
+      self.max_blocco = max_blocco
+      self.min_idf = min_idf
+      self.vocabolario = None
+
+   def __repr__(self):
+      return (f"<{self.__class__.__name__} left_on={self.left_on!r}, right_on={self.right_on!r}, "
+              f"modalita={self.modalita!r}, min_token_comuni={self.min_token_comuni}, max_blocco={self.max_blocco}>")
+
+   def adatta(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> "IndiceInvertito":
+      """Funzione che restituisce una copia dell'indice con vocabolario, frequenze e idf calcolati su df_a e df_b interi.
+         La copia si usa con blocchi di df_a e con lo stesso df_b (stesso index): la rarità dei token non dipende dal blocco
+         e le posting list filtrate di df_b sono calcolate una volta sola. I token di un blocco che non sono nel
+         vocabolario (blocchi di un altro dataframe) non sono nel df_b adattato e non generano coppie: sono ignorati.
+         Input:
+            - df_a, df_b, dataframe interi (es. proiezioni di booking e agoda, vedi funzioni.proiezione_linkage).
+      """
+      adattato = copy.copy(self)
+      adattato.vocabolario = None
+      _, posting_b, vocabolario = adattato.token_rari(df_a, df_b)
+      adattato.vocabolario = vocabolario
+      adattato._codici_token = pd.Index(vocabolario["token"])
+      adattato._posting_b = posting_b
+      adattato._index_b = df_b.index
+      return adattato
+
+   def token_rari(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> tuple:
+      """Restituisce i token di df_a e df_b (una riga per record e token, posizione del record e codice del token)
+         già filtrati sui soli token rari, più la tabella del vocabolario con frequenze e idf.
+         Se l'indice è adattato (vedi adatta()) sono usate le frequenze del vocabolario adattato."""
+      if self.vocabolario is not None:
+         return self._token_rari_adattati(df_a, df_b)
+      token_a = tokenizza(df_a[self.left_on].reset_index(drop=True), self.modalita, self.q)
+      token_b = tokenizza(df_b[self.right_on].reset_index(drop=True), self.modalita, self.q)
+
+      codici, vocabolario = pd.factorize(np.concatenate([token_a.to_numpy(), token_b.to_numpy()]))
+      codici_a, codici_b = codici[:len(token_a)], codici[len(token_a):]
+
+      frequenze_a = np.bincount(codici_a, minlength=len(vocabolario))
+      frequenze_b = np.bincount(codici_b, minlength=len(vocabolario))
+      idf = np.log((len(df_a) + len(df_b)) / (frequenze_a + frequenze_b))
+      rari = (frequenze_a * frequenze_b <= self.max_blocco) & (idf >= self.min_idf)
+
+      vocabolario = pd.DataFrame({"token": vocabolario, "frequenza_a": frequenze_a,
+                                  "frequenza_b": frequenze_b, "idf": idf, "raro": rari})
+      posting_a = pd.DataFrame({"record": token_a.index.to_numpy(), "token": codici_a})
+      posting_b = pd.DataFrame({"record": token_b.index.to_numpy(), "token": codici_b})
+      return self._filtra_rari(posting_a, rari, idf), self._filtra_rari(posting_b, rari, idf), vocabolario
+
+   def _token_rari_adattati(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> tuple:
+      """token_rari() con il vocabolario di adatta(): si dividono in token solo i titoli di df_a."""
+      if not df_b.index.equals(self._index_b):
+         raise ValueError("L'indice è stato adattato su un altro dataframe: usare adatta() con lo stesso df_b di index().")
+      token_a = tokenizza(df_a[self.left_on].reset_index(drop=True), self.modalita, self.q)
+      codici_a = self._codici_token.get_indexer(token_a.to_numpy())
+      # I token fuori dal vocabolario hanno l'ultimo codice: mai rari e con idf minimo
+      codici_a[codici_a < 0] = len(self.vocabolario)
+      rari = np.append(self.vocabolario["raro"].to_numpy(), False)
+      idf = np.append(self.vocabolario["idf"].to_numpy(), -np.inf)
+      posting_a = pd.DataFrame({"record": token_a.index.to_numpy(), "token": codici_a})
+      posting_a = self._filtra_rari(posting_a, rari, idf)
+      # Del df_b solo i record con un token in comune con il blocco
+      posting_b = self._posting_b[np.isin(self._posting_b["token"].to_numpy(), posting_a["token"].to_numpy())]
+      return posting_a, posting_b, self.vocabolario
+
+   @staticmethod
+   def _filtra_rari(posting: pd.DataFrame, rari: np.ndarray, idf: np.ndarray) -> pd.DataFrame:
+      """Tiene i token rari di ogni record; ai record senza token rari lascia il token (o i token) con idf massimo."""
+      tenuti = rari[posting["token"].to_numpy()]
+      senza_rari = ~pd.Series(tenuti).groupby(posting["record"].to_numpy()).transform("any").to_numpy()
+      idf_token = pd.Series(idf[posting["token"].to_numpy()])
+      migliori = idf_token.to_numpy() == idf_token.groupby(posting["record"].to_numpy()).transform("max").to_numpy()
+      return posting[tenuti | (senza_rari & migliori)]
+
+   def _link_index(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> pd.MultiIndex:
+      posting_a, posting_b, vocabolario = self.token_rari(df_a, df_b)
+
+      # Join delle posting list sul token: una riga per ogni (record a, record b, token in comune)
+      coppie = posting_a.merge(posting_b, on="token", suffixes=("_a", "_b"))
+      chiave = coppie["record_a"].to_numpy(np.int64) * len(df_b) + coppie["record_b"].to_numpy(np.int64)
+      chiavi, comuni = np.unique(chiave, return_counts=True)
+      chiavi = chiavi[comuni >= self.min_token_comuni]
+
+      return pd.MultiIndex.from_arrays([df_a.index[chiavi // len(df_b)], df_b.index[chiavi % len(df_b)]],
+                                       names=[df_a.index.name, df_b.index.name])
+
+
+class IndiceInvertitoSorgenti(IndiceInvertito):
+   """Indice invertito sui token dei titoli di più sorgenti (piattaforme) riunite in un unico dataframe.
+      Un solo indice per tutti i record al posto di un IndiceInvertito per ogni coppia di sorgenti: le coppie candidate
+      sono solo tra record di sorgenti diverse e un token è raro se il suo blocco ha al massimo 'max_blocco' coppie
+      tra sorgenti diverse per ogni coppia di sorgenti (idf calcolato su tutti i record).
+      Con due sorgenti le coppie sono quelle di IndiceInvertito.
+      Si usa in modalità deduplicazione, con un solo dataframe che ha la colonna della sorgente:
+         indexer = recordlinkage.Index()
+         indexer.add(IndiceInvertitoSorgenti('titolo', 'sorgente'))
+         candidate_links = indexer.index(record)   # coppie (record, record) con il primo record prima nel dataframe
+   """
+
+   def __init__(self, on: str = "titolo", sorgente: str = "sorgente",
+                modalita: str = "token", q: int = 3,
+                min_token_comuni: int = 1, max_blocco: int = 100, min_idf: float = 0.0,
+                **kwargs):
+      super().__init__(on, on, modalita=modalita, q=q, min_token_comuni=min_token_comuni,
+                       max_blocco=max_blocco, min_idf=min_idf, **kwargs)
+      self.sorgente = sorgente
+
+   def __repr__(self):
+      return (f"<{self.__class__.__name__} on={self.left_on!r}, sorgente={self.sorgente!r}, "
+              f"modalita={self.modalita!r}, min_token_comuni={self.min_token_comuni}, max_blocco={self.max_blocco}>")
+
+   def _link_index(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> pd.MultiIndex:
+      raise ValueError(f"{self.__class__.__name__} lavora su un solo dataframe con tutte le sorgenti: usare indexer.index(record).")
+
+   def _dedup_index(self, df: pd.DataFrame) -> pd.MultiIndex:
+      token = tokenizza(df[self.left_on].reset_index(drop=True), self.modalita, self.q)
+      codici, vocabolario = pd.factorize(token.to_numpy())
+      record = token.index.to_numpy()
+      sorgenti, nomi = pd.factorize(df[self.sorgente])
+
+      # Frequenza di ogni token in ogni sorgente: coppie del blocco tra sorgenti diverse = (n^2 - somma n_s^2) / 2
+      per_sorgente = np.bincount(codici * len(nomi) + sorgenti[record],
+                                 minlength=len(vocabolario) * len(nomi)).reshape(len(vocabolario), len(nomi)).astype(np.int64)
+      frequenze = per_sorgente.sum(axis=1)
+      coppie_blocco = (frequenze ** 2 - (per_sorgente ** 2).sum(axis=1)) // 2
+      idf = np.log(len(df) / frequenze)
+      # max_blocco vale per ogni coppia di sorgenti, come in IndiceInvertito con un indice per coppia
+      rari = (coppie_blocco <= self.max_blocco * len(nomi) * (len(nomi) - 1) // 2) & (idf >= self.min_idf)
+      posting = self._filtra_rari(pd.DataFrame({"record": record, "token": codici}), rari, idf)
+
+      # I token di una sola sorgente non generano coppie: fuori dal join, dove creerebbero solo coppie da scartare
+      posting = posting[coppie_blocco[posting["token"].to_numpy()] > 0]
+      coppie = posting.merge(posting, on="token", suffixes=("_a", "_b"))
+      a, b = coppie["record_a"].to_numpy(np.int64), coppie["record_b"].to_numpy(np.int64)
+      tenute = (a < b) & (sorgenti[a] != sorgenti[b])
+      chiavi, comuni = np.unique(a[tenute] * len(df) + b[tenute], return_counts=True)
+      chiavi = chiavi[comuni >= self.min_token_comuni]
+
+      return pd.MultiIndex.from_arrays([df.index[chiavi // len(df)], df.index[chiavi % len(df)]],
+                                       names=[df.index.name, df.index.name])
+
+#%%%
+
+
+#%%% Top-k TF-IDF
+
+def top_k_righe(similarita, k: int) -> tuple:
+   """Funzione che, data una matrice sparsa (csr) di similarità, tiene per ogni riga i k valori più alti.
+      Output:
+         - righe, colonne e valori dei k migliori elementi di ogni riga (meno se la riga ha meno di k valori non nulli).
+   """
+   similarita = similarita.tocsr()
+   lunghezze = np.diff(similarita.indptr)
+   righe = np.repeat(np.arange(similarita.shape[0]), lunghezze)
+   # Ordinare per riga e, dentro la riga, per similarità decrescente; poi tenere i primi k di ogni riga
+   ordine = np.lexsort((-similarita.data, righe))
+   rango = np.arange(len(ordine)) - np.repeat(similarita.indptr[:-1], lunghezze)
+   primi = ordine[rango < k]
+   return righe[primi], similarita.indices[primi], similarita.data[primi]
+
+
+class TopKTfidf(BaseIndexAlgorithm):
+   """Generatore di coppie candidate tramite i k vicini più simili.
+      I titoli sono trasformati in vettori sparsi TF-IDF di n-grammi di caratteri (vocabolario comune a booking e agoda);
+      per ogni record di booking si tengono i k record di agoda con similarità del coseno più alta.
+      Il prodotto tra matrici sparse è calcolato a blocchi di 'chunk_size' righe di booking, così la memoria resta limitata.
+      Le coppie candidate sono O(n*k) invece di O(dimensione del blocco^2).
+      Si usa come gli altri algoritmi di recordlinkage:
+         indexer = recordlinkage.Index()
+         indexer.add(TopKTfidf('titolo_booking', 'titolo_agoda', k=5))
+         candidate_links = indexer.index(copia_booking, copia_agoda)
+      Il vocabolario e gli idf sono quelli dei due dataframe passati a index(); con adatta(), come per IndiceInvertito,
+      sono calcolati una volta sola sui dataframe interi e non dipendono dal blocco di booking.
+   """
+
+   def __init__(self, left_on: str = "titolo_booking", right_on: str = "titolo_agoda",
+                k: int = 5, ngram_range: tuple = (3, 3), min_similarita: float = 0.0,
+                chunk_size: int = 10000, **kwargs):
+      super().__init__(**kwargs)
+      self.left_on = left_on
+      self.right_on = right_on
+      self.k = k
+      self.ngram_range = ngram_range
+      self.min_similarita = min_similarita
+      self.chunk_size = chunk_size
+      self.vectorizer = None
+
+   def __repr__(self):
+      return (f"<{self.__class__.__name__} left_on={self.left_on!r}, right_on={self.right_on!r}, "
+              f"k={self.k}, ngram_range={self.ngram_range}>")
+
+   def adatta(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> "TopKTfidf":
+      """Funzione che restituisce una copia con il TfidfVectorizer addestrato su df_a e df_b interi e la matrice di df_b,
+         da usare con blocchi di df_a e lo stesso df_b (vedi IndiceInvertito.adatta())."""
+      adattato = copy.copy(self)
+      adattato.vectorizer = self._addestra(df_a, df_b)
+      adattato._vettori_b = adattato.vectorizer.transform(df_b[self.right_on].astype(object).fillna(""))
+      adattato._index_b = df_b.index
+      return adattato
+
+   def _addestra(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> TfidfVectorizer:
+      """TfidfVectorizer sugli n-grammi di caratteri, addestrato sui titoli di df_a e df_b (vocabolario comune)."""
+      vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=self.ngram_range,
+                                   lowercase=True, strip_accents="unicode", dtype=np.float32)
+      return vectorizer.fit(pd.concat([df_a[self.left_on].astype(object).fillna(""),
+                                       df_b[self.right_on].astype(object).fillna("")], ignore_index=True))
+
+   def vettori(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> tuple:
+      """Restituisce le matrici TF-IDF (normalizzate, righe = record) dei titoli di df_a e df_b.
+         Se adattato (vedi adatta()) con il vectorizer e la matrice di df_b di adatta()."""
+      titoli_a = df_a[self.left_on].astype(object).fillna("")
+      if self.vectorizer is not None:
+         if not df_b.index.equals(self._index_b):
+            raise ValueError("TopKTfidf è stato adattato su un altro dataframe: usare adatta() con lo stesso df_b di index().")
+         return self.vectorizer.transform(titoli_a), self._vettori_b
+      vectorizer = self._addestra(df_a, df_b)
+      return vectorizer.transform(titoli_a), vectorizer.transform(df_b[self.right_on].astype(object).fillna(""))
+
+   def _link_index(self, df_a: pd.DataFrame, df_b: pd.DataFrame) -> pd.MultiIndex:
+      vettori_a, vettori_b = self.vettori(df_a, df_b)
+      vettori_b_t = vettori_b.T.tocsr()
+
+      righe, colonne = [], []
+      for inizio in range(0, vettori_a.shape[0], self.chunk_size):
+         similarita = vettori_a[inizio:inizio + self.chunk_size] @ vettori_b_t
+         if self.min_similarita > 0:
+            similarita.data[similarita.data < self.min_similarita] = 0
+            similarita.eliminate_zeros()
+         r, c, _ = top_k_righe(similarita, self.k)
+         righe.append(r + inizio)
+         colonne.append(c)
+
+      righe = np.concatenate(righe) if righe else np.empty(0, dtype=np.int64)
+      colonne = np.concatenate(colonne) if colonne else np.empty(0, dtype=np.int64)
+      return pd.MultiIndex.from_arrays([df_a.index[righe], df_b.index[colonne]],
+                                       names=[df_a.index.name, df_b.index.name])
+
+#%%%
+
+
+#%%% Valutazione del blocking
+
+def valuta_blocking(candidate_links: pd.MultiIndex,
+                    match_veri: pd.MultiIndex,
+                    n_booking: int,
+                    n_agoda: int) -> dict:
+   """Funzione che misura la qualità di una strategia di blocking.
+      Input:
+         - candidate_links, coppie candidate generate dall'indexer;
+         - match_veri, coppie (index booking, index agoda) considerate corrette, es. da Results/matches_*.csv;
+         - n_booking, n_agoda, numero di record dei due dataframe.
+      Output:
+         - dizionario con numero di coppie, pair reduction ratio (quota di coppie evitate rispetto al prodotto cartesiano)
+           e pair completeness (quota di match veri presenti tra le coppie candidate).
+   """
+   trovati = match_veri.isin(candidate_links).sum()
+   return {
+      "coppie_candidate": len(candidate_links),
+      "reduction_ratio": 1 - len(candidate_links) / (n_booking * n_agoda),
+      "pair_completeness": trovati / len(match_veri) if len(match_veri) else np.nan,
+      "match_veri_persi": len(match_veri) - int(trovati),
+   }
+
+#%%%
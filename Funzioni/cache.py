@@ -0,0 +1,184 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+
+#%%% Chiavi della cache
+
+def hash_stringhe(valori) -> np.ndarray:
+   """Funzione che calcola un hash a 64 bit stabile (blake2b, uguale in ogni esecuzione) per ogni stringa.
+      Output:
+         - array uint64, un hash per stringa.
+   """
+   return np.fromiter((int.from_bytes(hashlib.blake2b(str(v).encode("utf-8"), digest_size=8).digest(), "little")
+                       for v in valori), dtype=np.uint64, count=len(valori))
+
+
+def _mescola(x: np.ndarray) -> np.ndarray:
+   """Finalizzatore di splitmix64: mescola i bit di un array uint64 (le moltiplicazioni sono modulo 2^64)."""
+   x = x ^ (x >> np.uint64(30))
+   x = x * np.uint64(0xBF58476D1CE4E5B9)
+   x = x ^ (x >> np.uint64(27))
+   x = x * np.uint64(0x94D049BB133111EB)
+   return x ^ (x >> np.uint64(31))
+
+
+def chiavi_similarita(hash_booking: np.ndarray, hash_agoda: np.ndarray, metodo: str) -> np.ndarray:
+   """Funzione che combina gli hash delle due stringhe e del metodo in una chiave int64 per coppia.
+      La combinazione non è simmetrica: (a, b) e (b, a) hanno chiavi diverse.
+   """
+   hash_metodo = hash_stringhe([metodo])[0]
+   with np.errstate(over="ignore"):
+      return _mescola(np.asarray(hash_booking, dtype=np.uint64) ^ _mescola(np.asarray(hash_agoda, dtype=np.uint64) ^ hash_metodo)).view(np.int64)
+
+#%%%
+
+
+#%%% Cache su disco
+
+class CacheSimilarita:
+   """Cache persistente delle similarità tra coppie di stringhe: una tabella ordinata per chiave salvata in file .npy
+      e letta come memory map, così la ricerca di milioni di coppie è un'unica np.searchsorted.
+      La chiave è l'hash di (stringa booking, stringa agoda, metodo), vedi chiavi_similarita();
+      il valore è la similarità. Rilanciando il record linkage con soglie diverse, o su uno scraping
+      che ripete gran parte delle location, si calcolano solo le coppie mai viste.
+      - Al massimo 'max_voci' coppie: oltre si eliminano quelle usate meno di recente (LRU);
+      - 'hit' e 'miss' contano le coppie trovate e non trovate dall'apertura della cache.
+      Le coppie aggiunte con salva() e gli ultimi usi restano in memoria (e sono già trovate da cerca()) fino a scrivi(),
+      chiamata una volta alla fine di ogni record linkage: la tabella è riscritta una volta per esecuzione e non per blocco.
+      Ogni scrittura crea una nuova versione (cartella 'v<numero>' con tutti i file) e poi sostituisce con un solo
+      os.replace il file 'corrente' che la indica: un'interruzione lascia la versione precedente intera e coerente.
+      La cartella deve essere usata da un solo processo alla volta.
+      Uso:
+         cache = CacheSimilarita(paths['path_progetto'] / 'cache_similarita')
+         record_linkage_title(agoda.copy(), booking.copy(), 0.95, cache=cache)
+         cache.statistiche()
+   """
+
+   _FILE = ("chiavi", "valori", "ultimo_uso")
+
+   def __init__(self, path, max_voci: int = 10_000_000):
+      self.path = Path(path)
+      self.path.mkdir(parents=True, exist_ok=True)
+      self.max_voci = max_voci
+      self.hit = 0
+      self.miss = 0
+      self._apri()
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} path={str(self.path)!r}, max_voci={self.max_voci}, hit={self.hit}, miss={self.miss}>"
+
+   def __len__(self):
+      return len(self._chiavi) + len(self._nuove_chiavi)
+
+   def __enter__(self):
+      return self
+
+   def __exit__(self, *errore):
+      self.scrivi()
+
+   def _apri(self) -> None:
+      """Apre la versione corrente della cache (chiavi e valori come memory map, ultimo uso in memoria),
+         o crea una cache vuota. Le versioni non più indicate da 'corrente' (scritture interrotte) sono eliminate."""
+      corrente = self.path / "corrente"
+      self._versione = corrente.read_text().strip() if corrente.exists() else None
+      for cartella in self.path.glob("v*"):
+         if cartella.name != self._versione:
+            shutil.rmtree(cartella, ignore_errors=True)
+      (self.path / "corrente.tmp").unlink(missing_ok=True)
+
+      if self._versione is None:
+         self._chiavi = np.empty(0, np.int64)
+         self._valori = np.empty(0, np.float64)
+         self._ultimo_uso = np.empty(0, np.int64)
+         self._orologio = 0
+      else:
+         cartella = self.path / self._versione
+         self._chiavi = np.load(cartella / "chiavi.npy", mmap_mode="r")
+         self._valori = np.load(cartella / "valori.npy", mmap_mode="r")
+         self._ultimo_uso = np.load(cartella / "ultimo_uso.npy")
+         # Orologio logico per l'LRU: aumenta di uno ad ogni ricerca, anche tra un'esecuzione e l'altra
+         self._orologio = int(np.load(cartella / "orologio.npy"))
+      self._nuove_chiavi = np.empty(0, np.int64)
+      self._nuovi_valori = np.empty(0, np.float64)
+      self._modificata = False
+
+   def _scrivi(self, chiavi, valori, ultimo_uso, orologio) -> None:
+      """Scrive una nuova versione della cache e la rende corrente con un solo os.replace."""
+      numero = int(self._versione[1:]) + 1 if self._versione else 0
+      versione = f"v{numero:06d}"
+      cartella = self.path / versione
+      cartella.mkdir(exist_ok=True)
+      for nome, valore in zip(self._FILE + ("orologio",), (chiavi, valori, ultimo_uso, np.int64(orologio))):
+         np.save(cartella / f"{nome}.npy", valore)
+      temporaneo = self.path / "corrente.tmp"
+      temporaneo.write_text(versione)
+      os.replace(temporaneo, self.path / "corrente")
+
+   def cerca(self, chiavi: np.ndarray) -> tuple:
+      """Cerca le chiavi nella cache (anche tra quelle salvate e non ancora scritte) e aggiorna il loro ultimo uso.
+         Output:
+            - array con le similarità (NaN per le chiavi non trovate);
+            - array booleano, True per le chiavi trovate.
+      """
+      chiavi = np.asarray(chiavi, dtype=np.int64)
+      self._orologio += 1
+      self._modificata = True
+      valori = np.full(len(chiavi), np.nan)
+      trovate = np.zeros(len(chiavi), dtype=bool)
+      if len(self._chiavi):
+         posizioni = np.minimum(np.searchsorted(self._chiavi, chiavi), len(self._chiavi) - 1)
+         trovate = self._chiavi[posizioni] == chiavi
+         valori[trovate] = self._valori[posizioni[trovate]]
+         self._ultimo_uso[posizioni[trovate]] = self._orologio
+      if len(self._nuove_chiavi):
+         posizioni = np.minimum(np.searchsorted(self._nuove_chiavi, chiavi), len(self._nuove_chiavi) - 1)
+         nuove = ~trovate & (self._nuove_chiavi[posizioni] == chiavi)
+         valori[nuove] = self._nuovi_valori[posizioni[nuove]]
+         trovate |= nuove
+
+      self.hit += int(trovate.sum())
+      self.miss += int((~trovate).sum())
+      return valori, trovate
+
+   def salva(self, chiavi: np.ndarray, valori: np.ndarray) -> None:
+      """Aggiunge le similarità calcolate alle coppie in memoria; sono scritte su disco da scrivi()."""
+      chiavi = np.concatenate([self._nuove_chiavi, np.asarray(chiavi, dtype=np.int64)])
+      valori = np.concatenate([self._nuovi_valori, np.asarray(valori, dtype=np.float64)])
+      chiavi, indici = np.unique(chiavi, return_index=True)
+      nuove = ~np.isin(chiavi, self._chiavi)
+      self._nuove_chiavi, self._nuovi_valori = chiavi[nuove], valori[indici][nuove]
+      self._modificata = True
+
+   def scrivi(self) -> None:
+      """Scrive su disco le coppie aggiunte e gli ultimi usi (riscrivendo la tabella ordinata in una nuova versione);
+         se si supera 'max_voci' elimina le coppie usate meno di recente."""
+      if not self._modificata:
+         return
+      chiavi = np.concatenate([self._chiavi, self._nuove_chiavi])
+      valori = np.concatenate([self._valori, self._nuovi_valori])
+      ultimo_uso = np.concatenate([self._ultimo_uso, np.full(len(self._nuove_chiavi), self._orologio, dtype=np.int64)])
+
+      if len(chiavi) > self.max_voci:
+         tenute = np.argpartition(-ultimo_uso, self.max_voci - 1)[:self.max_voci] if self.max_voci else []
+         chiavi, valori, ultimo_uso = chiavi[tenute], valori[tenute], ultimo_uso[tenute]
+      ordine = np.argsort(chiavi, kind="stable")
+
+      self._scrivi(chiavi[ordine], valori[ordine], ultimo_uso[ordine], self._orologio)
+      # Le memory map della versione precedente vanno chiuse prima di eliminarla (vedi _apri)
+      self._chiavi = self._valori = None
+      self._apri()
+
+   def statistiche(self) -> dict:
+      """Contatori di hit e miss dall'apertura della cache e numero di coppie salvate."""
+      totale = self.hit + self.miss
+      return {"hit": self.hit, "miss": self.miss,
+              "hit_rate": self.hit / totale if totale else np.nan, "voci": len(self)}
+
+   def azzera_statistiche(self) -> None:
+      self.hit = self.miss = 0
+
+#%%%
@@ -0,0 +1,581 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from cache import CacheSimilarita, chiavi_similarita, hash_stringhe
+from parallelo import esegui_in_parallelo, numero_processi
+
+
+#%%% Codifica delle stringhe
+
+# Caratteri che non formano un carattere a sé ma si uniscono al precedente (accenti combinanti, zero width joiner, ...).
+# jellyfish confronta i grafemi e non i singoli codepoint: "A" + "̀" vale come un unico carattere "À".
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+
+
+def _grafemi(x: str) -> list:
+   """Suddivide una stringa in grafemi: carattere base seguito dagli eventuali segni combinanti."""
+   grafemi = []
+   for carattere in x:
+      if grafemi and (unicodedata.category(carattere) in ("Mn", "Me", "Mc") or carattere == "‍"):
+         grafemi[-1] += carattere
+      else:
+         grafemi.append(carattere)
+   return grafemi
+
+
+def codifica_stringhe(valori, composti: dict = None) -> tuple:
+   """Funzione che trasforma un insieme di stringhe in una matrice di interi.
+      Ogni riga contiene un codice per ogni carattere (grafema) della stringa, le posizioni oltre la lunghezza della stringa
+      sono riempite con -1 (valore che non corrisponde a nessun carattere).
+      I caratteri semplici sono codificati con il loro codepoint unicode, i grafemi composti da più codepoint
+      (es. lettera + accento combinante) con un codice oltre l'ultimo codepoint unicode.
+      Input:
+         - valori, lista/array/Series di stringhe;
+         - composti (opzionale), dizionario grafema composto -> codice, da condividere tra le stringhe che verranno confrontate.
+      Output:
+         - matrice (n x lunghezza massima) di tipo int32;
+         - vettore con la lunghezza di ogni stringa.
+   """
+   valori = list(valori)
+   if composti is None:
+      composti = {}
+   caratteri = []
+   for valore in valori:
+      if _NON_ASCII.search(valore) is None:
+         caratteri.append(valore)
+         continue
+      grafemi = _grafemi(valore)
+      if len(grafemi) == len(valore):
+         caratteri.append(valore)
+         continue
+      # Grafemi composti sostituiti da un carattere "privato" oltre il range unicode (codificato a parte)
+      caratteri.append([g if len(g) == 1 else composti.setdefault(g, 0x110000 + len(composti)) for g in grafemi])
+
+   lunghezze = np.fromiter((len(c) for c in caratteri), dtype=np.int64, count=len(caratteri))
+   larghezza = max(int(lunghezze.max()) if len(caratteri) else 0, 1)
+   matrice = np.full((len(caratteri), larghezza), -1, dtype=np.int32)
+
+   # Un'unica conversione in utf-32 per le stringhe semplici: ogni carattere occupa esattamente 4 byte, quindi un int32.
+   semplici = [i for i, c in enumerate(caratteri) if isinstance(c, str)]
+   testo = "".join(caratteri[i] for i in semplici)
+   codepoint = np.frombuffer(testo.encode("utf-32-le"), dtype=np.int32)
+   lunghezze_semplici = lunghezze[semplici]
+   righe = np.repeat(np.asarray(semplici, dtype=np.int64), lunghezze_semplici)
+   colonne = np.arange(len(codepoint)) - np.repeat(np.cumsum(lunghezze_semplici) - lunghezze_semplici, lunghezze_semplici)
+   matrice[righe, colonne] = codepoint
+
+   for i, c in enumerate(caratteri):
+      if not isinstance(c, str):
+         matrice[i, :len(c)] = [x if isinstance(x, int) else ord(x) for x in c]
+
+   return matrice, lunghezze
+
+#%%%
+
+
+#%%% Jaro-Winkler vettoriale
+
+_UNO = np.uint64(1)
+
+
+def _maschera_bit(k: np.ndarray) -> np.ndarray:
+   """Restituisce per ogni elemento di k un uint64 con i k bit meno significativi a 1 (k compreso tra 0 e 64)."""
+   k = k.astype(np.uint64)
+   pieno = k >= 64
+   maschera = (_UNO << np.where(pieno, 0, k).astype(np.uint64)) - _UNO
+   maschera[pieno] = ~np.uint64(0)
+   return maschera
+
+
+def _peso_jarowinkler(A, la, B, lb, comuni, trasposizioni) -> np.ndarray:
+   """Formula finale di Jaro-Winkler (stesso ordine delle operazioni di jellyfish, per avere gli stessi float)."""
+   with np.errstate(divide="ignore", invalid="ignore"):
+      c = comuni.astype(np.float64)
+      peso = (c / la + c / lb + (c - trasposizioni) / c) / 3
+   peso[comuni == 0] = 0.0
+
+   # Modifica di Winkler: prefisso comune (massimo 4 caratteri)
+   P = min(4, A.shape[1], B.shape[1])
+   prefisso_uguale = (A[:, :P] == B[:, :P]) & (np.arange(P) < np.minimum(la, lb)[:, None])
+   prefisso = np.cumprod(prefisso_uguale, axis=1).sum(axis=1)
+   boost = peso > 0.7
+   peso[boost] += prefisso[boost] * 0.1 * (1.0 - peso[boost])
+   return peso
+
+
+def _jarowinkler_bit(A: np.ndarray, la: np.ndarray,
+                     B: np.ndarray, lb: np.ndarray,
+                     pm: np.ndarray, pm_righe: np.ndarray, A_alfabeto: np.ndarray) -> np.ndarray:
+   """Jaro-Winkler bit-parallelo per un blocco di coppie con stringhe di agoda lunghe al massimo 64 caratteri.
+      Le posizioni di ogni carattere nella stringa di agoda sono una maschera di bit (pm), così la ricerca del primo
+      carattere libero nella finestra è un'operazione su un solo uint64 per coppia.
+      Le righe devono essere ordinate per lunghezza di A decrescente.
+   """
+   n, L1 = A.shape
+   raggio = np.maximum(np.maximum(la, lb) // 2 - 1, 0)
+   attive = np.searchsorted(-la, -np.arange(L1), side="left") # righe con la > i
+
+   liberi_b = _maschera_bit(lb) # posizioni di B non ancora abbinate
+   match_a = np.zeros((n, L1), dtype=bool)
+
+   # Indici piatti in pm: una sola take per posizione invece di un indexing a due dimensioni
+   pm_piatta = pm.ravel()
+   pm_indici = pm_righe[:, None] * pm.shape[1] + A_alfabeto
+
+   for i in range(L1):
+      r = int(attive[i])
+      if r == 0:
+         break
+      inizio = np.maximum(i - raggio[:r], 0)
+      fine = np.minimum(i + raggio[:r], lb[:r] - 1) + 1
+      finestra = _maschera_bit(fine) & ~_maschera_bit(inizio)
+      candidati = pm_piatta.take(pm_indici[:r, i]) & finestra & liberi_b[:r]
+      primo = candidati & (~candidati + _UNO) # bit meno significativo
+      liberi_b[:r] ^= primo
+      match_a[:r, i] = primo != 0
+
+   comuni = match_a.sum(axis=1)
+
+   # Trasposizioni: il k-esimo carattere in comune di A confrontato con il k-esimo di B
+   abbinati_b = _maschera_bit(lb) & ~liberi_b
+   trasposizioni = np.zeros(n, dtype=np.int64)
+   righe_tutte = np.arange(n)
+   for i in range(L1):
+      righe = righe_tutte[match_a[:, i]]
+      if len(righe) == 0:
+         continue
+      x = abbinati_b[righe]
+      primo = x & (~x + _UNO)
+      abbinati_b[righe] = x ^ primo
+      posizione = np.log2(primo.astype(np.float64)).astype(np.int64)
+      trasposizioni[righe] += B[righe, posizione] != A[righe, i]
+   trasposizioni //= 2
+
+   return _peso_jarowinkler(A, la, B, lb, comuni, trasposizioni)
+
+
+def _jarowinkler_matrice(A: np.ndarray, la: np.ndarray,
+                         B: np.ndarray, lb: np.ndarray) -> np.ndarray:
+   """Jaro-Winkler per un blocco di coppie senza limiti di lunghezza (usato per le stringhe oltre i 64 caratteri).
+      Le posizioni abbinate sono matrici booleane invece che maschere di bit.
+      Le righe devono essere ordinate per lunghezza di A decrescente.
+   """
+   n = len(la)
+   B = np.where(B == -1, -2, B) # Il padding di B non deve mai coincidere con il padding di A
+   L1, L2 = A.shape[1], B.shape[1]
+
+   raggio = np.maximum(np.maximum(la, lb) // 2 - 1, 0)
+   raggio_max = int(raggio.max())
+   attive = np.searchsorted(-la, -np.arange(L1), side="left")
+
+   match_a = np.zeros((n, L1), dtype=bool)
+   match_b = np.zeros((n, L2), dtype=bool)
+   for i in range(L1):
+      r = int(attive[i])
+      if r == 0:
+         break
+      c0 = max(0, i - raggio_max)
+      c1 = min(L2, i + raggio_max + 1)
+      colonne = np.arange(c0, c1)
+      candidati = (B[:r, c0:c1] == A[:r, i, None]) & ~match_b[:r, c0:c1]
+      candidati &= colonne >= (i - raggio[:r, None])
+      candidati &= colonne <= np.minimum(i + raggio[:r, None], lb[:r, None] - 1)
+      righe = np.flatnonzero(candidati.any(axis=1))
+      j = candidati.argmax(axis=1)[righe] + c0
+      match_b[righe, j] = True
+      match_a[righe, i] = True
+
+   comuni = match_a.sum(axis=1)
+
+   K = min(L1, L2)
+   ordine_a = np.argsort(~match_a, axis=1, kind="stable")[:, :K]
+   ordine_b = np.argsort(~match_b, axis=1, kind="stable")[:, :K]
+   diversi = np.take_along_axis(A, ordine_a, axis=1) != np.take_along_axis(B, ordine_b, axis=1)
+   diversi &= np.arange(K) < comuni[:, None]
+   trasposizioni = diversi.sum(axis=1) // 2
+
+   return _peso_jarowinkler(A, la, B, lb, comuni, trasposizioni)
+
+
+def _maschere_posizioni(matrice: np.ndarray, lunghezze: np.ndarray, alfabeto: np.ndarray) -> np.ndarray:
+   """Per ogni stringa (lunga al massimo 64) e ogni carattere dell'alfabeto la maschera di bit delle posizioni del carattere."""
+   n, L = matrice.shape
+   pm = np.zeros((n, len(alfabeto) + 1), dtype=np.uint64) # ultima colonna: caratteri assenti, maschera vuota
+   righe, colonne = np.nonzero(np.arange(L) < lunghezze[:, None])
+   codici = np.searchsorted(alfabeto, matrice[righe, colonne])
+   # Ogni (stringa, carattere, posizione) è unico, quindi sommare i bit equivale a un OR
+   np.add.at(pm, (righe, codici), _UNO << colonne.astype(np.uint64))
+   return pm
+
+
+def _blocchi_coppie(la: np.ndarray, lb: np.ndarray, chunk_size: int) -> tuple:
+   """Ordine delle coppie per lunghezza decrescente e suddivisione in blocchi di al massimo 'chunk_size' coppie.
+      Prima i blocchi con stringhe di agoda lunghe al massimo 64 caratteri (versione bit-parallela), poi gli altri.
+      Output:
+         - ordine delle coppie;
+         - lista di blocchi (inizio, fine, bit): posizioni in 'ordine' e versione del calcolo da usare.
+   """
+   ordine = np.lexsort((-lb, -la))
+   corte = lb[ordine] <= 64
+   ordine = np.concatenate([ordine[corte], ordine[~corte]])
+   n_corte = int(corte.sum())
+
+   blocchi = []
+   for inizio_gruppo, fine_gruppo, bit in ((0, n_corte, True), (n_corte, len(ordine), False)):
+      for inizio in range(inizio_gruppo, fine_gruppo, chunk_size):
+         blocchi.append((inizio, min(inizio + chunk_size, fine_gruppo), bit))
+   return ordine, blocchi
+
+
+def _calcola_blocco(array: dict, inizio: int, fine: int, bit: bool) -> None:
+   """Calcola la similarità di un blocco di coppie e la scrive in array['similarita'].
+      'array' contiene le matrici delle stringhe e gli indici delle coppie (vedi jarowinkler_vettoriale),
+      così la stessa funzione è usata sia in un solo processo che nei processi di parallelo.py.
+   """
+   blocco = array["ordine"][inizio:fine]
+   cb, ca = array["cb"][blocco], array["ca"][blocco]
+   la_blocco, lb_blocco = array["la"][blocco], array["lb"][blocco]
+   matrice_a, alfabeto = array["matrice_a"], array["alfabeto"]
+   L1, L2 = max(int(la_blocco.max()), 1), max(int(lb_blocco.max()), 1)
+   A = array["matrice_b"][cb, :L1]
+   B = matrice_a[ca, :L2]
+   if bit:
+      agoda_blocco, pm_righe = np.unique(ca, return_inverse=True)
+      pm = _maschere_posizioni(matrice_a[agoda_blocco, :L2], array["lunghezze_a"][agoda_blocco], alfabeto)
+      A_alfabeto = np.searchsorted(alfabeto, A)
+      A_alfabeto[(A_alfabeto == len(alfabeto)) | (alfabeto[np.minimum(A_alfabeto, len(alfabeto) - 1)] != A)] = len(alfabeto)
+      array["similarita"][blocco] = _jarowinkler_bit(A, la_blocco, B, lb_blocco, pm, pm_righe, A_alfabeto)
+   else:
+      array["similarita"][blocco] = _jarowinkler_matrice(A, la_blocco, B, lb_blocco)
+
+
+# Potatura delle coppie sotto soglia: limite superiore di Jaro-Winkler calcolato senza abbinare i caratteri.
+# Margine sotto la soglia entro il quale una coppia è comunque calcolata: il limite è un float come la similarità,
+# con il margine un arrotondamento diverso tra le due formule non può scartare una coppia sopra soglia.
+_TOLLERANZA = 1e-9
+
+# Numero di gruppi di caratteri dei conteggi: i caratteri più frequenti hanno un gruppo a testa, gli altri un gruppo comune
+_GRUPPI_CARATTERI = 32
+
+
+def _winkler_limite(jaro: np.ndarray, prefisso: np.ndarray) -> np.ndarray:
+   """Modifica di Winkler applicata a un limite superiore della Jaro: la modifica è crescente nella Jaro,
+      quindi il risultato è un limite superiore della Jaro-Winkler con lo stesso prefisso comune."""
+   return np.where(jaro > 0.7, jaro + prefisso * 0.1 * (1.0 - jaro), jaro)
+
+
+def _conteggi_caratteri(matrice: np.ndarray, lunghezze: np.ndarray, gruppi: np.ndarray) -> np.ndarray:
+   """Per ogni stringa il numero di caratteri di ogni gruppo (matrice n x _GRUPPI_CARATTERI).
+      'gruppi' è la tabella codice del carattere -> gruppo, vedi _limite_jarowinkler()."""
+   n, L = matrice.shape
+   righe, colonne = np.nonzero(np.arange(L) < lunghezze[:, None])
+   indici = righe * _GRUPPI_CARATTERI + gruppi[np.searchsorted(gruppi[:, 0], matrice[righe, colonne]), 1]
+   conteggi = np.bincount(indici, minlength=n * _GRUPPI_CARATTERI).reshape(n, _GRUPPI_CARATTERI)
+   return conteggi.astype(np.uint8 if L < 256 else np.uint16)
+
+
+def _limite_jarowinkler(matrice_b: np.ndarray, lunghezze_b: np.ndarray,
+                        matrice_a: np.ndarray, lunghezze_a: np.ndarray,
+                        cb: np.ndarray, ca: np.ndarray,
+                        soglia: float, chunk_size: int) -> np.ndarray:
+   """Limite superiore della similarità Jaro-Winkler delle coppie (matrice_b[cb], matrice_a[ca]), senza abbinare i caratteri.
+      Senza trasposizioni la Jaro è al massimo (m / la + m / lb + 1) / 3, con m caratteri in comune; per m:
+         1. la lunghezza della stringa più corta (costo trascurabile, su tutte le coppie);
+         2. la somma su ogni carattere del minimo tra le sue occorrenze nelle due stringhe (multiinsieme dei caratteri),
+            solo per le coppie che superano il limite 1: i caratteri sono raggruppati in _GRUPPI_CARATTERI gruppi
+            e un gruppo conta come un carattere, quindi il limite resta valido.
+      Il prefisso comune (massimo 4 caratteri) è quello esatto e la modifica di Winkler è applicata al limite della Jaro.
+      Output:
+         - vettore con il limite di ogni coppia: la similarità esatta non lo supera.
+   """
+   la = lunghezze_b[cb]
+   lb = lunghezze_a[ca]
+   P = min(4, matrice_b.shape[1], matrice_a.shape[1])
+   prefisso_uguale = (matrice_b[cb, :P] == matrice_a[ca, :P]) & (np.arange(P) < np.minimum(la, lb)[:, None])
+   prefisso = np.cumprod(prefisso_uguale, axis=1).sum(axis=1)
+
+   def limite(comuni):
+      with np.errstate(divide="ignore", invalid="ignore"):
+         jaro = np.where(comuni > 0, (comuni / la + comuni / lb + 1.0) / 3, 0.0)
+      return _winkler_limite(jaro, prefisso)
+
+   # 1. Limite sulle lunghezze
+   comuni = np.minimum(la, lb).astype(np.float64)
+   limiti = limite(comuni)
+   restanti = np.flatnonzero(limiti >= soglia - _TOLLERANZA)
+   if len(restanti) == 0:
+      return limiti
+
+   # 2. Limite sui caratteri in comune, con i conteggi dei caratteri di ogni stringa calcolati una volta
+   codici, frequenze = np.unique(np.concatenate([matrice_b[matrice_b >= 0], matrice_a[matrice_a >= 0]]), return_counts=True)
+   gruppo = np.full(len(codici), _GRUPPI_CARATTERI - 1)
+   gruppo[np.argsort(-frequenze, kind="stable")[:_GRUPPI_CARATTERI - 1]] = np.arange(min(len(codici), _GRUPPI_CARATTERI - 1))
+   gruppi = np.column_stack([codici, gruppo])
+   conteggi_b = _conteggi_caratteri(matrice_b, lunghezze_b, gruppi)
+   conteggi_a = _conteggi_caratteri(matrice_a, lunghezze_a, gruppi)
+   for inizio in range(0, len(restanti), chunk_size):
+      blocco = restanti[inizio:inizio + chunk_size]
+      comuni[blocco] = np.minimum(conteggi_b[cb[blocco]], conteggi_a[ca[blocco]]).sum(axis=1)
+   limiti[restanti] = limite(comuni)[restanti]
+   return limiti
+
+
+def _similarita_coppie(uniche_b, uniche_a, cb: np.ndarray, ca: np.ndarray, chunk_size: int, n_jobs: int,
+                       soglia: float = None) -> tuple:
+   """Similarità Jaro-Winkler delle coppie di stringhe distinte (uniche_b[cb], uniche_a[ca]).
+      Con una soglia sono calcolate solo le coppie il cui limite superiore (_limite_jarowinkler) può superarla,
+      le altre hanno come valore il limite, sotto soglia.
+      Output:
+         - vettore delle similarità;
+         - vettore booleano, True per le coppie con la similarità esatta (calcolata).
+   """
+   composti = {}
+   matrice_b, lunghezze_b = codifica_stringhe(uniche_b, composti)
+   matrice_a, lunghezze_a = codifica_stringhe(uniche_a, composti)
+   similarita = np.empty(len(cb))
+   esatte = np.ones(len(cb), dtype=bool)
+   if soglia is not None:
+      limiti = _limite_jarowinkler(matrice_b, lunghezze_b, matrice_a, lunghezze_a, cb, ca, soglia, chunk_size)
+      esatte = limiti >= soglia - _TOLLERANZA
+      similarita[~esatte] = limiti[~esatte]
+      cb, ca = cb[esatte], ca[esatte]
+      if len(cb) == 0:
+         return similarita, esatte
+   la = lunghezze_b[cb]
+   lb = lunghezze_a[ca]
+   alfabeto = np.unique(matrice_a[matrice_a >= 0])
+
+   # Ordinare per lunghezza decrescente, così ogni blocco ha stringhe di lunghezza simile (meno padding)
+   ordine, blocchi = _blocchi_coppie(la, lb, chunk_size)
+   array = {"ordine": ordine, "cb": cb, "ca": ca, "la": la, "lb": lb,
+            "matrice_b": matrice_b, "matrice_a": matrice_a, "lunghezze_a": lunghezze_a, "alfabeto": alfabeto}
+   if numero_processi(n_jobs) > 1 and len(blocchi) > 1:
+      # I blocchi sono indipendenti: le matrici delle stringhe sono messe in memoria condivisa (parallelo.py)
+      # e ogni processo scrive le similarità dei suoi blocchi direttamente nel vettore condiviso del risultato.
+      similarita[esatte] = esegui_in_parallelo(_calcola_blocco, array, {"similarita": (len(cb), np.float64)},
+                                               blocchi, n_jobs)["similarita"]
+   else:
+      array["similarita"] = np.empty(len(cb))
+      for blocco in blocchi:
+         _calcola_blocco(array, *blocco)
+      similarita[esatte] = array["similarita"]
+   return similarita, esatte
+
+
+def _jarowinkler_posizioni(posizioni_b: np.ndarray,
+                           posizioni_a: np.ndarray,
+                           colonna_booking: pd.Series,
+                           colonna_agoda: pd.Series,
+                           chunk_size: int = 20000,
+                           n_jobs: int = 1,
+                           cache: CacheSimilarita = None,
+                           soglia: float = None,
+                           statistiche: dict = None) -> np.ndarray:
+   """Similarità Jaro-Winkler delle coppie date dalle posizioni dei record nelle due colonne (vedi jarowinkler_vettoriale)."""
+   # Codici delle stringhe distinte (-1 per i valori mancanti)
+   codici_b, uniche_b = pd.factorize(colonna_booking)
+   codici_a, uniche_a = pd.factorize(colonna_agoda)
+   codici_b = codici_b[posizioni_b]
+   codici_a = codici_a[posizioni_a]
+
+   risultato = np.full(len(posizioni_b), np.nan)
+   validi = (codici_b >= 0) & (codici_a >= 0)
+   if not validi.any():
+      return risultato
+
+   # Ogni coppia di stringhe distinte è calcolata una sola volta
+   chiavi = codici_b[validi].astype(np.int64) * len(uniche_a) + codici_a[validi]
+   chiavi_uniche, inverso = np.unique(chiavi, return_inverse=True)
+   cb = chiavi_uniche // len(uniche_a)
+   ca = chiavi_uniche % len(uniche_a)
+
+   # Le similarità già presenti nella cache su disco (cache.py) non sono ricalcolate
+   similarita = np.empty(len(chiavi_uniche))
+   potate = np.zeros(len(chiavi_uniche), dtype=bool)
+   da_calcolare = np.arange(len(chiavi_uniche))
+   if cache is not None:
+      chiavi_cache = chiavi_similarita(hash_stringhe(uniche_b)[cb], hash_stringhe(uniche_a)[ca], "jarowinkler")
+      valori, trovate = cache.cerca(chiavi_cache)
+      similarita[trovate] = valori[trovate]
+      da_calcolare = np.flatnonzero(~trovate)
+
+   if len(da_calcolare):
+      similarita[da_calcolare], esatte = _similarita_coppie(uniche_b, uniche_a, cb[da_calcolare], ca[da_calcolare],
+                                                            chunk_size, n_jobs, soglia)
+      potate[da_calcolare] = ~esatte
+      # Nella cache solo le similarità esatte: i limiti delle coppie potate dipendono dalla soglia
+      if cache is not None:
+         cache.salva(chiavi_cache[da_calcolare[esatte]], similarita[da_calcolare[esatte]])
+
+   if statistiche is not None:
+      statistiche["coppie_potate"] = statistiche.get("coppie_potate", 0) + int(potate[inverso].sum())
+   risultato[validi] = similarita[inverso]
+   return risultato
+
+
+def jarowinkler_vettoriale(candidate_links: pd.MultiIndex,
+                           colonna_booking: pd.Series,
+                           colonna_agoda: pd.Series,
+                           chunk_size: int = 20000,
+                           n_jobs: int = 1,
+                           cache: CacheSimilarita = None,
+                           soglia: float = None,
+                           statistiche: dict = None) -> pd.Series:
+   """Funzione che calcola la similarità Jaro-Winkler per tutte le coppie candidate in blocco.
+      Sostituisce recordlinkage.Compare().string(..., method='jarowinkler'), che chiama jellyfish
+      una coppia alla volta, con gli stessi risultati.
+      - Le stringhe sono codificate una sola volta in matrici di interi;
+      - Le coppie di stringhe ripetute sono calcolate una sola volta;
+      - Le coppie sono ordinate per lunghezza e processate a blocchi di 'chunk_size', così la memoria resta limitata;
+      - Con n_jobs > 1 i blocchi sono divisi tra più processi;
+      - Con una cache le coppie di stringhe già calcolate in esecuzioni precedenti sono lette dal disco;
+      - Con una soglia le coppie che non possono superarla sono scartate senza calcolarle (potatura): un limite superiore
+        della similarità, da lunghezze, caratteri in comune e prefisso (_limite_jarowinkler), è calcolato per tutte le coppie
+        e solo quelle con il limite sopra soglia sono confrontate carattere per carattere.
+      Input:
+         - candidate_links, MultiIndex (index booking, index agoda) generato dall'indexer;
+         - colonna_booking, Series di stringhe con l'index di booking (es. 'titolo_booking');
+         - colonna_agoda, Series di stringhe con l'index di agoda (es. 'titolo_agoda');
+         - chunk_size (opzionale), numero di coppie calcolate per blocco;
+         - n_jobs (opzionale), numero di processi tra cui dividere i blocchi (-1 tutti i core), vedi parallelo.py;
+         - cache (opzionale), CacheSimilarita nella quale cercare e salvare le similarità, vedi cache.py;
+         - soglia (opzionale), soglia della potatura: le similarità sopra soglia sono esatte, quelle sotto soglia possono essere
+           il limite superiore della coppia (sempre sotto soglia) invece della similarità;
+         - statistiche (opzionale), dizionario nel quale sommare 'coppie_potate', le coppie candidate non calcolate.
+      Output:
+         - Series con la similarità per ogni coppia, indicizzata da candidate_links (NaN se manca una delle due stringhe).
+   """
+   posizioni_b = colonna_booking.index.get_indexer(candidate_links.get_level_values(0))
+   posizioni_a = colonna_agoda.index.get_indexer(candidate_links.get_level_values(1))
+   return pd.Series(_jarowinkler_posizioni(posizioni_b, posizioni_a, colonna_booking, colonna_agoda, chunk_size, n_jobs, cache,
+                                           soglia, statistiche),
+                    index=candidate_links)
+
+#%%%
+
+
+#%%% Confronto su più campi
+
+METODI = ("jarowinkler", "esatto", "gauss", "lineare")
+
+
+def leggi_confronto(confronto: tuple) -> tuple:
+   """Funzione che completa la configurazione di un confronto:
+      (colonna booking, colonna agoda[, metodo[, opzioni]]) -> (colonna booking, colonna agoda, metodo, opzioni).
+      Senza metodo il confronto è 'jarowinkler', come nei dizionari dei confronti usati finora."""
+   colonna_booking, colonna_agoda, *resto = confronto
+   metodo = resto[0] if resto else "jarowinkler"
+   opzioni = dict(resto[1]) if len(resto) > 1 else {}
+   if metodo not in METODI:
+      raise ValueError(f"Metodo di confronto '{metodo}' non valido, valori possibili: {list(METODI)}")
+   if metodo in ("gauss", "lineare") and opzioni.get("scala", 0) <= 0:
+      raise ValueError(f"Il confronto '{metodo}' richiede l'opzione 'scala' > 0.")
+   return colonna_booking, colonna_agoda, metodo, opzioni
+
+
+def valori_numerici(colonna: pd.Series) -> np.ndarray:
+   """Funzione che restituisce i valori di una colonna come array float64: anche stringhe con la virgola decimale
+      (es. '8,1' -> 8.1) e categorie, convertite una volta per categoria; NaN per i valori non numerici."""
+   if isinstance(colonna.dtype, pd.CategoricalDtype):
+      categorie = valori_numerici(pd.Series(colonna.cat.categories))
+      return np.append(categorie, np.nan)[colonna.cat.codes.to_numpy()]
+   if pd.api.types.is_numeric_dtype(colonna.dtype):
+      return colonna.to_numpy(dtype=np.float64, na_value=np.nan)
+   testo = colonna.astype(object).str.replace(",", ".", regex=False)
+   return pd.to_numeric(testo, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def similarita_numerica(x: np.ndarray,
+                        y: np.ndarray,
+                        metodo: str,
+                        scala: float,
+                        offset: float = 0.0,
+                        relativa: bool = False) -> np.ndarray:
+   """Funzione che calcola la similarità tra due array di numeri, con le formule di recordlinkage.Compare().numeric():
+         - 'gauss', 2^(-((d - offset) / scala)^2): vale 0.5 quando la differenza supera l'offset di 'scala';
+         - 'lineare', 1 - (d - offset) / (2 scala): vale 0.5 a 'scala' oltre l'offset e 0 da 2 'scala' in poi;
+      dove d è la differenza assoluta, 0 fino all'offset.
+      Input:
+         - x, y, array float della stessa lunghezza (NaN per i valori mancanti);
+         - metodo, 'gauss' oppure 'lineare';
+         - scala, offset (opzionale), parametri della similarità;
+         - relativa (opzionale), se True d è la differenza relativa |x - y| / max(|x|, |y|) (es. per i prezzi).
+      Output:
+         - array di similarità tra 0 e 1 (NaN se manca uno dei due valori).
+   """
+   d = np.abs(x - y)
+   if relativa:
+      massimo = np.maximum(np.abs(x), np.abs(y))
+      d = np.divide(d, massimo, out=np.where(massimo == 0, 0.0, d), where=massimo > 0)
+   d = np.maximum(d - offset, 0)
+   if metodo == "gauss":
+      return np.exp2(-(d / scala) ** 2)
+   if metodo == "lineare":
+      return 1 - np.minimum(d, 2 * scala) / (2 * scala)
+   raise ValueError("'metodo' deve essere 'gauss' oppure 'lineare'.")
+
+
+def _uguaglianza_posizioni(posizioni_b: np.ndarray,
+                           posizioni_a: np.ndarray,
+                           colonna_booking: pd.Series,
+                           colonna_agoda: pd.Series) -> np.ndarray:
+   """1.0 se i valori delle coppie sono uguali, 0.0 se diversi, NaN se ne manca uno.
+      Si confrontano i codici dei valori distinti, senza confrontare le stringhe coppia per coppia."""
+   codici_b, uniche_b = pd.factorize(colonna_booking)
+   codici_a, uniche_a = pd.factorize(colonna_agoda)
+   # Codice booking di ogni valore distinto di agoda (-1 se il valore non è in booking, -2 se manca)
+   codice_comune = np.append(pd.Index(uniche_b).get_indexer(uniche_a), -2)
+   codici_b = codici_b[posizioni_b]
+   codici_a = codice_comune[codici_a[posizioni_a]]
+   risultato = (codici_b == codici_a).astype(np.float64)
+   risultato[(codici_b < 0) | (codici_a == -2)] = np.nan
+   return risultato
+
+
+def confronta_campi(candidate_links: pd.MultiIndex,
+                    df_booking: pd.DataFrame,
+                    df_agoda: pd.DataFrame,
+                    confronti: dict,
+                    chunk_size: int = 20000,
+                    n_jobs: int = 1,
+                    cache: CacheSimilarita = None,
+                    soglie: dict = None,
+                    statistiche: dict = None) -> pd.DataFrame:
+   """Funzione che calcola il vettore di confronto di ogni coppia candidata su più campi in un solo passaggio.
+      Sostituisce una chiamata di recordlinkage.Compare() per campo (string, exact, numeric): le posizioni delle coppie
+      nei due dataframe sono calcolate una sola volta e ogni colonna è letta come array numpy e "raccolta" sulle coppie
+      (codici per le stringhe, numeri per i campi numerici), senza passare dal MultiIndex per ogni campo.
+      Input:
+         - candidate_links, MultiIndex (index booking, index agoda) generato dall'indexer;
+         - df_booking, df_agoda, dataframe (o proiezioni) con le colonne dei confronti;
+         - confronti, dizionario nome della similarità -> (colonna booking, colonna agoda[, metodo[, opzioni]]), metodo tra:
+            - 'jarowinkler' (default), similarità Jaro-Winkler delle stringhe, vedi jarowinkler_vettoriale();
+            - 'esatto', 1 se i valori sono uguali, 0 altrimenti (es. città);
+            - 'gauss', 'lineare', similarità numerica, opzioni 'scala', 'offset', 'relativa', vedi similarita_numerica();
+         - chunk_size, n_jobs, cache (opzionali), vedi jarowinkler_vettoriale() (usati solo dai confronti 'jarowinkler');
+         - soglie (opzionale), dizionario nome della similarità -> soglia della potatura, vedi jarowinkler_vettoriale()
+           (solo confronti 'jarowinkler');
+         - statistiche (opzionale), dizionario nel quale sommare 'coppie_potate', vedi jarowinkler_vettoriale().
+      Output:
+         - dataframe con una colonna per confronto e una riga per coppia candidata (NaN se manca uno dei due valori).
+   """
+   posizioni_b = df_booking.index.get_indexer(candidate_links.get_level_values(0))
+   posizioni_a = df_agoda.index.get_indexer(candidate_links.get_level_values(1))
+
+   vettore = {}
+   for nome, confronto in confronti.items():
+      colonna_booking, colonna_agoda, metodo, opzioni = leggi_confronto(confronto)
+      if metodo == "jarowinkler":
+         vettore[nome] = _jarowinkler_posizioni(posizioni_b, posizioni_a, df_booking[colonna_booking], df_agoda[colonna_agoda],
+                                                chunk_size, n_jobs, cache, (soglie or {}).get(nome), statistiche)
+      elif metodo == "esatto":
+         vettore[nome] = _uguaglianza_posizioni(posizioni_b, posizioni_a, df_booking[colonna_booking], df_agoda[colonna_agoda])
+      else:
+         vettore[nome] = similarita_numerica(valori_numerici(df_booking[colonna_booking])[posizioni_b],
+                                             valori_numerici(df_agoda[colonna_agoda])[posizioni_a], metodo, **opzioni)
+   return pd.DataFrame(vettore, index=candidate_links)
+
+#%%%
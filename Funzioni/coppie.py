@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+
+#%%% Chiavi intere delle coppie
+
+# Una coppia (index booking, index agoda) è rappresentata da un solo int64: index booking nei 32 bit alti, index agoda nei 32 bit bassi.
+# Join, rimozione dei duplicati e confronti tra insiemi di match diventano operazioni tra interi, senza creare stringhe 'b#a'.
+_BIT = 32
+_MASCHERA = (1 << _BIT) - 1
+
+
+def codifica_coppie(index_booking, index_agoda) -> np.ndarray:
+   """Funzione che trasforma le coppie (index booking, index agoda) in chiavi int64: index_booking << 32 | index_agoda.
+      Input:
+         - index_booking, index_agoda, array/Series di interi non negativi minori di 2^32.
+      Output:
+         - array int64 con una chiave per coppia.
+   """
+   booking = np.asarray(index_booking)
+   agoda = np.asarray(index_agoda)
+   if booking.dtype.kind not in "iu" or agoda.dtype.kind not in "iu":
+      raise TypeError("Gli index di booking e agoda devono essere interi per essere codificati in una chiave.")
+   if len(booking) and (booking.min() < 0 or booking.max() > _MASCHERA or agoda.min() < 0 or agoda.max() > _MASCHERA):
+      raise ValueError("Gli index di booking e agoda devono essere compresi tra 0 e 2^32 - 1.")
+   return (booking.astype(np.int64) << _BIT) | agoda.astype(np.int64)
+
+
+def decodifica_coppie(chiavi) -> tuple:
+   """Funzione inversa di codifica_coppie.
+      Output:
+         - array index booking, array index agoda.
+   """
+   chiavi = np.asarray(chiavi, dtype=np.int64)
+   return chiavi >> _BIT, chiavi & _MASCHERA
+
+
+def chiavi_coppie(df: pd.DataFrame,
+                  colonna_booking: str = "index_booking",
+                  colonna_agoda: str = "index_agoda") -> np.ndarray:
+   """Funzione che restituisce le chiavi int64 delle coppie di un dataframe di match (es. output di record_linkage_title
+      o Results/matches_*.csv), da usare al posto della colonna 'pair' per confronti tra insiemi di match.
+   """
+   return codifica_coppie(df[colonna_booking].to_numpy(), df[colonna_agoda].to_numpy())
+
+
+def formatta_coppie(index_booking, index_agoda) -> pd.Series:
+   """Funzione che crea la colonna leggibile 'pair' ('index_booking#index_agoda'), da usare solo al momento dell'output."""
+   return pd.Series(index_booking).astype(str).to_numpy() + "#" + pd.Series(index_agoda).astype(str).to_numpy()
+
+
+def differenza_match(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
+   """Funzione che restituisce le righe di df1 la cui coppia non è presente in df2 (differenza tra insiemi di match).
+      Sostituisce set(df1.pair).difference(set(df2.pair)) con un confronto tra chiavi intere.
+   """
+   return df1[~np.isin(chiavi_coppie(df1), chiavi_coppie(df2))]
+
+
+def valuta_match(match: pd.DataFrame, veri: pd.MultiIndex) -> dict:
+   """Funzione che misura la qualità dei match rispetto alle coppie vere (es. quelle di sintetico.genera_dataset).
+      Input:
+         - match, dataframe di match con 'index_booking' e 'index_agoda';
+         - veri, MultiIndex (index booking, index agoda) delle coppie vere.
+      Output:
+         - dizionario con match, coppie vere, veri positivi, precision, recall e f1.
+   """
+   chiavi_match = np.unique(chiavi_coppie(match))
+   chiavi_vere = np.unique(codifica_coppie(veri.get_level_values(0), veri.get_level_values(1)))
+   veri_positivi = int(np.isin(chiavi_match, chiavi_vere, assume_unique=True).sum())
+   precision = veri_positivi / len(chiavi_match) if len(chiavi_match) else 1.0
+   recall = veri_positivi / len(chiavi_vere) if len(chiavi_vere) else 1.0
+   f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+   return {"match": len(chiavi_match), "coppie_vere": len(chiavi_vere), "veri_positivi": veri_positivi,
+           "precision": precision, "recall": recall, "f1": f1}
+
+#%%%
@@ -0,0 +1,214 @@
+"""Salvataggio dei dati in Parquet al posto dei csv (Data Lake, Data Product, Results).
+   Ogni tabella è un dataset Parquet (una cartella 'nome.parquet') partizionato per città e date del soggiorno,
+   con i tipi già convertiti (voti '8,1' -> 8.1, date datetime64) e le colonne con pochi valori diversi
+   salvate come categorie (dizionario). In lettura si possono scegliere le colonne e filtrare le partizioni,
+   es. solo 'titolo_processed' e 'città' di Roma, senza leggere il resto del file.
+   Uso:
+      python "Funzioni/dataset.py"   # converte in Parquet i csv di Data Lake, Data Product e Results
+"""
+import argparse
+import shutil
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+
+
+#%%% Tipi delle colonne
+
+# Nome della colonna con l'indice del dataframe (l'indice è quello usato dal record linkage per le coppie)
+INDICE = "indice"
+
+# Colonne salvate come categoria, anche con suffisso _booking/_agoda (file dei match in Results)
+CATEGORICHE = ("città", "zona", "zona_processed", "recensione_voto_parola", "date", "permanenza",
+               "inizio_permanenza", "fine_permanenza")
+
+# Numeri salvati come stringhe con la virgola decimale
+NUMERI_CON_VIRGOLA = ("recensione_voto_numerico",)
+
+DATE = ("inizio_permanenza_datetime", "fine_permanenza_datetime")
+
+# Colonne usate per le partizioni, nell'ordine delle cartelle (solo quelle presenti nel dataframe)
+PARTIZIONI = ("città", "inizio_permanenza_datetime", "fine_permanenza_datetime")
+
+LIVELLI = {"data_lake": "path_data_lake", "data_product": "path_data_product", "results": "path_results"}
+
+
+def _nome_base(colonna: str) -> str:
+   """Nome della colonna senza il suffisso della piattaforma (es. 'città_booking' -> 'città')."""
+   for suffisso in ("_booking", "_agoda"):
+      if colonna.endswith(suffisso):
+         return colonna[:-len(suffisso)]
+   return colonna
+
+
+def tipizza(dataframe: pd.DataFrame) -> pd.DataFrame:
+   """Funzione che converte le colonne di un dataframe letto da csv nei tipi salvati nel Parquet:
+      - NUMERI_CON_VIRGOLA in float ('8,1' -> 8.1), solo se tutti i valori sono numeri (altrimenti restano stringhe);
+      - DATE in datetime64;
+      - CATEGORICHE in category.
+      Output:
+         - nuovo dataframe (quello in input non viene modificato).
+   """
+   dataframe = dataframe.copy()
+   for colonna in dataframe.columns:
+      base = _nome_base(colonna)
+      if base in NUMERI_CON_VIRGOLA and dataframe[colonna].dtype == object:
+         numeri = pd.to_numeric(dataframe[colonna].str.replace(",", ".", regex=False), errors="coerce")
+         if numeri.notna().sum() == dataframe[colonna].notna().sum():
+            dataframe[colonna] = numeri
+      elif base in DATE:
+         dataframe[colonna] = pd.to_datetime(dataframe[colonna])
+      elif base in CATEGORICHE:
+         dataframe[colonna] = dataframe[colonna].astype("category")
+   return dataframe
+
+#%%%
+
+
+#%%% Scrittura e lettura
+
+def path_dataset(nome: str, livello: str = "data_product", paths: dict = None) -> Path:
+   """Funzione che restituisce il percorso di un dataset a partire dai percorsi del file config.json.
+      Input:
+         - nome, nome della tabella (es. 'booking', 'matches_titolo_095');
+         - livello (opzionale), 'data_lake', 'data_product' o 'results';
+         - paths (opzionale), output di percorsi.carica_percorsi().
+   """
+   if livello not in LIVELLI:
+      raise ValueError(f"Livello '{livello}' non valido, valori possibili: {list(LIVELLI)}")
+   paths = paths or carica_percorsi()
+   return paths[LIVELLI[livello]] / f"{nome}.parquet"
+
+
+def scrivi_dataset(dataframe: pd.DataFrame,
+                   path,
+                   partizioni: tuple = None,
+                   modalita: str = "sovrascrivi",
+                   compressione: str = "zstd") -> Path:
+   """Funzione che salva un dataframe come dataset Parquet partizionato (una sottocartella per valore di partizione).
+      Input:
+         - dataframe, già tipizzato o letto da csv (viene passato a tipizza());
+         - path, cartella del dataset (vedi path_dataset());
+         - partizioni (opzionale), colonne delle partizioni, di default quelle di PARTIZIONI presenti nel dataframe;
+         - modalita (opzionale):
+            - 'sovrascrivi', il dataset viene sostituito;
+            - 'aggiorna', sono sostituite solo le partizioni presenti nel dataframe (es. una nuova città o nuove date),
+              le altre restano come sono;
+         - compressione (opzionale), codec Parquet.
+      Output:
+         - percorso del dataset.
+   """
+   if modalita not in ("sovrascrivi", "aggiorna"):
+      raise ValueError(f"Modalità '{modalita}' non valida, valori possibili: ['sovrascrivi', 'aggiorna']")
+   path = Path(path)
+   if partizioni is None:
+      partizioni = [colonna for colonna in PARTIZIONI if colonna in dataframe.columns]
+   partizioni = list(partizioni)
+
+   dataframe = tipizza(dataframe)
+   # Le partizioni cambiano l'ordine delle righe: se l'indice è crescente l'ordine viene ripristinato in lettura
+   ordinato = dataframe.index.is_monotonic_increasing and dataframe.index.is_unique
+   dataframe.index = dataframe.index.rename(INDICE)
+   dataframe = dataframe.reset_index()
+   # Le partizioni sono nomi di cartelle: le date diventano 'AAAA-MM-GG' e sono riconvertite in lettura
+   for colonna in partizioni:
+      if pd.api.types.is_datetime64_any_dtype(dataframe[colonna]):
+         dataframe[colonna] = dataframe[colonna].dt.strftime("%Y-%m-%d")
+   tabella = pa.Table.from_pandas(dataframe, preserve_index=False)
+   tabella = tabella.replace_schema_metadata({**tabella.schema.metadata, b"indice_ordinato": str(int(ordinato)).encode()})
+
+   if modalita == "sovrascrivi" and path.exists():
+      shutil.rmtree(path)
+   pq.write_to_dataset(tabella, path, partition_cols=partizioni or None, compression=compressione,
+                       existing_data_behavior="delete_matching")
+   return path
+
+
+def leggi_dataset(path, colonne: list = None, filtri: list = None, stringhe_arrow: bool = False) -> pd.DataFrame:
+   """Funzione che legge un dataset Parquet scritto da scrivi_dataset().
+      Input:
+         - path, cartella del dataset;
+         - colonne (opzionale), colonne da leggere (l'indice è letto sempre), di default tutte;
+         - filtri (opzionale), filtri di pyarrow, es. [('città', '==', 'roma')]: sulle colonne di partizione
+           sono lette solo le cartelle che li soddisfano;
+         - stringhe_arrow (opzionale), se True le colonne di testo restano nella memoria di pyarrow (dtype 'string[pyarrow]')
+           invece di diventare oggetti str di python: meno della metà della memoria, ma tipo diverso da quello dei csv.
+      Output:
+         - dataframe con lo stesso indice del dataframe salvato; le righe sono nell'ordine di scrittura se l'indice
+           era crescente o se il dataset non è partizionato, altrimenti raggruppate per partizione.
+   """
+   if colonne is not None:
+      colonne = [INDICE] + [colonna for colonna in colonne if colonna != INDICE]
+   tabella = pq.read_table(path, columns=colonne, filters=filtri)
+   ordinato = (tabella.schema.metadata or {}).get(b"indice_ordinato") == b"1"
+   # Le partizioni con valore mancante hanno un dizionario con null, che pyarrow non sa unire tra i file:
+   # queste colonne sono lette come stringhe e ritrasformate in categorie da pandas
+   for i, campo in enumerate(tabella.schema):
+      if pa.types.is_dictionary(campo.type) and any(pezzo.dictionary.null_count for pezzo in tabella.column(i).chunks):
+         tabella = tabella.set_column(i, campo.name, tabella.column(i).cast(campo.type.value_type))
+   tipi = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+   dataframe = tabella.to_pandas(self_destruct=True, split_blocks=True, types_mapper=tipi.get if stringhe_arrow else None)
+   del tabella
+
+   for colonna in dataframe.columns:
+      base = _nome_base(colonna)
+      # Le date delle partizioni sono lette come stringhe
+      if base in DATE and not pd.api.types.is_datetime64_any_dtype(dataframe[colonna]):
+         valori = dataframe[colonna].astype("category")
+         date = pd.to_datetime(valori.cat.categories).take(valori.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT)
+         dataframe[colonna] = pd.Series(date, index=dataframe.index)
+      elif base in CATEGORICHE and not isinstance(dataframe[colonna].dtype, pd.CategoricalDtype):
+         dataframe[colonna] = dataframe[colonna].astype("category")
+
+   dataframe = dataframe.set_index(INDICE)
+   if ordinato and dataframe.index.is_unique:
+      dataframe = dataframe.sort_index()
+   dataframe.index.name = None
+   if colonne is None:
+      colonne_salvate = pq.read_schema(next(Path(path).rglob("*.parquet"))).pandas_metadata
+      ordine = [c["name"] for c in colonne_salvate["columns"] if c["name"] in dataframe.columns] if colonne_salvate else []
+      dataframe = dataframe[ordine + [c for c in dataframe.columns if c not in ordine]]
+   else:
+      dataframe = dataframe[colonne[1:]]
+   return dataframe
+
+
+def converti_csv(path_csv, path=None, index_col=0, **kwargs) -> Path:
+   """Funzione che converte un csv (Data Lake, Data Product o Results) in un dataset Parquet nella stessa cartella.
+      Gli altri argomenti sono passati a scrivi_dataset()."""
+   path_csv = Path(path_csv)
+   dataframe = pd.read_csv(path_csv, index_col=index_col)
+   return scrivi_dataset(dataframe, path or path_csv.with_suffix(".parquet"), **kwargs)
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--livelli", nargs="+", choices=list(LIVELLI), default=list(LIVELLI))
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   for livello in args.livelli:
+      for path_csv in sorted(paths[LIVELLI[livello]].glob("*.csv")):
+         if livello == "data_lake":
+            # booking_Roma.csv -> dataset 'booking', partizione città=Roma (nei csv del Data Lake la città non c'è)
+            piattaforma, città = path_csv.stem.split("_", 1)
+            dataframe = pd.read_csv(path_csv, index_col=0).assign(città=città)
+            path = scrivi_dataset(dataframe, path_dataset(piattaforma, livello, paths), partizioni=("città", "date"),
+                                  modalita="aggiorna")
+         else:
+            # I match con città sono salvati senza indice (index=False) nel notebook
+            index_col = None if path_csv.name == "matches_titolo_095_città_08.csv" else 0
+            path = converti_csv(path_csv, index_col=index_col, partizioni=() if livello == "results" else None)
+         print(f"{path_csv.name} -> {path.relative_to(paths['path_progetto'])}")
+
+
+if __name__ == "__main__":
+   main()
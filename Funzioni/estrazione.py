@@ -0,0 +1,352 @@
+"""Estrazione delle informazioni dagli html salvati dagli scraper (stesse informazioni dei notebook 02)_Get_Info).
+   Gli html sono letti con il parser di lxml e le proprietà sono estratte con selettori XPath compilati una sola volta;
+   ogni pagina è elaborata da un processo diverso e le righe di ogni pagina sono aggiunte, colonna per colonna,
+   al dataframe finale che viene salvato nel Data Lake.
+   Uso:
+      python "Funzioni/estrazione.py" booking --città Roma
+      python "Funzioni/estrazione.py" agoda --città Roma --lavoro 2025-08-01,2025-08-02
+      python "Funzioni/estrazione.py" agoda --città Roma [--html pagina1.txt pagina2.txt] [--n-jobs -1] [--formato parquet]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from lxml import etree, html as lxml_html
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from parallelo import numero_processi
+from percorsi import carica_percorsi
+
+
+#%%% Selettori
+
+# Come find() di BeautifulSoup: il primo nodo discendente (in ordine di documento) che soddisfa il selettore
+_BOOKING = {
+   "proprieta": etree.XPath("//div[@data-testid='property-card']"),
+   "titolo": etree.XPath(".//div[@data-testid='title']"),
+   "recensioni": etree.XPath(".//div[@data-testid='review-score']"),
+   "voto_numerico": etree.XPath(".//div[@aria-hidden='true']"),
+   "info_recensioni": etree.XPath(".//div[@aria-hidden='false']"),
+   "costi": etree.XPath(".//div[@data-testid='availability-rate-wrapper']"),
+   "permanenza": etree.XPath(".//div[@data-testid='price-for-x-nights']"),
+   "prezzo": etree.XPath(".//span[@data-testid='price-and-discounted-price']"),
+   "distanza_centro": etree.XPath(".//span[@data-testid='distance']"),
+   "indirizzo": etree.XPath(".//span[@data-testid='address']"),
+   "stelle": etree.XPath("count((.//div[@data-testid='rating-stars'])[1]//div)"),
+   "ha_stelle": etree.XPath("boolean(.//div[@data-testid='rating-stars'])"),
+   "valutazione": etree.XPath("count((.//div[@data-testid='rating-squares'])[1]//div)"),
+   "ha_valutazione": etree.XPath("boolean(.//div[@data-testid='rating-squares'])"),
+   "descrizione": etree.XPath(".//div[@data-testid='recommended-units']"),
+   "descrizione_camera": etree.XPath(".//h4"),
+   "configurazione_camera": etree.XPath(".//div[@data-testid='property-card-unit-configuration']"),
+}
+
+_AGODA = {
+   "proprieta": etree.XPath("//div[@data-element-name='PropertyCardBaseJacket']"),
+   "header": etree.XPath(".//header[@data-element-name='property-info-header']"),
+   "titolo": etree.XPath(".//h3[@data-selenium='hotel-name']"),
+   "stelle": etree.XPath("count((.//div[@data-testid='rating-container'])[1]//svg[@opacity='1'])"),
+   "ha_stelle": etree.XPath("boolean(.//div[@data-testid='rating-container'])"),
+   "indirizzo": etree.XPath(".//div[@data-selenium='area-city']"),
+   "informazioni": etree.XPath(".//div[@data-element-name='property-card-pricing-info']"),
+   "recensioni": etree.XPath(".//div[@class='Box-sc-kv6pi1-0 hRUYUu PropertyCard__PricingHeadliner']//p"),
+   "span": etree.XPath(".//span"),
+   "prezzo": etree.XPath(".//div[@data-element-name='property-card-price']//div[@data-element-name='final-price']"),
+}
+
+COLONNE_BOOKING = ["titolo", "recensione_voto_numerico", "recensione_voto_parola", "numero_recensioni", "date",
+                   "permanenza", "prezzo", "distanza_centro", "indirizzo", "stelle", "valutazione_booking",
+                   "descrizione_camera", "configurazione_camera", "descrizione_unprocessed"]
+
+COLONNE_AGODA = ["titolo", "recensione_voto_numerico", "recensione_voto_parola", "numero_recensioni", "date",
+                 "permanenza", "prezzo", "indirizzo", "valutazione"]
+
+NOVITA_BOOKING = "Novità su booking"
+
+
+def _testo(nodo) -> str:
+   """Testo di un nodo e di tutti i suoi discendenti, come l'attributo .text di BeautifulSoup."""
+   return "".join(nodo.itertext())
+
+
+def _primo(selettore, nodo):
+   """Primo risultato del selettore (o None), come find() di BeautifulSoup."""
+   risultati = selettore(nodo)
+   return risultati[0] if risultati else None
+
+
+def _testo_primo(selettore, nodo):
+   """Testo del primo risultato del selettore, None se non ci sono risultati."""
+   trovato = _primo(selettore, nodo)
+   return None if trovato is None else _testo(trovato)
+
+
+def _figli(nodo) -> list:
+   """Testo dei figli diretti di un nodo compresi i pezzi di testo tra un tag e l'altro,
+      come iterando su un tag di BeautifulSoup (for div in tag)."""
+   testi = [nodo.text] if nodo.text else []
+   for figlio in nodo:
+      if not isinstance(figlio, etree._Comment):
+         testi.append(_testo(figlio))
+      if figlio.tail:
+         testi.append(figlio.tail)
+   return testi
+
+
+def leggi_html(path) -> etree._Element:
+   """Funzione che legge un html salvato dallo scraper e restituisce la radice del documento (parser di lxml)."""
+   with open(path, "rb") as f:
+      return lxml_html.document_fromstring(f.read(), parser=lxml_html.HTMLParser(encoding="utf-8"))
+
+#%%%
+
+
+#%%% Estrazione di una pagina
+
+def estrai_booking(radice, date: str = "1 agosto - 2 agosto") -> dict:
+   """Funzione che estrae le informazioni di ogni proprietà di una pagina di booking (html_final.txt).
+      Riproduce il ciclo del notebook 'Scraping-from-booking/02)_Get_Info.ipynb', comprese le sue particolarità:
+      il voto in parole e il numero di recensioni, se mancano, sono quelli della proprietà precedente.
+      Input:
+         - radice, documento restituito da leggi_html();
+         - date (opzionale), date del soggiorno (nella pagina non ci sono).
+      Output:
+         - dizionario colonna -> lista di valori, con le colonne di COLONNE_BOOKING.
+   """
+   s = _BOOKING
+   colonne = {colonna: [] for colonna in COLONNE_BOOKING}
+   voto_parola = numero_recensioni = None
+   for post in s["proprieta"](radice):
+      review = _primo(s["recensioni"], post)
+      if review is not None:
+         voto_numerico = _testo_primo(s["voto_numerico"], review)
+         for testo in _figli(_primo(s["info_recensioni"], review)):
+            if ("recensioni" in testo.lower()) or ("recensione" in testo.lower()):
+               numero_recensioni = testo
+            else:
+               voto_parola = testo
+      else:
+         voto_numerico = voto_parola = numero_recensioni = NOVITA_BOOKING
+
+      costi = _primo(s["costi"], post)
+      descrizione = _primo(s["descrizione"], post)
+      configurazione = _testo_primo(s["configurazione_camera"], descrizione)
+
+      colonne["titolo"].append(_testo_primo(s["titolo"], post))
+      colonne["recensione_voto_numerico"].append(voto_numerico)
+      colonne["recensione_voto_parola"].append(voto_parola)
+      colonne["numero_recensioni"].append(numero_recensioni)
+      colonne["date"].append(date)
+      colonne["permanenza"].append(_testo_primo(s["permanenza"], costi))
+      colonne["prezzo"].append(_testo_primo(s["prezzo"], costi))
+      colonne["distanza_centro"].append(_testo_primo(s["distanza_centro"], post))
+      colonne["indirizzo"].append(_testo_primo(s["indirizzo"], post))
+      colonne["stelle"].append(int(s["stelle"](post)) if s["ha_stelle"](post) else np.nan)
+      colonne["valutazione_booking"].append(int(s["valutazione"](post)) if s["ha_valutazione"](post) else np.nan)
+      colonne["descrizione_camera"].append(_testo_primo(s["descrizione_camera"], descrizione))
+      colonne["configurazione_camera"].append("Configurazione camera non disponibile" if configurazione is None else configurazione)
+      colonne["descrizione_unprocessed"].append(_testo(descrizione))
+   return colonne
+
+
+def estrai_agoda(radice, date: str = "1 agosto - 2 agosto", permanenza: str = "1 notte, 2 adulti") -> dict:
+   """Funzione che estrae le informazioni di ogni proprietà di una pagina di agoda (html_final_pagina{i}.txt).
+      Riproduce il ciclo del notebook 'Scraping-from-Agoda/02)_Get_Info.ipynb': le proprietà senza titolo sono scartate.
+      Nel notebook i voti e il numero di recensioni mancanti sono quelli della proprietà precedente (anche della pagina
+      precedente): qui restano None, il riporto è fatto da costruisci_dataframe() dopo aver unito le pagine.
+      Input:
+         - radice, documento restituito da leggi_html();
+         - date, permanenza (opzionali), valori fissi delle colonne 'date' e 'permanenza'.
+      Output:
+         - dizionario colonna -> lista di valori, con le colonne di COLONNE_AGODA.
+   """
+   s = _AGODA
+   colonne = {colonna: [] for colonna in COLONNE_AGODA}
+   for post in s["proprieta"](radice):
+      header = _primo(s["header"], post)
+      titolo = None if header is None else _testo_primo(s["titolo"], header)
+      if titolo is None:
+         continue
+
+      voto_numerico = voto_parola = numero_recensioni = None
+      informazioni = _primo(s["informazioni"], post)
+      for p in s["recensioni"](informazioni):
+         spans = s["span"](p)
+         if len(spans) > 0:
+            for span in spans:
+               if "," in _testo(span):
+                  voto_numerico = _testo(span)
+               else:
+                  voto_parola = _testo(span)
+         else:
+            numero_recensioni = _testo(p)
+
+      colonne["titolo"].append(titolo)
+      colonne["recensione_voto_numerico"].append(voto_numerico)
+      colonne["recensione_voto_parola"].append(voto_parola)
+      colonne["numero_recensioni"].append(numero_recensioni)
+      colonne["date"].append(date)
+      colonne["permanenza"].append(permanenza)
+      colonne["prezzo"].append(_testo_primo(s["prezzo"], informazioni))
+      colonne["indirizzo"].append(_testo_primo(s["indirizzo"], header).replace("- Guarda sulla mappa", ""))
+      colonne["valutazione"].append(int(s["stelle"](header)) if s["ha_stelle"](header) else np.nan)
+   return colonne
+
+
+_ESTRATTORI = {"booking": estrai_booking, "agoda": estrai_agoda}
+
+_COLONNE = {"booking": COLONNE_BOOKING, "agoda": COLONNE_AGODA}
+
+
+def estrai_pagina(piattaforma: str, path, **valori_fissi) -> dict:
+   """Funzione che legge un html ed estrae le proprietà (eseguita dai processi del pool)."""
+   return _ESTRATTORI[piattaforma](leggi_html(path), **valori_fissi)
+
+#%%%
+
+
+#%%% Estrazione di più pagine
+
+def ordina_pagine(paths: list) -> list:
+   """Ordina i file html per numero di pagina (html_final_pagina10.txt dopo html_final_pagina9.txt)."""
+   return sorted(paths, key=lambda p: [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", Path(p).name)])
+
+
+def html_lavoro(cartella, piattaforma: str, città: str, lavoro: str = None) -> tuple:
+   """Funzione che trova gli html da elaborare nella cartella html di uno scraper.
+      scraping.py salva ogni lavoro in una sottocartella '<piattaforma>_<città>_<check-in>_<check-out>' (vedi scraping.nome_lavoro),
+      i notebook 01)_Get_HTML direttamente nella cartella.
+      Input:
+         - cartella, cartella html dello scraper;
+         - piattaforma, città, del lavoro;
+         - lavoro (opzionale), 'check-in,check-out' (AAAA-MM-GG) del lavoro, di default l'ultimo lavoro completato
+           (stato.json) della città; se la città non ha lavori gli html_final*.txt della cartella.
+      Output:
+         - lista degli html nell'ordine delle pagine;
+         - (check-in, check-out) del lavoro, None per gli html dei notebook.
+   """
+   cartella = Path(cartella)
+   prefisso = f"{piattaforma}_{città.replace(' ', '-')}_"
+   if lavoro is not None:
+      date = tuple(parte.strip() for parte in lavoro.split(","))
+      sottocartella = cartella / (prefisso + "_".join(date))
+      if not sottocartella.is_dir():
+         raise FileNotFoundError(f"Nessun lavoro di scraping in {sottocartella}.")
+      return ordina_pagine(sottocartella.glob("html_final*.txt")), date
+
+   completati = []
+   for sottocartella in cartella.glob(prefisso + "*"):
+      stato = sottocartella / "stato.json"
+      if stato.exists() and json.loads(stato.read_text(encoding="utf-8"))["completato"]:
+         completati.append((stato.stat().st_mtime, sottocartella))
+   if completati:
+      sottocartella = max(completati)[1]
+      return ordina_pagine(sottocartella.glob("html_final*.txt")), tuple(sottocartella.name[len(prefisso):].split("_"))
+   return ordina_pagine(cartella.glob("html_final*.txt")), None
+
+
+def costruisci_dataframe(piattaforma: str, pagine) -> pd.DataFrame:
+   """Funzione che unisce le colonne estratte dalle pagine (nell'ordine delle pagine) in un unico dataframe.
+      Per agoda i voti e il numero di recensioni mancanti sono riportati dalla proprietà precedente, come nel notebook.
+      Input:
+         - piattaforma, 'booking' o 'agoda';
+         - pagine, iterabile di dizionari colonna -> lista di valori (output di estrai_booking/estrai_agoda).
+      Output:
+         - dataframe con una riga per proprietà, indice 0..n-1.
+   """
+   colonne = {colonna: [] for colonna in _COLONNE[piattaforma]}
+   for pagina in pagine:
+      for colonna, valori in pagina.items():
+         colonne[colonna].extend(valori)
+
+   dataframe = pd.DataFrame(colonne)
+   if piattaforma == "agoda":
+      recensioni = ["recensione_voto_numerico", "recensione_voto_parola", "numero_recensioni"]
+      dataframe[recensioni] = dataframe[recensioni].ffill()
+   return dataframe
+
+
+def estrai_html(piattaforma: str,
+                paths: list,
+                n_jobs: int = -1,
+                **valori_fissi) -> pd.DataFrame:
+   """Funzione che estrae le proprietà da più html salvati, una pagina per processo.
+      Ogni processo legge la sua pagina dal disco e restituisce solo le colonne estratte (liste di stringhe),
+      che sono aggiunte al dataframe finale nell'ordine delle pagine appena pronte.
+      Input:
+         - piattaforma, 'booking' o 'agoda';
+         - paths, lista dei file html (nell'ordine delle pagine, vedi ordina_pagine());
+         - n_jobs (opzionale), numero di processi, vedi parallelo.numero_processi();
+         - valori_fissi (opzionali), es. date="1 agosto - 2 agosto", passati a estrai_booking/estrai_agoda.
+      Output:
+         - dataframe con le stesse colonne del notebook 02)_Get_Info della piattaforma.
+   """
+   if piattaforma not in _ESTRATTORI:
+      raise ValueError(f"Piattaforma '{piattaforma}' non valida, valori possibili: {list(_ESTRATTORI)}")
+
+   processi = min(numero_processi(n_jobs), len(paths)) or 1
+   if processi == 1:
+      return costruisci_dataframe(piattaforma, (estrai_pagina(piattaforma, path, **valori_fissi) for path in paths))
+
+   with ProcessPoolExecutor(max_workers=processi) as executor:
+      futuri = [executor.submit(estrai_pagina, piattaforma, path, **valori_fissi) for path in paths]
+      return costruisci_dataframe(piattaforma, (futuro.result() for futuro in futuri))
+
+
+def salva_data_lake(dataframe: pd.DataFrame, path, formato: str = "csv") -> Path:
+   """Funzione che salva il dataframe estratto nel Data Lake, in csv (come i notebook) o in parquet.
+      Output:
+         - percorso del file scritto (estensione aggiunta in base al formato).
+   """
+   path = Path(path).with_suffix(f".{formato}")
+   if formato == "csv":
+      dataframe.to_csv(path)
+   elif formato == "parquet":
+      dataframe.to_parquet(path)
+   else:
+      raise ValueError(f"Formato '{formato}' non valido, valori possibili: ['csv', 'parquet']")
+   return path
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("piattaforma", choices=list(_ESTRATTORI))
+   parser.add_argument("--città", default="Roma", help="usata per il nome del file nel Data Lake (es. booking_Roma.csv)")
+   parser.add_argument("--html", nargs="+", default=None,
+                       help="file html da elaborare, di default quelli dell'ultimo lavoro di scraping.py completato della città "
+                            "o, senza lavori, gli html_final*.txt della cartella html dello scraper (vedi html_lavoro)")
+   parser.add_argument("--lavoro", default=None, help="check-in,check-out (AAAA-MM-GG) del lavoro di scraping.py da elaborare")
+   parser.add_argument("--date", default=None, help="colonna 'date', di default dalle date del lavoro o '1 agosto - 2 agosto'")
+   parser.add_argument("--n-jobs", type=int, default=-1)
+   parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+   parser.add_argument("--output", default=None, help="file di output, di default nel Data Lake")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   date_html = None
+   if args.html is None:
+      args.html, date_html = html_lavoro(paths[f"path_scraper_{args.piattaforma}"] / "html", args.piattaforma, args.città,
+                                         args.lavoro)
+   if not args.html:
+      raise FileNotFoundError("Nessun file html da elaborare.")
+   if args.date is None:
+      from pipeline import date_lavoro
+      args.date = date_lavoro(*date_html) if date_html else "1 agosto - 2 agosto"
+
+   inizio = time.perf_counter()
+   dataframe = estrai_html(args.piattaforma, args.html, n_jobs=args.n_jobs, date=args.date)
+   output = args.output or paths["path_data_lake"] / f"{args.piattaforma}_{args.città}"
+   output = salva_data_lake(dataframe, output, args.formato)
+   print(f"{len(dataframe)} proprietà da {len(args.html)} pagine in {time.perf_counter() - inizio:.2f} s -> {output}")
+
+
+if __name__ == "__main__":
+   main()
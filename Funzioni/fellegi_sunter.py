@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+
+#%%% Tabella dei pattern di accordo
+
+def livelli_accordo(features: pd.DataFrame, soglie: list) -> np.ndarray:
+   """Funzione che calcola il livello di accordo di ogni coppia per ogni colonna: il numero di soglie della colonna
+      superate (strettamente) dalla similarità. Con una soglia i livelli sono 0/1 (la binarizzazione del modello classico),
+      con più soglie si hanno più livelli (es. soglie 0.8, 0.9, 0.95: livelli 0-3). Un valore mancante è al livello 0.
+      Input:
+         - features, dataframe con le similarità;
+         - soglie, per ogni colonna di features un array ordinato in modo crescente di soglie.
+      Output:
+         - matrice di interi (coppie x colonne).
+   """
+   livelli = np.empty(features.shape, dtype=np.int64)
+   for j, (colonna, s) in enumerate(zip(features.columns, soglie)):
+      livelli[:, j] = np.searchsorted(s, np.nan_to_num(features[colonna].to_numpy(dtype=np.float64), nan=-np.inf), side="left")
+   return livelli
+
+
+def istogramma_soglie(features: pd.DataFrame, soglie: list) -> np.ndarray:
+   """Funzione che conta le coppie per ogni cella di una griglia di soglie, una lista di soglie per colonna.
+      La cella di una coppia è, per ogni colonna, il numero di soglie superate (strettamente) dalla similarità
+      (vedi livelli_accordo); un valore mancante non supera nessuna soglia. Gli istogrammi di più blocchi di coppie si possono sommare.
+      Input:
+         - features, dataframe con le similarità;
+         - soglie, per ogni colonna di features un array ordinato in modo crescente di soglie.
+      Output:
+         - array con una dimensione per colonna, di lunghezza numero di soglie + 1.
+   """
+   forma = tuple(len(s) + 1 for s in soglie)
+   celle = livelli_accordo(features, soglie).T
+   return np.bincount(np.ravel_multi_index(tuple(celle), forma), minlength=int(np.prod(forma))).reshape(forma)
+
+
+def riduci_istogramma(istogramma: np.ndarray, posizioni: list) -> np.ndarray:
+   """Funzione che, dato l'istogramma di istogramma_soglie, restituisce l'istogramma su una griglia con meno soglie,
+      senza tornare alle coppie: è la tabella dei pattern di accordo a più livelli usata da em_livelli.
+      Con una sola posizione per colonna i livelli sono 0/1: è la tabella dei pattern binari di recordlinkage.ECMClassifier().
+      Input:
+         - istogramma, output di istogramma_soglie;
+         - posizioni, per ogni colonna le posizioni (crescenti) delle soglie scelte nel suo array di soglie.
+      Output:
+         - array con una dimensione per colonna, di lunghezza numero di soglie scelte + 1.
+   """
+   # Una cella i della griglia completa ha superato le soglie scelte in posizione < i
+   mappe = [np.searchsorted(np.asarray(p), np.arange(n), side="left") for p, n in zip(posizioni, istogramma.shape)]
+   forma = tuple(len(p) + 1 for p in posizioni)
+   celle = np.ravel_multi_index(np.meshgrid(*mappe, indexing="ij"), forma)
+   return np.bincount(celle.ravel(), weights=istogramma.ravel(), minlength=int(np.prod(forma))).reshape(forma).astype(np.int64)
+
+#%%%
+
+
+#%%% Fellegi-Sunter a più livelli
+
+def em_livelli(istogramma: np.ndarray,
+               max_iter: int = 100,
+               atol: float = 10e-5,
+               proporzione_iniziale: float = 0.1) -> dict:
+   """Funzione che stima il modello di Fellegi-Sunter con l'algoritmo EM sulla tabella dei pattern di accordo a più livelli.
+      Ogni colonna ha una distribuzione dei livelli tra i match (m) e una tra i non match (u), indipendenti tra le colonne.
+      Il costo di ogni iterazione dipende dal numero di pattern distinti (celle non vuote dell'istogramma),
+      non dal numero di coppie. Con due livelli per colonna è lo stesso modello (e la stessa inizializzazione)
+      di recordlinkage.ECMClassifier() (init 'jaro').
+      Input:
+         - istogramma, numero di coppie per pattern, una dimensione per colonna (output di istogramma_soglie o riduci_istogramma);
+         - max_iter, atol (opzionali), numero massimo di iterazioni e tolleranza per la convergenza;
+         - proporzione_iniziale (opzionale), quota iniziale di coppie che sono match.
+      Output:
+         - dizionario con:
+            - 'proporzione_match', quota stimata di coppie che sono match;
+            - 'm', 'u', per ogni colonna la probabilità di ogni livello tra i match e tra i non match;
+            - 'pesi', array con la forma dell'istogramma: peso di match di ogni pattern, log2(P(pattern|match) / P(pattern|non match));
+            - 'probabilita_match', array con la forma dell'istogramma: probabilità a posteriori di match di ogni pattern
+              (NaN per i pattern con livelli mai osservati);
+            - 'iterazioni', iterazioni eseguite.
+   """
+   istogramma = np.asarray(istogramma)
+   forma = istogramma.shape
+   celle = np.flatnonzero(istogramma)
+   livelli = np.unravel_index(celle, forma)
+   conteggi = istogramma.ravel()[celle].astype(np.float64)
+
+   # Inizializzazione: livelli alti più probabili tra i match, livelli bassi tra i non match (con due livelli 0.1/0.9 come ECM)
+   iniziale = [np.linspace(0.1, 0.9, n) / np.linspace(0.1, 0.9, n).sum() if n > 1 else np.ones(1) for n in forma]
+   m, u = iniziale, [p[::-1].copy() for p in iniziale]
+   proporzione = proporzione_iniziale
+   osservati = [np.bincount(l, minlength=n) > 0 for l, n in zip(livelli, forma)]
+
+   iterazione = 0
+   with np.errstate(divide="ignore", invalid="ignore"):
+      for iterazione in range(1, max_iter + 1):
+         # Expectation: probabilità di match di ogni pattern, lookup dei parametri per livello
+         log_m = np.log(proporzione) + sum(np.log(p[l]) for p, l in zip(m, livelli))
+         log_u = np.log1p(-proporzione) + sum(np.log(p[l]) for p, l in zip(u, livelli))
+         g = np.exp(log_m - np.logaddexp(log_m, log_u))
+         peso_m, peso_u = g * conteggi, (1 - g) * conteggi
+         if peso_m.sum() == 0 or peso_u.sum() == 0:
+            break
+
+         # Maximisation: frequenze pesate dei livelli di ogni colonna
+         nuova_proporzione = peso_m.sum() / conteggi.sum()
+         nuovo_m = [np.bincount(l, weights=peso_m, minlength=n) / peso_m.sum() for l, n in zip(livelli, forma)]
+         nuovo_u = [np.bincount(l, weights=peso_u, minlength=n) / peso_u.sum() for l, n in zip(livelli, forma)]
+
+         convergenza = (np.isclose(nuova_proporzione, proporzione, atol=atol)
+                        and all(np.allclose(a[o], b[o], atol=atol) for a, b, o in zip(nuovo_m, m, osservati))
+                        and all(np.allclose(a[o], b[o], atol=atol) for a, b, o in zip(nuovo_u, u, osservati)))
+         proporzione, m, u = nuova_proporzione, nuovo_m, nuovo_u
+         if convergenza:
+            break
+
+      # Tabelle sull'intera griglia dei pattern: ogni colonna contribuisce lungo il suo asse
+      assi = [(1,) * j + (-1,) + (1,) * (len(forma) - j - 1) for j in range(len(forma))]
+      log_m = np.log(proporzione) + sum(np.log(p).reshape(a) for p, a in zip(m, assi))
+      log_u = np.log1p(-proporzione) + sum(np.log(p).reshape(a) for p, a in zip(u, assi))
+      pesi = sum(np.log2(pm / pu).reshape(a) for pm, pu, a in zip(m, u, assi))
+      probabilita = np.exp(log_m - np.logaddexp(log_m, log_u))
+
+   return {
+      "proporzione_match": proporzione,
+      "m": m,
+      "u": u,
+      "pesi": np.broadcast_to(pesi, forma).copy(),
+      "probabilita_match": np.broadcast_to(probabilita, forma).copy(),
+      "iterazioni": iterazione,
+   }
+
+
+def pesi_coppie(livelli: np.ndarray, modello: dict) -> pd.DataFrame:
+   """Funzione che riporta il modello di em_livelli sulle coppie: per ogni coppia il peso e la probabilità di match
+      del suo pattern, con un unico lookup vettoriale nelle tabelle del modello.
+      Input:
+         - livelli, matrice (coppie x colonne) dei livelli di accordo, output di livelli_accordo con le stesse soglie del modello;
+         - modello, output di em_livelli.
+      Output:
+         - dataframe con le colonne 'peso' e 'probabilita_match', una riga per coppia.
+   """
+   celle = np.ravel_multi_index(tuple(np.asarray(livelli).T), modello["pesi"].shape)
+   return pd.DataFrame({"peso": modello["pesi"].ravel()[celle],
+                        "probabilita_match": modello["probabilita_match"].ravel()[celle]})
+
+#%%%
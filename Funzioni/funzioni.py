@@ -1,144 +1,255 @@
+import warnings
+
+import numpy as np
 import pandas as pd 
 import recordlinkage
 
+from confronto import confronta_campi, leggi_confronto
+from blocking import IndiceInvertito, TopKTfidf
+from assegnazione import assegna_uno_a_uno
+from coppie import formatta_coppie
+from fellegi_sunter import istogramma_soglie, livelli_accordo, riduci_istogramma, em_livelli, pesi_coppie
+from profilazione import NESSUN_PROFILO, profilo_esecuzione
 
-def record_linkage_title(copia_agoda : pd.DataFrame,
-                         copia_booking : pd.DataFrame,
-                         soglia : float ) -> pd.DataFrame:
-   """Funzione per praticare il record linkage tra due dataframe, selezione tramite threshold. 
-      Non si tratta di una vera e propria funzione in quanto i parametri sono molti e non tutti selezionabili, è solo un modo per risparmiare codice e rendere tutto più chiaro e semplice.
+
+def crea_indexer(blocking = "first_letter") -> recordlinkage.Index:
+   """Funzione che crea l'indexer (strategia di blocking) usato dalle funzioni di record linkage.
       Input:
-         - Dataframe1;
-         - Dataframe2;
-         - Soglia (threshold).
-         
+         - blocking, può essere:
+            - 'first_letter', blocking sulla prima lettera del titolo (default);
+            - 'token', indice invertito sulle parole rare del titolo (blocking.py);
+            - 'qgram', indice invertito sui q-grammi rari del titolo (blocking.py);
+            - 'tfidf', per ogni record di booking i 5 record di agoda più simili secondo TF-IDF sui n-grammi di caratteri (blocking.py);
+            - un recordlinkage.Index o un algoritmo di indexing di recordlinkage già configurato,
+              che lavori sulle colonne 'titolo_booking'/'titolo_agoda' (es. IndiceInvertito(max_blocco=50)).
       Output:
-         - Restituisce un dataframe con i risultati.
+         - recordlinkage.Index pronto per generare le coppie candidate.
    """
+   if isinstance(blocking, recordlinkage.Index):
+      return blocking
 
-
-   # Aggiungere le colonne ID: 
-   copia_booking['id_booking'] = copia_booking.index
-   copia_agoda['id_agoda'] = copia_agoda.index
-   
-
-   copia_booking = copia_booking.rename(columns={"titolo_processed":"titolo_booking"})
-   copia_agoda = copia_agoda.rename(columns={"titolo_processed":"titolo_agoda"})
-
-   # Blocking sulla prima lettera (Il blocking sulla prima lettera è una tecnica di record linkage usata per ridurre il numero di confronti tra record che devono essere effettuati.)
-   #  Nel record linkage, si confrontano record da due (o più) set di dati per trovare duplicati o corrispondenze. Confrontare ogni record con tutti gli altri è computazionalmente costoso, soprattutto con set grandi complessità. 
-   # Il blocking serve a limitare i confronti a gruppi più piccoli di record che condividono una certa caratteristica.
-   # Il blocking sulla prima lettera: significa che i record vengono suddivisi in blocchi in base alla prima lettera di un campo di testo, per esempio un cognome, un nome o un indirizzo. Solo i record che iniziano con la stessa lettera vengono poi confrontati tra loro.
-   copia_booking['first_letter'] = copia_booking['titolo_booking'].str[0]
-   copia_agoda['first_letter'] = copia_agoda['titolo_agoda'].str[0]
-
-   # STEP 1
-   # Creare un oggetto di tipo Index e  definire una strategia di "blocking" basata sul valore della colonna 'first_letter'.
    indexer = recordlinkage.Index() # Creare index
-   indexer.block('first_letter') # Definire il blocking sulla prima colonna
-
+   if blocking == "first_letter":
+      indexer.block('first_letter') # Definire il blocking sulla prima lettera
+   elif blocking in ("token", "qgram"):
+      indexer.add(IndiceInvertito('titolo_booking', 'titolo_agoda', modalita=blocking))
+   elif blocking == "tfidf":
+      indexer.add(TopKTfidf('titolo_booking', 'titolo_agoda'))
+   elif isinstance(blocking, str):
+      raise ValueError("'blocking' deve essere 'first_letter', 'token', 'qgram', 'tfidf' oppure un indexer di recordlinkage.")
+   else:
+      indexer.add(blocking)
+   return indexer
+
+
+def adatta_indexer(indexer : recordlinkage.Index,
+                   proiezione_booking : pd.DataFrame,
+                   proiezione_agoda : pd.DataFrame) -> recordlinkage.Index:
+   """Funzione che restituisce un nuovo indexer con gli algoritmi di blocking (IndiceInvertito, TopKTfidf) adattati
+      a booking e agoda interi: frequenze dei token e idf sono calcolati una volta sola, così le coppie candidate
+      di ogni blocco di booking (modalità streaming, vedi blocchi_booking) sono quelle di booking intero.
+      Gli algoritmi senza adatta() (es. il blocking sulla prima lettera) non dipendono dal blocco e restano gli stessi.
+      Input:
+         - indexer, vedi crea_indexer();
+         - proiezione_booking, proiezione_agoda, proiezioni dei dataframe interi, vedi proiezione_linkage().
+   """
+   adattato = recordlinkage.Index()
+   for algoritmo in indexer.algorithms:
+      adattato.add(algoritmo.adatta(proiezione_booking, proiezione_agoda) if hasattr(algoritmo, "adatta") else algoritmo)
+   return adattato
+
+
+# Colonne dei dataframe originali riportate nei match (STEP 6-7, vedi aggiungi_informazioni).
+# Numero di notti e persone e date sono le stesse per entrambi i dataset: si prendono solo da agoda.
+VARIABILI_BOOKING = ["titolo", "zona", "città", "distanza_centro", "prezzo",
+                     'recensione_voto_numerico', 'recensione_voto_parola', 'numero_recensioni']
+VARIABILI_AGODA = VARIABILI_BOOKING + ['numero_notti', 'numero_persone', 'inizio_permanenza', 'fine_permanenza']
+
+# Confronti delle funzioni di record linkage: nome della similarità -> (colonna booking, colonna agoda[, metodo[, opzioni]]),
+# vedi confronto.confronta_campi(). Le colonne del titolo sono quelle della proiezione (proiezione_linkage).
+CONFRONTI_TITOLO = {'name_similarity': ('titolo_booking', 'titolo_agoda')}
+CONFRONTI_CITY_TITLE = {**CONFRONTI_TITOLO, 'città_similarity': ('città', 'città')}
+
+# Confronto su più campi: città esatta, zona (Jaro-Winkler), distanza dal centro (km), prezzo (differenza relativa)
+# e voto delle recensioni. Es. record_linkage_city_title(..., confronti=CONFRONTI_MULTICAMPO)
+CONFRONTI_MULTICAMPO = {
+   **CONFRONTI_TITOLO,
+   'città_similarity': ('città', 'città', 'esatto'),
+   'zona_similarity': ('zona_processed', 'zona_processed'),
+   'distanza_similarity': ('distanza_centro', 'distanza_centro', 'gauss', {'scala': 1.0}),
+   'prezzo_similarity': ('prezzo', 'prezzo', 'lineare', {'scala': 0.15, 'relativa': True}),
+   'voto_similarity': ('recensione_voto_numerico', 'recensione_voto_numerico', 'gauss', {'scala': 0.3}),
+}
+
+# Soglie aggiuntive dei livelli di accordo di Fellegi-Sunter (oltre a quella scelta) per ogni similarità, vedi _linkage_city_title.
+# Le similarità senza soglia scelta (zona, distanza, ...) hanno solo i livelli di queste soglie.
+# Il modello a più livelli è opzionale (livelli=LIVELLI_FELLEGI_SUNTER): di default titolo e città sono binarizzati
+# con le soglie scelte, come recordlinkage.ECMClassifier(), e solo le altre similarità prendono i livelli da qui.
+LIVELLI_FELLEGI_SUNTER = {'name_similarity': (0.9, 0.97), 'città_similarity': (0.9,),
+                          'zona_similarity': (0.8, 0.95), 'distanza_similarity': (0.5, 0.9),
+                          'prezzo_similarity': (0.5, 0.9), 'voto_similarity': (0.5, 0.9)}
+
+# Colonne a pochi valori diversi portate nella proiezione del record linkage come codici di categoria
+CATEGORICHE_LINKAGE = ("città", "zona_processed")
+
+
+def proiezione_linkage(df : pd.DataFrame, piattaforma : str, colonne : list = ()) -> pd.DataFrame:
+   """Funzione che crea la proiezione compatta di un dataframe (o di un blocco) usata dal record linkage,
+      al posto di una copia con tutte le colonne (descrizioni, indirizzi, ...):
+         - l'index è quello del dataframe (id intero del record, usato nelle coppie candidate);
+         - 'titolo_<piattaforma>', 'titolo_processed' come categoria: ogni titolo distinto è salvato una volta
+           e i record hanno solo il suo codice;
+         - 'first_letter', prima lettera del titolo (categoria), per il blocking sulla prima lettera;
+         - le colonne di CATEGORICHE_LINKAGE presenti nel dataframe (città, zona), come categorie;
+         - le altre colonne dei confronti ('colonne'): quelle numeriche come sono, le altre come categorie.
+      Le colonne già categoriche (es. lette con dataset.leggi_dataset()) non sono ricodificate.
+      Le informazioni complete sono aggiunte solo ai match finali, vedi aggiungi_informazioni().
+      Input:
+         - df, dataframe di booking o agoda;
+         - piattaforma, 'booking' oppure 'agoda';
+         - colonne (opzionale), altre colonne usate dai confronti (es. 'prezzo'), vedi colonne_confronti().
+   """
+   titoli = _categoria(df["titolo_processed"])
+   # Prima lettera calcolata sui titoli distinti (categorie) e non su ogni record
+   codici_lettere, lettere = pd.factorize(titoli.cat.categories.str[0])
+   # Il codice -1 (titolo mancante) prende l'ultimo elemento, anch'esso -1
+   codici_lettere = np.append(codici_lettere, -1)[titoli.cat.codes.to_numpy()]
+   proiezione = {f"titolo_{piattaforma}": titoli, "first_letter": pd.Categorical.from_codes(codici_lettere, lettere)}
+   for colonna in (*CATEGORICHE_LINKAGE, *colonne):
+      if colonna in df.columns and colonna not in proiezione:
+         numerica = pd.api.types.is_numeric_dtype(df[colonna].dtype)
+         proiezione[colonna] = df[colonna] if numerica else _categoria(df[colonna])
+   return pd.DataFrame(proiezione, index=df.index)
+
+
+def colonne_confronti(confronti : dict) -> tuple:
+   """Funzione che restituisce le colonne di booking e di agoda usate da un dizionario di confronti."""
+   letti = [leggi_confronto(confronto) for confronto in confronti.values()]
+   return [c[0] for c in letti], [c[1] for c in letti]
+
+
+def _categoria(colonna : pd.Series) -> pd.Series:
+   """Colonna come categoria con le categorie nell'ordine di comparsa: ordinarle (come fa astype('category'))
+      costa più della codifica stessa e al record linkage l'ordine non serve."""
+   if isinstance(colonna.dtype, pd.CategoricalDtype):
+      return colonna
+   codici, valori = pd.factorize(colonna)
+   return pd.Series(pd.Categorical.from_codes(codici, valori), index=colonna.index, name=colonna.name)
+
+
+def blocchi_booking(booking, chunk_size : int = None):
+   """Generatore dei blocchi di booking elaborati dalle funzioni di record linkage (modalità streaming).
+      Input:
+         - booking, può essere:
+            - un dataframe, restituito intero se chunk_size è None, altrimenti a blocchi di chunk_size righe;
+            - un iteratore di dataframe, es. pd.read_csv(path, chunksize=100000), così booking non è mai tutto in memoria.
+              Gli index dei blocchi devono essere unici (read_csv continua la numerazione da un blocco all'altro).
+         - chunk_size (opzionale), numero di righe per blocco.
+      Con un dataframe a blocchi le frequenze del blocking sono quelle di booking intero (vedi adatta_indexer) e i match
+      sono gli stessi dell'esecuzione senza blocchi. Con un iteratore booking non è mai tutto in memoria: l'indexer
+      usa le frequenze di ogni blocco, a meno di passare come blocking un IndiceInvertito già adattato (adatta())
+      sui titoli di booking interi.
+   """
+   if isinstance(booking, pd.DataFrame):
+      if chunk_size is None:
+         yield booking
+         return
+      for inizio in range(0, len(booking), chunk_size):
+         yield booking.iloc[inizio:inizio + chunk_size]
+   else:
+      yield from booking
+
+
+
+
+def calcola_features(blocco_booking : pd.DataFrame,
+                     copia_agoda : pd.DataFrame,
+                     indexer : recordlinkage.Index,
+                     confronti : dict,
+                     n_jobs : int = 1,
+                     cache = None,
+                     soglie : dict = None,
+                     profilo = NESSUN_PROFILO) -> pd.DataFrame:
+   """Funzione che esegue gli STEP 2-4 del record linkage su un blocco di booking: coppie candidate e similarità.
+      Input:
+         - blocco_booking, copia_agoda, proiezioni create con proiezione_linkage();
+         - indexer, strategia di blocking, vedi crea_indexer();
+         - confronti, dizionario nome della similarità -> (colonna booking, colonna agoda[, metodo[, opzioni]]),
+           vedi confronto.confronta_campi() (senza metodo: Jaro-Winkler);
+         - n_jobs, cache (opzionali), vedi jarowinkler_vettoriale();
+         - soglie (opzionale), dizionario nome della similarità -> soglia della potatura, vedi confronto.confronta_campi();
+         - profilo (opzionale), Profilo che registra le fasi (profilazione.py).
+      Output:
+         - dataframe con una colonna per confronto e una riga per coppia candidata (MultiIndex index booking, index agoda).
+           Con soglie, le similarità sotto soglia possono essere un limite superiore invece della similarità esatta.
+   """
    # STEP 2
-   #  Generare i candidate pairs (coppie da confrontare) tra due dataset (copia_booking e copia_agoda), 
+   #  Generare i candidate pairs (coppie da confrontare) tra due dataset (blocco di booking e copia_agoda), 
    # secondo le regole di blocking definite prima con indexer.block() (step 1).
-   candidate_links = indexer.index(copia_booking, copia_agoda) # Trovare le coppie da confrontare 
-   #print(f"Coppie candidate: {len(candidate_links)}")        # Mostrare a schermo il numero di coppie candidate
+   with profilo.fase("STEP 2 coppie candidate", righe_booking=len(blocco_booking)):
+      candidate_links = indexer.index(blocco_booking, copia_agoda) # Trovare le coppie da confrontare 
+      profilo.conta(coppie=len(candidate_links))                  # Numero di coppie candidate (vedi profilazione.py)
 
    # STEP 3
    # Configurare il confronto tra due colonne di testo, usando il metodo di similarità Jaro-Winkler.
    # Il metodo Jaro-Winkler è particolarmente efficace per confrontare stringhe brevi e con piccole variazioni o errori di battitura (es. "Hotel Roma" vs "Hotel Roma Center").
-   compare = recordlinkage.Compare()
-   compare.string('titolo_booking',         # variabile 1 da confrontare
-                  'titolo_agoda',           # variabile 2 da confrontare
-                  method='jarowinkler',    # Metodo per il confronto
-                  label='name_similarity'  # Nome della variabile risultante contenente la simililarità, compresa tra 0 e 1 (0 stringhe completamente diverse, 1 stringhe identiche)
-                  )
+   # Il confronto non passa più da recordlinkage.Compare().string(method='jarowinkler'), che calcola una coppia alla volta,
+   # ma da jarowinkler_vettoriale (confronto.py): stesse similarità, calcolate in blocco sulle stringhe codificate.
+   # Gli altri campi (città esatta, prezzo, distanza, ...) sono confrontati nello stesso passaggio, vedi confronta_campi().
+   # Con soglie (potatura) le coppie che non possono superare la soglia, secondo un limite superiore calcolato su lunghezze,
+   # caratteri in comune e prefisso, non sono confrontate carattere per carattere.
 
    # STEP 4
    # Eseguire effettivamente il confronto tra le coppie di record (i candidate links) generate in precedenza (STEP 2).
-   # Usa le regole di similarità definite con compare
-   features = compare.compute(candidate_links, copia_booking, copia_agoda) # Restituisce un pandas dataframe con la similarity per ogni coppia
-   #print(features['name_similarity'].describe()) # Overview sulle similarities calcolate.
-
-   # STEP 5
-   # Trovare i match. Le coppie con un valore di similarità superiore a una soglia stabilita sono considerate match.
-   # Il metodo fellegi sunter non può essere usato su una sola variabile quindi si fa direttamente la selezione tramite soglia.
-   scores_df = features[features['name_similarity'] > soglia] # Estrazione coppie match
-   # Ordinare il dataset dei risultati. Aggiungere ai match le informazioni di agoda e booking
-   scores_df.reset_index(inplace=True)  # Fare il reset degli indici. In questo modo si avranno come variabili gli indici delle location. 
-                                    # Avere gli indici come variabili faciliterà poi  le prossime operazioni.                                  
-   scores_df = scores_df.rename(columns={'level_0': 'index_booking', 'level_1': 'index_agoda'}) # Rinominare le variabili indice
-   scores_df['pair'] = scores_df['index_booking'].astype(str) + '#' + scores_df['index_agoda'].astype(str)
-
-   # Negli step successivi:
-   # A. Eliminati tutti gli index che hanno più di un match
-   # B. Selezionato solo l'index booking duplicato con score maggiore, a parità presi entrambi
-   # C. Selezionato solo l'index agoda duplicato con score maggiore, a parità presi entrambi
-   # D. Inserire nuovamente i match migliori.
-   # In questo modo se una location ha più di un match si prende quella con la probabilità di match migliore
-   # è infatti inutile avere due match diversi dato che uno sarà sicuramente sbagliato dato che la corrispondenza deve
-   # essere 1:1
-   match = scores_df.copy()
-
-
-   # A. Prendere solo il match migliore per ogni location, non ha senso prendere la seconda opzione.
-   match = scores_df.drop_duplicates(subset='index_booking', keep=False)
-   match = match.drop_duplicates(subset='index_agoda', keep=False)
-
-   # B.
-   # Filtra solo i duplicati su index_booking
-   dups = scores_df[scores_df.duplicated(subset='index_booking', keep=False)]
-   # Raggruppa per index_booking e seleziona il massimo score
-   booking_best_match = dups.groupby('index_booking', group_keys=False).apply(
-      lambda row: row[row['name_similarity'] == row['name_similarity'].max()]
-   )
-
-   # C.
-   # Filtra solo i duplicati su index_agoda
-   dups = scores_df[scores_df.duplicated(subset='index_agoda', keep=False)]
-   # Raggruppa per index_booking e seleziona il massimo score
-   agoda_best_match = dups.groupby('index_agoda', group_keys=False).apply(
-      lambda row: row[row['name_similarity'] == row['name_similarity'].max()]
-   )
-
-   # D.
-   agoda_best_match["pair"] = agoda_best_match['index_booking'].astype(str) + '#' + agoda_best_match['index_agoda'].astype(str)
-   booking_best_match["pair"] = booking_best_match['index_booking'].astype(str) + '#' + booking_best_match['index_agoda'].astype(str)
-   match = pd.concat([match,booking_best_match])
-   match = pd.concat([match,agoda_best_match])
-
-
-   # STEP 6
-   # Ordinare il dataset dei risultati. Aggiungere ai match le informazioni di agoda e booking
-
-   match.reset_index(inplace=True) # Fare il reset degli indici. In questo modo si avranno come variabili gli indici delle location. 
-                                    # Avere gli indici come variabili faciliterà poi  le prossime operazioni.                                  
-   match = match.rename(columns={'level_0': 'index_booking', 'level_1': 'index_agoda'}) # Rinominare le variabili indice
-
-   match['pair'] = match['index_booking'].astype(str) + '#' + match['index_agoda'].astype(str)
-
-   # Lista delle variabili da inserire nel dataset finale dei match. 
-   # Evito di inserie numero di notti e persone perchè è lo stesso per entrambi i dataset. E quindi si prende direttamente dall'ultimo dataset
-   variabili_comuni = ["titolo", "zona","città","distanza_centro","prezzo", 
-                     'recensione_voto_numerico', 'recensione_voto_parola', 'numero_recensioni'] 
-
-   # Unire il dataframe dei match con il dataframe booking. Prendere solo le informazioni delle accomodation in comune.
-   match = pd.merge(match, # Dataframe left
-                  copia_booking[variabili_comuni], # Dataframe right
-                  left_on="index_booking", # Il dataframe left (match) ha come indice per il merge la variabile 'index_booking'
-                  right_index=True # Il dataframe right (booking) ha come indice per il merge l'index.
-                  ) 
-
-   variabili_comuni.extend(['numero_notti', 'numero_persone', 'inizio_permanenza', 'fine_permanenza']) # Ora posso aggiungere le variabili comuni.
-   match =  pd.merge(match, # Dataframe left
-                  copia_agoda[variabili_comuni], # Dataframe right
-                  left_on="index_agoda", # Il dataframe left (match) ha come indice per il merge la variabile 'index_booking'
-                  right_index=True, # Il dataframe right (booking) ha come indice per il merge l'index.
-                  suffixes=("_booking","_agoda") # Le variabili che avranno nome uguali in left e right avranno suffisso 'booking' in left e suffisso 'agoda' in right
-                  ) 
-
+   # Similarità compresa tra 0 e 1 (0 stringhe completamente diverse, 1 stringhe identiche)
+   with profilo.fase("STEP 3-4 similarità", coppie=len(candidate_links), confronti=len(confronti)):
+      statistiche = {}
+      features = confronta_campi(candidate_links, blocco_booking, copia_agoda, confronti, n_jobs=n_jobs, cache=cache,
+                                 soglie=soglie, statistiche=statistiche) # Restituisce un pandas dataframe con la similarity per ogni coppia
+      profilo.conta(**statistiche)                                       # Coppie potate (non calcolate)
+      return features
+
+
+def aggiungi_informazioni(match : pd.DataFrame,
+                          copia_booking : pd.DataFrame,
+                          copia_agoda : pd.DataFrame,
+                          colonne_score : list) -> pd.DataFrame:
+   """Funzione che completa i match 1:1 (index_booking, index_agoda e score) con le informazioni di booking e agoda.
+      È l'unico punto in cui servono le colonne dei dataframe originali: il record linkage lavora sulla proiezione
+      compatta (proiezione_linkage) e solo qui, per i soli match finali, sono prese le righe e le colonne che servono.
+      Input:
+         - match, dataframe con le colonne 'index_booking', 'index_agoda' e le colonne di score;
+         - copia_booking, copia_agoda, dataframe originali, oppure le sole righe dei match con le colonne
+           VARIABILI_BOOKING e VARIABILI_AGODA (l'index deve essere unico);
+         - colonne_score, colonne di score da mettere all'inizio del risultato, dopo 'pair'.
+      Output:
+         - dataframe dei match con le colonne nello stesso ordine per tutte le funzioni di record linkage.
+   """
+   # Posizione di ogni match nei dataframe originali: al posto di due merge sui dataframe interi
+   # si prendono (take) le sole righe dei match, una colonna alla volta
+   righe_booking = copia_booking.index.get_indexer(match["index_booking"])
+   righe_agoda = copia_agoda.index.get_indexer(match["index_agoda"])
+   trovati = (righe_booking >= 0) & (righe_agoda >= 0)
+   match = match[trovati].reset_index(drop=True)
+   righe_booking, righe_agoda = righe_booking[trovati], righe_agoda[trovati]
+
+   # Le variabili con nome uguale hanno suffisso '_booking' e '_agoda'; numero di notti e persone e date
+   # sono le stesse per entrambi i dataset e si prendono direttamente da agoda
+   informazioni = {}
+   for colonna in VARIABILI_AGODA:
+      if colonna in VARIABILI_BOOKING:
+         informazioni[f"{colonna}_booking"] = copia_booking[colonna].take(righe_booking).set_axis(match.index)
+         informazioni[f"{colonna}_agoda"] = copia_agoda[colonna].take(righe_agoda).set_axis(match.index)
+      else:
+         informazioni[colonna] = copia_agoda[colonna].take(righe_agoda).set_axis(match.index)
+   match = pd.concat([match, pd.DataFrame(informazioni)], axis=1)
+
+   # Colonna leggibile 'pair' (index_booking#index_agoda), creata solo ora per i match finali.
+   # Per confrontare insiemi di match usare le chiavi intere di coppie.py (chiavi_coppie, match_diversi).
+   match['pair'] = formatta_coppie(match['index_booking'], match['index_agoda'])
                                                                         
    # Ordinare le colonne per una visualizzazione dei dati migliore.
-   match = match[[ 'pair','name_similarity',
+   match = match[['pair'] + list(colonne_score) + [
                   'titolo_booking', 'titolo_agoda',
                   'zona_booking','zona_agoda',
                   'città_booking', 'città_agoda',
@@ -150,165 +261,391 @@ def record_linkage_title(copia_agoda : pd.DataFrame,
                   'numero_recensioni_booking','numero_recensioni_agoda',
                   'numero_notti', 'numero_persone', 'inizio_permanenza', 'fine_permanenza', 
                ]]
-   match.drop_duplicates(inplace=True) # Rimuovere righe duplicate
+   match = match.drop_duplicates(subset=['index_booking', 'index_agoda']) # Rimuovere coppie duplicate
    return match
 
+
+def _linkage_title(copia_agoda : pd.DataFrame,
+                   copia_booking : pd.DataFrame,
+                   soglie : list,
+                   blocking = "first_letter",
+                   assegnazione : str = "greedy",
+                   chunk_size : int = None,
+                   n_jobs : int = 1,
+                   cache = None,
+                   confronti : dict = None,
+                   potatura : bool = True,
+                   profilo = NESSUN_PROFILO) -> tuple:
+   """Record linkage sul titolo per una o più soglie (vedi record_linkage_title e sweep): blocking e similarità
+      sono calcolati una sola volta, tenendo le coppie sopra la soglia più bassa.
+      Le similarità di confronti diverse da 'name_similarity' non decidono i match e sono solo aggiunte ai risultati.
+      Con potatura il titolo delle coppie sotto la soglia più bassa non è calcolato (non possono essere match).
+      Output:
+         - riepilogo, dataframe con una riga per soglia (coppie sopra soglia, match 1:1);
+         - dizionario soglia -> dataframe dei match, come record_linkage_title.
+   """
+   # STEP 0, soglie, confronti e proiezioni
+   soglie = list(dict.fromkeys(soglie))
+   confronti = CONFRONTI_TITOLO if confronti is None else confronti
+   if 'name_similarity' not in confronti:
+      raise ValueError("I confronti devono contenere 'name_similarity'")
+   colonne_booking, colonne_agoda = colonne_confronti(confronti)
+   soglie_potatura = {'name_similarity': min(soglie)} if potatura else None
+
+   # Proiezione compatta di agoda: id, codici del titolo, prima lettera e colonne dei confronti (vedi proiezione_linkage).
+   # Booking è proiettato blocco per blocco (STEP 2-5); le altre colonne servono solo per i match finali (STEP 6).
+   with profilo.fase("STEP 0 proiezione", righe=len(copia_agoda)):
+      proiezione_agoda = proiezione_linkage(copia_agoda, "agoda", colonne_agoda)
+
+   # STEP 1
+   # Creare un oggetto di tipo Index e  definire una strategia di "blocking".
+   # Di default il blocking sulla colonna 'first_letter'. Con blocking='token' un indice invertito sui token rari del titolo:
+   # la prima lettera, essendo le parole ordinate da alfabeto(), è quella della parola alfabeticamente prima, e parole
+   # generiche come 'Apartment' o 'Hotel' creano blocchi enormi, ma sui dati sintetici etichettati il recall è più basso
+   # (vedi Benchmark/benchmark_suite.py), vedi crea_indexer().
+   with profilo.fase("STEP 1 blocking"):
+      indexer = crea_indexer(blocking)
+      # A blocchi, frequenze dei token e idf del blocking sono calcolati su booking intero e non sul blocco
+      if isinstance(copia_booking, pd.DataFrame) and chunk_size is not None:
+         indexer = adatta_indexer(indexer, proiezione_linkage(copia_booking, "booking"), proiezione_agoda)
+
+   # Gli STEP 2-5 sono eseguiti su un blocco di booking alla volta (un solo blocco se chunk_size è None, vedi blocchi_booking).
+   # Di ogni blocco si tengono solo le coppie sopra soglia e le righe di booking che vi compaiono (con le sole colonne
+   # dei match): la memoria dipende dalla dimensione del blocco e non dal numero totale di coppie candidate.
+   coppie_sopra_soglia = []
+   booking_sopra_soglia = []
+   for blocco_booking in blocchi_booking(copia_booking, chunk_size):
+      with profilo.fase("STEP 0 proiezione", righe=len(blocco_booking)):
+         proiezione_booking = proiezione_linkage(blocco_booking, "booking", colonne_booking)
+      features = calcola_features(proiezione_booking, proiezione_agoda, indexer, confronti, n_jobs=n_jobs, cache=cache,
+                                  soglie=soglie_potatura, profilo=profilo)
+
+      # STEP 5
+      # Trovare i match. Le coppie con un valore di similarità superiore a una soglia stabilita sono considerate match.
+      # Il metodo fellegi sunter non può essere usato su una sola variabile quindi si fa direttamente la selezione tramite soglia.
+      with profilo.fase("STEP 5 soglia", coppie=len(features)):
+         sopra_soglia = features[features['name_similarity'] > min(soglie)] # Estrazione coppie match
+         coppie_sopra_soglia.append(sopra_soglia)
+         booking_sopra_soglia.append(blocco_booking.loc[sopra_soglia.index.unique(level=0), VARIABILI_BOOKING])
+         profilo.conta(coppie_sopra_soglia=len(sopra_soglia))
+
+   # Le similarità nuove sono scritte nella cache su disco una volta per esecuzione e non per blocco (vedi cache.py)
+   if cache is not None:
+      cache.scrivi()
+
+   with profilo.fase("STEP 5 soglia"):
+      scores_df = pd.concat(coppie_sopra_soglia)
+      copia_booking = pd.concat(booking_sopra_soglia)
+
+      # Avere gli indici come variabili faciliterà poi le prossime operazioni.
+      scores_df = scores_df.rename_axis(['index_booking', 'index_agoda']).reset_index()
+
+   # Risoluzione dei match multipli (ex step A-D, vedi assegnazione.py).
+   # Se una location ha più di un match si prende quello con la similarità migliore:
+   # è infatti inutile avere due match diversi dato che uno sarà sicuramente sbagliato dato che la corrispondenza deve
+   # essere 1:1. A differenza dei vecchi step A-D, anche a parità di score ogni location resta con un solo match.
+   #  - 'greedy': si accettano per prime le coppie con similarità più alta;
+   #  - 'ottimo': matching bipartito che massimizza la somma delle similarità.
+   # Il greedy scorre le coppie per similarità decrescente: il risultato con una soglia più alta è la parte sopra soglia
+   # del risultato con la soglia più bassa, quindi basta una sola assegnazione per tutte le soglie.
+   if assegnazione == "greedy":
+      with profilo.fase("STEP A-D assegnazione 1:1", coppie=len(scores_df)):
+         assegnate = assegna_uno_a_uno(scores_df, 'name_similarity', metodo=assegnazione)
+
+   similarita_ordinate = np.sort(scores_df['name_similarity'].to_numpy())
+   riepilogo = []
+   risultati = {}
+   for soglia in soglie:
+      with profilo.fase("STEP A-D assegnazione 1:1"):
+         if assegnazione == "greedy":
+            match = assegnate[assegnate['name_similarity'] > soglia]
+         else:
+            match = assegna_uno_a_uno(scores_df[scores_df['name_similarity'] > soglia], 'name_similarity', metodo=assegnazione)
+
+      # STEP 6
+      # Ordinare il dataset dei risultati. Aggiungere ai match le informazioni di agoda e booking
+      with profilo.fase("STEP 6 informazioni", match=len(match)):
+         risultati[soglia] = aggiungi_informazioni(match, copia_booking, copia_agoda, list(confronti))
+      riepilogo.append({'soglia': soglia,
+                        'coppie_sopra_soglia': len(similarita_ordinate) - np.searchsorted(similarita_ordinate, soglia, side="right"),
+                        'match': len(risultati[soglia])})
+
+   return pd.DataFrame(riepilogo), risultati
+
+
+def _linkage_city_title(dataframe_booking : pd.DataFrame,
+                        dataframe_agoda : pd.DataFrame,
+                        soglie_titolo : list,
+                        soglie_città : list,
+                        blocking = "first_letter",
+                        assegnazione : str = "greedy",
+                        livelli : dict = None,
+                        chunk_size : int = None,
+                        n_jobs : int = 1,
+                        cache = None,
+                        confronti : dict = None,
+                        potatura : bool = True,
+                        profilo = NESSUN_PROFILO) -> tuple:
+   """Record linkage Fellegi-Sunter su titolo e città per una griglia di soglie (vedi record_linkage_city_title e sweep).
+      Blocking e similarità sono calcolati una sola volta; per ogni combinazione di soglie il modello di Fellegi-Sunter
+      (binario, o a più livelli con 'livelli') è stimato con l'EM sui conteggi dei pattern di accordo, ricavati
+      dall'istogramma delle coppie sulla griglia di tutte le soglie. Le similarità di confronti oltre a titolo e città
+      (es. CONFRONTI_MULTICAMPO) entrano nel modello con i soli livelli di 'livelli' (di default quelli di LIVELLI_FELLEGI_SUNTER).
+      Con potatura il titolo delle coppie sotto il primo taglio della sua griglia non è calcolato: la coppia resta
+      nel livello più basso, quindi istogramma e modello non cambiano.
+      Output:
+         - riepilogo, dataframe con una riga per combinazione (coppie classificate match, match 1:1);
+         - dizionario (soglia_titolo, soglia_città) -> dataframe dei match, come record_linkage_city_title.
+   """
+   # STEP 0, soglie, confronti e proiezioni
+   soglie_titolo = list(dict.fromkeys(soglie_titolo))
+   soglie_città = list(dict.fromkeys(soglie_città))
+   confronti = CONFRONTI_CITY_TITLE if confronti is None else confronti
+   # Di default titolo e città binarizzati dalle soglie scelte; le altre similarità non hanno una soglia scelta
+   if livelli is None:
+      livelli = {nome: soglie for nome, soglie in LIVELLI_FELLEGI_SUNTER.items()
+                 if nome in confronti and nome not in ('name_similarity', 'città_similarity')}
+   if not {'name_similarity', 'città_similarity'} <= set(confronti):
+      raise ValueError("I confronti devono contenere 'name_similarity' e 'città_similarity'")
+   # Titolo e città per primi: sono le similarità con le soglie scelte
+   confronti = {nome: confronti[nome] for nome in ('name_similarity', 'città_similarity', *confronti)}
+   colonne_booking, colonne_agoda = colonne_confronti(confronti)
+   # Griglia di ogni similarità: le soglie di tutte le combinazioni e quelle dei livelli
+   griglia = [np.unique(np.append(soglie, livelli.get(nome, ())))
+              for nome, soglie in zip(confronti, (soglie_titolo, soglie_città, *[()] * (len(confronti) - 2)))]
+   if any(len(g) == 0 for g in griglia):
+      raise ValueError("Ogni similarità oltre a titolo e città deve avere almeno un livello in 'livelli'")
+   # Solo il titolo è potato: le altre similarità dei match sono riportate nei risultati e devono essere esatte
+   soglie_potatura = {'name_similarity': griglia[0][0]} if potatura else None
+
+   # Proiezione compatta di agoda: id, codici del titolo, prima lettera, città e colonne dei confronti (vedi proiezione_linkage).
+   # Booking è proiettato blocco per blocco; le altre colonne servono solo per i match finali (STEP 7).
+   with profilo.fase("STEP 0 proiezione", righe=len(dataframe_agoda)):
+      proiezione_agoda = proiezione_linkage(dataframe_agoda, "agoda", colonne_agoda)
+
+   # STEP 1, strategia di blocking
+   with profilo.fase("STEP 1 blocking"):
+      indexer = crea_indexer(blocking)
+      # A blocchi, frequenze dei token e idf del blocking sono calcolati su booking intero e non sul blocco
+      if isinstance(dataframe_booking, pd.DataFrame) and chunk_size is not None:
+         indexer = adatta_indexer(indexer, proiezione_linkage(dataframe_booking, "booking"), proiezione_agoda)
+
+   # Gli STEP 2-5 sono eseguiti su un blocco di booking alla volta (un solo blocco se chunk_size è None, vedi blocchi_booking).
+   # Il modello di Fellegi-Sunter (STEP 6) dipende solo da quante coppie hanno ciascun pattern di accordo (fellegi_sunter.py):
+   # di ogni blocco si somma l'istogramma delle coppie sulla griglia delle soglie e si tengono solo le coppie con il titolo
+   # sopra la soglia più bassa, le sole che possono diventare match, e le righe di booking che vi compaiono.
+   istogramma = 0
+   coppie_sopra_soglia = []
+   booking_sopra_soglia = []
+   for blocco_booking in blocchi_booking(dataframe_booking, chunk_size):
+      # STEP 2, candidate pairs
+      # STEP 3, configurare metodo per il calcolo delle similarità (Jaro-Winkler vettoriale e altri campi, vedi confronto.py)
+      # STEP 4, calcolo similarità
+      with profilo.fase("STEP 0 proiezione", righe=len(blocco_booking)):
+         proiezione_booking = proiezione_linkage(blocco_booking, "booking", colonne_booking)
+      features = calcola_features(proiezione_booking, proiezione_agoda, indexer, confronti, n_jobs=n_jobs, cache=cache,
+                                  soglie=soglie_potatura, profilo=profilo)
+
+      with profilo.fase("STEP 5 livelli di accordo", coppie=len(features)):
+         istogramma = istogramma + istogramma_soglie(features, griglia)
+         sopra_soglia = features[features["name_similarity"] > min(soglie_titolo)]
+         coppie_sopra_soglia.append(sopra_soglia)
+         booking_sopra_soglia.append(blocco_booking.loc[sopra_soglia.index.unique(level=0), VARIABILI_BOOKING])
+         profilo.conta(coppie_sopra_soglia=len(sopra_soglia))
+
+   # Le similarità nuove sono scritte nella cache su disco una volta per esecuzione e non per blocco (vedi cache.py)
+   if cache is not None:
+      cache.scrivi()
+
+   with profilo.fase("STEP 5 livelli di accordo"):
+      features = pd.concat(coppie_sopra_soglia)
+      copia_booking = pd.concat(booking_sopra_soglia)
+
+   riepilogo = []
+   risultati = {}
+   for soglia_titolo in soglie_titolo:
+      for soglia_città in soglie_città:
+         # STEP 5
+         # Livelli di accordo per Fellegi-Sunter.
+         # Il modello classico si basa su variabili binarie che indicano se un certo campo supera una soglia di somiglianza:
+         # di default titolo e città sono binarizzati con le soglie scelte (stesso modello di recordlinkage.ECMClassifier()).
+         # Con livelli=LIVELLI_FELLEGI_SUNTER ogni similarità è divisa in più livelli (3-4) dalla sua soglia e dalle soglie di 'livelli'
+         # (es. titolo <= 0.9, 0.9-0.95, 0.95-0.97, > 0.97), così un titolo quasi identico pesa più di uno appena sopra soglia;
+         # i livelli fissi però possono prevalere sulla soglia scelta (es. con 0.97 soglie del titolo tra 0.9 e 0.97 danno gli stessi match).
+         with profilo.fase("STEP 5 livelli di accordo"):
+            tagli = [np.unique(np.append(soglia, livelli.get(nome, ())))
+                     for nome, soglia in zip(confronti, (soglia_titolo, soglia_città, *[()] * (len(confronti) - 2)))]
+            posizioni = [np.searchsorted(g, t) for g, t in zip(griglia, tagli)]
+            conteggi = riduci_istogramma(istogramma, posizioni)
+
+         # STEP 6 Classificare tramite EM (Fellegi-Sunter) e trovare match.
+         # em_livelli stima il modello sulla tabella dei pattern di accordo (un conteggio per pattern distinto, non una riga per coppia);
+         # pesi e probabilità di match tornano alle coppie con un lookup vettoriale nella tabella (pesi_coppie).
+         with profilo.fase("STEP 6 Fellegi-Sunter", coppie=len(features)):
+            modello = em_livelli(conteggi)
+            sotto_soglia = slice(0, np.searchsorted(tagli[0], soglia_titolo) + 1)
+            if ((modello["probabilita_match"][sotto_soglia] > 0.5) & (conteggi[sotto_soglia] > 0)).any():
+               warnings.warn("Il modello di Fellegi-Sunter classifica come match coppie con titolo sotto soglia: "
+                             "queste coppie non sono conservate e non compaiono nei risultati.")
+            pesi = pesi_coppie(livelli_accordo(features, tagli), modello)
+            matches = ((features["name_similarity"].to_numpy() > soglia_titolo)
+                       & (pesi["probabilita_match"].to_numpy() > 0.5))
+
+            # Score: probabilità a posteriori di match del pattern della coppia (al posto della media delle similarità).
+            # Le coppie con lo stesso pattern hanno la stessa probabilità: la media delle similarità decide solo a parità di score.
+            scores_df = pd.DataFrame({'index_booking': features.index.get_level_values(0)[matches],
+                                      'index_agoda': features.index.get_level_values(1)[matches],
+                                      'score': pesi["probabilita_match"].to_numpy()[matches],
+                                      'peso': pesi["peso"].to_numpy()[matches],
+                                      'similarita_media': np.nanmean(features.to_numpy()[matches], axis=1)})
+            profilo.conta(coppie_classificate_match=int(matches.sum()))
+
+         # Risoluzione dei match multipli (ex step A-D, vedi assegnazione.py): ogni location resta con un solo match,
+         # quello con score migliore ('greedy') oppure quello che massimizza la somma degli score ('ottimo').
+         with profilo.fase("STEP A-D assegnazione 1:1", coppie=len(scores_df)):
+            match = assegna_uno_a_uno(scores_df, 'score', metodo=assegnazione, spareggio='similarita_media')
+
+         # STEP 7, aggiungere informazioni utili ai risultati
+         # Estrarre gli score della città e del titolo per poi aggiungerli al dataset finale (join sul MultiIndex delle coppie)
+         with profilo.fase("STEP 7 informazioni", match=len(match)):
+            match = match.join(features, on=['index_booking', 'index_agoda'])
+            risultati[(soglia_titolo, soglia_città)] = aggiungi_informazioni(match, copia_booking, dataframe_agoda,
+                                                                            ['score', 'peso', *confronti])
+         riepilogo.append({'soglia_titolo': soglia_titolo, 'soglia_città': soglia_città,
+                           'coppie_classificate_match': int(matches.sum()),
+                           'match': len(risultati[(soglia_titolo, soglia_città)])})
+
+   return pd.DataFrame(riepilogo), risultati
+
+
+def record_linkage_title(copia_agoda : pd.DataFrame,
+                         copia_booking : pd.DataFrame,
+                         soglia : float,
+                         blocking = "first_letter",
+                         assegnazione : str = "greedy",
+                         chunk_size : int = None,
+                         n_jobs : int = 1,
+                         cache = None,
+                         confronti : dict = None,
+                         potatura : bool = True,
+                         profilo = None) -> pd.DataFrame:
+   """Funzione per praticare il record linkage tra due dataframe, selezione tramite threshold. 
+      Non si tratta di una vera e propria funzione in quanto i parametri sono molti e non tutti selezionabili, è solo un modo per risparmiare codice e rendere tutto più chiaro e semplice.
+      Input:
+         - Dataframe1;
+         - Dataframe2;
+         - Soglia (threshold);
+         - blocking (opzionale), strategia di blocking, vedi crea_indexer(). Di default la prima lettera del titolo;
+         - assegnazione (opzionale), risoluzione dei match multipli, 'greedy' oppure 'ottimo', vedi assegnazione.py;
+         - chunk_size (opzionale), modalità streaming: booking è confrontato a blocchi di chunk_size righe e di ogni blocco
+           si tengono solo le coppie sopra soglia. Booking può essere anche un iteratore di dataframe, vedi blocchi_booking();
+         - n_jobs (opzionale), numero di processi per il calcolo delle similarità (-1 tutti i core), vedi parallelo.py;
+         - cache (opzionale), CacheSimilarita (cache.py): le similarità già calcolate in esecuzioni precedenti non sono ricalcolate;
+         - confronti (opzionale), similarità da calcolare, di default CONFRONTI_TITOLO (vedi confronto.confronta_campi());
+           i match sono decisi solo da 'name_similarity', le altre similarità sono aggiunte ai risultati;
+         - potatura (opzionale), se True (default) la similarità del titolo è calcolata solo per le coppie che possono
+           superare la soglia secondo un limite superiore (vedi confronto.jarowinkler_vettoriale()): stessi match, meno calcoli;
+         - profilo (opzionale), profilazione.Profilo che registra tempo, CPU, memoria e conteggi di ogni STEP,
+           vedi profilazione.py (anche senza profilo, con la variabile d'ambiente PROFILO_LINKAGE).
+         
+      Output:
+         - Restituisce un dataframe con i risultati.
+      Per provare più soglie senza ripetere blocking e confronti usare sweep().
+   """
+   with profilo_esecuzione(profilo, "record_linkage_title") as profilo:
+      _, risultati = _linkage_title(copia_agoda, copia_booking, [soglia], blocking=blocking, assegnazione=assegnazione,
+                                    chunk_size=chunk_size, n_jobs=n_jobs, cache=cache, confronti=confronti,
+                                    potatura=potatura, profilo=profilo)
+   return risultati[soglia]
+
+
 def record_linkage_city_title(dataframe_booking : pd.DataFrame,
                               dataframe_agoda : pd.DataFrame,
                               soglia_titolo : float,
-                              soglia_città : float
+                              soglia_città : float,
+                              blocking = "first_letter",
+                              assegnazione : str = "greedy",
+                              livelli : dict = None,
+                              chunk_size : int = None,
+                              n_jobs : int = 1,
+                              cache = None,
+                              confronti : dict = None,
+                              potatura : bool = True,
+                              profilo = None
                               ) -> pd.DataFrame:
    """Funzione per praticare il record linkage tra due dataframe. 
-      Utilizza il metodo: 'Fellegi-Sunter'.
+      Utilizza il metodo: 'Fellegi-Sunter' (fellegi_sunter.em_livelli), binario oppure con più livelli di accordo per ogni similarità.
       Input:
          - Dataframe1;
          - Dataframe2;
-         - Soglia (threshold).
+         - Soglia del titolo e soglia della città (threshold) per i livelli di accordo delle similarità;
+           solo le coppie con il titolo sopra soglia possono essere match;
+         - blocking (opzionale), strategia di blocking, vedi crea_indexer(). Di default la prima lettera del titolo;
+         - assegnazione (opzionale), risoluzione dei match multipli, 'greedy' oppure 'ottimo', vedi assegnazione.py;
+         - livelli (opzionale), dizionario similarità -> soglie aggiuntive dei livelli di accordo. Di default titolo e città
+           sono solo binarizzati con le due soglie (come recordlinkage.ECMClassifier()) e le altre similarità dei confronti
+           hanno i livelli di LIVELLI_FELLEGI_SUNTER; con livelli=LIVELLI_FELLEGI_SUNTER il modello a più livelli;
+         - chunk_size (opzionale), modalità streaming: booking è confrontato a blocchi di chunk_size righe e di ogni blocco
+           si tengono solo le coppie sopra soglia. Booking può essere anche un iteratore di dataframe, vedi blocchi_booking();
+         - n_jobs (opzionale), numero di processi per il calcolo delle similarità (-1 tutti i core), vedi parallelo.py;
+         - cache (opzionale), CacheSimilarita (cache.py): le similarità già calcolate in esecuzioni precedenti non sono ricalcolate;
+         - confronti (opzionale), similarità del modello, di default CONFRONTI_CITY_TITLE (titolo e città);
+           con CONFRONTI_MULTICAMPO anche zona, distanza dal centro, prezzo e voto, calcolati in un solo passaggio
+           (vedi confronto.confronta_campi()). Le similarità oltre a titolo e città hanno i livelli di 'livelli';
+         - potatura (opzionale), se True (default) la similarità del titolo è calcolata solo per le coppie che possono
+           superare il livello più basso del titolo, vedi confronto.jarowinkler_vettoriale(): stessi match, meno calcoli;
+         - profilo (opzionale), profilazione.Profilo che registra tempo, CPU, memoria e conteggi di ogni STEP,
+           vedi profilazione.py (anche senza profilo, con la variabile d'ambiente PROFILO_LINKAGE).
          
       Output:
-         - Restituisce un dataframe con i risultati.
+         - Restituisce un dataframe con i risultati: 'score' è la probabilità di match stimata dal modello e 'peso'
+           il peso di match del pattern di accordo della coppia.
+      Per provare più soglie senza ripetere blocking e confronti usare sweep().
    """
-   copia_booking = dataframe_booking.copy()
-   copia_agoda = dataframe_agoda.copy()
-
-   # Aggiungere le colonne ID: 
-   copia_booking['id_booking'] = copia_booking.index
-   copia_agoda['id_agoda'] = copia_agoda.index
-
-   copia_booking = copia_booking.rename(columns={"titolo_processed":"titolo_booking"})
-   copia_agoda = copia_agoda.rename(columns={"titolo_processed":"titolo_agoda"})
-
-   # Blocking sulla prima lettera (Il blocking sulla prima lettera è una tecnica di record linkage usata per ridurre il numero di confronti tra record che devono essere effettuati.)
-   #  Nel record linkage, si confrontano record da due (o più) set di dati per trovare duplicati o corrispondenze. Confrontare ogni record con tutti gli altri è computazionalmente costoso, soprattutto con set grandi complessità. 
-   # Il blocking serve a limitare i confronti a gruppi più piccoli di record che condividono una certa caratteristica.
-   # Il blocking sulla prima lettera: significa che i record vengono suddivisi in blocchi in base alla prima lettera di un campo di testo, per esempio un cognome, un nome o un indirizzo. Solo i record che iniziano con la stessa lettera vengono poi confrontati tra loro.
-   copia_booking['first_letter'] = copia_booking['titolo_booking'].str[0]
-   copia_agoda['first_letter'] = copia_agoda['titolo_agoda'].str[0]
-   copia_agoda.head(1)
-
-   # STEP 0, impostare i threshold/soglie
-   soglia_titolo = 0.95
-   soglia_città = 0.9
-
-   # STEP 1, strategia di blocking
-   indexer = recordlinkage.Index()
-   indexer.block('first_letter')
-
-
-   # STEP 2, candidate pairs
-   candidate_links = indexer.index(copia_booking, copia_agoda)
-
-
-   # STEP 3, configurare metodo per il calcolo delle similarità
-   compare = recordlinkage.Compare()
-   compare.string('titolo_booking', 'titolo_agoda', method='jarowinkler', label='name_similarity')
-   compare.string('città', 'città', method='jarowinkler', label='città_similarity')
-
-   # STEP 4, calcolo similarità
-   features = compare.compute(candidate_links, copia_booking, copia_agoda)
-
-
-   # STEP 5 
-   # Binarizzazione per Fellegi-Sunter (lascia più margine)
-   # Il modello si basa su variabili binarie che indicano se un certo campo matcha (coincide) o meno — o almeno supera una certa soglia di somiglianza.
-   # Il modello Fellegi-Sunter lavora meglio (o richiede) variabili binarie:
-   # Invece di usare direttamente la similarità continua (es. 0.96, 0.87...), si trasforma in vero/falso in base a una soglia ritenuta significativa.
-   # Questo semplifica il calcolo delle probabilità di match e non-match, che nel modello sono basate su matrici di confusione binarie (es. probabilità che name_similarity=True dato che è un match vs. non match).
-   features_bin = features.copy()
-   features_bin["name_similarity"] = features_bin["name_similarity"] > soglia_titolo
-   features_bin["città_similarity"] = features_bin["città_similarity"] > soglia_città
-
-   # STEP 6 Classificare tramite  ECMClassifier (Fellegi-Sunter) e trovare match.
-   fs = recordlinkage.ECMClassifier() # Definire il classificatore
-   fs.fit(features_bin)               # Train classificatore
-   matches = fs.predict(features_bin) # Ottenere i match
-
-   # calcola punteggio medio come proxy (media delle similarità)
-   scores = features.loc[list(matches)].mean(axis=1)
-
-   # Creare un dataframe con gli scores e rinominare le variabili
-   scores_df = scores.reset_index()
-   scores_df.columns = ['index_booking', 'index_agoda', 'score'] # Siccome l'ordine di confronto era booking e poi agoda, il primo indice è quello di booking, segue l'index di agoda e lo score
-
-
-   # Negli step successivi:
-   # A. Eliminati tutti gli index che hanno più di un match
-   # B. Selezionato solo l'index booking duplicato con score maggiore, a parità presi entrambi
-   # C. Selezionato solo l'index agoda duplicato con score maggiore, a parità presi entrambi
-   # Ha senso siccome si sta facendo selezione con jarowinkler????
-   match = scores_df.copy()
-
-   # A. Prendere solo il match migliore per ogni location, non ha senso prendere la seconda opzione.
-   match = scores_df.drop_duplicates(subset='index_booking', keep=False)
-   match = match.drop_duplicates(subset='index_agoda', keep=False)
-
-   # B.
-   # Filtra solo i duplicati su index_booking
-   dups = scores_df[scores_df.duplicated(subset='index_booking', keep=False)]
-
-   # Raggruppa per index_booking e seleziona il massimo score
-   booking_best_match = dups.groupby('index_booking', group_keys=False).apply(
-      lambda row: row[row['score'] == row['score'].max()]
-   )
-
-   # C.
-   # Filtra solo i duplicati su index_agoda
-   dups = scores_df[scores_df.duplicated(subset='index_agoda', keep=False)]
-   # Raggruppa per index_booking e seleziona il massimo score
-   agoda_best_match = dups.groupby('index_agoda', group_keys=False).apply(
-      lambda row: row[row['score'] == row['score'].max()]
-   )
-
-   # D.
-   agoda_best_match["pair"] = agoda_best_match['index_booking'].astype(str) + '#' + agoda_best_match['index_agoda'].astype(str)
-   booking_best_match["pair"] = booking_best_match['index_booking'].astype(str) + '#' + booking_best_match['index_agoda'].astype(str)
-   match = pd.concat([match,booking_best_match])
-   match = pd.concat([match,agoda_best_match])
-
-
-
-   # STEP 7, aggiungere informazioni utili ai risultati
-   match['pair'] = match['index_booking'].astype(str) + '#' + match['index_agoda'].astype(str)
-
-   # Lista delle variabili da inserire nel dataset finale dei match. 
-   # Evito di inserie numero di notti e persone perchè è lo stesso per entrambi i dataset. E quindi si prende direttamente dall'ultimo dataset
-   variabili_comuni = ["titolo","zona","città","distanza_centro","prezzo", 
-                     'recensione_voto_numerico','recensione_voto_parola','numero_recensioni'] 
-
-   # Unire il dataframe dei match con il dataframe booking. Prendere solo le informazioni delle accomodation in comune.
-   match = pd.merge(match, # Dataframe left
-                  dataframe_booking[variabili_comuni], # Dataframe right
-                  left_on="index_booking",   # Il dataframe left (match) ha come indice per il merge la variabile 'index_booking'
-                  right_index=True # Il dataframe right (booking) ha come indice per il merge l'index.
-                  ) 
-
-   variabili_comuni.extend(['numero_notti', 'numero_persone', 'inizio_permanenza', 'fine_permanenza']) # Ora posso aggiungere le variabili comuni.
-   match =  pd.merge(match, # Dataframe left
-                  dataframe_agoda[variabili_comuni], # Dataframe right
-                  left_on="index_agoda", # Il dataframe left (match) ha come indice per il merge la variabile 'index_booking'
-                  right_index=True, # Il dataframe right (booking) ha come indice per il merge l'index.
-                  suffixes=("_booking","_agoda") # Le variabili che avranno nome uguali in left e right avranno suffisso 'booking' in left e suffisso 'agoda' in right
-                  ) 
-
-   # Estrarre gli score della città e del titolo per poi aggiungerli al dataset finale
-   single_scores = features.reset_index()
-   single_scores["pair"] = single_scores["level_0"].astype(str) + '#' + single_scores["level_1"].astype(str)
-   match = pd.merge(match,single_scores,on="pair")
-
-                                                                        
-   # Ordinare le colonne per una visualizzazione dei dati migliore.
-   match = match[[ 'pair','score','name_similarity','città_similarity',
-                  'titolo_booking', 'titolo_agoda',
-                  'zona_booking','zona_agoda',
-                  'città_booking', 'città_agoda',
-                  'prezzo_booking', 'prezzo_agoda', 
-                  'index_booking', 'index_agoda',
-                  'distanza_centro_booking', 'distanza_centro_agoda',
-                  'recensione_voto_numerico_booking', 'recensione_voto_numerico_agoda',
-                  'recensione_voto_parola_booking',    'recensione_voto_parola_agoda',
-                  'numero_recensioni_booking','numero_recensioni_agoda',
-                  'numero_notti', 'numero_persone', 'inizio_permanenza', 'fine_permanenza', 
-               ]]
-
-   match.drop_duplicates(inplace=True) # Rimuovere righe duplicate
-   return match
\ No newline at end of file
+   with profilo_esecuzione(profilo, "record_linkage_city_title") as profilo:
+      _, risultati = _linkage_city_title(dataframe_booking, dataframe_agoda, [soglia_titolo], [soglia_città],
+                                         blocking=blocking, assegnazione=assegnazione, livelli=livelli,
+                                         chunk_size=chunk_size, n_jobs=n_jobs, cache=cache, confronti=confronti,
+                                         potatura=potatura, profilo=profilo)
+   return risultati[(soglia_titolo, soglia_città)]
+
+
+def sweep(dataframe_booking : pd.DataFrame,
+          dataframe_agoda : pd.DataFrame,
+          soglie_titolo : list,
+          soglie_città : list = None,
+          blocking = "first_letter",
+          assegnazione : str = "greedy",
+          livelli : dict = None,
+          chunk_size : int = None,
+          n_jobs : int = 1,
+          cache = None,
+          confronti : dict = None,
+          potatura : bool = True,
+          profilo = None) -> dict:
+   """Funzione per provare più soglie in una sola esecuzione: blocking e similarità sono calcolati una sola volta.
+      - Senza soglie_città equivale a record_linkage_title per ogni soglia del titolo;
+      - Con soglie_città equivale a record_linkage_city_title per ogni combinazione (soglia_titolo, soglia_città).
+      Input:
+         - Dataframe booking;
+         - Dataframe agoda;
+         - soglie_titolo, lista di soglie per la similarità del titolo;
+         - soglie_città (opzionale), lista di soglie per la similarità della città;
+         - blocking, assegnazione, livelli, chunk_size, n_jobs, cache, confronti, potatura, profilo (opzionali), come nelle funzioni di record linkage
+           (livelli solo con soglie_città).
+      Output:
+         - dizionario con:
+            - 'riepilogo', dataframe con una riga per soglia (o combinazione di soglie) e il numero di coppie e di match;
+            - 'match', dizionario soglia (o tupla (soglia_titolo, soglia_città)) -> dataframe dei match.
+   """
+   with profilo_esecuzione(profilo, "sweep") as profilo:
+      if soglie_città is None:
+         riepilogo, risultati = _linkage_title(dataframe_agoda, dataframe_booking, soglie_titolo, blocking=blocking,
+                                               assegnazione=assegnazione, chunk_size=chunk_size, n_jobs=n_jobs, cache=cache,
+                                               confronti=confronti, potatura=potatura, profilo=profilo)
+      else:
+         riepilogo, risultati = _linkage_city_title(dataframe_booking, dataframe_agoda, soglie_titolo, soglie_città,
+                                                    blocking=blocking, assegnazione=assegnazione, livelli=livelli,
+                                                    chunk_size=chunk_size, n_jobs=n_jobs, cache=cache, confronti=confronti,
+                                                    potatura=potatura, profilo=profilo)
+   return {"riepilogo": riepilogo, "match": risultati}
@@ -0,0 +1,283 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from assegnazione import assegna_uno_a_uno
+from blocking import IndiceInvertito, tokenizza
+from cache import hash_stringhe
+from confronto import jarowinkler_vettoriale
+from funzioni import aggiungi_informazioni
+
+
+#%%% Chiavi dei record
+
+def chiavi_record(df: pd.DataFrame, colonne: tuple = ("titolo", "zona", "città")) -> np.ndarray:
+   """Funzione che assegna ad ogni location una chiave int64 stabile tra uno scraping e l'altro:
+      hash (blake2b, vedi cache.hash_stringhe) di titolo, zona e città. Le location con gli stessi valori
+      sono distinte dal numero di occorrenza (0 per la prima, 1 per la seconda, ...), nell'ordine del dataframe.
+      Output:
+         - array int64, una chiave per riga di df.
+   """
+   testo = df[colonne[0]].astype(str)
+   for colonna in colonne[1:]:
+      testo = testo + "\x1f" + df[colonna].astype(str)
+   occorrenza = testo.groupby(testo).cumcount().astype(str)
+   return hash_stringhe((testo + "\x1f" + occorrenza).to_numpy()).view(np.int64)
+
+#%%%
+
+
+#%%% Archivio del record linkage incrementale
+
+class ArchivioLinkage:
+   """Record linkage sul titolo (come record_linkage_title) incrementale: l'archivio conserva lo stato dell'ultima esecuzione
+      e ad ogni nuovo scraping confronta solo le location inserite o modificate.
+      Nell'archivio (un unico file .npz, sostituito in blocco ad ogni aggiornamento) ci sono:
+         - le location di booking e agoda, chiave (vedi chiavi_record) e hash del titolo processato;
+         - l'indice invertito sui token dei titoli (vocabolario e posting list chiave -> token), vedi IndiceInvertito;
+         - le coppie con similarità sopra soglia e i match 1:1 accettati, come coppie di chiavi.
+      Ad ogni aggiornamento:
+         1. una location è inserita se la sua chiave è nuova, modificata se il titolo processato è cambiato, rimossa se non c'è più;
+         2. i token delle location inserite e modificate sono aggiunti all'indice, quelli delle rimosse eliminati;
+         3. si generano le coppie candidate con la regola di IndiceInvertito sulle frequenze dell'indice aggiornato
+            (location cambiate di booking x tutto agoda, booking invariato x location cambiate di agoda) e si calcola la
+            similarità solo per queste. Sono cambiate anche le location invariate i cui token rari cambiano con le nuove frequenze;
+         4. l'assegnazione 1:1 è ricalcolata solo nelle componenti connesse (grafo delle coppie sopra soglia) toccate da una modifica:
+            greedy e ottimo sono indipendenti tra componenti, le altre componenti tengono i match salvati.
+      Il risultato è lo stesso di record_linkage_title (con lo stesso blocking, es. blocking='token', e chunk_size None) sugli stessi dataframe,
+      a meno dell'ordine delle righe e delle scelte tra coppie con score identico nelle componenti non ricalcolate
+      (con 'ottimo' tra più assegnazioni con la stessa somma degli score).
+      Uso:
+         archivio = ArchivioLinkage(paths['path_results'] / 'archivio_linkage', soglia=0.95)
+         match = archivio.aggiorna(booking, agoda)
+         archivio.ultimo_aggiornamento
+   """
+
+   _FILE = "archivio.npz"
+
+   def __init__(self, path, soglia: float, blocking="token", assegnazione: str = "greedy"):
+      self.path = Path(path)
+      self.path.mkdir(parents=True, exist_ok=True)
+      if isinstance(blocking, str):
+         if blocking not in ("token", "qgram"):
+            raise ValueError("Il record linkage incrementale supporta solo il blocking 'token', 'qgram' o un IndiceInvertito.")
+         blocking = IndiceInvertito("titolo_booking", "titolo_agoda", modalita=blocking)
+      elif not isinstance(blocking, IndiceInvertito):
+         raise ValueError("Il record linkage incrementale supporta solo il blocking 'token', 'qgram' o un IndiceInvertito.")
+      self.indice = blocking
+      self.parametri = {"soglia": float(soglia), "assegnazione": assegnazione, "modalita": blocking.modalita,
+                        "q": blocking.q, "min_token_comuni": blocking.min_token_comuni,
+                        "max_blocco": blocking.max_blocco, "min_idf": blocking.min_idf}
+      self.ultimo_aggiornamento = None
+      self._apri()
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} path={str(self.path)!r}, soglia={self.parametri['soglia']}, match={len(self.stato['match_booking'])}>"
+
+   def _apri(self) -> None:
+      """Legge l'archivio, o crea uno stato vuoto. Un archivio creato con altri parametri non può essere aggiornato."""
+      file = self.path / self._FILE
+      if not file.exists():
+         vuoto = np.empty(0, np.int64)
+         self.stato = {"vocabolario": np.empty(0, dtype="<U1"), "coppie_similarita": np.empty(0, np.float64)}
+         for nome in ("booking_chiavi", "booking_firme", "agoda_chiavi", "agoda_firme", "coppie_booking", "coppie_agoda",
+                      "match_booking", "match_agoda"):
+            self.stato[nome] = vuoto
+         for lato in ("booking", "agoda"):
+            self.stato[f"posting_{lato}"] = np.empty((0, 2), np.int64)
+         return
+
+      with np.load(file) as dati:
+         self.stato = {nome: dati[nome] for nome in dati.files if nome != "parametri"}
+         parametri = json.loads(str(dati["parametri"]))
+      if parametri != self.parametri:
+         raise ValueError(f"L'archivio {file} è stato creato con parametri diversi ({parametri}): "
+                          "usare gli stessi parametri oppure ricostruirlo con azzera().")
+
+   def _scrivi(self, stato: dict) -> None:
+      """Scrive lo stato nell'archivio (prima su un file temporaneo, poi lo sostituisce)."""
+      temporaneo = self.path / "archivio.tmp.npz"
+      np.savez(temporaneo, parametri=np.array(json.dumps(self.parametri)), **stato)
+      os.replace(temporaneo, self.path / self._FILE)
+
+   def azzera(self) -> None:
+      """Elimina l'archivio: il prossimo aggiornamento ricalcola il record linkage da zero."""
+      (self.path / self._FILE).unlink(missing_ok=True)
+      self._apri()
+
+   def _rarita(self, posting_b: np.ndarray, posting_a: np.ndarray, n_vocabolario: int, n_record: int) -> tuple:
+      """Token rari e idf (regola di IndiceInvertito.token_rari) calcolati sulle frequenze delle posting list."""
+      frequenze_b = np.bincount(posting_b[:, 1], minlength=n_vocabolario)
+      frequenze_a = np.bincount(posting_a[:, 1], minlength=n_vocabolario)
+      with np.errstate(divide="ignore", invalid="ignore"):
+         idf = np.log(n_record / (frequenze_b + frequenze_a))
+      rari = (frequenze_b * frequenze_a <= self.indice.max_blocco) & (idf >= self.indice.min_idf)
+      return rari, idf, frequenze_b, frequenze_a
+
+   @staticmethod
+   def _posting_filtrate(posting: np.ndarray, chiavi: np.ndarray, rari: np.ndarray, idf: np.ndarray) -> pd.DataFrame:
+      """Posting list delle sole location 'chiavi', filtrate sui token rari come in IndiceInvertito."""
+      posting = posting[np.isin(posting[:, 0], chiavi)]
+      return IndiceInvertito._filtra_rari(pd.DataFrame({"record": posting[:, 0], "token": posting[:, 1]}), rari, idf)
+
+   def _candidate(self, posting_x: np.ndarray, chiavi_x: np.ndarray, posting_y: np.ndarray, chiavi_y: np.ndarray,
+                  rari: np.ndarray, idf: np.ndarray) -> tuple:
+      """Coppie candidate (come IndiceInvertito._link_index) tra le location 'chiavi_x' di un lato e 'chiavi_y' dell'altro.
+         Dell'altro lato si filtrano solo le location che hanno almeno un token in comune con chiavi_x.
+         Output:
+            - array delle chiavi x e array delle chiavi y di ogni coppia.
+      """
+      filtrate_x = self._posting_filtrate(posting_x, chiavi_x, rari, idf)
+      chiavi_y = np.intersect1d(chiavi_y, posting_y[np.isin(posting_y[:, 1], filtrate_x["token"].to_numpy()), 0])
+      filtrate_y = self._posting_filtrate(posting_y, chiavi_y, rari, idf)
+      comuni = filtrate_x.merge(filtrate_y, on="token", suffixes=("_x", "_y")).groupby(["record_x", "record_y"]).size()
+      comuni = comuni[comuni >= self.indice.min_token_comuni]
+      return comuni.index.get_level_values(0).to_numpy(np.int64), comuni.index.get_level_values(1).to_numpy(np.int64)
+
+   def _sporche(self, posting: np.ndarray, escluse: np.ndarray, token: np.ndarray, vecchie: tuple, nuove: tuple) -> np.ndarray:
+      """Location (non in 'escluse') con un token in 'token' i cui token tenuti da IndiceInvertito cambiano
+         passando dalla rarità 'vecchie' (rari, idf) a quella 'nuove': le loro coppie candidate vanno ricalcolate."""
+      chiavi = np.setdiff1d(posting[np.isin(posting[:, 1], token), 0], escluse)
+      prima = self._posting_filtrate(posting, chiavi, *vecchie)
+      dopo = self._posting_filtrate(posting, chiavi, *nuove)
+      prima = pd.MultiIndex.from_frame(prima)
+      dopo = pd.MultiIndex.from_frame(dopo)
+      return np.union1d(prima[~prima.isin(dopo)].get_level_values(0), dopo[~dopo.isin(prima)].get_level_values(0)).astype(np.int64)
+
+   def aggiorna(self,
+                booking: pd.DataFrame,
+                agoda: pd.DataFrame,
+                n_jobs: int = 1,
+                cache=None) -> pd.DataFrame:
+      """Funzione che aggiorna l'archivio con un nuovo scraping e restituisce i match 1:1.
+         Input:
+            - booking, agoda, dataframe di 'Data Product' (colonne 'titolo', 'titolo_processed', 'zona', 'città', ...);
+            - n_jobs, cache (opzionali), vedi jarowinkler_vettoriale().
+         Output:
+            - dataframe dei match nello stesso formato di record_linkage_title.
+           In self.ultimo_aggiornamento il numero di location inserite, modificate, rimosse e sporche (vedi _sporche),
+           di coppie confrontate e di componenti riassegnate.
+      """
+      # Il nuovo stato è costruito su una copia (gli array sono sostituiti, mai modificati): self.stato cambia solo
+      # dopo la scrittura dell'archivio, così un errore durante l'aggiornamento lascia memoria e disco allineati
+      stato = dict(self.stato)
+      resoconto = {}
+
+      # 1. Location inserite, modificate e rimosse di ogni piattaforma
+      correnti, cambiate, eliminate = {}, {}, {}
+      n_record_prima = len(stato["booking_chiavi"]) + len(stato["agoda_chiavi"])
+      for lato, df in (("booking", booking), ("agoda", agoda)):
+         chiavi = chiavi_record(df)
+         titoli = df["titolo_processed"]
+         firme = hash_stringhe(titoli.fillna("").to_numpy()).view(np.int64)
+         posizioni = pd.Index(stato[f"{lato}_chiavi"]).get_indexer(chiavi)
+
+         inserite = posizioni < 0
+         modificate = ~inserite
+         modificate[modificate] = stato[f"{lato}_firme"][posizioni[modificate]] != firme[modificate]
+         cambiate[lato] = chiavi[inserite | modificate]
+         eliminate[lato] = np.concatenate([np.setdiff1d(stato[f"{lato}_chiavi"], chiavi), chiavi[modificate]])
+         correnti[lato] = pd.DataFrame({"titolo": titoli.to_numpy(), "index": df.index.to_numpy()}, index=chiavi)
+         stato[f"{lato}_chiavi"], stato[f"{lato}_firme"] = chiavi, firme
+         resoconto[f"{lato}_inserite"] = int(inserite.sum())
+         resoconto[f"{lato}_modificate"] = int(modificate.sum())
+         resoconto[f"{lato}_rimosse"] = len(eliminate[lato]) - int(modificate.sum())
+
+      # 2. Indice invertito: via i token delle location rimosse o modificate, dentro quelli delle inserite o modificate
+      posting_prima = {"booking": stato["posting_booking"], "agoda": stato["posting_agoda"]}
+      vocabolario = pd.Index(stato["vocabolario"])
+      for lato in ("booking", "agoda"):
+         posting = stato[f"posting_{lato}"]
+         posting = posting[~np.isin(posting[:, 0], eliminate[lato])]
+         token = tokenizza(correnti[lato].loc[cambiate[lato], "titolo"], self.indice.modalita, self.indice.q)
+         codici = vocabolario.get_indexer(token.to_numpy())
+         nuovi = pd.unique(token.to_numpy()[codici < 0])
+         if len(nuovi):
+            vocabolario = vocabolario.append(pd.Index(nuovi))
+            codici = vocabolario.get_indexer(token.to_numpy())
+         stato[f"posting_{lato}"] = np.concatenate([posting, np.column_stack([token.index.to_numpy(np.int64), codici])])
+      stato["vocabolario"] = vocabolario.to_numpy(dtype=str)
+
+      # 3. Coppie candidate: regola di IndiceInvertito (token rari) con le frequenze dell'indice aggiornato.
+      # Le frequenze cambiano anche la rarità dei token delle location invariate: le location i cui token tenuti cambiano
+      # sono "sporche", le loro coppie sono ricalcolate come quelle delle location inserite o modificate.
+      posting_b, posting_a = stato["posting_booking"], stato["posting_agoda"]
+      rari, idf, frequenze_b, frequenze_a = self._rarita(posting_b, posting_a, len(vocabolario), len(booking) + len(agoda))
+      rari_prima, idf_prima, frequenze_b_prima, frequenze_a_prima = self._rarita(
+         posting_prima["booking"], posting_prima["agoda"], len(vocabolario), n_record_prima)
+      token_cambiati = np.flatnonzero((frequenze_b != frequenze_b_prima) | (frequenze_a != frequenze_a_prima) | (rari != rari_prima))
+      for lato, posting in (("booking", posting_b), ("agoda", posting_a)):
+         sporche = self._sporche(posting, cambiate[lato], token_cambiati, (rari_prima, idf_prima), (rari, idf))
+         resoconto[f"{lato}_sporche"] = len(sporche)
+         cambiate[lato] = np.concatenate([cambiate[lato], sporche])
+         eliminate[lato] = np.concatenate([eliminate[lato], sporche])
+
+      # Location cambiate di booking x tutto agoda, location invariate di booking x location cambiate di agoda
+      invariate_b = np.setdiff1d(correnti["booking"].index.to_numpy(), cambiate["booking"])
+      candidate_b, candidate_a = self._candidate(posting_b, cambiate["booking"], posting_a, correnti["agoda"].index.to_numpy(), rari, idf)
+      altre_a, altre_b = self._candidate(posting_a, cambiate["agoda"], posting_b, invariate_b, rari, idf)
+      candidate_links = pd.MultiIndex.from_arrays([np.concatenate([candidate_b, altre_b]), np.concatenate([candidate_a, altre_a])])
+      resoconto["coppie_confrontate"] = len(candidate_links)
+
+      # Solo i titoli delle location nelle coppie candidate (jarowinkler_vettoriale codifica tutte le stringhe che riceve)
+      titoli_b = correnti["booking"].loc[candidate_links.get_level_values(0).unique(), "titolo"]
+      titoli_a = correnti["agoda"].loc[candidate_links.get_level_values(1).unique(), "titolo"]
+      similarita = jarowinkler_vettoriale(candidate_links, titoli_b, titoli_a,
+                                          n_jobs=n_jobs, cache=cache, soglia=self.parametri["soglia"])
+      if cache is not None:
+         cache.scrivi()
+      similarita = similarita[similarita > self.parametri["soglia"]]
+
+      # Coppie sopra soglia: via quelle con una location rimossa o modificata, dentro quelle nuove
+      tenute = ~(np.isin(stato["coppie_booking"], eliminate["booking"]) | np.isin(stato["coppie_agoda"], eliminate["agoda"]))
+      perse_b, perse_a = stato["coppie_booking"][~tenute], stato["coppie_agoda"][~tenute]
+      stato["coppie_booking"] = np.concatenate([stato["coppie_booking"][tenute], similarita.index.get_level_values(0).to_numpy(np.int64)])
+      stato["coppie_agoda"] = np.concatenate([stato["coppie_agoda"][tenute], similarita.index.get_level_values(1).to_numpy(np.int64)])
+      stato["coppie_similarita"] = np.concatenate([stato["coppie_similarita"][tenute], similarita.to_numpy()])
+
+      # 4. Assegnazione 1:1 solo nelle componenti toccate: con una coppia nuova, o con una location che ha perso una coppia
+      coppie_b, coppie_a = stato["coppie_booking"], stato["coppie_agoda"]
+      codici_b, uniche_b = pd.factorize(coppie_b)
+      codici_a, uniche_a = pd.factorize(coppie_a)
+      grafo = coo_matrix((np.ones(len(coppie_b)), (codici_b, codici_a + len(uniche_b))), shape=(len(uniche_b) + len(uniche_a),) * 2)
+      _, componente_nodo = connected_components(grafo, directed=False)
+      componente = componente_nodo[codici_b]
+
+      nuove = np.zeros(len(coppie_b), dtype=bool)
+      nuove[int(tenute.sum()):] = True
+      toccate_b = np.isin(coppie_b, np.concatenate([perse_b, cambiate["booking"]]))
+      toccate_a = np.isin(coppie_a, np.concatenate([perse_a, cambiate["agoda"]]))
+      da_riassegnare = np.isin(componente, componente[nuove | toccate_b | toccate_a])
+      resoconto["componenti_riassegnate"] = len(np.unique(componente[da_riassegnare]))
+
+      # I match salvati restano validi solo nelle componenti non toccate (le loro location e coppie sono invariate)
+      chiave_coppia = pd.MultiIndex.from_arrays([coppie_b, coppie_a])
+      salvati = chiave_coppia.isin(pd.MultiIndex.from_arrays([stato["match_booking"], stato["match_agoda"]])) & ~da_riassegnare
+
+      scores_df = pd.DataFrame({"chiave_booking": coppie_b[da_riassegnare], "chiave_agoda": coppie_a[da_riassegnare],
+                                "index_booking": correnti["booking"].loc[coppie_b[da_riassegnare], "index"].to_numpy(),
+                                "index_agoda": correnti["agoda"].loc[coppie_a[da_riassegnare], "index"].to_numpy(),
+                                "name_similarity": stato["coppie_similarita"][da_riassegnare]})
+      riassegnati = assegna_uno_a_uno(scores_df, "name_similarity", metodo=self.parametri["assegnazione"])
+      stato["match_booking"] = np.concatenate([coppie_b[salvati], riassegnati["chiave_booking"].to_numpy(np.int64)])
+      stato["match_agoda"] = np.concatenate([coppie_a[salvati], riassegnati["chiave_agoda"].to_numpy(np.int64)])
+      resoconto["match"] = len(stato["match_booking"])
+
+      self._scrivi(stato)
+      self.stato = stato
+      self.ultimo_aggiornamento = resoconto
+
+      # Match con le informazioni di booking e agoda, come record_linkage_title
+      posizioni = chiave_coppia.get_indexer(pd.MultiIndex.from_arrays([stato["match_booking"], stato["match_agoda"]]))
+      match = pd.DataFrame({"index_booking": correnti["booking"].loc[stato["match_booking"], "index"].to_numpy(),
+                            "index_agoda": correnti["agoda"].loc[stato["match_agoda"], "index"].to_numpy(),
+                            "name_similarity": stato["coppie_similarita"][posizioni]})
+      match = match.sort_values(["index_booking", "index_agoda"])
+      return aggiungi_informazioni(match, booking, agoda, ["name_similarity"])
+
+#%%%
@@ -0,0 +1,221 @@
+"""Record linkage tra più piattaforme (booking, agoda, ...) in un solo passaggio.
+   Invece di un record linkage per ogni coppia di piattaforme e di una riconciliazione a mano dei risultati:
+      1. i record di tutte le piattaforme sono riuniti in un'unica proiezione compatta;
+      2. un solo indice invertito sui token rari dei titoli genera le coppie candidate tra piattaforme diverse
+         (blocking.IndiceInvertitoSorgenti): il costo cresce con il numero totale di record, non con le coppie di piattaforme;
+      3. la similarità Jaro-Winkler dei titoli è calcolata sulle coppie candidate (con la potatura sotto soglia);
+      4. le coppie sopra soglia sono unite in entità con le componenti connesse: un'entità ha al massimo un record
+         per piattaforma, le componenti con due record della stessa piattaforma sono divise con un union-find greedy
+         (collegamenti per similarità decrescente, accettati solo tra entità senza piattaforme in comune);
+      5. il risultato è una tabella larga: una riga per entità, index, titolo e prezzo di ogni piattaforma.
+   Con due piattaforme le entità sono i match di record_linkage_title con assegnazione greedy.
+   Uso:
+      entita = record_linkage_piattaforme({"booking": booking, "agoda": agoda, "expedia": expedia}, soglia=0.95)
+"""
+import numpy as np
+import pandas as pd
+import recordlinkage
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from blocking import IndiceInvertitoSorgenti
+from confronto import confronta_campi
+from profilazione import profilo_esecuzione
+
+
+#%%% Record di tutte le piattaforme
+
+def unisci_piattaforme(piattaforme: dict) -> pd.DataFrame:
+   """Funzione che riunisce i record di più piattaforme in un'unica proiezione compatta (come funzioni.proiezione_linkage).
+      Input:
+         - piattaforme, dizionario nome della piattaforma -> dataframe (colonna 'titolo_processed').
+      Output:
+         - dataframe con index 0..N-1 (posizione del record) e colonne 'sorgente' (categoria con i nomi delle piattaforme),
+           'record' (index del record nel suo dataframe) e 'titolo' (titolo processato, come categoria).
+   """
+   quanti = [len(df) for df in piattaforme.values()]
+   # Ogni titolo distinto è salvato una volta, anche se compare in più piattaforme
+   codici, titoli = pd.factorize(pd.concat([df["titolo_processed"].astype(object) for df in piattaforme.values()],
+                                           ignore_index=True))
+   return pd.DataFrame({
+      "sorgente": pd.Categorical.from_codes(np.repeat(np.arange(len(piattaforme)), quanti), list(piattaforme)),
+      "record": np.concatenate([df.index.to_numpy() for df in piattaforme.values()]),
+      "titolo": pd.Categorical.from_codes(codici, titoli),
+   })
+
+#%%%
+
+
+#%%% Entità: componenti connesse con al massimo un record per piattaforma
+
+def _union_find_vincolato(a: np.ndarray, b: np.ndarray, score: np.ndarray, sorgenti: np.ndarray) -> np.ndarray:
+   """Union-find greedy: i collegamenti (a, b) sono scorsi per score decrescente e uniscono due gruppi solo se
+      non hanno piattaforme in comune (insiemi di piattaforme come maschere di bit).
+      Output:
+         - per ogni record (0..len(sorgenti)-1) il rappresentante del suo gruppo."""
+   padre = list(range(len(sorgenti)))
+   piattaforme = [1 << int(s) for s in sorgenti]
+
+   def radice(x):
+      while padre[x] != x:
+         padre[x] = padre[padre[x]]
+         x = padre[x]
+      return x
+
+   # Per score decrescente, a parità di score per posizione dei record (come assegnazione.assegnazione_greedy)
+   for i in np.lexsort((b, a, -score)):
+      ra, rb = radice(a[i]), radice(b[i])
+      if ra != rb and not piattaforme[ra] & piattaforme[rb]:
+         padre[rb] = ra
+         piattaforme[ra] |= piattaforme[rb]
+   return np.array([radice(x) for x in range(len(sorgenti))], dtype=np.int64)
+
+
+def raggruppa_entita(a: np.ndarray, b: np.ndarray, score: np.ndarray, sorgenti: np.ndarray) -> np.ndarray:
+   """Funzione che unisce i record collegati in entità con al massimo un record per piattaforma.
+      Le componenti connesse del grafo dei collegamenti sono calcolate in blocco: quelle senza due record della stessa
+      piattaforma (quasi tutte) sono già entità; solo le altre passano dall'union-find greedy, che scorre i loro
+      collegamenti per score decrescente e rifiuta quelli che metterebbero due record della stessa piattaforma insieme.
+      Input:
+         - a, b, posizioni dei due record di ogni collegamento (coppia sopra soglia);
+         - score, similarità di ogni collegamento;
+         - sorgenti, codice della piattaforma di ogni record.
+      Output:
+         - array con il numero dell'entità di ogni record (0..numero di entità - 1, nell'ordine dei record).
+   """
+   n = len(sorgenti)
+   grafo = coo_matrix((np.ones(len(a)), (a, b)), shape=(n, n))
+   _, componente = connected_components(grafo, directed=False)
+
+   # Componenti con due record della stessa piattaforma
+   doppi = pd.DataFrame({"componente": componente, "sorgente": sorgenti}).duplicated().to_numpy()
+   in_conflitto = np.zeros(componente.max() + 1 if n else 0, dtype=bool)
+   in_conflitto[componente[doppi]] = True
+   if in_conflitto.any():
+      nodi = np.flatnonzero(in_conflitto[componente])
+      collegamenti = np.flatnonzero(in_conflitto[componente[a]])
+      locale = np.full(n, -1, dtype=np.int64)
+      locale[nodi] = np.arange(len(nodi))
+      rappresentante = _union_find_vincolato(locale[a[collegamenti]], locale[b[collegamenti]], score[collegamenti],
+                                             sorgenti[nodi])
+      # Nuovi numeri dopo quelli delle componenti: il rappresentante identifica il gruppo dentro la componente
+      componente = componente.copy()
+      componente[nodi] = componente.max() + 1 + nodi[rappresentante]
+   return pd.factorize(componente)[0]
+
+#%%%
+
+
+def tabella_entita(record: pd.DataFrame,
+                   entita: np.ndarray,
+                   piattaforme: dict,
+                   variabili: tuple,
+                   similarita: pd.Series,
+                   singoli: bool = False) -> pd.DataFrame:
+   """Funzione che crea la tabella larga delle entità: una riga per entità e, per ogni piattaforma,
+      'index_<piattaforma>' e le colonne '<variabile>_<piattaforma>' (es. 'prezzo_booking', 'prezzo_agoda', ...).
+      Input:
+         - record, entita, record di tutte le piattaforme (unisci_piattaforme) e numero dell'entità di ognuno;
+         - piattaforme, dizionario nome -> dataframe originale, da cui sono prese le variabili;
+         - variabili, colonne dei dataframe originali da riportare (le piattaforme senza la colonna hanno valori mancanti);
+         - similarita, similarità dei collegamenti sopra soglia (MultiIndex posizioni dei due record);
+         - singoli (opzionale), se True anche le entità con un solo record.
+      Output:
+         - dataframe con 'entita', 'numero_piattaforme' (numero di record), 'similarita_media' (dei collegamenti dentro l'entità)
+           e le colonne di ogni piattaforma.
+   """
+   dimensione = np.bincount(entita)
+   tenute = np.flatnonzero(dimensione >= (1 if singoli else 2))
+   a = similarita.index.get_level_values(0).to_numpy()
+   b = similarita.index.get_level_values(1).to_numpy()
+   interni = entita[a] == entita[b]
+   somma = np.bincount(entita[a[interni]], weights=similarita.to_numpy()[interni], minlength=len(dimensione))
+   numero = np.bincount(entita[a[interni]], minlength=len(dimensione))
+   with np.errstate(invalid="ignore"):
+      media = somma / numero
+
+   tabella = {"entita": tenute, "numero_piattaforme": dimensione[tenute], "similarita_media": media[tenute]}
+   posizione_entita = np.full(len(dimensione), -1)
+   posizione_entita[tenute] = np.arange(len(tenute))
+   sorgenti = record["sorgente"].cat.codes.to_numpy()
+   for codice, (nome, df) in enumerate(piattaforme.items()):
+      # Un record per piattaforma per entità: ogni record della piattaforma va in una riga diversa
+      propri = np.flatnonzero((sorgenti == codice) & (posizione_entita[entita] >= 0))
+      righe = pd.RangeIndex(len(tenute))
+      indici = record["record"].to_numpy()[propri]
+      tabella[f"index_{nome}"] = pd.Series(indici, index=posizione_entita[entita[propri]]).reindex(righe).astype("Int64")
+      posizioni = df.index.get_indexer(indici)
+      for variabile in variabili:
+         valori = df[variabile].to_numpy()[posizioni] if variabile in df.columns else np.full(len(propri), np.nan)
+         tabella[f"{variabile}_{nome}"] = pd.Series(valori, index=posizione_entita[entita[propri]]).reindex(righe)
+   return pd.DataFrame(tabella)
+
+
+def record_linkage_piattaforme(piattaforme: dict,
+                               soglia: float,
+                               blocking="token",
+                               variabili: tuple = ("titolo", "prezzo"),
+                               singoli: bool = False,
+                               n_jobs: int = 1,
+                               cache=None,
+                               potatura: bool = True,
+                               profilo=None) -> pd.DataFrame:
+   """Funzione per il record linkage sul titolo tra più piattaforme in un solo passaggio (vedi l'inizio del modulo).
+      Input:
+         - piattaforme, dizionario nome della piattaforma -> dataframe di 'Data Product' (almeno due piattaforme);
+         - soglia, le coppie con similarità del titolo sopra soglia sono collegate;
+         - blocking (opzionale), 'token' o 'qgram' (indice invertito sui token o q-grammi rari, vedi IndiceInvertitoSorgenti)
+           oppure un algoritmo di indexing di recordlinkage in modalità deduplicazione sulle colonne 'titolo' e 'sorgente';
+         - variabili (opzionale), colonne riportate per ogni piattaforma nella tabella delle entità;
+         - singoli (opzionale), se True la tabella contiene anche i record senza collegamenti;
+         - n_jobs, cache, potatura (opzionali), come in record_linkage_title;
+         - profilo (opzionale), profilazione.Profilo che registra tempo, CPU, memoria e conteggi di ogni STEP.
+      Output:
+         - dataframe delle entità, una riga per entità, vedi tabella_entita().
+   """
+   if len(piattaforme) < 2:
+      raise ValueError("Servono almeno due piattaforme.")
+   with profilo_esecuzione(profilo, "record_linkage_piattaforme") as profilo:
+      # STEP 0, proiezione compatta di tutti i record
+      with profilo.fase("STEP 0 proiezione", righe=sum(len(df) for df in piattaforme.values())):
+         record = unisci_piattaforme(piattaforme)
+
+      # STEP 1-2, un solo indice invertito per tutte le piattaforme: coppie candidate tra piattaforme diverse
+      with profilo.fase("STEP 1-2 coppie candidate"):
+         indexer = recordlinkage.Index()
+         if blocking in ("token", "qgram"):
+            indexer.add(IndiceInvertitoSorgenti("titolo", "sorgente", modalita=blocking))
+         elif isinstance(blocking, str):
+            raise ValueError("'blocking' deve essere 'token', 'qgram' oppure un algoritmo di indexing di recordlinkage.")
+         else:
+            indexer.add(blocking)
+         candidate_links = indexer.index(record)
+         profilo.conta(coppie=len(candidate_links))
+
+      # STEP 3-4, similarità dei titoli (stessa proiezione per i due record della coppia)
+      with profilo.fase("STEP 3-4 similarità", coppie=len(candidate_links)):
+         statistiche = {}
+         features = confronta_campi(candidate_links, record, record, {"name_similarity": ("titolo", "titolo")},
+                                    n_jobs=n_jobs, cache=cache, soglie={"name_similarity": soglia} if potatura else None,
+                                    statistiche=statistiche)
+         profilo.conta(**statistiche)
+         if cache is not None:
+            cache.scrivi()
+
+      # STEP 5, collegamenti: coppie sopra soglia
+      with profilo.fase("STEP 5 soglia", coppie=len(features)):
+         similarita = features["name_similarity"]
+         similarita = similarita[similarita > soglia]
+         profilo.conta(coppie_sopra_soglia=len(similarita))
+
+      # STEP 6, entità con al massimo un record per piattaforma
+      with profilo.fase("STEP 6 entità"):
+         entita = raggruppa_entita(similarita.index.get_level_values(0).to_numpy(),
+                                   similarita.index.get_level_values(1).to_numpy(),
+                                   similarita.to_numpy(), record["sorgente"].cat.codes.to_numpy())
+
+      # STEP 7, tabella larga delle entità
+      with profilo.fase("STEP 7 informazioni"):
+         tabella = tabella_entita(record, entita, piattaforme, variabili, similarita, singoli)
+         profilo.conta(entita=len(tabella))
+   return tabella
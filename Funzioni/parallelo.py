@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+#%%% Numero di processi
+
+def numero_processi(n_jobs: int = 1) -> int:
+   """Funzione che traduce il parametro n_jobs nel numero di processi, con la stessa convenzione di scikit-learn:
+      None o 1 un solo processo, -1 tutti i core, -2 tutti i core meno uno, ecc.
+   """
+   if n_jobs is None:
+      return 1
+   if n_jobs < 0:
+      return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+   return max(int(n_jobs), 1)
+
+#%%%
+
+
+#%%% Array in memoria condivisa
+
+# Array condivisi visti dal processo corrente (in ogni processo del pool, collegati una sola volta da _collega)
+_ARRAY = {}
+_MEMORIE = []
+
+
+def _crea_condiviso(forma, dtype) -> tuple:
+   """Crea un blocco di memoria condivisa per un array (forma, dtype).
+      Output:
+         - oggetto SharedMemory (da chiudere e rimuovere con unlink);
+         - descrittore (nome, forma, dtype) con il quale gli altri processi si collegano all'array.
+   """
+   forma = tuple(forma) if isinstance(forma, (tuple, list)) else (int(forma),)
+   dtype = np.dtype(dtype)
+   memoria = shared_memory.SharedMemory(create=True, size=max(int(np.prod(forma)) * dtype.itemsize, 1))
+   return memoria, (memoria.name, forma, dtype.str)
+
+
+def _vista(memoria: shared_memory.SharedMemory, descrittore: tuple) -> np.ndarray:
+   """Array numpy che usa direttamente la memoria condivisa (nessuna copia)."""
+   _, forma, dtype = descrittore
+   return np.ndarray(forma, dtype=np.dtype(dtype), buffer=memoria.buf)
+
+
+def _collega(descrittori: dict) -> None:
+   """Initializer dei processi del pool: collega gli array condivisi, una sola volta per processo."""
+   _ARRAY.clear()
+   for nome, (nome_memoria, forma, dtype) in descrittori.items():
+      # La memoria è creata e rimossa (unlink) solo dal processo principale
+      memoria = shared_memory.SharedMemory(name=nome_memoria)
+      _MEMORIE.append(memoria)
+      _ARRAY[nome] = _vista(memoria, (nome_memoria, forma, dtype))
+
+
+def _esegui_compito(funzione, compito: tuple) -> None:
+   funzione(_ARRAY, *compito)
+
+#%%%
+
+
+#%%% Esecuzione in parallelo
+
+def esegui_in_parallelo(funzione,
+                        ingressi: dict,
+                        uscite: dict,
+                        compiti: list,
+                        n_jobs: int = -1) -> dict:
+   """Funzione che esegue funzione(array, *compito) per ogni compito in un ProcessPoolExecutor.
+      Gli array di ingresso e di uscita sono messi in memoria condivisa: ai processi non vengono passati dataframe
+      o array serializzati (pickle), ma solo il nome dei blocchi di memoria all'avvio e poi i compiti (pochi interi).
+      Ogni compito scrive i suoi risultati in una parte diversa degli array di uscita.
+      Input:
+         - funzione, funzione definita a livello di modulo (es. confronto._calcola_blocco) con argomenti (array, *compito);
+         - ingressi, dizionario nome -> array numpy in sola lettura;
+         - uscite, dizionario nome -> (forma, dtype) degli array da riempire;
+         - compiti, lista di tuple di argomenti;
+         - n_jobs (opzionale), numero di processi, vedi numero_processi().
+      Output:
+         - dizionario nome -> array di uscita (copiati fuori dalla memoria condivisa).
+   """
+   memorie, descrittori = {}, {}
+   try:
+      for nome, valori in ingressi.items():
+         valori = np.asarray(valori)
+         memorie[nome], descrittori[nome] = _crea_condiviso(valori.shape, valori.dtype)
+         _vista(memorie[nome], descrittori[nome])[...] = valori
+      for nome, (forma, dtype) in uscite.items():
+         memorie[nome], descrittori[nome] = _crea_condiviso(forma, dtype)
+
+      processi = min(numero_processi(n_jobs), len(compiti)) or 1
+      with ProcessPoolExecutor(max_workers=processi, initializer=_collega, initargs=(descrittori,)) as executor:
+         # list() per propagare le eventuali eccezioni dei processi
+         list(executor.map(_esegui_compito, [funzione] * len(compiti), compiti))
+
+      return {nome: _vista(memorie[nome], descrittori[nome]).copy() for nome in uscite}
+   finally:
+      for memoria in memorie.values():
+         memoria.close()
+         memoria.unlink()
+
+#%%%
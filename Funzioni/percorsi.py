@@ -0,0 +1,54 @@
+import hashlib
+import json
+from pathlib import Path
+
+
+def trova_config(start: Path = None) -> Path:
+   """Funzione che cerca il file config.json risalendo le cartelle a partire da 'start'.
+      È lo stesso procedimento usato all'inizio dei notebook, raccolto in una funzione per gli script.
+      Input:
+         - start (opzionale), cartella di partenza, se non specificata la cartella di questo file.
+      Output:
+         - percorso del file config.json.
+   """
+   if start is None:
+      start = Path(__file__).parent
+
+   current = Path(start).resolve()
+   for parent in [current] + list(current.parents):
+      json_path_config_path = parent / "config.json"
+      if json_path_config_path.exists():
+         return json_path_config_path
+
+   raise FileNotFoundError("File 'config.json' non trovato.")
+
+
+def carica_percorsi(start: Path = None) -> dict:
+   """Funzione che legge il file config.json e restituisce i percorsi assoluti del progetto.
+      A differenza dei notebook la radice del progetto è la cartella che contiene config.json,
+      così gli script funzionano anche se 'path_progetto' non è stato modificato.
+      Input:
+         - start (opzionale), cartella dalla quale iniziare la ricerca di config.json.
+      Output:
+         - dizionario con gli stessi nomi del file config, con i percorsi 'path_*' resi assoluti.
+   """
+   json_path_config_path = trova_config(start)
+   with open(json_path_config_path) as f:
+      paths = json.load(f)
+
+   radice = json_path_config_path.parent
+   percorsi = {"path_progetto": radice}
+   for chiave, valore in paths.items():
+      if chiave.startswith("path_") and chiave not in ("path_progetto", "path_selenium_driver"):
+         percorsi[chiave] = radice / valore.lstrip("/")
+   percorsi["path_selenium_driver"] = paths.get("path_selenium_driver")
+   return percorsi
+
+
+def hash_file(path: Path) -> str:
+   """Hash blake2b (128 bit) del contenuto di un file, letto a blocchi di 1 MB."""
+   h = hashlib.blake2b(digest_size=16)
+   with open(path, "rb") as f:
+      for blocco in iter(lambda: f.read(1 << 20), b""):
+         h.update(blocco)
+   return h.hexdigest()
@@ -0,0 +1,464 @@
+"""Pipeline del progetto, dagli html ai risultati, al posto dell'esecuzione a mano dei notebook.
+   Gli stadi formano un DAG sui percorsi di config.json:
+      get_html_<sito>_<città>          scraping.py (solo con --lavori)            -> html dello scraper
+      get_info_<piattaforma>_<città>   estrazione.py (02)_Get_Info)               -> Data Lake/<piattaforma>_<città>.csv
+      pulizia_<piattaforma>            pulizia.py (Cleaning_pipeline.ipynb)       -> Data Product/<piattaforma>.csv
+      linkage_titolo                   record_linkage_title (RecordLinkage.ipynb) -> Results/matches_titolo_<soglia>.csv
+      linkage_città_titolo             record_linkage_city_title                  -> Results/matches_titolo_<soglia>_città_<soglia>.csv
+      prezzi                           prezzi.ArchivioPrezzi (aggregati dei prezzi) -> Results/archivio_prezzi/archivio.npz
+      analisi                          AnalisiRisultati.ipynb eseguito con nbclient -> Results/AnalisiRisultati_eseguito.ipynb
+   Uno stadio dipende dagli stadi che scrivono i suoi file di input. L'impronta di uno stadio (blake2b) comprende i file
+   di input, i file del codice che lo esegue e i parametri (città, date, anno, soglie, blocking): è salvata in
+   'Results/.pipeline/stato.json' dopo l'esecuzione e lo stadio è saltato se l'impronta non è cambiata e gli output esistono.
+   L'hash di un file è ricalcolato solo se dimensione o data di modifica sono cambiate.
+   Gli stadi indipendenti (estrazione e pulizia di agoda e booking, i due record linkage) sono eseguiti in parallelo
+   da --n-jobs thread. pandas, recordlinkage, dateparser, lxml, selenium e nbclient sono importati solo dagli stadi
+   eseguiti: --help, --mostra e un'esecuzione senza stadi da aggiornare usano solo la libreria standard.
+   Senza --lavori e --html-città i file del Data Lake sono input della pipeline (gli html non sono estratti di nuovo).
+   Uso:
+      python "Funzioni/pipeline.py" [--mostra] [--forza] [--stadi pulizia linkage_titolo] [--n-jobs 2]
+      python "Funzioni/pipeline.py" --html-città Terni          (estrae gli html salvati nelle cartelle degli scraper)
+      python "Funzioni/pipeline.py" --lavori agoda,Roma,2025-08-01,2025-08-02 booking,Roma,2025-08-01,2025-08-02
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi, hash_file
+
+PIATTAFORME = ("agoda", "booking")
+MESI = ("gennaio", "febbraio", "marzo", "aprile", "maggio", "giugno", "luglio", "agosto", "settembre", "ottobre",
+        "novembre", "dicembre")
+ANNO_DATI = 2025 # Anno delle date di permanenza dei dati del repository (agosto 2025)
+
+# File di Funzioni/ eseguiti da ogni tipo di stadio: se cambiano lo stadio non è più aggiornato
+CODICE = {
+   "get_html": ["scraping.py"],
+   "get_info": ["estrazione.py", "parallelo.py"],
+   "pulizia": ["pulizia.py"],
+   "linkage": ["funzioni.py", "assegnazione.py", "blocking.py", "cache.py", "confronto.py", "coppie.py",
+               "fellegi_sunter.py", "parallelo.py", "profilazione.py"],
+   "prezzi": ["prezzi.py"],
+   "analisi": [],
+}
+
+
+#%%% Impronte
+
+class Impronte:
+   """Hash dei file di input degli stadi. 'memoria' (salvata nello stato della pipeline) associa ad ogni file
+      dimensione, data di modifica e hash: un file non modificato non è riletto.
+      Una cartella ha come hash quello dei nomi e degli hash dei suoi file."""
+
+   def __init__(self, radice: Path, memoria: dict = None):
+      self.radice = Path(radice)
+      self.memoria = dict(memoria or {})
+      self._lock = threading.Lock()
+
+   def relativo(self, path: Path) -> str:
+      """Percorso relativo alla radice del progetto (le impronte non cambiano se il progetto è spostato)."""
+      try:
+         return Path(path).relative_to(self.radice).as_posix()
+      except ValueError:
+         return Path(path).as_posix()
+
+   def file(self, path: Path) -> str:
+      path = Path(path)
+      if path.is_dir():
+         h = hashlib.blake2b(digest_size=16)
+         for figlio in sorted(p for p in path.rglob("*") if p.is_file()):
+            h.update(f"{figlio.relative_to(path).as_posix()}:{self.file(figlio)};".encode("utf-8"))
+         return h.hexdigest()
+      if not path.exists():
+         return "assente"
+
+      stat = path.stat()
+      chiave = self.relativo(path)
+      with self._lock:
+         salvato = self.memoria.get(chiave)
+      if salvato and salvato[0] == stat.st_size and salvato[1] == stat.st_mtime_ns:
+         return salvato[2]
+      valore = hash_file(path)
+      with self._lock:
+         self.memoria[chiave] = [stat.st_size, stat.st_mtime_ns, valore]
+      return valore
+
+   def stadio(self, stadio) -> str:
+      """Impronta di uno stadio: nome, parametri e hash dei file di input."""
+      contenuto = {"nome": stadio.nome, "parametri": stadio.parametri,
+                   "input": {self.relativo(p): self.file(p) for p in stadio.input}}
+      return hashlib.blake2b(json.dumps(contenuto, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+#%%%
+
+
+#%%% Stadi
+
+class Stadio:
+   """Stadio della pipeline: funzione(stadio) legge i file 'input' e scrive i file 'output'.
+      'parametri' fanno parte dell'impronta, 'opzioni' (es. numero di processi, driver di selenium) no."""
+
+   def __init__(self, nome: str, funzione, input: list, output: list, parametri: dict = None, opzioni: dict = None):
+      self.nome = nome
+      self.funzione = funzione
+      self.input = [Path(p) for p in input]
+      self.output = [Path(p) for p in output]
+      self.parametri = parametri or {}
+      self.opzioni = opzioni or {}
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} {self.nome}: {len(self.input)} input, {len(self.output)} output>"
+
+
+def _get_html(stadio: Stadio) -> None:
+   from scraping import SchedulerScraping, SessioneSelenium
+   sessione = lambda: SessioneSelenium(stadio.opzioni.get("path_driver"))
+   scheduler = SchedulerScraping(stadio.opzioni["cartella"], crea_sessione=sessione, n_sessioni=1)
+   risultato = scheduler.esegui([tuple(stadio.parametri["lavoro"])])
+   if not risultato["completato"].all():
+      raise RuntimeError(f"Scraping non completato: {risultato['errore'].iloc[0]}")
+
+
+def _get_info(stadio: Stadio) -> None:
+   from estrazione import estrai_html, ordina_pagine, salva_data_lake
+   html = [p for p in stadio.input if p.name.startswith("html_final")]
+   for cartella in (p for p in stadio.input if p.is_dir()):
+      html.extend(cartella.glob("html_final*.txt"))
+   if not html:
+      raise FileNotFoundError(f"Nessun file html da elaborare per {stadio.nome}.")
+   dataframe = estrai_html(stadio.parametri["piattaforma"], ordina_pagine(html), n_jobs=stadio.opzioni.get("n_jobs", -1),
+                           date=stadio.parametri["date"])
+   salva_data_lake(dataframe, stadio.output[0], "csv")
+
+
+def _pulizia(stadio: Stadio) -> None:
+   from pulizia import leggi_data_lake, pulisci_piattaforma
+   piattaforma = stadio.parametri["piattaforma"]
+   dati = leggi_data_lake(stadio.opzioni["path_data_lake"], piattaforma, stadio.parametri["città"])
+   pulisci_piattaforma(dati, piattaforma, stadio.parametri["anno"]).to_csv(stadio.output[0])
+
+
+def _leggi_data_product(stadio: Stadio) -> tuple:
+   import pandas as pd
+   agoda, booking = (pd.read_csv(stadio.opzioni["path_data_product"] / f"{p}.csv", index_col=0) for p in PIATTAFORME)
+   return agoda, booking
+
+
+def _linkage_titolo(stadio: Stadio) -> None:
+   from funzioni import record_linkage_title
+   agoda, booking = _leggi_data_product(stadio)
+   match = record_linkage_title(agoda, booking, stadio.parametri["soglia_titolo"], blocking=stadio.parametri["blocking"])
+   match.to_csv(stadio.output[0])
+
+
+def _linkage_città_titolo(stadio: Stadio) -> None:
+   from funzioni import record_linkage_city_title
+   agoda, booking = _leggi_data_product(stadio)
+   match = record_linkage_city_title(booking, agoda, stadio.parametri["soglia_titolo"], stadio.parametri["soglia_città"],
+                                     blocking=stadio.parametri["blocking"])
+   match.to_csv(stadio.output[0], index=False)
+
+
+def _prezzi(stadio: Stadio) -> None:
+   import pandas as pd
+   from prezzi import ArchivioPrezzi
+   booking = pd.read_csv(stadio.opzioni["path_data_product"] / "booking.csv", index_col=0)
+   archivio = ArchivioPrezzi(stadio.output[0].parent)
+   for match in stadio.parametri["match"]:
+      archivio.aggiorna_file(stadio.opzioni["path_results"] / match, booking=booking)
+
+
+def _analisi(stadio: Stadio) -> None:
+   try:
+      import nbformat
+      from nbclient import NotebookClient
+   except ImportError as errore:
+      raise ImportError("Lo stadio 'analisi' esegue AnalisiRisultati.ipynb con nbclient e nbformat, non installati.") from errore
+   notebook = nbformat.read(stadio.input[0], as_version=4)
+   NotebookClient(notebook, resources={"metadata": {"path": str(stadio.input[0].parent)}}).execute()
+   nbformat.write(notebook, stadio.output[0])
+
+
+def etichetta_soglia(soglia: float) -> str:
+   """Soglia nel nome dei file dei risultati, come nei notebook (0.95 -> '095', 0.8 -> '08')."""
+   return str(soglia).replace(".", "")
+
+
+def date_lavoro(checkin: str, checkout: str) -> str:
+   """Date di un lavoro di scraping nel formato della colonna 'date' (es. '1 agosto - 2 agosto')."""
+   inizio, fine = date.fromisoformat(checkin), date.fromisoformat(checkout)
+   return f"{inizio.day} {MESI[inizio.month - 1]} - {fine.day} {MESI[fine.month - 1]}"
+
+
+def crea_stadi(paths: dict,
+               città: list = ("Roma", "Terni"),
+               lavori: list = (),
+               html_città: str = None,
+               date_html: str = "1 agosto - 2 agosto",
+               anno: int = None,
+               soglia_titolo: float = 0.95,
+               soglia_città: float = 0.8,
+               blocking: str = "first_letter",
+               n_jobs: int = -1) -> list:
+   """Funzione che crea gli stadi della pipeline sui percorsi di config.json.
+      Input:
+         - paths, percorsi del progetto (percorsi.carica_percorsi());
+         - città, città del Data Lake unite nella pulizia di ogni piattaforma;
+         - lavori (opzionale), lavori di scraping (sito, città, check-in, check-out): per ognuno uno stadio get_html
+           e uno get_info, che salvano gli html in una sottocartella della cartella html dello scraper;
+         - html_città (opzionale), città degli html salvati nella cartella html degli scraper (html_final*.txt, come i notebook):
+           uno stadio get_info per piattaforma, con le date 'date_html';
+         - anno (opzionale), anno delle date di permanenza, di default quello del primo lavoro o ANNO_DATI;
+         - soglia_titolo, soglia_città, blocking, parametri dei record linkage (di default quelli di RecordLinkage.ipynb);
+         - n_jobs, processi dell'estrazione degli html (vedi estrazione.estrai_html).
+      Output:
+         - lista di Stadio.
+   """
+   funzioni = paths["path_funzioni"]
+   codice = {tipo: [funzioni / f for f in file] for tipo, file in CODICE.items()}
+   data_lake, data_product, risultati = paths["path_data_lake"], paths["path_data_product"], paths["path_results"]
+   anno = anno or (date.fromisoformat(lavori[0][2]).year if lavori else ANNO_DATI)
+   stadi = []
+
+   for sito, città_lavoro, checkin, checkout in lavori:
+      cartella = paths[f"path_scraper_{sito}"] / "html"
+      # Sottocartella del lavoro, come scraping.nome_lavoro()
+      html = cartella / "_".join(str(parte).replace(" ", "-") for parte in (sito, città_lavoro, checkin, checkout))
+      stadi.append(Stadio(f"get_html_{sito}_{città_lavoro}", _get_html, codice["get_html"], [html],
+                          {"lavoro": [sito, città_lavoro, checkin, checkout]},
+                          {"cartella": cartella, "path_driver": paths.get("path_selenium_driver")}))
+      stadi.append(Stadio(f"get_info_{sito}_{città_lavoro}", _get_info, [html] + codice["get_info"],
+                          [data_lake / f"{sito}_{città_lavoro}.csv"],
+                          {"piattaforma": sito, "città": città_lavoro, "date": date_lavoro(checkin, checkout)}, {"n_jobs": n_jobs}))
+
+   if html_città:
+      for piattaforma in PIATTAFORME:
+         html = sorted((paths[f"path_scraper_{piattaforma}"] / "html").glob("html_final*.txt"))
+         stadi.append(Stadio(f"get_info_{piattaforma}_{html_città}", _get_info, html + codice["get_info"],
+                             [data_lake / f"{piattaforma}_{html_città}.csv"],
+                             {"piattaforma": piattaforma, "città": html_città, "date": date_html}, {"n_jobs": n_jobs}))
+
+   for piattaforma in PIATTAFORME:
+      stadi.append(Stadio(f"pulizia_{piattaforma}", _pulizia,
+                          [data_lake / f"{piattaforma}_{c}.csv" for c in città] + [data_product / "funzioni.py"] + codice["pulizia"],
+                          [data_product / f"{piattaforma}.csv"],
+                          {"piattaforma": piattaforma, "città": list(città), "anno": anno}, {"path_data_lake": data_lake}))
+
+   data_product_csv = [data_product / f"{p}.csv" for p in PIATTAFORME]
+   match_titolo = risultati / f"matches_titolo_{etichetta_soglia(soglia_titolo)}.csv"
+   match_città = risultati / f"matches_titolo_{etichetta_soglia(soglia_titolo)}_città_{etichetta_soglia(soglia_città)}.csv"
+   stadi.append(Stadio("linkage_titolo", _linkage_titolo, data_product_csv + codice["linkage"], [match_titolo],
+                       {"soglia_titolo": soglia_titolo, "blocking": blocking}, {"path_data_product": data_product}))
+   stadi.append(Stadio("linkage_città_titolo", _linkage_città_titolo, data_product_csv + codice["linkage"], [match_città],
+                       {"soglia_titolo": soglia_titolo, "soglia_città": soglia_città, "blocking": blocking},
+                       {"path_data_product": data_product}))
+   stadi.append(Stadio("prezzi", _prezzi, [match_titolo, match_città, data_product / "booking.csv"] + codice["prezzi"],
+                       [risultati / "archivio_prezzi" / "archivio.npz"], {"match": [match_titolo.name, match_città.name]},
+                       {"path_data_product": data_product, "path_results": risultati}))
+   stadi.append(Stadio("analisi", _analisi, [paths["path_progetto"] / "AnalisiRisultati.ipynb", match_titolo, match_città],
+                       [risultati / "AnalisiRisultati_eseguito.ipynb"]))
+   return stadi
+
+#%%%
+
+
+#%%% Esecuzione
+
+class Pipeline:
+   """DAG degli stadi: le dipendenze sono ricavate dai file (uno stadio dipende da quelli che scrivono i suoi input).
+      Lo stato (impronte degli stadi eseguiti e memoria degli hash dei file) è letto da e scritto in 'path_stato'.
+      Uso:
+         pipeline = Pipeline(crea_stadi(paths), paths['path_results'] / '.pipeline' / 'stato.json', radice=paths['path_progetto'])
+         pipeline.piano()      # stadi aggiornati e da eseguire
+         pipeline.esegui()     # esegue solo gli stadi da aggiornare
+   """
+
+   def __init__(self, stadi: list, path_stato: Path, radice: Path, n_jobs: int = 2):
+      self.stadi = {stadio.nome: stadio for stadio in stadi}
+      self.path_stato = Path(path_stato)
+      self.n_jobs = max(int(n_jobs), 1)
+
+      produttori = {output: stadio.nome for stadio in stadi for output in stadio.output}
+      self.dipendenze = {stadio.nome: sorted({produttori[p] for p in stadio.input if produttori.get(p, stadio.nome) != stadio.nome})
+                         for stadio in stadi}
+      self.ordine = self._ordine_topologico()
+
+      stato = json.loads(self.path_stato.read_text()) if self.path_stato.exists() else {}
+      self.stato = stato.get("stadi", {})
+      self.impronte = Impronte(radice, stato.get("file"))
+      self._lock = threading.Lock()
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} {len(self.stadi)} stadi, stato={str(self.path_stato)!r}>"
+
+   def _ordine_topologico(self) -> list:
+      ordine, visitati, in_corso = [], set(), set()
+
+      def visita(nome):
+         if nome in in_corso:
+            raise ValueError(f"Dipendenza circolare tra gli stadi, stadio '{nome}'.")
+         if nome not in visitati:
+            in_corso.add(nome)
+            for dipendenza in self.dipendenze[nome]:
+               visita(dipendenza)
+            in_corso.discard(nome)
+            visitati.add(nome)
+            ordine.append(nome)
+
+      for nome in self.stadi:
+         visita(nome)
+      return ordine
+
+   def seleziona(self, nomi: list = None) -> list:
+      """Stadi 'nomi' (o che iniziano con '<nome>_', es. 'pulizia') e quelli da cui dipendono, in ordine topologico.
+         Senza nomi tutti gli stadi."""
+      if not nomi:
+         return list(self.ordine)
+      scelti = set()
+      for nome in nomi:
+         trovati = [s for s in self.stadi if s == nome or s.startswith(f"{nome}_")]
+         if not trovati:
+            raise ValueError(f"Stadio '{nome}' non valido, valori possibili: {self.ordine}")
+         scelti.update(trovati)
+
+      da_visitare = list(scelti)
+      while da_visitare:
+         for dipendenza in self.dipendenze[da_visitare.pop()]:
+            if dipendenza not in scelti:
+               scelti.add(dipendenza)
+               da_visitare.append(dipendenza)
+      return [nome for nome in self.ordine if nome in scelti]
+
+   def aggiornato(self, nome: str) -> bool:
+      """True se l'impronta dello stadio è quella dell'ultima esecuzione e i suoi output esistono."""
+      stadio = self.stadi[nome]
+      salvato = self.stato.get(nome)
+      return (salvato is not None and all(p.exists() for p in stadio.output)
+              and salvato["impronta"] == self.impronte.stadio(stadio))
+
+   def piano(self, nomi: list = None, forza: bool = False) -> list:
+      """Stato di ogni stadio selezionato senza eseguire niente: 'aggiornato', 'da eseguire', oppure
+         'da eseguire se cambiano gli input' se è aggiornato ma dipende da uno stadio da eseguire.
+         Output: lista di (stadio, stato, dipendenze)."""
+      piano, da_eseguire = [], set()
+      for nome in self.seleziona(nomi):
+         if forza or not self.aggiornato(nome):
+            stato = "da eseguire"
+            da_eseguire.add(nome)
+         elif da_eseguire.intersection(self.dipendenze[nome]):
+            stato = "da eseguire se cambiano gli input"
+         else:
+            stato = "aggiornato"
+         piano.append((nome, stato, self.dipendenze[nome]))
+      return piano
+
+   def _salva_stato(self) -> None:
+      """Scrive lo stato (prima su un file temporaneo, poi lo sostituisce)."""
+      self.path_stato.parent.mkdir(parents=True, exist_ok=True)
+      temporaneo = self.path_stato.with_suffix(".tmp")
+      with self._lock:
+         contenuto = {"stadi": self.stato, "file": dict(self.impronte.memoria)}
+         temporaneo.write_text(json.dumps(contenuto, indent=1, ensure_ascii=False))
+         os.replace(temporaneo, self.path_stato)
+
+   def _esegui_stadio(self, nome: str, forza: bool) -> tuple:
+      """Esegue uno stadio se non è aggiornato. L'impronta è calcolata quando gli stadi da cui dipende sono terminati:
+         se i loro output non sono cambiati lo stadio è saltato."""
+      stadio = self.stadi[nome]
+      impronta = self.impronte.stadio(stadio)
+      if not forza and self.aggiornato(nome):
+         return "saltato", 0.0
+
+      inizio = time.perf_counter()
+      for output in stadio.output:
+         output.parent.mkdir(parents=True, exist_ok=True)
+      stadio.funzione(stadio)
+      tempo = time.perf_counter() - inizio
+      with self._lock:
+         self.stato[nome] = {"impronta": impronta, "tempo": round(tempo, 3), "eseguito": datetime.now().isoformat(timespec="seconds")}
+      self._salva_stato()
+      return "eseguito", tempo
+
+   def esegui(self, nomi: list = None, forza: bool = False, stampa=print) -> dict:
+      """Esegue gli stadi selezionati (vedi seleziona()) non aggiornati: ogni stadio parte appena gli stadi da cui dipende
+         sono terminati, fino a n_jobs stadi alla volta. Se uno stadio fallisce quelli che ne dipendono non sono eseguiti.
+         Output: dizionario stadio -> (esito, secondi), esito tra 'eseguito', 'saltato', 'fallito', 'non eseguito'."""
+      da_eseguire = self.seleziona(nomi)
+      esiti = {}
+      with ThreadPoolExecutor(max_workers=self.n_jobs) as executor:
+         in_corso = {}
+         while da_eseguire or in_corso:
+            for nome in list(da_eseguire):
+               dipendenze = [esiti.get(d, (None,))[0] for d in self.dipendenze[nome] if d in self.stadi]
+               if any(esito in ("fallito", "non eseguito") for esito in dipendenze):
+                  esiti[nome] = ("non eseguito", 0.0)
+                  da_eseguire.remove(nome)
+                  stampa(f"{'non eseguito':>12}  {nome}")
+               elif all(esito is not None for esito in dipendenze):
+                  in_corso[executor.submit(self._esegui_stadio, nome, forza)] = nome
+                  da_eseguire.remove(nome)
+            if not in_corso:
+               continue
+
+            finiti, _ = wait(in_corso, return_when=FIRST_COMPLETED)
+            for futuro in finiti:
+               nome = in_corso.pop(futuro)
+               try:
+                  esiti[nome] = futuro.result()
+                  stampa(f"{esiti[nome][0]:>12}  {nome}" + (f" ({esiti[nome][1]:.2f} s)" if esiti[nome][0] == "eseguito" else ""))
+               except Exception as errore:
+                  esiti[nome] = ("fallito", 0.0)
+                  stampa(f"{'fallito':>12}  {nome}: {errore!r}")
+      self._salva_stato()
+      return esiti
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--stadi", nargs="+", default=None, help="stadi da eseguire (con quelli da cui dipendono), di default tutti")
+   parser.add_argument("--forza", action="store_true", help="esegue gli stadi anche se sono aggiornati")
+   parser.add_argument("--mostra", action="store_true", help="mostra lo stato degli stadi senza eseguirli")
+   parser.add_argument("--n-jobs", type=int, default=2, help="stadi eseguiti in parallelo")
+   parser.add_argument("--città", nargs="+", default=["Roma", "Terni"], help="città del Data Lake")
+   parser.add_argument("--lavori", nargs="+", default=[], help="lavori di scraping sito,città,check-in,check-out (date AAAA-MM-GG)")
+   parser.add_argument("--html-città", default=None, help="città degli html salvati nelle cartelle html degli scraper")
+   parser.add_argument("--date", default="1 agosto - 2 agosto", help="date degli html di --html-città")
+   parser.add_argument("--anno", type=int, default=None, help=f"anno delle date di permanenza (default: primo lavoro o {ANNO_DATI})")
+   parser.add_argument("--soglia-titolo", type=float, default=0.95)
+   parser.add_argument("--soglia-città", type=float, default=0.8)
+   parser.add_argument("--blocking", default="first_letter", help="blocking dei record linkage, vedi funzioni.crea_indexer()")
+   parser.add_argument("--n-jobs-estrazione", type=int, default=-1, help="processi dell'estrazione degli html")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   lavori = [tuple(parte.strip() for parte in lavoro.split(",")) for lavoro in args.lavori]
+   stadi = crea_stadi(paths, args.città, lavori, args.html_città, args.date, args.anno, args.soglia_titolo,
+                      args.soglia_città, args.blocking, args.n_jobs_estrazione)
+   pipeline = Pipeline(stadi, paths["path_results"] / ".pipeline" / "stato.json", paths["path_progetto"], args.n_jobs)
+
+   if args.mostra:
+      for nome, stato, dipendenze in pipeline.piano(args.stadi, args.forza):
+         print(f"{nome:<24} {stato:<34} {', '.join(dipendenze)}")
+      return
+
+   inizio = time.perf_counter()
+   esiti = pipeline.esegui(args.stadi, args.forza)
+   conteggi = {esito: sum(e == esito for e, _ in esiti.values()) for esito in ("eseguito", "saltato", "fallito", "non eseguito")}
+   print(f"{len(esiti)} stadi in {time.perf_counter() - inizio:.2f} s: "
+         + ", ".join(f"{n} {esito}" for esito, n in conteggi.items() if n))
+   if conteggi["fallito"]:
+      sys.exit(1)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,269 @@
+"""Analisi dei prezzi dei match (le stesse misure di AnalisiRisultati.ipynb) su molti scraping senza rileggere tutti i file dei match.
+   - analizza_prezzi: differenza_assoluta (booking - agoda), differenza_percentuale (rispetto ad agoda) e l'etichetta
+     'convenienza' calcolate sulle colonne con np.select, al posto di df.apply(confronta_prezzi, axis=1);
+   - ArchivioPrezzi: aggregati additivi (conteggi per etichetta, somme delle differenze e dei loro quadrati, somme dei prezzi,
+     minimo e massimo) per snapshot (un file dei match, es. 'matches_titolo_095'), città, zona, data di inizio permanenza
+     e stelle di booking. Un nuovo file dei match è letto una sola volta e i suoi aggregati aggiunti all'archivio; un file
+     già aggiunto e non modificato (stesso hash) non è riletto, uno modificato sostituisce i suoi aggregati.
+     riepilogo() raggruppa gli aggregati per le dimensioni richieste e calcola medie, deviazione standard e quote.
+   Snapshot di metodi di record linkage diversi sullo stesso scraping contengono le stesse location: vanno riepilogati
+   separatamente (argomento 'snapshot').
+   Uso:
+      python "Funzioni/prezzi.py" aggiorna Results/matches_titolo_095.csv [--archivio <cartella>]
+      python "Funzioni/prezzi.py" riepilogo --per città stelle [--snapshot matches_titolo_095]
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi, hash_file
+
+# Etichette di confronta_prezzi() di AnalisiRisultati.ipynb
+MANCANTE = "missing price"
+BOOKING = "more convenient on booking"
+AGODA = "more convenient on agoda"
+STESSO = "same price"
+
+DIMENSIONI = ("snapshot", "città", "zona", "data", "stelle")
+# Misure additive: la somma degli aggregati di più snapshot è l'aggregato dei loro match
+MISURE = ("coppie", "n_booking", "n_agoda", "n_stesso", "n_mancante", "somma_differenza", "somma_quadrati",
+          "n_percentuale", "somma_percentuale", "somma_prezzo_booking", "somma_prezzo_agoda")
+ESTREMI = ("min_differenza", "max_differenza")
+
+
+#%%% Differenze di prezzo
+
+def analizza_prezzi(match: pd.DataFrame) -> pd.DataFrame:
+   """Funzione che aggiunge ai match le colonne di AnalisiRisultati.ipynb, calcolate sulle colonne.
+      Input:
+         - match, dataframe con 'prezzo_booking' e 'prezzo_agoda' (es. un file dei match di Results).
+      Output:
+         - copia di match con:
+            - differenza_assoluta, prezzo_booking - prezzo_agoda (positiva se booking è più caro);
+            - differenza_percentuale, differenza_assoluta / prezzo_agoda * 100, NaN se il prezzo di agoda è 0;
+            - convenienza, etichetta di confronta_prezzi() ('missing price' se manca uno dei due prezzi).
+   """
+   booking = pd.to_numeric(match["prezzo_booking"], errors="coerce").to_numpy(dtype=np.float64)
+   agoda = pd.to_numeric(match["prezzo_agoda"], errors="coerce").to_numpy(dtype=np.float64)
+   differenza = booking - agoda
+   with np.errstate(divide="ignore", invalid="ignore"):
+      percentuale = np.where(agoda != 0, differenza / agoda * 100, np.nan)
+
+   match = match.copy()
+   match["differenza_assoluta"] = differenza
+   match["differenza_percentuale"] = percentuale
+   match["convenienza"] = np.select([np.isnan(booking) | np.isnan(agoda), booking < agoda, booking > agoda],
+                                    [MANCANTE, BOOKING, AGODA], default=STESSO)
+   return match
+
+
+def aggrega_prezzi(match: pd.DataFrame, snapshot: str, booking: pd.DataFrame = None) -> pd.DataFrame:
+   """Funzione che calcola gli aggregati dei prezzi di un file dei match per città, zona, data di inizio permanenza e stelle.
+      Input:
+         - match, dataframe dei match (colonne di record_linkage_title: città_booking, zona_booking, inizio_permanenza...);
+         - snapshot, nome dello snapshot;
+         - booking (opzionale), 'Data Product/booking.csv': le stelle sono prese da qui tramite 'index_booking'
+           se i match non hanno la colonna 'stelle' (altrimenti le stelle sono mancanti).
+      Output:
+         - dataframe con una riga per combinazione di DIMENSIONI, colonne MISURE ed ESTREMI.
+   """
+   analisi = analizza_prezzi(match)
+   prezzo_booking = pd.to_numeric(match["prezzo_booking"], errors="coerce").to_numpy(dtype=np.float64)
+   prezzo_agoda = pd.to_numeric(match["prezzo_agoda"], errors="coerce").to_numpy(dtype=np.float64)
+   if "stelle" in match.columns:
+      stelle = pd.to_numeric(match["stelle"], errors="coerce").to_numpy(dtype=np.float64)
+   elif booking is not None:
+      stelle = booking["stelle"].reindex(match["index_booking"]).to_numpy(dtype=np.float64)
+   else:
+      stelle = np.full(len(match), np.nan)
+
+   differenza = analisi["differenza_assoluta"].to_numpy()
+   valida = ~np.isnan(differenza)
+   convenienza = analisi["convenienza"].to_numpy()
+   percentuale = analisi["differenza_percentuale"].to_numpy()
+   tabella = pd.DataFrame({
+      "snapshot": snapshot,
+      "città": match["città_booking"].to_numpy(dtype=object),
+      "zona": match["zona_booking"].to_numpy(dtype=object),
+      "data": pd.to_datetime(match["inizio_permanenza"], format="%d-%m-%y", errors="coerce").to_numpy(dtype="datetime64[D]"),
+      "stelle": stelle,
+      "coppie": 1,
+      "n_booking": convenienza == BOOKING,
+      "n_agoda": convenienza == AGODA,
+      "n_stesso": convenienza == STESSO,
+      "n_mancante": convenienza == MANCANTE,
+      "somma_differenza": np.where(valida, differenza, 0.0),
+      "somma_quadrati": np.where(valida, differenza ** 2, 0.0),
+      "n_percentuale": ~np.isnan(percentuale),
+      "somma_percentuale": np.nan_to_num(percentuale),
+      "somma_prezzo_booking": np.where(valida, prezzo_booking, 0.0),
+      "somma_prezzo_agoda": np.where(valida, prezzo_agoda, 0.0),
+      "min_differenza": differenza,
+      "max_differenza": differenza,
+   })
+   return _raggruppa(tabella, list(DIMENSIONI))
+
+
+def _raggruppa(tabella: pd.DataFrame, per: list) -> pd.DataFrame:
+   """Somma delle MISURE, minimo e massimo delle differenze per le dimensioni 'per' (valori mancanti compresi)."""
+   gruppi = tabella.groupby(per, dropna=False, sort=True)
+   aggregati = gruppi[list(MISURE)].sum()
+   aggregati["min_differenza"] = gruppi["min_differenza"].min()
+   aggregati["max_differenza"] = gruppi["max_differenza"].max()
+   conteggi = [m for m in MISURE if not m.startswith("somma")]
+   aggregati[conteggi] = aggregati[conteggi].astype(np.int64)
+   return aggregati.reset_index()
+
+#%%%
+
+
+#%%% Archivio degli aggregati
+
+class ArchivioPrezzi:
+   """Aggregati dei prezzi dei match di più snapshot, aggiornati un file dei match alla volta (vedi aggrega_prezzi).
+      L'archivio è un unico file .npz (sostituito in blocco ad ogni aggiornamento) con le colonne degli aggregati e,
+      per ogni snapshot, l'hash del file letto: un file non modificato non è riletto.
+      Uso:
+         archivio = ArchivioPrezzi(paths['path_results'] / 'archivio_prezzi')
+         archivio.aggiorna_file(paths['path_results'] / 'matches_titolo_095.csv', booking=booking)
+         archivio.riepilogo(per=['città', 'stelle'], snapshot='matches_titolo_095')
+   """
+
+   _FILE = "archivio.npz"
+
+   def __init__(self, path):
+      self.path = Path(path)
+      self.path.mkdir(parents=True, exist_ok=True)
+      self._apri()
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} path={str(self.path)!r}, snapshot={len(self.snapshot)}, righe={len(self.aggregati)}>"
+
+   def _apri(self) -> None:
+      """Legge l'archivio, o crea un archivio vuoto."""
+      file = self.path / self._FILE
+      if not file.exists():
+         self.snapshot = {}
+         self.aggregati = aggrega_prezzi(pd.DataFrame(columns=["prezzo_booking", "prezzo_agoda", "città_booking",
+                                                               "zona_booking", "inizio_permanenza"]), "")
+         return
+
+      with np.load(file) as dati:
+         self.snapshot = json.loads(str(dati["registro"]))
+         colonne = {nome: dati[nome] for nome in dati.files if nome != "registro"}
+      # Le stringhe mancanti sono salvate come '' (il formato .npz non salva oggetti python)
+      for nome in ("città", "zona"):
+         colonne[nome] = np.where(colonne[nome] == "", None, colonne[nome].astype(object))
+      colonne["data"] = colonne["data"].astype("datetime64[ns]")
+      self.aggregati = pd.DataFrame(colonne)
+
+   def _scrivi(self) -> None:
+      """Scrive l'archivio (prima su un file temporaneo, poi lo sostituisce)."""
+      colonne = {nome: self.aggregati[nome].to_numpy() for nome in self.aggregati.columns}
+      for nome in ("snapshot", "città", "zona"):
+         colonne[nome] = self.aggregati[nome].fillna("").to_numpy(dtype=str)
+      colonne["data"] = self.aggregati["data"].to_numpy(dtype="datetime64[D]")
+      temporaneo = self.path / "archivio.tmp.npz"
+      np.savez_compressed(temporaneo, registro=np.array(json.dumps(self.snapshot, ensure_ascii=False)), **colonne)
+      os.replace(temporaneo, self.path / self._FILE)
+
+   def aggiorna(self, match: pd.DataFrame, snapshot: str, booking: pd.DataFrame = None, impronta: str = None) -> dict:
+      """Aggiunge (o sostituisce) gli aggregati di uno snapshot.
+         Input:
+            - match, dataframe dei match dello snapshot;
+            - snapshot, nome dello snapshot;
+            - booking (opzionale), per le stelle, vedi aggrega_prezzi();
+            - impronta (opzionale), hash del file dei match (vedi aggiorna_file()).
+         Output:
+            - resoconto: snapshot, esito ('aggiunto' o 'sostituito'), righe dei match e righe degli aggregati dello snapshot.
+      """
+      nuovi = aggrega_prezzi(match, snapshot, booking)
+      esito = "sostituito" if snapshot in self.snapshot else "aggiunto"
+      self.aggregati = pd.concat([self.aggregati[self.aggregati["snapshot"] != snapshot], nuovi], ignore_index=True)
+      self.snapshot[snapshot] = {"impronta": impronta, "righe": len(match),
+                                 "aggiornato": datetime.now().isoformat(timespec="seconds")}
+      self._scrivi()
+      return {"snapshot": snapshot, "esito": esito, "righe": len(match), "aggregati": len(nuovi)}
+
+   def aggiorna_file(self, path, snapshot: str = None, booking: pd.DataFrame = None) -> dict:
+      """Aggiunge gli aggregati di un file dei match csv (snapshot di default: nome del file senza estensione).
+         Se il file ha lo stesso hash dell'ultimo aggiornamento dello snapshot non è letto (esito 'invariato')."""
+      path = Path(path)
+      snapshot = snapshot or path.stem
+      impronta = hash_file(path)
+      if self.snapshot.get(snapshot, {}).get("impronta") == impronta:
+         return {"snapshot": snapshot, "esito": "invariato", "righe": self.snapshot[snapshot]["righe"],
+                 "aggregati": int((self.aggregati["snapshot"] == snapshot).sum())}
+      return self.aggiorna(pd.read_csv(path), snapshot, booking, impronta)
+
+   def rimuovi(self, snapshot: str) -> None:
+      """Elimina gli aggregati di uno snapshot."""
+      self.aggregati = self.aggregati[self.aggregati["snapshot"] != snapshot].reset_index(drop=True)
+      self.snapshot.pop(snapshot, None)
+      self._scrivi()
+
+   def riepilogo(self, per: list = ("città",), snapshot=None) -> pd.DataFrame:
+      """Riepilogo dei prezzi per le dimensioni 'per' (tra DIMENSIONI), calcolato dagli aggregati.
+         Input:
+            - per, dimensioni del raggruppamento (lista vuota: un'unica riga);
+            - snapshot (opzionale), nome o lista di nomi degli snapshot da riepilogare, di default tutti.
+         Output:
+            - dataframe con coppie, conteggi e quote di ogni etichetta di convenienza, differenza media (booking - agoda),
+              deviazione standard, minimo e massimo, differenza percentuale media e prezzi medi di booking e agoda
+              (delle coppie con entrambi i prezzi).
+      """
+      per = list(per)
+      if any(dimensione not in DIMENSIONI for dimensione in per):
+         raise ValueError(f"Dimensioni non valide, valori possibili: {list(DIMENSIONI)}")
+      aggregati = self.aggregati
+      if snapshot is not None:
+         aggregati = aggregati[aggregati["snapshot"].isin([snapshot] if isinstance(snapshot, str) else list(snapshot))]
+      if per:
+         riepilogo = _raggruppa(aggregati, per)
+      else:
+         riepilogo = _raggruppa(aggregati.assign(totale="totale"), ["totale"])
+
+      con_prezzi = riepilogo["coppie"] - riepilogo["n_mancante"]
+      validi = con_prezzi.where(con_prezzi > 0)
+      for etichetta in ("booking", "agoda", "stesso", "mancante"):
+         riepilogo[f"quota_{etichetta}"] = riepilogo[f"n_{etichetta}"] / riepilogo["coppie"]
+      riepilogo["differenza_media"] = riepilogo["somma_differenza"] / validi
+      varianza = (riepilogo["somma_quadrati"] - riepilogo["somma_differenza"] ** 2 / validi) / (validi - 1).where(validi > 1)
+      riepilogo["deviazione_standard"] = np.sqrt(varianza.clip(lower=0))
+      riepilogo["differenza_percentuale_media"] = riepilogo["somma_percentuale"] / riepilogo["n_percentuale"].where(riepilogo["n_percentuale"] > 0)
+      riepilogo["prezzo_medio_booking"] = riepilogo["somma_prezzo_booking"] / validi
+      riepilogo["prezzo_medio_agoda"] = riepilogo["somma_prezzo_agoda"] / validi
+      somme = [m for m in MISURE if m.startswith("somma") or m == "n_percentuale"]
+      return riepilogo.drop(columns=somme + ([] if per else ["totale"]))
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("comando", choices=["aggiorna", "riepilogo"])
+   parser.add_argument("file", nargs="*", type=Path, help="file dei match da aggiungere (aggiorna)")
+   parser.add_argument("--archivio", type=Path, default=None, help="default: 'Results/archivio_prezzi'")
+   parser.add_argument("--per", nargs="*", default=["città"], help=f"dimensioni del riepilogo, tra {list(DIMENSIONI)}")
+   parser.add_argument("--snapshot", nargs="+", default=None, help="snapshot del riepilogo, di default tutti")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   archivio = ArchivioPrezzi(args.archivio or paths["path_results"] / "archivio_prezzi")
+   if args.comando == "aggiorna":
+      booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+      print(pd.DataFrame([archivio.aggiorna_file(file, booking=booking) for file in args.file]).to_string(index=False))
+   else:
+      pd.set_option("display.width", 200)
+      print(archivio.riepilogo(args.per, args.snapshot).to_string(index=False))
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,187 @@
+"""Profilazione per fase delle funzioni di record linkage (STEP 0-7 di funzioni.py).
+   Un Profilo passato alle funzioni (argomento 'profilo') registra per ogni fase tempo reale, tempo di CPU,
+   variazione della memoria residente (RSS, vedi MISURA_MEMORIA) e i conteggi di righe e coppie; i dati si possono vedere come tabella
+   (report) o salvare in formato Chrome trace, da aprire con chrome://tracing o https://ui.perfetto.dev.
+   Senza modificare il notebook: con la variabile d'ambiente PROFILO_LINKAGE=<cartella> ogni chiamata
+   di record linkage salva nella cartella il suo trace e il suo report (vedi profilo_esecuzione).
+   Uso:
+      profilo = Profilo()
+      match = record_linkage_title(agoda, booking, 0.95, profilo=profilo)
+      print(profilo.report())
+      profilo.salva_chrome_trace("trace.json")
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+try:
+   import resource
+except ImportError:  # Windows
+   resource = None
+
+# Variabile d'ambiente con la cartella dove salvare il profilo di ogni chiamata di record linkage
+VARIABILE_AMBIENTE = "PROFILO_LINKAGE"
+
+_PAGINA_MB = os.sysconf("SC_PAGE_SIZE") / 2**20 if hasattr(os, "sysconf") else None
+# ru_maxrss è in kB su Linux e in byte su macOS
+_MAXRSS_MB = 2**20 if sys.platform == "darwin" else 2**10
+
+# Misura di memoria_residente(): 'rss' (RSS attuale, /proc/self/statm su Linux), 'picco_rss' (picco di RSS da ru_maxrss,
+# dove /proc non esiste, es. macOS: la variazione di una fase è allora la crescita del picco) oppure None (Windows, NaN)
+MISURA_MEMORIA = "rss" if os.path.exists("/proc/self/statm") else ("picco_rss" if resource is not None else None)
+
+
+def memoria_residente() -> float:
+   """Memoria residente (RSS) attuale del processo in MB; dove /proc non esiste (es. macOS) il picco di RSS
+      (picco_memoria_residente), NaN se non è disponibile nemmeno quello (Windows). Vedi MISURA_MEMORIA."""
+   try:
+      with open("/proc/self/statm") as f:
+         return int(f.read().split()[1]) * _PAGINA_MB
+   except (OSError, TypeError):
+      return picco_memoria_residente()
+
+
+def picco_memoria_residente() -> float:
+   """Picco della memoria residente del processo in MB: VmHWM di /proc/self/status (Linux), altrimenti ru_maxrss
+      di resource.getrusage (es. macOS), NaN se non sono disponibili (Windows)."""
+   try:
+      with open("/proc/self/status") as f:
+         return next(int(riga.split()[1]) / 1024 for riga in f if riga.startswith("VmHWM"))
+   except (OSError, StopIteration):
+      pass
+   if resource is None:
+      return float("nan")
+   return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / _MAXRSS_MB
+
+
+def azzera_picco_memoria() -> bool:
+   """Funzione che porta il picco di picco_memoria_residente() alla memoria residente attuale, con /proc/self/clear_refs (Linux).
+      Altrove il picco non si può azzerare (resta quello dall'avvio del processo) e la funzione restituisce False:
+      la differenza tra due picchi misura allora solo la memoria oltre il picco precedente.
+      Output:
+         - True se il picco è stato azzerato.
+   """
+   try:
+      with open("/proc/self/clear_refs", "w") as f:
+         f.write("5")
+      return True
+   except OSError:
+      return False
+
+
+class Profilo:
+   """Registro delle fasi di una o più esecuzioni del record linkage.
+      Input:
+         - callback (opzionale), funzione chiamata con il dizionario di ogni fase appena conclusa (es. per un log).
+   """
+
+   def __init__(self, callback=None):
+      self.callback = callback
+      self.eventi = []
+      self._aperti = []
+      self._origine = time.perf_counter()
+
+   @contextmanager
+   def fase(self, nome: str, **conteggi):
+      """Context manager che registra una fase: le fasi dentro un'altra fase sono registrate come annidate.
+         I conteggi (es. coppie=len(candidate_links)) si possono passare qui o aggiungere dopo con conta()."""
+      evento = {"nome": nome, "livello": len(self._aperti), "conteggi": dict(conteggi),
+                "inizio_s": time.perf_counter() - self._origine}
+      cpu, memoria = time.process_time(), memoria_residente()
+      self._aperti.append(evento)
+      try:
+         yield evento
+      finally:
+         self._aperti.pop()
+         evento["tempo_s"] = time.perf_counter() - self._origine - evento["inizio_s"]
+         evento["cpu_s"] = time.process_time() - cpu
+         evento["memoria_mb"] = memoria_residente() - memoria
+         self.eventi.append(evento)
+         if self.callback is not None:
+            self.callback(evento)
+
+   def conta(self, **conteggi) -> None:
+      """Somma i conteggi a quelli della fase aperta più interna."""
+      if self._aperti:
+         for chiave, valore in conteggi.items():
+            self._aperti[-1]["conteggi"][chiave] = self._aperti[-1]["conteggi"].get(chiave, 0) + int(valore)
+
+   def report(self) -> pd.DataFrame:
+      """Funzione che riassume le fasi per nome, nell'ordine della prima esecuzione.
+         Output:
+            - dataframe con chiamate, tempo, CPU, variazione di RSS (somme sulle chiamate della fase, misura in MISURA_MEMORIA),
+              quota del tempo della fase sul totale delle fasi di primo livello e una colonna per conteggio.
+      """
+      if not self.eventi:
+         return pd.DataFrame(columns=["fase", "livello", "chiamate", "tempo_s", "cpu_s", "memoria_mb", "quota_tempo"])
+      eventi = sorted(self.eventi, key=lambda e: e["inizio_s"])
+      righe = pd.DataFrame([{"fase": e["nome"], "livello": e["livello"], "tempo_s": e["tempo_s"], "cpu_s": e["cpu_s"],
+                             "memoria_mb": e["memoria_mb"], **e["conteggi"]} for e in eventi])
+      conteggi = [c for c in righe.columns if c not in ("fase", "livello", "tempo_s", "cpu_s", "memoria_mb")]
+      report = righe.groupby("fase", sort=False).agg(livello=("livello", "min"), chiamate=("fase", "size"),
+                                                     tempo_s=("tempo_s", "sum"), cpu_s=("cpu_s", "sum"),
+                                                     memoria_mb=("memoria_mb", "sum"),
+                                                     **{c: (c, lambda v: v.sum(min_count=1)) for c in conteggi})
+      report[conteggi] = report[conteggi].astype("Int64")
+      totale = righe.loc[righe["livello"] == 0, "tempo_s"].sum()
+      report.insert(5, "quota_tempo", report["tempo_s"] / totale if totale else float("nan"))
+      return report.reset_index()
+
+   def chrome_trace(self) -> dict:
+      """Funzione che restituisce le fasi nel formato Chrome trace (eventi completi 'X', tempi in microsecondi),
+         con la misura della memoria (MISURA_MEMORIA) in 'otherData'."""
+      processo, thread = os.getpid(), threading.get_ident()
+      eventi = [{"name": e["nome"], "cat": "record_linkage", "ph": "X", "pid": processo, "tid": thread,
+                 "ts": e["inizio_s"] * 1e6, "dur": e["tempo_s"] * 1e6,
+                 "args": {"cpu_s": e["cpu_s"], "memoria_mb": e["memoria_mb"], **e["conteggi"]}}
+                for e in sorted(self.eventi, key=lambda e: e["inizio_s"])]
+      return {"traceEvents": eventi, "displayTimeUnit": "ms", "otherData": {"misura_memoria": MISURA_MEMORIA}}
+
+   def salva_chrome_trace(self, path) -> Path:
+      """Funzione che salva il Chrome trace in un file JSON."""
+      path = Path(path)
+      path.write_text(json.dumps(self.chrome_trace()))
+      return path
+
+
+class ProfiloNullo:
+   """Profilo che non registra nulla, usato quando non si vuole profilare (costo trascurabile)."""
+
+   def fase(self, nome: str, **conteggi):
+      return nullcontext()
+
+   def conta(self, **conteggi) -> None:
+      pass
+
+
+NESSUN_PROFILO = ProfiloNullo()
+
+
+@contextmanager
+def profilo_esecuzione(profilo, nome: str):
+   """Context manager usato dalle funzioni di record linkage: registra la chiamata intera come fase 'nome'.
+      Input:
+         - profilo, il Profilo passato alla funzione oppure None: in quel caso, se la variabile d'ambiente PROFILO_LINKAGE
+           indica una cartella, la chiamata è profilata e alla fine sono salvati nella cartella
+           '<nome>_<data e ora>.json' (Chrome trace) e '<nome>_<data e ora>.csv' (report), altrimenti non si registra nulla.
+      Output:
+         - il profilo da passare alle fasi della funzione.
+   """
+   cartella = os.environ.get(VARIABILE_AMBIENTE) if profilo is None else None
+   if profilo is None:
+      profilo = Profilo() if cartella else NESSUN_PROFILO
+   with profilo.fase(nome):
+      yield profilo
+   if cartella:
+      cartella = Path(cartella)
+      cartella.mkdir(parents=True, exist_ok=True)
+      base = cartella / f"{nome}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+      profilo.salva_chrome_trace(base.with_suffix(".json"))
+      profilo.report().to_csv(base.with_suffix(".csv"), index=False)
@@ -0,0 +1,197 @@
+"""Pulizia dei dati del Data Lake, le stesse operazioni di 'Data Product/Cleaning_pipeline.ipynb' senza eseguire il notebook.
+   Ogni piattaforma è pulita separatamente (pulisci_piattaforma), così agoda e booking possono essere pulite in parallelo
+   (vedi pipeline.py). Le funzioni di pulizia delle colonne sono quelle di 'Data Product/funzioni.py' (modulo_pulizia),
+   recordlinkage è importato solo al momento della pulizia della colonna 'città'.
+   Passaggi, per ogni piattaforma:
+      - variabili estratte da 'permanenza', 'date' e 'indirizzo' per ogni città (estrai_variabili) e colonne nell'ordine del notebook;
+      - unione delle città, pulizia di prezzo, recensioni, distanza dal centro, persone, notti e date;
+      - titolo_processed (normalizza_titoli), zona_processed e città pulita con recordlinkage.preprocessing.clean;
+      - per agoda i record aggiunti a mano nel notebook (RECORD_AGGIUNTI).
+   Uso:
+      python "Funzioni/pulizia.py" agoda [--città Roma Terni] [--anno 2025] [--output <file>]
+"""
+import argparse
+import importlib.util
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+
+PIATTAFORME = ("agoda", "booking")
+
+COLONNE = ['titolo', 'zona', 'città', 'distanza_centro', 'prezzo', 'numero_notti', 'numero_persone', 'inizio_permanenza',
+           'fine_permanenza', 'recensione_voto_numerico', 'recensione_voto_parola', 'numero_recensioni', 'date', 'permanenza',
+           'indirizzo']
+COLONNE_PIATTAFORMA = {"agoda": COLONNE + ['valutazione'],
+                       "booking": COLONNE + ['valutazione_booking', 'stelle', 'descrizione_camera', 'configurazione_camera',
+                                             'descrizione_unprocessed']}
+
+# Record aggiunti a mano ad agoda nel notebook
+RECORD_AGGIUNTI = [{'titolo_processed': 'hotel valentino', 'prezzo': 190, 'zona_processed': 'eur', 'città': 'Roma'},
+                   {'titolo_processed': 'paris hotel', 'prezzo': 110, 'zona_processed': 'termini', 'città': 'Roma'},
+                   {'titolo_processed': 'fiori hotel', 'prezzo': 81, 'zona_processed': 'Terni', 'città': 'Terni'},
+                   {'titolo_processed': 'classic hotel tulippano', 'prezzo': 109, 'zona_processed': 'Roma', 'città': 'Roma'}]
+
+# Pulizia dei titoli, dopo alfabeto()
+_TRATTINO = re.compile(r"\s*-\s*.*$")
+_ROMA = re.compile(r",?\s*roma\b")
+_ROME = re.compile(r",?\s*rome\b")
+
+# Pulizia della zona, dopo lower() (per agoda prima anche _TRATTINO)
+_ZONA = [(r',?\s*roma\b', ''),
+         (r'\bcentrale\b', ''),
+         (r'\b(rione|piazza|fontana|di|del|e|città|citta|citt)\b', ''),
+         (r'\s+', ' ')]
+
+
+@lru_cache(maxsize=None)
+def modulo_pulizia():
+   """Modulo 'Data Product/funzioni.py' (pulizia dei dati), caricato con un altro nome:
+      'funzioni' è già quello del record linkage (Funzioni/funzioni.py)."""
+   path = carica_percorsi()["path_data_product"] / "funzioni.py"
+   specifica = importlib.util.spec_from_file_location("funzioni_pulizia", path)
+   modulo = importlib.util.module_from_spec(specifica)
+   specifica.loader.exec_module(modulo)
+   return modulo
+
+
+#%%% Pulizia dei titoli
+
+def normalizza_titoli(titoli) -> np.ndarray:
+   """Funzione che pulisce titoli grezzi come la colonna 'titolo_processed' di 'Data Product' (Data Product/Cleaning_pipeline.ipynb):
+      alfabeto() e poi, in minuscolo, via il testo dopo un trattino e le parole 'roma' e 'rome', infine in formato title.
+      Le espressioni regolari sono quelle del notebook, applicate titolo per titolo.
+      Output:
+         - array di titoli processati.
+   """
+   alfabeto = modulo_pulizia().alfabeto
+   processati = []
+   for titolo in titoli:
+      titolo = _TRATTINO.sub("", alfabeto(titolo).lower())
+      processati.append(_ROME.sub("", _ROMA.sub("", titolo)).strip().title())
+   return np.array(processati, dtype=object)
+
+
+def titolo_processed(colonna: pd.Series) -> pd.Series:
+   """Versione di normalizza_titoli() da applicare direttamente ad una colonna, ogni titolo distinto è pulito una sola volta."""
+   codici, uniche = modulo_pulizia().valori_unici(colonna)
+   if not all(isinstance(x, str) for x in uniche):
+      raise TypeError("'colonna' deve contenere solo stringhe.")
+   return pd.Series(normalizza_titoli(uniche)[codici], index=colonna.index, name=colonna.name)
+
+
+def zona_processed(colonna: pd.Series, piattaforma: str) -> pd.Series:
+   """Funzione che pulisce la colonna 'zona' come nel notebook: minuscolo, senza 'roma', 'centrale' e parole come
+      'rione', 'piazza', 'di', spazi multipli ridotti ad uno. Per agoda è rimosso anche il testo dopo un trattino."""
+   zona = colonna.str.lower()
+   if piattaforma == "agoda":
+      zona = zona.str.replace(_TRATTINO.pattern, '', regex=True)
+   for espressione, sostituto in _ZONA:
+      zona = zona.str.replace(espressione, sostituto, regex=True)
+   return zona.str.strip()
+
+#%%%
+
+
+#%%% Pulizia di una piattaforma
+
+def estrai_variabili(dataframe: pd.DataFrame, piattaforma: str, città: str) -> pd.DataFrame:
+   """Funzione che estrae le variabili di una città da 'permanenza', 'date' e 'indirizzo' (il formato dell'indirizzo
+      dipende da piattaforma e città) e restituisce le colonne di COLONNE_PIATTAFORMA.
+      Input:
+         - dataframe, dati di una città del Data Lake (es. 'Data Lake/agoda_Roma.csv');
+         - piattaforma, 'agoda' o 'booking';
+         - città, nome della città nel file (es. 'Roma').
+      Output:
+         - dataframe con numero_notti, numero_persone, inizio_permanenza, fine_permanenza, zona, città (e per agoda distanza_centro).
+   """
+   dataframe = dataframe.copy()
+   dataframe["numero_notti"] = dataframe.permanenza.str.split(",").str[0]
+   dataframe["numero_persone"] = dataframe.permanenza.str.split(",").str[1]
+   dataframe["inizio_permanenza"] = dataframe.date.str.split("-").str[0]
+   dataframe["fine_permanenza"] = dataframe.date.str.split("-").str[1]
+
+   roma = città.lower() == "roma"
+   if piattaforma == "agoda":
+      # Roma: '<zona>, Roma - <distanza>', Terni: '<zona>, Terni' senza distanza dal centro
+      dataframe["distanza_centro"] = dataframe.indirizzo.str.split("-").str[1] if roma else np.nan
+      dataframe["zona"] = (dataframe.indirizzo.str.split("-").str[0] if roma else dataframe.indirizzo).str.split(",").str[0]
+   else:
+      # Roma: '<zona>, Roma', Terni: '<zona>'
+      dataframe["zona"] = dataframe.indirizzo.str.split(",").str[0] if roma else dataframe.indirizzo
+   dataframe["città"] = città.lower()
+   return dataframe[COLONNE_PIATTAFORMA[piattaforma]]
+
+
+def pulisci_piattaforma(dati: dict,
+                        piattaforma: str,
+                        anno: int = None,
+                        record_aggiunti: bool = True) -> pd.DataFrame:
+   """Funzione che pulisce i dati di una piattaforma come Cleaning_pipeline.ipynb.
+      Input:
+         - dati, dizionario {città: dataframe del Data Lake}, le città sono unite in quest'ordine;
+         - piattaforma, 'agoda' o 'booking';
+         - anno (opzionale), anno delle date di permanenza (vedi trasforma_in_data_colonna), se non specificato quello corrente;
+         - record_aggiunti, se True ad agoda sono aggiunti i record di RECORD_AGGIUNTI come nel notebook.
+      Output:
+         - dataframe pulito, come 'Data Product/<piattaforma>.csv'.
+   """
+   if piattaforma not in PIATTAFORME:
+      raise ValueError(f"'piattaforma' deve essere una tra {PIATTAFORME}.")
+   from recordlinkage.preprocessing import clean
+   pulizia = modulo_pulizia()
+
+   df = pd.concat([estrai_variabili(dataframe, piattaforma, città) for città, dataframe in dati.items()])
+   df.reset_index(inplace=True, drop=True)
+
+   df["prezzo"] = pulizia.pulisci_prezzo(df.prezzo)
+   df["numero_recensioni"] = pulizia.pulisci_recensione_colonna(df.numero_recensioni)
+   df["distanza_centro"] = pulizia.pulisci_distanza_centro_colonna(df.distanza_centro)
+   if piattaforma == "booking":
+      df.loc[df.recensione_voto_numerico == "Novità su booking", "recensione_voto_numerico"] = np.nan
+      df.loc[df.recensione_voto_parola == "Novità su booking", "recensione_voto_parola"] = np.nan
+   df["numero_persone"] = df.numero_persone.str.replace("adulti", "").astype(int)
+   df["numero_notti"] = df.numero_notti.str.replace("notte", "").astype(int)
+   for colonna in ("inizio_permanenza", "fine_permanenza"):
+      df[f"{colonna}_datetime"] = pulizia.trasforma_in_data_colonna(df[colonna], anno)
+      df[colonna] = df[f"{colonna}_datetime"].dt.strftime('%d-%m-%y')
+
+   df.insert(loc=1, column='titolo_processed', value=titolo_processed(df.titolo))
+   df.insert(loc=3, column='zona_processed', value=zona_processed(df.zona, piattaforma))
+   df['città'] = clean(df['città'])
+
+   if piattaforma == "agoda" and record_aggiunti:
+      df = pd.concat([df, pd.DataFrame(RECORD_AGGIUNTI)], ignore_index=True)
+   return df
+
+
+def leggi_data_lake(path_data_lake: Path, piattaforma: str, città: list) -> dict:
+   """Funzione che legge i file del Data Lake di una piattaforma. Output: dizionario {città: dataframe}."""
+   return {c: pd.read_csv(Path(path_data_lake) / f"{piattaforma}_{c}.csv", index_col=0) for c in città}
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("piattaforma", choices=PIATTAFORME)
+   parser.add_argument("--città", nargs="+", default=["Roma", "Terni"])
+   parser.add_argument("--anno", type=int, default=None, help="anno delle date di permanenza (default: anno corrente)")
+   parser.add_argument("--output", type=Path, default=None, help="default: 'Data Product/<piattaforma>.csv'")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   df = pulisci_piattaforma(leggi_data_lake(paths["path_data_lake"], args.piattaforma, args.città), args.piattaforma, args.anno)
+   output = args.output or paths["path_data_product"] / f"{args.piattaforma}.csv"
+   df.to_csv(output)
+   print(f"{args.piattaforma}: {df.shape[0]} righe, {df.shape[1]} colonne -> {output}")
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,366 @@
+"""Scheduler dello scraping di più città: una lista di lavori (sito, città, check-in, check-out) eseguiti da un pool
+   limitato di browser headless. Al posto dei time.sleep() fissi dei notebook 01)_Get_HTML si aspetta un evento
+   (le proprietà sono caricate, il numero di proprietà aumenta, il numero di pagina cambia) con un timeout.
+   L'html di ogni pagina è salvato appena scaricato insieme a un file stato.json: rilanciando lo scheduler
+   i lavori completati sono saltati e le pagine già salvate non vengono scaricate di nuovo.
+   Gli html sono salvati in UTF-8 con i nomi usati dai notebook (html_final.txt, html_final_pagina{i}.txt), nella
+   sottocartella del lavoro (es. 'html/agoda_Roma_2025-08-01_2025-08-02', vedi nome_lavoro): estrazione.py senza --html
+   elabora l'ultimo lavoro completato della città.
+   Uso:
+      python "Funzioni/scraping.py" booking,Roma,2025-08-01,2025-08-02 agoda,Roma,2025-08-01,2025-08-02 [--n-sessioni 2]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+from urllib.parse import quote_plus
+
+import numpy as np
+import pandas as pd
+from lxml import html as lxml_html
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+
+
+#%%% Siti
+
+# Link di ricerca: stessi parametri dei link dei notebook, con città e date come campi da sostituire
+URL = {
+   "booking": "https://www.booking.com/searchresults.it.html?ss={città}&lang=it&checkin={checkin}&checkout={checkout}"
+              "&group_adults=2&no_rooms=1&group_children=0",
+   "agoda": "https://www.agoda.com/it-it/search?textToSearch={città}&checkIn={checkin}&checkOut={checkout}"
+            "&rooms=1&adults=2&children=0&los={notti}&priceCur=EUR&currency=EUR",
+}
+
+# XPath degli elementi che segnalano gli eventi da aspettare o sui quali cliccare.
+# Più alternative dello stesso pulsante sono unite con "|" (un'unica attesa invece di una per metodo)
+XPATH = {
+   "booking": {
+      "proprieta": "//div[@data-testid='property-card']",
+      "cookie": "//button[text()='Accetto'] | //button[@id='onetrust-accept-btn-handler']",
+      "carica_altri": "//button[.//span[text()='Carica più risultati']] | //button[text()='Carica più risultati']",
+   },
+   "agoda": {
+      "proprieta": "//div[@data-element-name='PropertyCardBaseJacket']",
+      "cookie": "//button[text()='OK'] | //button[contains(@class, 'BtnPair__RejectBtn')] | //button[text()='Dismiss']",
+      "avanti": "//button[@id='paginationNext']",
+      "pagina": "//span[@id='paginationPageCount']",
+   },
+}
+
+
+def crea_url(lavoro: tuple, url: dict = None) -> str:
+   """Funzione che compone il link di ricerca di un lavoro (sito, città, check-in, check-out), date 'AAAA-MM-GG'."""
+   sito, città, checkin, checkout = lavoro
+   notti = (date.fromisoformat(checkout) - date.fromisoformat(checkin)).days
+   return (url or URL)[sito].format(città=quote_plus(città), checkin=checkin, checkout=checkout, notti=notti)
+
+
+def numero_pagine(html: str) -> tuple:
+   """Funzione che legge dal testo della paginazione di agoda ('Pagina 1 di 6') la pagina corrente e il numero di pagine.
+      Output:
+         - (pagina corrente, pagine totali), (1, 1) se la paginazione non c'è.
+   """
+   testo = lxml_html.fromstring(html).xpath(f"string({XPATH['agoda']['pagina']})").replace("Pagina", "")
+   if "di" not in testo:
+      return 1, 1
+   corrente, totali = testo.split("di")
+   return int(corrente), int(totali)
+
+#%%%
+
+
+#%%% Sessione del browser
+
+class SessioneSelenium:
+   """Browser Chrome headless (senza immagini, come nei notebook) con le poche operazioni usate dallo scheduler.
+      Le attese sono WebDriverWait su una condizione, che terminano appena la condizione è vera.
+      Lo scheduler accetta qualunque oggetto con gli stessi metodi (es. per provarlo senza browser, vedi
+      Benchmark/benchmark_scraping.py).
+   """
+
+   def __init__(self, path_driver: str = None, headless: bool = True):
+      from selenium import webdriver
+      from selenium.webdriver.chrome.service import Service
+
+      options = webdriver.ChromeOptions()
+      options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+      if headless:
+         options.add_argument("--headless=new")
+      options.add_argument("--window-size=1920,1080")
+      service = Service(executable_path=path_driver) if path_driver else Service()
+      self.driver = webdriver.Chrome(service=service, options=options)
+
+   def apri(self, url: str) -> None:
+      self.driver.get(url)
+
+   def html(self) -> str:
+      return self.driver.page_source
+
+   def conta(self, xpath: str) -> int:
+      from selenium.webdriver.common.by import By
+      return len(self.driver.find_elements(By.XPATH, xpath))
+
+   def attendi(self, xpath: str, timeout: float, minimo: int = 1) -> bool:
+      """Aspetta che ci siano almeno 'minimo' elementi che soddisfano l'XPath; False se scade il timeout."""
+      from selenium.common.exceptions import TimeoutException
+      from selenium.webdriver.support.ui import WebDriverWait
+      try:
+         WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(lambda driver: self.conta(xpath) >= minimo)
+         return True
+      except TimeoutException:
+         return False
+
+   def clicca(self, xpath: str, timeout: float) -> bool:
+      """Clicca il primo elemento cliccabile che soddisfa l'XPath; False se non compare entro il timeout."""
+      from selenium.common.exceptions import TimeoutException
+      from selenium.webdriver.common.by import By
+      from selenium.webdriver.support import expected_conditions as EC
+      from selenium.webdriver.support.ui import WebDriverWait
+      try:
+         WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(EC.element_to_be_clickable((By.XPATH, xpath))).click()
+         return True
+      except TimeoutException:
+         return False
+
+   def scorri_in_fondo(self) -> None:
+      self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+
+   def chiudi(self) -> None:
+      self.driver.quit()
+
+#%%%
+
+
+#%%% Scaricamento di un lavoro
+
+def _scrivi_testo(path: Path, testo: str) -> None:
+   """Scrive un file passando da un file temporaneo, così un'interruzione non lascia file a metà."""
+   temporaneo = path.with_name(path.name + ".tmp")
+   with open(temporaneo, "w", encoding="utf-8") as f:
+      f.write(testo)
+   os.replace(temporaneo, path)
+
+
+def _carica_tutte(sessione, xpath: dict, timeout_scroll: float, max_scroll: int) -> None:
+   """Scorre la pagina fino in fondo finché compaiono nuove proprietà (caricamento progressivo),
+      cliccando 'Carica più risultati' quando c'è. Si ferma quando per 'timeout_scroll' secondi non arriva niente."""
+   proprieta = sessione.conta(xpath["proprieta"])
+   for _ in range(max_scroll):
+      sessione.scorri_in_fondo()
+      if "carica_altri" in xpath and sessione.conta(xpath["carica_altri"]):
+         sessione.clicca(xpath["carica_altri"], timeout_scroll)
+      if not sessione.attendi(xpath["proprieta"], timeout_scroll, minimo=proprieta + 1):
+         return
+      proprieta = sessione.conta(xpath["proprieta"])
+
+
+def scarica_lavoro(sessione,
+                   lavoro: tuple,
+                   cartella,
+                   url: dict = None,
+                   timeout: float = 20,
+                   timeout_scroll: float = 3,
+                   max_scroll: int = 200,
+                   latenze: list = None) -> dict:
+   """Funzione che scarica tutte le pagine di risultati di un lavoro e salva l'html di ognuna nella cartella del lavoro.
+      Booking ha una sola pagina (html_final.txt) che si allunga scorrendo; agoda ha più pagine (html_final_pagina{i}.txt)
+      e le pagine già salvate in una esecuzione precedente non vengono scorse di nuovo.
+      Input:
+         - sessione, browser (SessioneSelenium o oggetto con gli stessi metodi);
+         - lavoro, tupla (sito, città, check-in, check-out);
+         - cartella, cartella del lavoro, con il file stato.json;
+         - url (opzionale), link di ricerca per sito, di default URL;
+         - timeout (opzionale), secondi massimi di attesa per il caricamento di una pagina;
+         - timeout_scroll (opzionale), secondi massimi di attesa di nuove proprietà dopo uno scroll;
+         - max_scroll (opzionale), numero massimo di scroll per pagina;
+         - latenze (opzionale), lista alla quale aggiungere (lavoro, pagina, secondi) per ogni pagina salvata.
+      Output:
+         - stato del lavoro (lo stesso salvato in stato.json).
+   """
+   sito = lavoro[0]
+   xpath = XPATH[sito]
+   cartella = Path(cartella)
+   cartella.mkdir(parents=True, exist_ok=True)
+   path_stato = cartella / "stato.json"
+   stato = json.loads(path_stato.read_text(encoding="utf-8")) if path_stato.exists() else {"pagine": [], "pagine_totali": None, "completato": False}
+   if stato["completato"]:
+      return stato
+
+   inizio = time.perf_counter()
+   sessione.apri(crea_url(lavoro, url))
+   if not sessione.attendi(xpath["proprieta"], timeout):
+      raise TimeoutError(f"Nessuna proprietà caricata entro {timeout} s: {lavoro}")
+   sessione.clicca(xpath["cookie"], timeout_scroll)
+
+   pagina = 1
+   while True:
+      if pagina not in stato["pagine"]:
+         _carica_tutte(sessione, xpath, timeout_scroll, max_scroll)
+         html = sessione.html()
+         nome = "html_final.txt" if sito == "booking" else f"html_final_pagina{pagina}.txt"
+         _scrivi_testo(cartella / nome, html)
+         stato["pagine"].append(pagina)
+         stato["pagine_totali"] = numero_pagine(html)[1] if sito == "agoda" else 1
+         _scrivi_testo(path_stato, json.dumps(stato))
+         if latenze is not None:
+            latenze.append((lavoro, pagina, time.perf_counter() - inizio))
+
+      if pagina >= stato["pagine_totali"]:
+         break
+
+      # Pagina successiva: si aspetta che la paginazione indichi la nuova pagina
+      inizio = time.perf_counter()
+      if not sessione.clicca(xpath["avanti"], timeout):
+         raise TimeoutError(f"Pulsante per la pagina {pagina + 1} non trovato: {lavoro}")
+      pagina += 1
+      if not sessione.attendi(f"{xpath['pagina']}[starts-with(normalize-space(.), 'Pagina {pagina} ')]", timeout):
+         raise TimeoutError(f"Pagina {pagina} non caricata entro {timeout} s: {lavoro}")
+
+   stato["completato"] = True
+   _scrivi_testo(path_stato, json.dumps(stato))
+   return stato
+
+#%%%
+
+
+#%%% Scheduler
+
+def nome_lavoro(lavoro: tuple) -> str:
+   """Nome della cartella di un lavoro, es. 'agoda_Roma_2025-08-01_2025-08-02'."""
+   return "_".join(str(parte).replace(" ", "-") for parte in lavoro)
+
+
+class SchedulerScraping:
+   """Esegue una lista di lavori (sito, città, check-in, check-out) con al massimo 'n_sessioni' browser aperti.
+      Ogni lavoro salva gli html in una sua sottocartella di 'cartella' (percorso, o dizionario sito -> percorso).
+      Ogni thread del pool usa sempre lo stesso browser (creato al primo lavoro con 'crea_sessione', chiuso alla fine);
+      se un lavoro fallisce il browser viene chiuso e ricreato e il lavoro riprovato fino a 'tentativi' volte,
+      ripartendo dalle pagine già salvate.
+      Dopo esegui(), metriche() restituisce throughput e latenza per pagina (tempo dal link o dal click
+      'pagina successiva' fino al salvataggio dell'html).
+      Uso:
+         scheduler = SchedulerScraping(paths['path_progetto'] / 'Web Scraping' / 'html', n_sessioni=3)
+         risultati = scheduler.esegui([('booking', 'Roma', '2025-08-01', '2025-08-02'),
+                                       ('agoda', 'Roma', '2025-08-01', '2025-08-02')])
+         scheduler.metriche()
+   """
+
+   def __init__(self,
+                cartella,
+                crea_sessione=None,
+                n_sessioni: int = 2,
+                url: dict = None,
+                tentativi: int = 2,
+                **opzioni):
+      self.cartella = cartella
+      self.crea_sessione = crea_sessione or SessioneSelenium
+      self.n_sessioni = max(int(n_sessioni), 1)
+      self.url = url
+      self.tentativi = tentativi
+      self.opzioni = opzioni
+      self.latenze = []
+      self.durata = np.nan
+      self._locale = threading.local()
+      self._sessioni = []
+      self._lock = threading.Lock()
+
+   def __repr__(self):
+      return f"<{self.__class__.__name__} cartella={self.cartella!r}, n_sessioni={self.n_sessioni}>"
+
+   def _cartella(self, sito: str) -> Path:
+      return Path(self.cartella[sito]) if isinstance(self.cartella, dict) else Path(self.cartella)
+
+   def _sessione(self):
+      """Browser del thread corrente (creato al primo uso)."""
+      if getattr(self._locale, "sessione", None) is None:
+         self._locale.sessione = self.crea_sessione()
+         with self._lock:
+            self._sessioni.append(self._locale.sessione)
+      return self._locale.sessione
+
+   def _chiudi_sessione(self) -> None:
+      sessione, self._locale.sessione = getattr(self._locale, "sessione", None), None
+      if sessione is None:
+         return
+      with self._lock:
+         self._sessioni.remove(sessione)
+      try:
+         sessione.chiudi()
+      except Exception:
+         pass
+
+   def _esegui_lavoro(self, lavoro: tuple) -> dict:
+      inizio = time.perf_counter()
+      risultato = {"sito": lavoro[0], "città": lavoro[1], "checkin": lavoro[2], "checkout": lavoro[3]}
+      for tentativo in range(1, self.tentativi + 1):
+         try:
+            stato = scarica_lavoro(self._sessione(), lavoro, self._cartella(lavoro[0]) / nome_lavoro(lavoro), url=self.url,
+                                   latenze=self.latenze, **self.opzioni)
+            risultato.update(completato=True, pagine=len(stato["pagine"]), tentativi=tentativo, errore=None)
+            break
+         except Exception as errore:
+            self._chiudi_sessione()
+            risultato.update(completato=False, pagine=np.nan, tentativi=tentativo, errore=repr(errore))
+      risultato["tempo"] = time.perf_counter() - inizio
+      return risultato
+
+   def esegui(self, lavori: list) -> pd.DataFrame:
+      """Esegue i lavori e restituisce un dataframe con una riga per lavoro
+         (completato, pagine salvate, tentativi, errore, tempo in secondi)."""
+      lavori = [tuple(lavoro) for lavoro in lavori]
+      self.latenze = []
+      inizio = time.perf_counter()
+      try:
+         with ThreadPoolExecutor(max_workers=min(self.n_sessioni, len(lavori)) or 1) as executor:
+            risultati = list(executor.map(self._esegui_lavoro, lavori))
+      finally:
+         for sessione in self._sessioni:
+            try:
+               sessione.chiudi()
+            except Exception:
+               pass
+         self._sessioni = []
+         self._locale = threading.local()
+      self.durata = time.perf_counter() - inizio
+      return pd.DataFrame(risultati)
+
+   def metriche(self) -> dict:
+      """Pagine salvate nell'ultima esecuzione, pagine al secondo e latenza per pagina (media, mediana, 95° percentile, massimo)."""
+      latenze = np.array([secondi for _, _, secondi in self.latenze], dtype=np.float64)
+      if len(latenze) == 0:
+         return {"pagine": 0, "durata": self.durata, "pagine_al_secondo": 0.0}
+      return {"pagine": len(latenze), "durata": self.durata, "pagine_al_secondo": len(latenze) / self.durata,
+              "latenza_media": latenze.mean(), "latenza_p50": np.percentile(latenze, 50),
+              "latenza_p95": np.percentile(latenze, 95), "latenza_max": latenze.max()}
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("lavori", nargs="+", help="sito,città,check-in,check-out (date AAAA-MM-GG)")
+   parser.add_argument("--n-sessioni", type=int, default=2)
+   parser.add_argument("--visibile", action="store_true", help="browser visibile invece che headless")
+   parser.add_argument("--cartella", default=None, help="di default la cartella html di ogni scraper")
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   lavori = [tuple(parte.strip() for parte in lavoro.split(",")) for lavoro in args.lavori]
+   sessione = lambda: SessioneSelenium(paths["path_selenium_driver"], headless=not args.visibile)
+
+   # Di default ogni sito salva nella cartella html del suo scraper
+   cartella = args.cartella or {sito: paths[f"path_scraper_{sito}"] / "html" for sito in URL}
+   scheduler = SchedulerScraping(cartella, crea_sessione=sessione, n_sessioni=args.n_sessioni)
+   print(scheduler.esegui(lavori).to_string())
+   print(scheduler.metriche())
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,434 @@
+"""Servizio di ricerca dei match: "qual è la location di agoda corrispondente a questa location di booking?",
+   una location (o un gruppo di location) alla volta, senza leggere tutto il file dei match come AnalisiRisultati.ipynb.
+   L'indice del servizio (costruisci_indice) è una cartella di file .npy con:
+      - index, titoli e titoli processati (output di alfabeto) delle location di booking e agoda;
+      - l'indice invertito sui token dei titoli di agoda (vocabolario ordinato e posting list in formato CSR), già filtrato
+        sui token rari come IndiceInvertito, e le frequenze dei token in booking e agoda;
+      - i match precalcolati (record_linkage_title oppure un file dei match di Results) di ogni location di booking.
+   All'avvio i titoli sono letti in memoria e gli altri array (posting list, vocabolario, hash, match) aperti come memory map.
+   Una location già nell'indice (index di booking, o titolo uguale dopo la pulizia a quello di una location di booking)
+   ha il match precalcolato. Un titolo nuovo è pulito come in Cleaning_pipeline.ipynb (pulizia.normalizza_titoli),
+   diviso in token e confrontato con Jaro-Winkler con le location di agoda che hanno un token raro in comune:
+   il match è la location con la similarità più alta sopra soglia.
+   Le richieste arrivano a un endpoint HTTP locale (asyncio, senza dipendenze esterne):
+      GET  /match?booking=<index>                match precalcolato di una location di booking;
+      GET  /match?titolo=<titolo>[&al_volo=1]    match di un titolo (al_volo=1: confronto anche se il titolo è nell'indice);
+      POST /match {"booking": [...], "titoli": [...], "al_volo": false}   più ricerche in una richiesta;
+      GET  /metriche                             richieste servite e latenze (p50, p99) di ogni endpoint.
+   Uso:
+      python "Funzioni/servizio.py" costruisci [--cartella <cartella>] [--soglia 0.95] [--match Results/matches_titolo_095.csv]
+      python "Funzioni/servizio.py" avvia [--cartella <cartella>] [--porta 8765]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+from blocking import IndiceInvertito, tokenizza
+from cache import hash_stringhe
+from confronto import jarowinkler_vettoriale
+from pulizia import normalizza_titoli
+
+# Array letti in memoria all'avvio, gli altri sono aperti come memory map
+IN_MEMORIA = ("booking_titoli", "agoda_titoli", "agoda_titoli_processed")
+
+
+#%%% Costruzione dell'indice
+
+def _scrivi_array(cartella: Path, array: dict) -> None:
+   """Scrive gli array dell'indice (prima su file temporanei, poi li sostituisce)."""
+   for nome, valore in array.items():
+      temporaneo = cartella / f"{nome}.tmp.npy"
+      np.save(temporaneo, valore)
+      os.replace(temporaneo, cartella / f"{nome}.npy")
+
+
+def _stringhe(colonna: pd.Series) -> np.ndarray:
+   """Colonna di testo come array di stringhe a lunghezza fissa (leggibile come memory map), '' per i valori mancanti."""
+   return colonna.fillna("").astype(str).to_numpy(dtype=str)
+
+
+def costruisci_indice(booking: pd.DataFrame,
+                      agoda: pd.DataFrame,
+                      cartella,
+                      soglia: float,
+                      match: pd.DataFrame = None,
+                      blocking="token") -> dict:
+   """Funzione che costruisce e salva l'indice del servizio (vedi ServizioMatch).
+      Input:
+         - booking, agoda, dataframe di 'Data Product' (colonne 'titolo', 'titolo_processed');
+         - cartella, dove salvare i file dell'indice;
+         - soglia, soglia della similarità dei titoli per i titoli nuovi (e per i match, se calcolati qui);
+         - match (opzionale), match precalcolati con le colonne 'index_booking', 'index_agoda', 'name_similarity'
+           (output di record_linkage_title o un file di Results); se mancano sono calcolati con record_linkage_title;
+         - blocking (opzionale), 'token', 'qgram' o un IndiceInvertito: regola delle coppie candidate dei titoli nuovi.
+      Output:
+         - parametri dell'indice (salvati anche in parametri.json).
+   """
+   if isinstance(blocking, str):
+      if blocking not in ("token", "qgram"):
+         raise ValueError("Il servizio supporta solo il blocking 'token', 'qgram' o un IndiceInvertito.")
+      blocking = IndiceInvertito("titolo_booking", "titolo_agoda", modalita=blocking)
+   elif not isinstance(blocking, IndiceInvertito):
+      raise ValueError("Il servizio supporta solo il blocking 'token', 'qgram' o un IndiceInvertito.")
+   cartella = Path(cartella)
+   cartella.mkdir(parents=True, exist_ok=True)
+
+   booking = booking.sort_index()
+   if match is None:
+      from funzioni import record_linkage_title
+      match = record_linkage_title(agoda.copy(), booking.copy(), soglia, blocking=blocking)
+
+   # Token rari dei titoli (stessa regola di IndiceInvertito su booking x agoda), vocabolario in ordine alfabetico
+   _, posting_agoda, vocabolario = blocking.token_rari(
+      pd.DataFrame({blocking.left_on: booking["titolo_processed"]}), pd.DataFrame({blocking.right_on: agoda["titolo_processed"]}))
+   ordine_vocabolario = np.argsort(vocabolario["token"].to_numpy(dtype=str), kind="stable")
+   codice = np.empty(len(vocabolario), np.int64)
+   codice[ordine_vocabolario] = np.arange(len(vocabolario))
+   token_agoda = codice[posting_agoda["token"].to_numpy()]
+   ordine = np.lexsort((posting_agoda["record"].to_numpy(), token_agoda))
+
+   # Match di ogni location di booking: posizione della location di agoda (-1 senza match) e similarità
+   posizioni_booking = booking.index.get_indexer(match["index_booking"])
+   posizioni_agoda = agoda.index.get_indexer(match["index_agoda"])
+   if (posizioni_booking < 0).any() or (posizioni_agoda < 0).any():
+      raise ValueError("I match contengono location che non sono nei dataframe di booking e agoda.")
+   match_agoda = np.full(len(booking), -1, np.int64)
+   match_similarita = np.full(len(booking), np.nan)
+   match_agoda[posizioni_booking] = posizioni_agoda
+   match_similarita[posizioni_booking] = match["name_similarity"].to_numpy(dtype=np.float64)
+
+   hash_booking = hash_stringhe(booking["titolo_processed"].fillna("").to_numpy()).view(np.int64)
+   ordine_hash = np.argsort(hash_booking, kind="stable")
+   _scrivi_array(cartella, {
+      "booking_index": booking.index.to_numpy(np.int64),
+      "booking_titoli": _stringhe(booking["titolo"].fillna(booking["titolo_processed"])),
+      "booking_hash": hash_booking[ordine_hash],
+      "booking_ordine_hash": ordine_hash,
+      "agoda_index": agoda.index.to_numpy(np.int64),
+      "agoda_titoli": _stringhe(agoda["titolo"].fillna(agoda["titolo_processed"])),
+      "agoda_titoli_processed": _stringhe(agoda["titolo_processed"]),
+      "vocabolario": vocabolario["token"].to_numpy(dtype=str)[ordine_vocabolario],
+      "frequenze_booking": vocabolario["frequenza_a"].to_numpy(np.int64)[ordine_vocabolario],
+      "frequenze_agoda": vocabolario["frequenza_b"].to_numpy(np.int64)[ordine_vocabolario],
+      "posting_inizi": np.searchsorted(token_agoda[ordine], np.arange(len(vocabolario) + 1)),
+      "posting_agoda": posting_agoda["record"].to_numpy(np.int64)[ordine],
+      "match_agoda": match_agoda,
+      "match_similarita": match_similarita,
+   })
+
+   parametri = {"soglia": float(soglia), "modalita": blocking.modalita, "q": blocking.q,
+                "min_token_comuni": blocking.min_token_comuni, "max_blocco": blocking.max_blocco,
+                "min_idf": blocking.min_idf, "booking": len(booking), "agoda": len(agoda), "match": len(match)}
+   with open(cartella / "parametri.json", "w") as f:
+      json.dump(parametri, f, indent=3)
+   return parametri
+
+#%%%
+
+
+#%%% Latenze
+
+class Latenze:
+   """Latenze delle ultime 'finestra' richieste di ogni endpoint (buffer circolare), per i percentili p50 e p99."""
+
+   def __init__(self, finestra: int = 100_000):
+      self.finestra = finestra
+      self._valori = {}
+      self._richieste = {}
+
+   def registra(self, endpoint: str, secondi: float) -> None:
+      if endpoint not in self._valori:
+         self._valori[endpoint] = np.empty(self.finestra)
+         self._richieste[endpoint] = 0
+      self._valori[endpoint][self._richieste[endpoint] % self.finestra] = secondi
+      self._richieste[endpoint] += 1
+
+   def riepilogo(self) -> dict:
+      """Per ogni endpoint: richieste servite e latenza p50, p99 e massima (in ms) delle ultime 'finestra'."""
+      riepilogo = {}
+      for endpoint, valori in self._valori.items():
+         valori = valori[:min(self._richieste[endpoint], self.finestra)] * 1000
+         p50, p99 = np.percentile(valori, [50, 99])
+         riepilogo[endpoint] = {"richieste": self._richieste[endpoint], "p50_ms": round(float(p50), 3),
+                                "p99_ms": round(float(p99), 3), "max_ms": round(float(valori.max()), 3)}
+      return riepilogo
+
+   def azzera(self) -> None:
+      self._valori.clear()
+      self._richieste.clear()
+
+#%%%
+
+
+#%%% Servizio
+
+class ServizioMatch:
+   """Ricerca dei match sull'indice salvato da costruisci_indice() e server HTTP che la espone.
+      Le ricerche di index di booking sono servite direttamente dal ciclo di asyncio (sono una np.searchsorted);
+      quelle per titolo, che possono richiedere il confronto dei titoli, da un thread separato ('n_thread'),
+      così nel frattempo il server continua a rispondere alle altre richieste.
+      Uso:
+         servizio = ServizioMatch(paths['path_results'] / 'indice_servizio')
+         servizio.cerca_booking([12, 40])
+         servizio.cerca_titoli(['Hotel Colosseo Roma'])
+         servizio.servi(porta=8765)   # http://127.0.0.1:8765/match?booking=12
+   """
+
+   def __init__(self, cartella, n_thread: int = 1, finestra: int = 100_000):
+      self.cartella = Path(cartella)
+      with open(self.cartella / "parametri.json") as f:
+         self.parametri = json.load(f)
+      self.array = {}
+      for file in self.cartella.glob("*.npy"):
+         if not file.name.endswith(".tmp.npy"):
+            self.array[file.stem] = np.load(file, mmap_mode=None if file.stem in IN_MEMORIA else "r")
+      self._esecutore = ThreadPoolExecutor(max_workers=n_thread)
+      self.latenze = Latenze(finestra)
+      self.ricerche = {"precalcolato": 0, "al_volo": 0}
+
+   def __repr__(self):
+      return (f"<{self.__class__.__name__} cartella={str(self.cartella)!r}, booking={self.parametri['booking']}, "
+              f"agoda={self.parametri['agoda']}, soglia={self.parametri['soglia']}>")
+
+   def _risultati(self, agoda: np.ndarray, similarita: np.ndarray, **colonne) -> list:
+      """Risposte delle ricerche: per ogni ricerca i valori di 'colonne' e la location di agoda del match
+         (posizione nell'indice, -1 senza match: agoda, titolo_agoda e similarita None) con la sua similarità."""
+      agoda = np.asarray(agoda, dtype=np.int64)
+      trovate = (agoda >= 0).tolist()
+      colonne["agoda"] = self.array["agoda_index"][agoda].tolist()
+      colonne["titolo_agoda"] = self.array["agoda_titoli"][agoda].tolist()
+      colonne["similarita"] = np.asarray(similarita, dtype=np.float64).tolist()
+      for nome in ("agoda", "titolo_agoda", "similarita"):
+         colonne[nome] = [v if t else None for v, t in zip(colonne[nome], trovate)]
+      return [dict(zip(colonne, valori)) for valori in zip(*colonne.values())]
+
+   def _precalcolati(self, posizioni: np.ndarray, **colonne) -> list:
+      """Risposte con i match precalcolati delle location di booking in 'posizioni' (posizioni nell'indice)."""
+      self.ricerche["precalcolato"] += len(posizioni)
+      return self._risultati(self.array["match_agoda"][posizioni], self.array["match_similarita"][posizioni],
+                             booking=self.array["booking_index"][posizioni].tolist(),
+                             titolo=self.array["booking_titoli"][posizioni].tolist(), origine=["precalcolato"] * len(posizioni),
+                             **colonne)
+
+   def cerca_booking(self, indici) -> list:
+      """Funzione che restituisce i match precalcolati di location di booking dell'indice.
+         Input:
+            - indici, index di booking.
+         Output:
+            - lista con un dizionario per indice: booking, titolo, origine, agoda, titolo_agoda, similarita
+              (agoda, titolo_agoda e similarita None senza match); {'booking': ..., 'errore': ...} se l'index non c'è.
+      """
+      indici = np.asarray(indici, dtype=np.int64)
+      index_booking = self.array["booking_index"]
+      posizioni = np.minimum(np.searchsorted(index_booking, indici), len(index_booking) - 1)
+      trovate = index_booking[posizioni] == indici
+      risultati = [{"booking": i, "errore": "location di booking non presente nell'indice"} for i in indici.tolist()]
+      for i, risultato in zip(np.flatnonzero(trovate), self._precalcolati(posizioni[trovate])):
+         risultati[i] = risultato
+      return risultati
+
+   def candidate(self, titoli_processati: np.ndarray) -> pd.MultiIndex:
+      """Funzione che genera le coppie candidate (titolo, posizione della location di agoda) di titoli processati
+         con la regola di IndiceInvertito, usando le frequenze dei token dell'indice: un titolo dell'indice ha le stesse
+         coppie candidate della sua location di booking. I token che non sono nel vocabolario non generano coppie
+         ma, come token rari, tolgono al titolo i token generici."""
+      parametri = self.parametri
+      vocabolario = self.array["vocabolario"]
+      token = tokenizza(pd.Series(titoli_processati, dtype=object), parametri["modalita"], parametri["q"])
+      testo = token.to_numpy(dtype=str)
+      codici = np.minimum(np.searchsorted(vocabolario, testo), len(vocabolario) - 1)
+      noti = vocabolario[codici] == testo if len(vocabolario) else np.zeros(len(testo), dtype=bool)
+
+      # Rarità e idf dei token (un token nuovo compare solo nel titolo cercato)
+      frequenze_booking = np.where(noti, self.array["frequenze_booking"][codici], 1)
+      frequenze_agoda = np.where(noti, self.array["frequenze_agoda"][codici], 0)
+      idf = np.log((parametri["booking"] + parametri["agoda"]) / (frequenze_booking + frequenze_agoda))
+      rari = (frequenze_booking * frequenze_agoda <= parametri["max_blocco"]) & (idf >= parametri["min_idf"])
+      # Regola di IndiceInvertito._filtra_rari (token rari, o quelli con idf massimo) con numpy, senza i groupby di pandas (pochi titoli per richiesta)
+      record = token.index.to_numpy(np.int64)
+      senza_rari = np.bincount(record, weights=rari, minlength=len(titoli_processati)) == 0
+      idf_massimo = np.full(len(titoli_processati), -np.inf)
+      np.maximum.at(idf_massimo, record, idf)
+      tenuti = np.flatnonzero(noti & (rari | (senza_rari[record] & (idf == idf_massimo[record]))))
+
+      # Posting list dei token tenuti: una riga per (titolo, location di agoda, token in comune)
+      inizi = self.array["posting_inizi"][codici[tenuti]]
+      quanti = self.array["posting_inizi"][codici[tenuti] + 1] - inizi
+      scarti = np.arange(quanti.sum()) - np.repeat(np.cumsum(quanti) - quanti, quanti)
+      agoda = self.array["posting_agoda"][np.repeat(inizi, quanti) + scarti]
+      chiave = np.repeat(record[tenuti], quanti) * parametri["agoda"] + agoda
+      chiavi, comuni = np.unique(chiave, return_counts=True)
+      chiavi = chiavi[comuni >= parametri["min_token_comuni"]]
+      return pd.MultiIndex.from_arrays([chiavi // parametri["agoda"], chiavi % parametri["agoda"]])
+
+   def migliori(self, titoli_processati: np.ndarray) -> tuple:
+      """Funzione che confronta titoli processati con le location di agoda (normalizza -> blocking -> confronto -> migliore).
+         Output:
+            - per ogni titolo la posizione della location di agoda con la similarità più alta sopra soglia (-1 se nessuna);
+            - la similarità di quella location.
+      """
+      candidate_links = self.candidate(titoli_processati)
+      posizioni = np.full(len(titoli_processati), -1, np.int64)
+      similarita = np.full(len(titoli_processati), np.nan)
+      if len(candidate_links):
+         agoda = candidate_links.unique(level=1)
+         titoli_agoda = pd.Series(self.array["agoda_titoli_processed"][agoda].astype(object), index=agoda)
+         punteggi = jarowinkler_vettoriale(candidate_links, pd.Series(titoli_processati, dtype=object), titoli_agoda,
+                                           soglia=self.parametri["soglia"])
+         punteggi = punteggi[punteggi > self.parametri["soglia"]].sort_values(ascending=False, kind="stable")
+         migliori = punteggi[~punteggi.index.get_level_values(0).duplicated()]
+         posizioni[migliori.index.get_level_values(0)] = migliori.index.get_level_values(1)
+         similarita[migliori.index.get_level_values(0)] = migliori.to_numpy()
+      return posizioni, similarita
+
+   def cerca_titoli(self, titoli, al_volo: bool = False) -> list:
+      """Funzione che cerca il match di titoli grezzi (come la colonna 'titolo'), puliti con normalizza_titoli().
+         Un titolo uguale dopo la pulizia a quello di una location di booking dell'indice ha il match precalcolato
+         della prima di queste location; gli altri titoli, o tutti con al_volo=True, sono confrontati con agoda (vedi migliori).
+         Output:
+            - lista con un dizionario per titolo, come cerca_booking() più 'titolo_processed'; 'booking' è None
+              per i titoli confrontati.
+      """
+      titoli = [str(titolo) for titolo in titoli]
+      processati = normalizza_titoli(titoli)
+      posizioni = np.full(len(processati), -1, np.int64)
+      if not al_volo and len(processati):
+         hash_titoli = hash_stringhe(processati).view(np.int64)
+         hash_booking = self.array["booking_hash"]
+         trovate = np.minimum(np.searchsorted(hash_booking, hash_titoli), len(hash_booking) - 1)
+         noti = hash_booking[trovate] == hash_titoli
+         posizioni[noti] = self.array["booking_ordine_hash"][trovate[noti]]
+
+      risultati = [None] * len(processati)
+      noti = np.flatnonzero(posizioni >= 0)
+      for i, risultato in zip(noti, self._precalcolati(posizioni[noti], titolo_processed=processati[noti].tolist())):
+         risultati[i] = risultato
+      nuovi = np.flatnonzero(posizioni < 0)
+      if len(nuovi):
+         self.ricerche["al_volo"] += len(nuovi)
+         agoda, similarita = self.migliori(processati[nuovi])
+         for i, risultato in zip(nuovi, self._risultati(agoda, similarita, booking=[None] * len(nuovi),
+                                                        titolo=[titoli[i] for i in nuovi], origine=["al_volo"] * len(nuovi),
+                                                        titolo_processed=processati[nuovi].tolist())):
+            risultati[i] = risultato
+      return risultati
+
+   async def _rispondi(self, metodo: str, destinazione: str, corpo: bytes) -> tuple:
+      """Esegue una richiesta HTTP. Output: nome dell'endpoint (per le latenze), codice di stato, risposta JSON."""
+      url = urlsplit(destinazione)
+      if url.path == "/metriche" and metodo == "GET":
+         return "GET /metriche", 200, {"latenze": self.latenze.riepilogo(), "ricerche": self.ricerche}
+      if url.path != "/match" or metodo not in ("GET", "POST"):
+         return "altro", 404, {"errore": f"endpoint {metodo} {url.path} inesistente"}
+
+      ciclo = asyncio.get_running_loop()
+      try:
+         if metodo == "POST":
+            richiesta = json.loads(corpo or b"{}")
+            risultati = self.cerca_booking(richiesta.get("booking", []))
+            risultati += await ciclo.run_in_executor(self._esecutore, self.cerca_titoli, list(richiesta.get("titoli", [])),
+                                                     bool(richiesta.get("al_volo", False)))
+            return "POST /match", 200, {"risultati": risultati}
+
+         parametri = parse_qs(url.query)
+         if "booking" in parametri:
+            risultato = self.cerca_booking([int(parametri["booking"][0])])[0]
+            return "GET /match?booking", 404 if "errore" in risultato else 200, risultato
+         if "titolo" in parametri:
+            al_volo = parametri.get("al_volo", ["0"])[0].lower() in ("1", "true")
+            risultato = await ciclo.run_in_executor(self._esecutore, self.cerca_titoli, parametri["titolo"][:1], al_volo)
+            return "GET /match?titolo", 200, risultato[0]
+      except (ValueError, TypeError, AttributeError) as errore:
+         return f"{metodo} /match", 400, {"errore": str(errore)}
+      return "GET /match", 400, {"errore": "parametro 'booking' o 'titolo' mancante"}
+
+   async def _connessione(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+      """Serve le richieste HTTP/1.1 di una connessione (keep-alive) finché il client non la chiude."""
+      try:
+         while True:
+            riga = await reader.readline()
+            if not riga:
+               break
+            metodo, destinazione, _ = riga.decode("latin-1").split(" ", 2)
+            intestazioni = {}
+            while (riga := await reader.readline()) not in (b"\r\n", b"\n", b""):
+               nome, _, valore = riga.decode("latin-1").partition(":")
+               intestazioni[nome.strip().lower()] = valore.strip()
+            corpo = await reader.readexactly(int(intestazioni.get("content-length", 0)))
+
+            inizio = time.perf_counter()
+            endpoint, stato, risposta = await self._rispondi(metodo, destinazione, corpo)
+            dati = json.dumps(risposta, ensure_ascii=False).encode("utf-8")
+            chiudi = intestazioni.get("connection", "").lower() == "close"
+            writer.write(f"HTTP/1.1 {stato} {'OK' if stato == 200 else 'Error'}\r\n"
+                         f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(dati)}\r\n"
+                         f"Connection: {'close' if chiudi else 'keep-alive'}\r\n\r\n".encode("latin-1") + dati)
+            await writer.drain()
+            self.latenze.registra(endpoint, time.perf_counter() - inizio)
+            if chiudi:
+               break
+      except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+         pass
+      finally:
+         writer.close()
+
+   async def avvia(self, host: str = "127.0.0.1", porta: int = 8765) -> asyncio.AbstractServer:
+      """Avvia il server HTTP nel ciclo di asyncio corrente (porta 0: una porta libera, vedi server.sockets)."""
+      return await asyncio.start_server(self._connessione, host, porta)
+
+   def servi(self, host: str = "127.0.0.1", porta: int = 8765) -> None:
+      """Avvia il server HTTP e risponde alle richieste fino all'interruzione (Ctrl+C)."""
+      async def principale():
+         server = await self.avvia(host, porta)
+         host_effettivo, porta_effettiva = server.sockets[0].getsockname()[:2]
+         print(f"Servizio in ascolto su http://{host_effettivo}:{porta_effettiva}", flush=True)
+         async with server:
+            await server.serve_forever()
+
+      try:
+         asyncio.run(principale())
+      except KeyboardInterrupt:
+         pass
+      finally:
+         self._esecutore.shutdown()
+
+#%%%
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("comando", choices=["costruisci", "avvia"])
+   parser.add_argument("--cartella", type=Path, default=None, help="cartella dell'indice, di default Results/indice_servizio")
+   parser.add_argument("--soglia", type=float, default=0.95)
+   parser.add_argument("--match", type=Path, default=None, help="file dei match (es. Results/matches_titolo_095.csv)")
+   parser.add_argument("--blocking", default="token", choices=["token", "qgram"])
+   parser.add_argument("--host", default="127.0.0.1")
+   parser.add_argument("--porta", type=int, default=8765)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   cartella = args.cartella or paths["path_results"] / "indice_servizio"
+   if args.comando == "costruisci":
+      booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+      agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+      match = pd.read_csv(args.match) if args.match else None
+      inizio = time.perf_counter()
+      parametri = costruisci_indice(booking, agoda, cartella, args.soglia, match=match, blocking=args.blocking)
+      print(f"Indice salvato in {cartella} in {time.perf_counter() - inizio:.2f} s: {parametri}")
+   else:
+      ServizioMatch(cartella).servi(args.host, args.porta)
+
+
+if __name__ == "__main__":
+   main()
@@ -0,0 +1,241 @@
+"""Generatore di dataset sintetici etichettati per misurare il record linkage con più righe dei dati reali.
+   I record di booking ('Data Product/booking.csv') sono replicati fino al numero di righe richiesto: in ogni replica
+   le lettere e le cifre del titolo sono permutate (la prima replica resta com'è), così i titoli delle repliche sono
+   diversi tra loro ma hanno la lunghezza, le parole e le similarità dei dati veri.
+   Agoda contiene:
+      - una copia perturbata di una parte dei record di booking, i match veri: refusi, parole in un altro ordine,
+        suffissi come ' Rome' o ' - City Centre', prezzo leggermente diverso;
+      - record senza corrispondente, i record reali di agoda con permutazioni diverse da quelle di booking.
+   'titolo_processed' è ricalcolato con la pulizia dei titoli di 'Data Product/funzioni.py' (alfabeto_colonna).
+   Le coppie vere sono restituite come MultiIndex (index booking, index agoda), come le coppie candidate.
+   Con genera_piattaforme() le stesse entità sono distribuite su più piattaforme (record linkage tra più piattaforme).
+   Uso:
+      python "Funzioni/sintetico.py" --righe 100000 --cartella <cartella>   # booking.csv, agoda.csv, coppie_vere.csv
+"""
+import argparse
+import string
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parent))
+from percorsi import carica_percorsi
+from pulizia import modulo_pulizia
+
+# Suffissi aggiunti ai titoli di agoda (città o centro, che la pulizia dei titoli non rimuove)
+SUFFISSI = (" Rome", " Roma", " - City Centre", " City Center", " - Rome City Centre")
+
+LETTERE = string.ascii_lowercase
+CIFRE = string.digits
+
+
+#%%% Repliche con titoli permutati
+
+def tabelle_permutazione(generatore: np.random.Generator, n: int) -> list:
+   """Funzione che crea n tabelle per str.translate, ognuna con una permutazione casuale delle lettere
+      (la stessa per minuscole e maiuscole) e delle cifre."""
+   tabelle = []
+   for _ in range(n):
+      lettere = "".join(generatore.permutation(list(LETTERE)))
+      cifre = "".join(generatore.permutation(list(CIFRE)))
+      tabelle.append(str.maketrans(LETTERE + LETTERE.upper() + CIFRE, lettere + lettere.upper() + cifre))
+   return tabelle
+
+
+def replica_permutata(dataframe: pd.DataFrame, righe: int, tabelle: list) -> pd.DataFrame:
+   """Funzione che replica il dataframe fino a 'righe' righe con index 0..righe-1: nella replica k il titolo
+      è tradotto con tabelle[k] (None lascia il titolo com'è). Servono almeno righe / len(dataframe) tabelle."""
+   copie = []
+   for k in range(-(-righe // len(dataframe))):
+      copia = dataframe.copy()
+      if tabelle[k] is not None:
+         copia["titolo"] = copia["titolo"].str.translate(tabelle[k])
+      copie.append(copia)
+   return pd.concat(copie, ignore_index=True).iloc[:righe] if copie else dataframe.iloc[:0].reset_index(drop=True)
+
+#%%%
+
+
+#%%% Perturbazioni dei titoli
+
+def _refuso(titolo: str, operazione: int, posizione: float, carattere: str) -> str:
+   """Un refuso nel titolo: 0 sostituzione, 1 cancellazione, 2 inserimento, 3 scambio di due caratteri vicini.
+      'posizione' è un numero tra 0 e 1 (frazione della lunghezza del titolo)."""
+   if len(titolo) < 2:
+      return titolo
+   i = int(posizione * (len(titolo) - 1))
+   if operazione == 0:
+      return titolo[:i] + carattere + titolo[i + 1:]
+   if operazione == 1:
+      return titolo[:i] + titolo[i + 1:]
+   if operazione == 2:
+      return titolo[:i] + carattere + titolo[i:]
+   return titolo[:i] + titolo[i + 1] + titolo[i] + titolo[i + 2:]
+
+
+def _scambia_parole(titolo: str, i: float, j: float) -> str:
+   """Scambia due parole del titolo ('i' e 'j' tra 0 e 1, frazioni del numero di parole)."""
+   parole = titolo.split()
+   if len(parole) < 2:
+      return titolo
+   a, b = int(i * len(parole)), int(j * len(parole))
+   parole[a], parole[b] = parole[b], parole[a]
+   return " ".join(parole)
+
+
+def perturba_titoli(titoli: np.ndarray,
+                    generatore: np.random.Generator,
+                    p_refuso: float = 0.5,
+                    p_ordine: float = 0.3,
+                    p_suffisso: float = 0.3) -> np.ndarray:
+   """Funzione che applica ai titoli (grezzi, prima della pulizia) le differenze tipiche tra booking e agoda.
+      Ogni perturbazione è applicata indipendentemente con la sua probabilità:
+         - p_refuso, un carattere sostituito, cancellato, inserito o scambiato con il successivo;
+         - p_ordine, due parole scambiate (la pulizia ordina le parole: il titolo pulito non cambia);
+         - p_suffisso, uno dei SUFFISSI aggiunto in fondo.
+      Output:
+         - array di titoli perturbati.
+   """
+   n = len(titoli)
+   titoli = np.array(titoli, dtype=object)
+   casi = generatore.random((3, n)) < np.array([[p_refuso], [p_ordine], [p_suffisso]])
+   # Numeri casuali estratti una volta per tutti i titoli: il risultato dipende solo dal seme e non dal numero di perturbati
+   operazioni = generatore.integers(0, 4, n)
+   posizioni = generatore.random((3, n))
+   caratteri = generatore.choice(list(LETTERE), n)
+   suffissi = generatore.choice(list(SUFFISSI), n)
+
+   for i in np.flatnonzero(casi[0]):
+      titoli[i] = _refuso(titoli[i], operazioni[i], posizioni[0, i], caratteri[i])
+   for i in np.flatnonzero(casi[1]):
+      titoli[i] = _scambia_parole(titoli[i], posizioni[1, i], posizioni[2, i])
+   titoli[casi[2]] = titoli[casi[2]] + suffissi[casi[2]]
+   return titoli
+
+#%%%
+
+
+def genera_dataset(booking: pd.DataFrame,
+                   agoda: pd.DataFrame,
+                   righe: int,
+                   righe_agoda: int = None,
+                   frazione_match: float = 0.5,
+                   p_refuso: float = 0.5,
+                   p_ordine: float = 0.3,
+                   p_suffisso: float = 0.3,
+                   variazione_prezzo: float = 0.05,
+                   seme: int = 0) -> tuple:
+   """Funzione che genera un dataset etichettato per il record linkage a partire dai dati di 'Data Product'.
+      Input:
+         - booking, agoda, dataframe di 'Data Product';
+         - righe, righe di booking;
+         - righe_agoda (opzionale), righe di agoda, di default quante quelle di booking;
+         - frazione_match (opzionale), frazione dei record di agoda che sono copie di un record di booking;
+         - p_refuso, p_ordine, p_suffisso (opzionali), probabilità delle perturbazioni dei titoli, vedi perturba_titoli();
+         - variazione_prezzo (opzionale), deviazione standard della variazione relativa del prezzo delle copie;
+         - seme (opzionale), a parità di seme e parametri il dataset è lo stesso.
+      Output:
+         - booking e agoda sintetici, con index 0..righe-1 e le colonne dei dataframe in input;
+         - coppie vere, MultiIndex (index_booking, index_agoda).
+   """
+   # Alcuni record di agoda hanno solo il titolo pulito: i titoli sono perturbati e ripuliti a partire da 'titolo'
+   booking, agoda = (df.assign(titolo=df["titolo"].fillna(df["titolo_processed"])) for df in (booking, agoda))
+   generatore = np.random.default_rng(seme)
+   righe_agoda = righe if righe_agoda is None else righe_agoda
+   n_match = min(round(frazione_match * righe_agoda), righe)
+   repliche_booking = -(-righe // len(booking))
+   repliche_agoda = -(-(righe_agoda - n_match) // len(agoda))
+   # La prima replica di booking resta com'è; agoda ha permutazioni diverse da quelle di booking,
+   # altrimenti i suoi record reali avrebbero un match (non etichettato) nella replica di booking con la stessa permutazione
+   tabelle = [None] + tabelle_permutazione(generatore, repliche_booking - 1 + repliche_agoda)
+
+   dataframe_booking = replica_permutata(booking, righe, tabelle[:repliche_booking])
+
+   # Copie perturbate di n_match record di booking, nelle colonne di agoda
+   scelti = np.sort(generatore.choice(righe, n_match, replace=False))
+   copie = dataframe_booking.iloc[scelti].reindex(columns=agoda.columns)
+   copie["titolo"] = perturba_titoli(copie["titolo"].to_numpy(), generatore, p_refuso, p_ordine, p_suffisso)
+   copie["prezzo"] = np.round(copie["prezzo"].to_numpy(dtype=np.float64)
+                              * np.exp(generatore.normal(0, variazione_prezzo, n_match))).astype(agoda["prezzo"].dtype)
+   altri = replica_permutata(agoda, righe_agoda - n_match, tabelle[repliche_booking:])
+
+   # Le copie sono mescolate ai record senza corrispondente
+   ordine = generatore.permutation(righe_agoda)
+   dataframe_agoda = pd.concat([copie, altri], ignore_index=True).iloc[ordine].reset_index(drop=True)
+   posizione = np.empty(righe_agoda, dtype=np.int64)
+   posizione[ordine] = np.arange(righe_agoda)
+   veri = pd.MultiIndex.from_arrays([scelti, posizione[:n_match]], names=["index_booking", "index_agoda"])
+
+   pulizia = modulo_pulizia()
+   for dataframe in (dataframe_booking, dataframe_agoda):
+      dataframe["titolo_processed"] = pulizia.alfabeto_colonna(dataframe["titolo"])
+   return dataframe_booking, dataframe_agoda, veri
+
+
+def genera_piattaforme(booking: pd.DataFrame,
+                       righe: int,
+                       piattaforme: tuple = ("booking", "agoda", "expedia"),
+                       frazione: float = 0.8,
+                       p_refuso: float = 0.5,
+                       p_ordine: float = 0.3,
+                       p_suffisso: float = 0.3,
+                       variazione_prezzo: float = 0.05,
+                       seme: int = 0) -> tuple:
+   """Funzione che genera un dataset etichettato con più piattaforme, per il record linkage tra più piattaforme
+      (multipiattaforma.py). Le entità sono 'righe' record di booking replicati come in genera_dataset();
+      ogni piattaforma contiene una frazione delle entità, in ordine casuale: la prima piattaforma con i titoli originali,
+      le altre con titoli e prezzi perturbati (vedi perturba_titoli()) indipendentemente l'una dall'altra.
+      Input:
+         - booking, dataframe di 'Data Product';
+         - righe, numero di entità;
+         - piattaforme (opzionale), nomi delle piattaforme;
+         - frazione (opzionale), frazione delle entità presenti in ogni piattaforma;
+         - p_refuso, p_ordine, p_suffisso, variazione_prezzo, seme (opzionali), come in genera_dataset().
+      Output:
+         - dizionario nome della piattaforma -> dataframe con index 0..n-1 e le colonne di booking;
+         - dizionario nome della piattaforma -> Series con l'entità vera di ogni record (stesso index).
+   """
+   booking = booking.assign(titolo=booking["titolo"].fillna(booking["titolo_processed"]))
+   generatore = np.random.default_rng(seme)
+   repliche = -(-righe // len(booking))
+   entita = replica_permutata(booking, righe, [None] + tabelle_permutazione(generatore, repliche - 1))
+
+   dataframe, veri = {}, {}
+   pulizia = modulo_pulizia()
+   for k, nome in enumerate(piattaforme):
+      scelte = generatore.permutation(righe)[:round(frazione * righe)]
+      copia = entita.iloc[scelte].reset_index(drop=True)
+      if k:
+         copia["titolo"] = perturba_titoli(copia["titolo"].to_numpy(), generatore, p_refuso, p_ordine, p_suffisso)
+         copia["prezzo"] = np.round(copia["prezzo"].to_numpy(dtype=np.float64)
+                                    * np.exp(generatore.normal(0, variazione_prezzo, len(copia))))
+      copia["titolo_processed"] = pulizia.alfabeto_colonna(copia["titolo"])
+      dataframe[nome] = copia
+      veri[nome] = pd.Series(scelte, index=copia.index, name="entita")
+   return dataframe, veri
+
+
+def main():
+   parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+   parser.add_argument("--righe", type=int, required=True)
+   parser.add_argument("--cartella", type=Path, required=True)
+   parser.add_argument("--frazione-match", type=float, default=0.5)
+   parser.add_argument("--seme", type=int, default=0)
+   args = parser.parse_args()
+
+   paths = carica_percorsi()
+   booking = pd.read_csv(paths["path_data_product"] / "booking.csv", index_col=0)
+   agoda = pd.read_csv(paths["path_data_product"] / "agoda.csv", index_col=0)
+   dataframe_booking, dataframe_agoda, veri = genera_dataset(booking, agoda, args.righe,
+                                                             frazione_match=args.frazione_match, seme=args.seme)
+   args.cartella.mkdir(parents=True, exist_ok=True)
+   dataframe_booking.to_csv(args.cartella / "booking.csv")
+   dataframe_agoda.to_csv(args.cartella / "agoda.csv")
+   veri.to_frame().to_csv(args.cartella / "coppie_vere.csv", index=False)
+   print(f"booking {len(dataframe_booking)} righe, agoda {len(dataframe_agoda)} righe, coppie vere {len(veri)}: {args.cartella}")
+
+
+if __name__ == "__main__":
+   main()